@@ -29,6 +29,7 @@ from auth.domain.schemas import (
 from auth.domain.interfaces import IAuthService, ITokenService
 from auth.infrastructure.email import EmailService
 from auth.infrastructure.token_blacklist_service import TokenBlacklistService
+from auth.infrastructure.backpressure import INTERACTIVE_ROUTE_CLASS, db_route
 from auth.domain.db_constants import *
 from config import settings
 
@@ -66,6 +67,7 @@ class AuthRouter:
         self.router.add_api_route("/login", 
                                  self.login_user, 
                                  methods=["POST"], 
+                                 dependencies=[Depends(db_route(INTERACTIVE_ROUTE_CLASS))], 
                                  response_model=TokenResponse, 
                                  responses={400: {"model": ErrorResponse}})
         
@@ -73,6 +75,7 @@ class AuthRouter:
         self.router.add_api_route("/refresh", 
                                  self.refresh_token, 
                                  methods=["POST"], 
+                                 dependencies=[Depends(db_route(INTERACTIVE_ROUTE_CLASS))], 
                                  response_model=TokenResponse, 
                                  responses={400: {"model": ErrorResponse}})
         
@@ -80,12 +83,14 @@ class AuthRouter:
         self.router.add_api_route("/logout", 
                                  self.logout, 
                                  methods=["POST"], 
+                                 dependencies=[Depends(db_route(INTERACTIVE_ROUTE_CLASS))], 
                                  responses={400: {"model": ErrorResponse}})
         
         # Получение информации о аккаунте
         self.router.add_api_route("/me", 
                                  self.get_current_user_info, 
-                                 methods=["GET"])
+                                 methods=["GET"], 
+                                 dependencies=[Depends(db_route(INTERACTIVE_ROUTE_CLASS))])
         
         # Восстановление забытого пароля(на почту приходит ссылка для сброса пароля)
         self.router.add_api_route("/forgot-password", 
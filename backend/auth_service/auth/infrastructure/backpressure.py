@@ -0,0 +1,162 @@
+import asyncio
+import json
+import logging
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Callable, List, Optional, TypeVar
+
+from auth.infrastructure.pool_stats import PoolStats
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Классы маршрутов, для которых задается допустимое время ожидания соединения
+DEFAULT_ROUTE_CLASS = "default"
+INTERACTIVE_ROUTE_CLASS = "interactive"
+ADMIN_ROUTE_CLASS = "admin"
+
+
+class PoolExhaustedError(Exception):
+    """
+    Соединение не получено из пула за допустимое для класса маршрута время
+    или очередь ожидания соединения переполнена. Отвечается 503 с Retry-After.
+    """
+
+    def __init__(self, route_class: str, reason: str):
+        super().__init__(f"Пул соединений с БД перегружен ({reason}), класс маршрута: {route_class}")
+        self.route_class = route_class
+        self.retry_after = settings.DB_RETRY_AFTER
+
+
+class RequestRoute:
+    """
+    Класс маршрута текущего HTTP-запроса и отказ в соединении, если он был
+    """
+
+    def __init__(self):
+        self.route_class = DEFAULT_ROUTE_CLASS
+        self.rejection: Optional[PoolExhaustedError] = None
+
+
+_current_route: ContextVar[Optional[RequestRoute]] = ContextVar("db_request_route", default=None)
+
+
+def get_request_route() -> Optional[RequestRoute]:
+    """
+    Возвращает класс маршрута текущего HTTP-запроса или None вне запроса
+    """
+    return _current_route.get()
+
+
+def db_route(route_class: str) -> Callable[[], Awaitable[None]]:
+    """
+    Зависимость FastAPI, задающая класс маршрута (см. acquire_timeout)
+    """
+    async def set_db_route() -> None:
+        route = _current_route.get()
+        if route is not None:
+            route.route_class = route_class
+
+    return set_db_route
+
+
+def acquire_timeout(route_class: str) -> float:
+    """
+    Допустимое время ожидания соединения из пула для класса маршрута
+    """
+    timeouts = {
+        INTERACTIVE_ROUTE_CLASS: settings.DB_ACQUIRE_TIMEOUT_INTERACTIVE,
+        ADMIN_ROUTE_CLASS: settings.DB_ACQUIRE_TIMEOUT_ADMIN,
+    }
+    return timeouts.get(route_class, settings.DB_ACQUIRE_TIMEOUT)
+
+
+async def wait_for_connection(acquire: Callable[[], Awaitable[T]], stats: PoolStats,
+                              route_class: str, timeout: float) -> T:
+    """
+    Ожидает соединение из пула с учетом очереди ожидания в статистике пула.
+    Если в очереди уже DB_ACQUIRE_MAX_WAITING запросов, отказ возвращается сразу.
+    """
+    max_waiting = settings.DB_ACQUIRE_MAX_WAITING
+    if max_waiting is not None and stats.waiting >= max_waiting:
+        stats.record_rejected(route_class)
+        raise PoolExhaustedError(route_class, f"в очереди {stats.waiting} запросов")
+
+    stats.queue_enter()
+    started = time.perf_counter()
+    try:
+        connection = await acquire()
+    except asyncio.TimeoutError:
+        stats.record_rejected(route_class)
+        raise PoolExhaustedError(route_class, f"соединение не получено за {timeout:g} с") from None
+    finally:
+        stats.queue_exit()
+    stats.record_acquire(time.perf_counter() - started)
+    return connection
+
+
+def overloaded_messages(error: PoolExhaustedError) -> List[dict]:
+    """
+    ASGI-сообщения ответа 503 с заголовком Retry-After
+    """
+    body = json.dumps({"detail": "Сервис перегружен, повторите запрос позже"}, ensure_ascii=False).encode()
+    return [
+        {
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(error.retry_after).encode()),
+            ],
+        },
+        {"type": "http.response.body", "body": body},
+    ]
+
+
+class BackpressureMiddleware:
+    """
+    ASGI middleware, отвечающее 503 с Retry-After, если запросу не хватило соединения из пула.
+
+    Ответ обработчика заменяется, даже если ошибка была перехвачена в репозитории:
+    иначе перегрузка пула выглядела бы для клиента как "неверные данные для входа"
+    или как отсутствие токена в черном списке.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = RequestRoute()
+        response_started = False
+        overloaded = False
+
+        async def send_or_overloaded(message):
+            nonlocal response_started, overloaded
+            if message["type"] == "http.response.start":
+                response_started = True
+                if route.rejection is not None:
+                    overloaded = True
+                    logger.warning(f"Отказ в соединении с БД: {str(route.rejection)}")
+                    for overloaded_message in overloaded_messages(route.rejection):
+                        await send(overloaded_message)
+                    return
+            if not overloaded:
+                await send(message)
+
+        token = _current_route.set(route)
+        try:
+            await self.app(scope, receive, send_or_overloaded)
+        except PoolExhaustedError as e:
+            if response_started:
+                raise
+            for message in overloaded_messages(e):
+                await send(message)
+        finally:
+            _current_route.reset(token)
@@ -1,15 +1,36 @@
 import logging
-from typing import Dict, List, Any, Optional
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from functools import partial
+from typing import AsyncIterator, Dict, List, Any, Optional
 import asyncpg
 from asyncpg.pool import Pool
 from auth.domain.db_constants import *
+from auth.infrastructure.backpressure import (
+    DEFAULT_ROUTE_CLASS, PoolExhaustedError, acquire_timeout, get_request_route, wait_for_connection
+)
+from auth.infrastructure.hot_statements import hot_statements, prepare_hot_statements
+from auth.infrastructure.pool_stats import PoolStats
 from config import settings
 
 logger = logging.getLogger(__name__)
 
+
+class PoolerConnection(asyncpg.Connection):
+    """
+    Соединение через PgBouncer с pool_mode=transaction: сеанс на сервере не закреплен
+    за клиентом, поэтому при возврате в пул он не сбрасывается
+    """
+
+    def _get_reset_query(self) -> str:
+        return ""
+
+
 class Database:
     _instance = None
     _pool: Optional[Pool] = None
+    _stats: PoolStats = PoolStats()
+    _ready = False
 
     def __new__(cls):
         if cls._instance is None:
@@ -18,6 +39,7 @@ class Database:
 
     async def connect(self) -> None:
         if self._pool is None:
+            started = time.perf_counter()
             try:
                 logger.info("Подключение к базе данных...")
                 self._pool = await asyncpg.create_pool(
@@ -25,14 +47,104 @@ class Database:
                     password=settings.DB_PASSWORD,
                     host=settings.DB_HOST,
                     port=settings.DB_PORT,
-                    database=settings.DB_NAME
+                    database=settings.DB_NAME,
+                    **self._pool_options()
                 )
                 logger.info("Подключение к базе данных успешно установлено.")
             except Exception as e:
                 logger.error(f"Ошибка при подключении к базе данных: {str(e)}")
                 raise
+            self._ready = True
+            logger.info(
+                f"База данных готова за {time.perf_counter() - started:.3f} с, "
+                f"подготовлено частых запросов: {self._stats.statements_prepared}"
+            )
+
+    def is_ready(self) -> bool:
+        """
+        Пул создан и частые запросы подготовлены на его соединениях
+        """
+        return self._ready and self._pool is not None
+
+    def _pool_options(self) -> Dict[str, Any]:
+        """
+        Параметры пула соединений из настроек приложения
+        """
+        options = {
+            "min_size": settings.DB_POOL_MIN_SIZE,
+            "max_size": settings.DB_POOL_MAX_SIZE,
+            "max_queries": settings.DB_POOL_MAX_QUERIES,
+            "max_inactive_connection_lifetime": settings.DB_POOL_MAX_INACTIVE_CONNECTION_LIFETIME,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "command_timeout": settings.DB_COMMAND_TIMEOUT,
+            "init": self._init_connection,
+        }
+        if settings.DB_TRANSACTION_POOLER:
+            # Без кэша asyncpg использует безымянные подготовленные запросы, которые
+            # не переживают смену серверного соединения пулером
+            options["statement_cache_size"] = 0
+            options["connection_class"] = PoolerConnection
+        if settings.DB_APPLICATION_NAME:
+            options["server_settings"] = {"application_name": settings.DB_APPLICATION_NAME}
+        if settings.DB_CONNECTION_SETUP_SQL and not settings.DB_TRANSACTION_POOLER:
+            options["setup"] = self._setup_connection
+        return options
+
+    async def _init_connection(self, connection: asyncpg.Connection) -> None:
+        """
+        Вызывается пулом один раз для каждого нового физического соединения.
+        За пулером транзакций SQL сеанса и прогрев запросов пропускаются
+        """
+        self._stats.record_connection_opened()
+        if settings.DB_TRANSACTION_POOLER:
+            return
+        if settings.DB_CONNECTION_INIT_SQL:
+            await connection.execute(settings.DB_CONNECTION_INIT_SQL)
+        if settings.DB_WARMUP_STATEMENTS and settings.DB_STATEMENT_CACHE_SIZE and hot_statements():
+            started = time.perf_counter()
+            prepared = await prepare_hot_statements(connection)
+            self._stats.record_warmup(time.perf_counter() - started, prepared)
+
+    async def _setup_connection(self, connection: asyncpg.Connection) -> None:
+        """
+        Вызывается пулом при каждой выдаче соединения,
+        подключается только если задан DB_CONNECTION_SETUP_SQL
+        """
+        await connection.execute(settings.DB_CONNECTION_SETUP_SQL)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[asyncpg.Connection]:
+        """
+        Выдает соединение из пула и учитывает время ожидания в статистике пула.
+        Ожидание ограничено временем для класса маршрута (см. acquire_timeout),
+        после которого возбуждается PoolExhaustedError
+        """
+        if not self._pool:
+            await self.connect()
+        
+        route = get_request_route()
+        route_class = route.route_class if route else DEFAULT_ROUTE_CLASS
+        timeout = acquire_timeout(route_class)
+        async with AsyncExitStack() as stack:
+            try:
+                connection = await wait_for_connection(
+                    partial(stack.enter_async_context, self._pool.acquire(timeout=timeout)),
+                    self._stats, route_class, timeout
+                )
+            except PoolExhaustedError as e:
+                if route is not None:
+                    route.rejection = e
+                raise
+            yield connection
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Возвращает состояние пула соединений и накопленную статистику
+        """
+        return self._stats.snapshot(self._pool)
 
     async def disconnect(self) -> None:
+        self._ready = False
         if self._pool:
             await self._pool.close()
             self._pool = None
@@ -43,10 +155,7 @@ class Database:
         Выполняет SQL запрос без возврата данных
         для INSERT, UPDATE, DELETE операций
         """
-        if not self._pool:
-            await self.connect()
-        
-        async with self._pool.acquire() as connection:
+        async with self.acquire() as connection:
             try:
                 return await connection.execute(query, *args, **kwargs)
             except Exception as e:
@@ -57,10 +166,7 @@ class Database:
         """
         Возвращает список строк результата запроса
         """
-        if not self._pool:
-            await self.connect()
-        
-        async with self._pool.acquire() as connection:
+        async with self.acquire() as connection:
             try:
                 rows = await connection.fetch(query, *args, **kwargs)
                 return [dict(row) for row in rows]
@@ -72,10 +178,7 @@ class Database:
         """
         Возвращает первую строку результата как словарь
         """
-        if not self._pool:
-            await self.connect()
-        
-        async with self._pool.acquire() as connection:
+        async with self.acquire() as connection:
             try:
                 row = await connection.fetchrow(query, *args, **kwargs)
                 return dict(row) if row else None
@@ -87,10 +190,7 @@ class Database:
         """
         Возвращает значение из первой строки результата
         """
-        if not self._pool:
-            await self.connect()
-        
-        async with self._pool.acquire() as connection:
+        async with self.acquire() as connection:
             try:
                 return await connection.fetchval(query, *args, **kwargs)
             except Exception as e:
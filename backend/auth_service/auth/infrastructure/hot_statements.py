@@ -0,0 +1,38 @@
+import logging
+from typing import List, Tuple
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+_hot_statements: List[str] = []
+
+
+def hot_statement(query: str) -> str:
+    """
+    Добавляет запрос в список запросов, подготавливаемых на каждом новом соединении.
+    Возвращает запрос без изменений
+    """
+    if query not in _hot_statements:
+        _hot_statements.append(query)
+    return query
+
+
+def hot_statements() -> Tuple[str, ...]:
+    return tuple(_hot_statements)
+
+
+async def prepare_hot_statements(connection: asyncpg.Connection) -> int:
+    """
+    Подготавливает частые запросы на соединении, возвращает число подготовленных.
+    Ошибка подготовки не мешает открытию соединения
+    """
+    prepared = 0
+    for query in _hot_statements:
+        try:
+            # use_cache=True: запрос должен попасть в кэш, из которого его берут fetch/execute
+            await connection._prepare(query, use_cache=True)
+            prepared += 1
+        except asyncpg.PostgresError as e:
+            logger.warning(f"Не удалось подготовить запрос при прогреве соединения: {str(e)}")
+    return prepared
@@ -2,10 +2,16 @@ import logging
 from datetime import datetime
 from typing import Optional
 from auth.infrastructure.database import Database
+from auth.infrastructure.hot_statements import hot_statement
 from auth.domain.db_constants import *
 
 logger = logging.getLogger(__name__)
 
+# Проверка токена выполняется при каждом запросе с токеном доступа
+IS_TOKEN_BLACKLISTED_QUERY = hot_statement(
+    f"SELECT 1 FROM {BLACKLISTED_TOKENS_TABLE} WHERE {BLACKLISTED_TOKEN_TOKEN} = $1"
+)
+
 class TokenBlacklistService:
     
     @staticmethod
@@ -36,8 +42,7 @@ class TokenBlacklistService:
         """
         try:
             db = Database()
-            query = f"SELECT 1 FROM {BLACKLISTED_TOKENS_TABLE} WHERE {BLACKLISTED_TOKEN_TOKEN} = $1"
-            result = await db.fetchval(query, token)
+            result = await db.fetchval(IS_TOKEN_BLACKLISTED_QUERY, token)
             return result is not None
         except Exception as e:
             logger.error(f"Ошибка при проверке токена в черном списке: {str(e)}")
@@ -3,10 +3,15 @@ from typing import Dict, List, Any, Optional, Tuple
 import uuid
 
 from auth.infrastructure.database import Database
+from auth.infrastructure.hot_statements import hot_statement
 from auth.domain.db_constants import *
 
 logger = logging.getLogger(__name__)
 
+# Поиск пользователя при входе и при проверке токена
+USER_BY_EMAIL_QUERY = hot_statement(f"SELECT * FROM {USERS_TABLE} WHERE {USER_EMAIL} = $1")
+USER_BY_ID_QUERY = hot_statement(f"SELECT * FROM {USERS_TABLE} WHERE {USER_ID} = $1")
+
 class UserRepository:
     def __init__(self):
         self.db = Database()
@@ -66,8 +71,7 @@ class UserRepository:
         try:
             # строка в число - защита от инъекций
             numeric_id = int(user_id)
-            query = f"SELECT * FROM {USERS_TABLE} WHERE {USER_ID} = $1"
-            return await self.db.fetchrow(query, numeric_id)
+            return await self.db.fetchrow(USER_BY_ID_QUERY, numeric_id)
         except ValueError:
             logger.error(f"Некорректный формат ID пользователя: {user_id}")
             return None
@@ -78,8 +82,7 @@ class UserRepository:
     async def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
 
         try:
-            query = f"SELECT * FROM {USERS_TABLE} WHERE {USER_EMAIL} = $1"
-            return await self.db.fetchrow(query, email)
+            return await self.db.fetchrow(USER_BY_EMAIL_QUERY, email)
         except Exception as e:
             logger.error(f"Ошибка при получении пользователя по email {email}: {str(e)}")
             return None
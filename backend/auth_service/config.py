@@ -33,6 +33,29 @@ class Settings(BaseSettings):
     DB_HOST: str
     DB_PORT: int
     
+    # Параметры пула соединений asyncpg (значения по умолчанию совпадают с asyncpg)
+    DB_POOL_MIN_SIZE: int = 10
+    DB_POOL_MAX_SIZE: int = 10
+    DB_POOL_MAX_QUERIES: int = 50000
+    DB_POOL_MAX_INACTIVE_CONNECTION_LIFETIME: float = 300.0
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_COMMAND_TIMEOUT: Optional[float] = None
+    DB_APPLICATION_NAME: Optional[str] = "trainova_auth_service"
+    # SQL, выполняемый при открытии соединения (init) и при каждой выдаче из пула (setup)
+    DB_CONNECTION_INIT_SQL: Optional[str] = None
+    DB_CONNECTION_SETUP_SQL: Optional[str] = None
+    # Подготовка частых запросов (auth/infrastructure/hot_statements.py) на новых соединениях
+    DB_WARMUP_STATEMENTS: bool = True
+    # Подключение через PgBouncer с pool_mode=transaction
+    DB_TRANSACTION_POOLER: bool = False
+    # Допустимое время ожидания соединения из пула по классам маршрутов (см. db_route)
+    # и предельная длина очереди ожидания (None - без ограничения); при отказе - 503
+    # с заголовком Retry-After (DB_RETRY_AFTER секунд)
+    DB_ACQUIRE_TIMEOUT: float = 2.0
+    DB_ACQUIRE_TIMEOUT_INTERACTIVE: float = 1.0
+    DB_ACQUIRE_TIMEOUT_ADMIN: float = 5.0
+    DB_ACQUIRE_MAX_WAITING: Optional[int] = 100
+    DB_RETRY_AFTER: int = 1
     
     class Config:
         env_file = os.environ.get("CONFIG_FILE", ".env")
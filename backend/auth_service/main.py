@@ -6,6 +6,7 @@ import logging
 import sys
 
 from auth import router as auth_router
+from auth.infrastructure.backpressure import ADMIN_ROUTE_CLASS, BackpressureMiddleware, PoolExhaustedError, db_route
 from auth.infrastructure.database import Database
 from auth.infrastructure.token_blacklist_service import TokenBlacklistService
 from config import settings
@@ -31,7 +32,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
+# Подключается последним, чтобы класс маршрута и отказ в соединении были видны во всем запросе
+app.add_middleware(BackpressureMiddleware)
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
@@ -40,6 +44,15 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         content={"detail": exc.detail}
     )
 
+@app.exception_handler(PoolExhaustedError)
+async def pool_exhausted_handler(request: Request, exc: PoolExhaustedError):
+    logger.warning(f"Отказ в соединении с БД: {str(exc)}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Сервис перегружен, повторите запрос позже"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 app.include_router(auth_router)
 
 @app.get("/")
@@ -51,6 +64,12 @@ def read_root():
         "docs_url": "/docs/api/auth"
     }
 
+@app.get("/ready")
+def readiness():
+    if not Database().is_ready():
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready"}
+
 def custom_openapi():
     if app.openapi_schema:
         return app.openapi_schema
@@ -97,7 +116,7 @@ async def shutdown_event():
     
     logger.info("Приложение остановлено")
 
-@app.post("/admin/clean-expired-tokens")
+@app.post("/admin/clean-expired-tokens", dependencies=[Depends(db_route(ADMIN_ROUTE_CLASS))])
 async def clean_expired_tokens():
     try:
         count = await TokenBlacklistService.clean_expired_tokens()
@@ -109,6 +128,10 @@ async def clean_expired_tokens():
             detail=f"Ошибка при очистке токенов: {str(e)}"
         )
 
+@app.get("/admin/db/pool-stats", dependencies=[Depends(db_route(ADMIN_ROUTE_CLASS))])
+async def db_pool_stats():
+    return Database().pool_stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
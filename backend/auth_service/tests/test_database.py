@@ -0,0 +1,184 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from auth.infrastructure.backpressure import BackpressureMiddleware, PoolExhaustedError, db_route
+from auth.infrastructure.database import Database, PoolerConnection
+from auth.infrastructure.pool_stats import PoolStats
+
+
+class FakePoolAcquire:
+    async def __aenter__(self):
+        connection = MagicMock()
+        connection.fetchval = AsyncMock(return_value=1)
+        return connection
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+@pytest.fixture
+def mock_pool():
+    pool = MagicMock()
+    pool.get_size.return_value = 4
+    pool.get_idle_size.return_value = 1
+    pool.get_min_size.return_value = 1
+    pool.get_max_size.return_value = 4
+    pool.acquire.return_value = FakePoolAcquire()
+    return pool
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_counts_acquisitions(mock_pool):
+    db = Database()
+    with patch.object(Database, "_pool", mock_pool), patch.object(Database, "_stats", PoolStats()):
+        await db.fetchval("SELECT 1")
+        async with db.acquire():
+            pass
+
+        stats = db.pool_stats()
+
+    assert stats["acquisitions"] == 2
+    assert stats["size"] == 4
+    assert stats["in_use"] == 3
+    assert sum(stats["acquire_wait_histogram"].values()) == 2
+
+
+def test_pool_options_from_settings():
+    with patch("auth.infrastructure.database.settings") as settings:
+        settings.DB_POOL_MAX_SIZE = 30
+        settings.DB_STATEMENT_CACHE_SIZE = 0
+        settings.DB_APPLICATION_NAME = "auth"
+        settings.DB_CONNECTION_SETUP_SQL = "SET statement_timeout = 1000"
+        settings.DB_TRANSACTION_POOLER = False
+
+        options = Database()._pool_options()
+
+    assert options["max_size"] == 30
+    assert options["statement_cache_size"] == 0
+    assert options["server_settings"] == {"application_name": "auth"}
+    assert "setup" in options
+
+
+def test_pool_options_behind_transaction_pooler():
+    with patch("auth.infrastructure.database.settings") as settings:
+        settings.DB_APPLICATION_NAME = "auth"
+        settings.DB_STATEMENT_CACHE_SIZE = 100
+        settings.DB_CONNECTION_SETUP_SQL = "SET statement_timeout = 1000"
+        settings.DB_TRANSACTION_POOLER = True
+
+        options = Database()._pool_options()
+
+    assert options["statement_cache_size"] == 0
+    assert options["connection_class"] is PoolerConnection
+    assert "setup" not in options
+
+
+class SlowPoolAcquire:
+    """Соединение не освобождается за время ожидания"""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+    async def __aenter__(self):
+        await asyncio.wait_for(asyncio.Event().wait(), self.timeout)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+@pytest.mark.asyncio
+async def test_exhausted_pool_replaces_response_with_503(mock_pool):
+    mock_pool.acquire.side_effect = lambda timeout=None: SlowPoolAcquire(timeout)
+    db = Database()
+    sent = []
+
+    async def app(scope, receive, send):
+        # Репозиторий перехватывает ошибку, и обработчик отвечает так, будто пользователь не найден
+        await db_route("interactive")()
+        try:
+            await db.fetchrow("SELECT * FROM users WHERE email = $1", "user@example.com")
+        except Exception:
+            pass
+        await send({"type": "http.response.start", "status": 401, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def send(message):
+        sent.append(message)
+
+    with patch.object(Database, "_pool", mock_pool), patch.object(Database, "_stats", PoolStats()), \
+            patch("auth.infrastructure.backpressure.settings") as settings:
+        settings.DB_ACQUIRE_TIMEOUT_INTERACTIVE = 0.01
+        settings.DB_ACQUIRE_MAX_WAITING = 10
+        settings.DB_RETRY_AFTER = 2
+        await BackpressureMiddleware(app)({"type": "http"}, None, send)
+        queue = db.pool_stats()["queue"]
+
+    assert sent[0]["status"] == 503
+    assert dict(sent[0]["headers"])[b"retry-after"] == b"2"
+    assert len(sent) == 2
+    assert queue["rejected_by_route_class"] == {"interactive": 1}
+    assert queue["waiting"] == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_immediately(mock_pool):
+    db = Database()
+    stats = PoolStats()
+    stats.queue_enter()
+
+    with patch.object(Database, "_pool", mock_pool), patch.object(Database, "_stats", stats), \
+            patch("auth.infrastructure.backpressure.settings") as settings:
+        settings.DB_ACQUIRE_TIMEOUT = 2.0
+        settings.DB_ACQUIRE_MAX_WAITING = 1
+        with pytest.raises(PoolExhaustedError):
+            await db.fetchval("SELECT 1")
+
+    assert stats.rejected == {"default": 1}
+    assert stats.acquisitions == 0
+
+
+class FakeCreatedPool:
+    """Пул, открывающий min_size соединений через хук init, как asyncpg.create_pool"""
+
+    def __init__(self, init, min_size, **kwargs):
+        self.init = init
+        self.connections = [MagicMock(_prepare=AsyncMock()) for _ in range(min_size)]
+
+    async def open(self):
+        for connection in self.connections:
+            await self.init(connection)
+        return self
+
+
+@pytest.mark.asyncio
+async def test_connect_prepares_hot_statements_before_ready():
+    db = Database()
+    pools = []
+
+    async def create_pool(**kwargs):
+        assert not db.is_ready()
+        pools.append(FakeCreatedPool(**kwargs))
+        return await pools[-1].open()
+
+    # connect присваивает _pool и _ready экземпляру-одиночке, поэтому подменяются атрибуты экземпляра
+    with patch.object(db, "_pool", None), patch.object(db, "_ready", False), \
+            patch.object(Database, "_stats", PoolStats()), \
+            patch("auth.infrastructure.database.asyncpg.create_pool", create_pool), \
+            patch("auth.infrastructure.database.settings") as settings, \
+            patch("auth.infrastructure.hot_statements._hot_statements", ["SELECT 1", "SELECT 2"]):
+        settings.DB_POOL_MIN_SIZE = 2
+        settings.DB_STATEMENT_CACHE_SIZE = 100
+        settings.DB_WARMUP_STATEMENTS = True
+        settings.DB_CONNECTION_INIT_SQL = None
+        settings.DB_CONNECTION_SETUP_SQL = None
+        settings.DB_TRANSACTION_POOLER = False
+
+        await db.connect()
+
+        assert db.is_ready()
+        assert Database._stats.statements_prepared == 4
+
+    prepared = pools[0].connections[0]._prepare.call_args_list
+    assert [call.args[0] for call in prepared] == ["SELECT 1", "SELECT 2"]
+    assert all(call.kwargs["use_cache"] for call in prepared)
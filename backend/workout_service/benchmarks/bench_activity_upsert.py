@@ -0,0 +1,137 @@
+"""
+Бенчмарк одновременного обновления активности пользователя за один день.
+
+Запускает --increments одновременных увеличений счетчика тренировок одного пользователя
+за одну дату (как при одновременных завершениях тренировок) двумя способами:
+    - прежний путь: SELECT строки активности, затем UPDATE или INSERT отдельными запросами;
+    - ActivityService.update_user_activity: один запрос USER_ACTIVITY_UPSERT_QUERY.
+Для каждого способа выводятся время всех увеличений, p50/p95 одного увеличения, число ошибок
+(одновременные INSERT отсутствующей строки нарушают первичный ключ) и итоговый счетчик,
+который должен быть равен числу увеличений.
+
+Строки активности и веса --user-id удаляются до и после каждого замера.
+Требуется доступная база данных и настроенный .env.
+
+Запуск из каталога backend/workout_service:
+    python -m benchmarks.bench_activity_upsert --increments 100 --connections 20 --rounds 5
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, List
+from uuid import uuid4
+
+import asyncpg
+
+from config import settings
+from training.application.services.activity_service import ActivityService
+from training.infrastructure.database import Database
+from training.infrastructure.request_scope import RequestScope, run_in_scope
+
+CLEANUP_QUERIES = (
+    "DELETE FROM user_activities WHERE user_id = $1",
+    "DELETE FROM user_weights WHERE user_id = $1",
+)
+
+
+async def legacy_increment(db: Database, user_id: int, record_date: date) -> None:
+    """Прежний путь: поиск строки активности, затем UPDATE или INSERT"""
+    existing = await db.fetchrow(
+        "SELECT * FROM user_activities WHERE user_id = $1 AND record_date = $2", user_id, record_date
+    )
+    if existing:
+        await db.fetchrow(
+            "UPDATE user_activities SET workout_count = workout_count + $3, last_workout_uuid = $4 "
+            "WHERE user_id = $1 AND record_date = $2 RETURNING *",
+            user_id, record_date, 1, uuid4()
+        )
+    else:
+        await db.fetchrow(
+            "INSERT INTO user_activities (user_id, record_date, workout_count, last_workout_uuid) "
+            "VALUES ($1, $2, $3, $4) RETURNING *",
+            user_id, record_date, 1, uuid4()
+        )
+
+
+async def upsert_increment(service: ActivityService, user_id: int, record_date: date) -> None:
+    """Новый путь: один запрос ActivityService.update_user_activity"""
+    await service.update_user_activity(user_id, record_date, 1, increment=True, last_workout_uuid=uuid4())
+
+
+async def in_request(func: Callable[[], Awaitable[Any]]) -> float:
+    """Выполняет func так же, как обработчик HTTP-запроса, и возвращает время выполнения в мс"""
+    scope = RequestScope(budget=settings.DB_REQUEST_BUDGET)
+    started = time.perf_counter()
+    try:
+        await run_in_scope(scope, func())
+    finally:
+        await scope.close()
+    return (time.perf_counter() - started) * 1000
+
+
+async def measure(db: Database, func: Callable[[], Awaitable[Any]], user_id: int, record_date: date,
+                  increments: int, rounds: int) -> Dict[str, float]:
+    totals, timings, errors, lost = [], [], 0, 0
+    for _ in range(rounds):
+        for query in CLEANUP_QUERIES:
+            await db.execute(query, user_id)
+        started = time.perf_counter()
+        results = await asyncio.gather(*[in_request(func) for _ in range(increments)], return_exceptions=True)
+        totals.append((time.perf_counter() - started) * 1000)
+        timings.extend(result for result in results if isinstance(result, float))
+        errors += sum(isinstance(result, Exception) for result in results)
+        count = await db.fetchval(
+            "SELECT workout_count FROM user_activities WHERE user_id = $1 AND record_date = $2", user_id, record_date
+        )
+        lost += increments - (count or 0)
+    for query in CLEANUP_QUERIES:
+        await db.execute(query, user_id)
+    return {
+        "total_ms": statistics.median(totals),
+        "p50_ms": statistics.median(timings) if timings else 0.0,
+        "p95_ms": statistics.quantiles(timings, n=20)[18] if len(timings) > 1 else (timings or [0.0])[0],
+        "errors": errors / rounds,
+        "lost": lost / rounds,
+    }
+
+
+async def main(increments: int, connections: int, rounds: int, user_id: int) -> None:
+    db = Database()
+    db._pool = await asyncpg.create_pool(
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        database=settings.DB_NAME,
+        min_size=connections,
+        max_size=connections,
+    )
+    service = ActivityService()
+    record_date = date.today()
+    try:
+        variants: List[Any] = [
+            ("legacy", lambda: legacy_increment(db, user_id, record_date)),
+            ("upsert", lambda: upsert_increment(service, user_id, record_date)),
+        ]
+        print(f"{'variant':>8} {'total, ms':>10} {'p50, ms':>9} {'p95, ms':>9} {'errors':>7} {'lost':>6}")
+        for name, func in variants:
+            result = await measure(db, func, user_id, record_date, increments, rounds)
+            print(
+                f"{name:>8} {result['total_ms']:>10.2f} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+                f"{result['errors']:>7.1f} {result['lost']:>6.1f}"
+            )
+    finally:
+        await db._pool.close()
+        db._pool = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--increments", type=int, default=100, help="Число одновременных увеличений счетчика")
+    parser.add_argument("--connections", type=int, default=20, help="Размер пула соединений")
+    parser.add_argument("--rounds", type=int, default=5, help="Число замеров для каждого способа")
+    parser.add_argument("--user-id", type=int, default=2_000_000_000, help="ID пользователя для замера")
+    args = parser.parse_args()
+    asyncio.run(main(args.increments, args.connections, args.rounds, args.user_id))
@@ -0,0 +1,213 @@
+"""
+Бенчмарк получения списка тренировок (/app-workouts).
+
+Сравнивает прежнюю реализацию (отдельные запросы на каждую тренировку) с текущей
+реализацией TrainingService.get_app_workouts (чтение из проекции user_workout_summary):
+количество обращений к БД и задержку p50/p95 в зависимости от размера каталога.
+
+Данные создаются во временной схеме, которая удаляется после завершения.
+Требуется база данных с примененными миграциями (см. database/migrations) и настроенный .env.
+
+Запуск из каталога backend/workout_service:
+    python -m benchmarks.bench_app_workouts --sizes 10 100 300 --iterations 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+import asyncpg
+
+from config import settings
+from training.application.services.activity_service import REFRESH_WORKOUT_SUMMARY_QUERY
+from training.application.services.training_service import TrainingService
+from training.domain.schemas import AppWorkout
+from training.infrastructure.database import Database
+
+BENCH_USER_ID = 1
+BENCH_TABLES = [
+    "muscle_groups",
+    "exercises",
+    "app_workouts",
+    "app_workout_exercises",
+    "user_workout_sessions",
+    "user_exercise_sessions",
+    "user_workout_summary",
+]
+
+
+class RoundTripCounter:
+    """Подсчитывает обращения к БД через методы Database"""
+
+    def __init__(self, db: Database):
+        self.count = 0
+        for name in ("fetch", "fetchrow", "fetchval", "execute"):
+            setattr(db, name, self._wrap(getattr(db, name)))
+
+    def _wrap(self, method: Callable) -> Callable:
+        async def wrapper(*args, **kwargs):
+            self.count += 1
+            return await method(*args, **kwargs)
+        return wrapper
+
+
+async def legacy_get_app_workouts(db: Database, user_id: int) -> List[AppWorkout]:
+    """Прежняя реализация: 4 запроса на каждую тренировку и суммирование времени в Python"""
+    rows = await db.fetch(
+        "SELECT * FROM app_workouts WHERE (is_visible = true OR $1 = true) ORDER BY created_at DESC",
+        False,
+    )
+    workouts = []
+    for row in rows:
+        workout = AppWorkout(**row)
+        workout.exercises = await db.fetch(
+            "SELECT * FROM app_workout_exercises WHERE app_workout_uuid = $1 ORDER BY created_at",
+            str(workout.app_workout_uuid),
+        )
+        last_session = await db.fetchrow(
+            """
+            SELECT workout_session_uuid, datetime_start FROM user_workout_sessions
+            WHERE user_id = $1 AND workout_uuid = $2 ORDER BY datetime_start DESC LIMIT 1
+            """,
+            user_id, str(workout.app_workout_uuid),
+        )
+        if last_session:
+            await db.fetchrow(
+                """
+                SELECT exercise_session_uuid FROM user_exercise_sessions
+                WHERE workout_session_uuid = $1 ORDER BY datetime_start DESC LIMIT 1
+                """,
+                str(last_session["workout_session_uuid"]),
+            )
+            times = await db.fetch(
+                """
+                SELECT datetime_start, datetime_end FROM user_exercise_sessions
+                WHERE workout_session_uuid = $1 AND datetime_end IS NOT NULL
+                """,
+                str(last_session["workout_session_uuid"]),
+            )
+            workout.total_workout_time = int(sum(
+                (t["datetime_end"] - t["datetime_start"]).total_seconds()
+                for t in times if t["datetime_start"] and t["datetime_end"]
+            ))
+        workouts.append(workout)
+    return workouts
+
+
+async def seed(conn: asyncpg.Connection, catalog_size: int, exercises_per_workout: int = 8,
+               sessions_per_workout: int = 5) -> None:
+    """Заполняет схему бенчмарка тестовыми данными"""
+    for table in reversed(BENCH_TABLES):
+        await conn.execute(f"TRUNCATE {table} CASCADE")
+
+    muscle_group_id = await conn.fetchval(
+        "INSERT INTO muscle_groups (name) VALUES ('bench') RETURNING id"
+    )
+    exercise_ids = [
+        await conn.fetchval(
+            "INSERT INTO exercises (muscle_group_id, title) VALUES ($1, $2) RETURNING exercise_id",
+            muscle_group_id, f"bench {i}",
+        )
+        for i in range(exercises_per_workout)
+    ]
+
+    now = datetime.now().astimezone()
+    workouts, workout_exercises, sessions, exercise_sessions = [], [], [], []
+    for _ in range(catalog_size):
+        workout_uuid = uuid.uuid4()
+        workouts.append((workout_uuid, "bench", True))
+        workout_exercises.extend((uuid.uuid4(), workout_uuid, exercise_id) for exercise_id in exercise_ids)
+        for s in range(sessions_per_workout):
+            session_uuid = uuid.uuid4()
+            start = now - timedelta(days=s)
+            sessions.append((session_uuid, BENCH_USER_ID, workout_uuid, start, "ended"))
+            exercise_sessions.extend(
+                (uuid.uuid4(), session_uuid, BENCH_USER_ID, exercise_id,
+                 start + timedelta(minutes=i), start + timedelta(minutes=i, seconds=40), "ended")
+                for i, exercise_id in enumerate(exercise_ids)
+            )
+
+    await conn.copy_records_to_table(
+        "app_workouts", records=workouts, columns=["app_workout_uuid", "name", "is_visible"]
+    )
+    await conn.copy_records_to_table(
+        "app_workout_exercises", records=workout_exercises,
+        columns=["id", "app_workout_uuid", "exercise_id"]
+    )
+    await conn.copy_records_to_table(
+        "user_workout_sessions", records=sessions,
+        columns=["workout_session_uuid", "user_id", "workout_uuid", "datetime_start", "status"]
+    )
+    await conn.copy_records_to_table(
+        "user_exercise_sessions", records=exercise_sessions,
+        columns=["exercise_session_uuid", "workout_session_uuid", "user_id", "exercise_uuid",
+                 "datetime_start", "datetime_end", "status"]
+    )
+    # Последняя сессия каждой тренировки создана первой (s == 0)
+    for session in sessions[::sessions_per_workout]:
+        await conn.execute(REFRESH_WORKOUT_SUMMARY_QUERY, session[0])
+    await conn.execute("ANALYZE")
+
+
+async def measure(name: str, func: Callable, counter: RoundTripCounter, iterations: int) -> Dict[str, Any]:
+    await func()  # прогрев
+    timings = []
+    counter.count = 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "name": name,
+        "round_trips": counter.count // iterations,
+        "p50_ms": statistics.median(timings),
+        "p95_ms": statistics.quantiles(timings, n=20)[18] if len(timings) > 1 else timings[0],
+    }
+
+
+async def main(sizes: List[int], iterations: int) -> None:
+    schema = f"bench_app_workouts_{uuid.uuid4().hex[:8]}"
+    dsn_kwargs = dict(
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        database=settings.DB_NAME,
+    )
+    admin = await asyncpg.connect(**dsn_kwargs)
+    await admin.execute(f"CREATE SCHEMA {schema}")
+    try:
+        for table in BENCH_TABLES:
+            await admin.execute(f"CREATE TABLE {schema}.{table} (LIKE public.{table} INCLUDING ALL)")
+
+        db = Database()
+        db._pool = await asyncpg.create_pool(**dsn_kwargs, server_settings={"search_path": schema})
+        counter = RoundTripCounter(db)
+        service = TrainingService()
+
+        print(f"{'catalog':>8} {'implementation':>15} {'round trips':>12} {'p50, ms':>9} {'p95, ms':>9}")
+        for size in sizes:
+            async with db._pool.acquire() as conn:
+                await seed(conn, size)
+            for name, func in (
+                ("legacy", lambda: legacy_get_app_workouts(db, BENCH_USER_ID)),
+                ("set-based", lambda: service.get_app_workouts(BENCH_USER_ID)),
+            ):
+                result = await measure(name, func, counter, iterations)
+                print(f"{size:>8} {result['name']:>15} {result['round_trips']:>12} "
+                      f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f}")
+        await db.disconnect()
+    finally:
+        await admin.execute(f"DROP SCHEMA {schema} CASCADE")
+        await admin.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 300])
+    parser.add_argument("--iterations", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.iterations))
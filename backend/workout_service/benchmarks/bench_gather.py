@@ -0,0 +1,92 @@
+"""
+Бенчмарк параллельного выполнения независимых запросов HTTP-запроса.
+
+Сравнивает сквозное время обработки запроса (p50/p95), выполняющего независимые запросы
+последовательно на соединении запроса и через Database.gather на отдельных соединениях
+пула. Время выполнения каждого запроса на сервере задается pg_sleep (--latency), чтобы
+результат не зависел от данных в таблицах.
+
+Требуется доступная база данных и настроенный .env.
+
+Запуск из каталога backend/workout_service:
+    python -m benchmarks.bench_gather --queries 2 --latency 0.005 --iterations 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+import asyncpg
+
+from config import settings
+from training.infrastructure.database import Database
+from training.infrastructure.request_scope import RequestScope, run_in_scope
+
+QUERY = "SELECT pg_sleep($1)"
+
+
+async def sequential(db: Database, queries: int, latency: float) -> List[Any]:
+    """Прежний путь: запросы друг за другом на соединении запроса"""
+    return [await db.fetchval(QUERY, latency) for _ in range(queries)]
+
+
+async def gathered(db: Database, queries: int, latency: float) -> List[Any]:
+    """Новый путь: независимые запросы параллельно через Database.gather"""
+    return await db.gather(*[db.fetchval(QUERY, latency) for _ in range(queries)])
+
+
+async def in_request(func: Callable[[], Awaitable[Any]]) -> None:
+    """Выполняет func так же, как обработчик HTTP-запроса (см. RequestScopeMiddleware)"""
+    scope = RequestScope(budget=settings.DB_REQUEST_BUDGET)
+    try:
+        await run_in_scope(scope, func())
+    finally:
+        await scope.close()
+
+
+async def measure(func: Callable[[], Awaitable[Any]], iterations: int) -> Dict[str, float]:
+    await in_request(func)  # прогрев
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await in_request(func)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "p50_ms": statistics.median(timings),
+        "p95_ms": statistics.quantiles(timings, n=20)[18] if len(timings) > 1 else timings[0],
+    }
+
+
+async def main(queries: int, latency: float, iterations: int) -> None:
+    db = Database()
+    db._pool = await asyncpg.create_pool(
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        database=settings.DB_NAME,
+        min_size=queries,
+        max_size=queries,
+    )
+    try:
+        variants = [
+            ("sequential", sequential),
+            ("gather", gathered),
+        ]
+        print(f"{'variant':>10} {'p50, ms':>9} {'p95, ms':>9}")
+        for name, func in variants:
+            result = await measure(lambda: func(db, queries, latency), iterations)
+            print(f"{name:>10} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f}")
+    finally:
+        await db._pool.close()
+        db._pool = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=2, help="Число независимых запросов в HTTP-запросе")
+    parser.add_argument("--latency", type=float, default=0.005, help="Время выполнения запроса на сервере, с")
+    parser.add_argument("--iterations", type=int, default=50, help="Число замеров для каждого варианта")
+    args = parser.parse_args()
+    asyncio.run(main(args.queries, args.latency, args.iterations))
@@ -0,0 +1,116 @@
+"""
+Бенчмарк преобразования результатов запроса в модели ответа.
+
+Сравнивает прежний путь Database.fetch (каждая строка Record копируется в dict, затем
+из словаря строится модель AppWorkout) с путем fetch(records=True) (модель строится
+напрямую из строки Row) на результате из 10 000 строк: время p50/p95 и пиковый объем
+памяти, выделенной за один вызов (tracemalloc).
+
+Строки генерируются запросом generate_series, таблицы не нужны.
+Требуется доступная база данных и настроенный .env.
+
+Запуск из каталога backend/workout_service:
+    python -m benchmarks.bench_records --rows 10000 --iterations 30
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable, Dict
+
+import asyncpg
+
+from config import settings
+from training.domain.schemas import AppWorkout
+from training.infrastructure.database import Database
+
+ROWS_QUERY = """
+    SELECT gen_random_uuid() AS app_workout_uuid,
+           'Тренировка ' || g AS name,
+           'Описание тренировки ' || g AS description,
+           1 AS created_by,
+           now() - g * interval '1 minute' AS created_at,
+           now() AS updated_at,
+           gen_random_uuid() AS last_session_uuid,
+           now() - g * interval '1 hour' AS last_session_start,
+           NULL::timestamptz AS last_session_stop,
+           'ended' AS last_session_status,
+           g * 60 AS total_workout_time,
+           true AS is_visible
+    FROM generate_series(1, $1) AS g
+"""
+
+
+async def fetch_dicts(db: Database, rows: int) -> int:
+    """Только получение строк: Record копируется в dict"""
+    return len(await db.fetch(ROWS_QUERY, rows))
+
+
+async def fetch_records(db: Database, rows: int) -> int:
+    """Только получение строк: строки Row без копирования"""
+    return len(await db.fetch(ROWS_QUERY, rows, records=True))
+
+
+async def models_from_dicts(db: Database, rows: int) -> int:
+    """Прежний путь: Record -> dict -> AppWorkout"""
+    return len([AppWorkout(**row) for row in await db.fetch(ROWS_QUERY, rows)])
+
+
+async def models_from_records(db: Database, rows: int) -> int:
+    """Новый путь: Row -> AppWorkout"""
+    return len([AppWorkout(**row) for row in await db.fetch(ROWS_QUERY, rows, records=True)])
+
+
+async def measure(func: Callable[[], Awaitable[Any]], iterations: int) -> Dict[str, Any]:
+    await func()  # прогрев
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await func()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    await func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "p50_ms": statistics.median(timings),
+        "p95_ms": statistics.quantiles(timings, n=20)[18] if len(timings) > 1 else timings[0],
+        "peak_kb": peak / 1024,
+    }
+
+
+async def main(rows: int, iterations: int) -> None:
+    db = Database()
+    db._pool = await asyncpg.create_pool(
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        database=settings.DB_NAME,
+        min_size=1,
+        max_size=1,
+    )
+    try:
+        variants = [
+            ("fetch -> dict", fetch_dicts),
+            ("fetch -> Row", fetch_records),
+            ("dict -> model", models_from_dicts),
+            ("Row -> model", models_from_records),
+        ]
+        print(f"{'variant':>14} {'p50, ms':>9} {'p95, ms':>9} {'peak, KiB':>10}")
+        for name, func in variants:
+            result = await measure(lambda: func(db, rows), iterations)
+            print(f"{name:>14} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['peak_kb']:>10.0f}")
+    finally:
+        await db._pool.close()
+        db._pool = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000, help="Число строк в результате запроса")
+    parser.add_argument("--iterations", type=int, default=30, help="Число замеров для каждого варианта")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.iterations))
@@ -2,14 +2,21 @@ from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
+import asyncio
 import logging
 import sys
+import asyncpg
 import jwt
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
 
 from training import router as training_router
+from training.infrastructure.backpressure import PoolExhaustedError
 from training.infrastructure.database import Database
+from training.infrastructure.migrations import apply_migrations
+from training.infrastructure.partitions import PartitionManager
+from training.infrastructure.query_cache import QueryCacheListener
+from training.infrastructure.request_scope import RequestScopeMiddleware
 from training.domain.utils import verify_token
 from config import settings
 
@@ -23,12 +30,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger("main")
 
+partition_manager = PartitionManager()
+query_cache_listener = QueryCacheListener(Database().query_cache)
+
 
 class AuthMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
 
         no_auth_paths = [
             "/",
+            "/ready",
             "/docs",
             "/openapi.json",
             "/redoc"
@@ -78,13 +89,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["Content-Type", "Set-Cookie", "Access-Control-Allow-Headers", 
-                   "Access-Control-Allow-Origin", "Authorization", "X-Requested-With"],
-    expose_headers=["Content-Type", "Set-Cookie"],
+                   "Access-Control-Allow-Origin", "Authorization", "X-Requested-With", "X-DB-Read-After"],
+    expose_headers=["Content-Type", "Set-Cookie", "X-Next-Cursor", "X-DB-LSN", "Retry-After"],
     max_age=600, 
 )
 
 
 app.add_middleware(AuthMiddleware)
+# Подключается последним, чтобы соединение запроса было общим для всех middleware и обработчиков
+app.add_middleware(RequestScopeMiddleware)
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
@@ -94,6 +107,28 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     )
 
 
+@app.exception_handler(asyncio.TimeoutError)
+@app.exception_handler(asyncpg.exceptions.QueryCanceledError)
+async def database_timeout_handler(request: Request, exc: Exception):
+    # Бюджет времени запроса к БД исчерпан или запрос отменен по statement_timeout
+    logger.warning(f"Превышено время выполнения запроса к БД: {request.url.path}")
+    return JSONResponse(
+        status_code=504,
+        content={"detail": "Превышено время ожидания ответа базы данных"}
+    )
+
+
+@app.exception_handler(PoolExhaustedError)
+async def pool_exhausted_handler(request: Request, exc: PoolExhaustedError):
+    # Пул соединений перегружен: быстрый отказ вместо ожидания в очереди
+    logger.warning(f"Отказ в соединении с БД: {str(exc)}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Сервис перегружен, повторите запрос позже"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
 app.include_router(training_router)
 
 @app.get("/")
@@ -106,6 +141,16 @@ def read_root():
     }
 
 
+@app.get("/ready")
+def readiness():
+    """
+    Проверка готовности: 503, пока не созданы пулы соединений и не подготовлены частые запросы
+    """
+    if not Database().is_ready():
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready"}
+
+
 @app.options("/{path:path}")
 async def options_handler(request: Request, path: str):
     logger.info(f"Обработка OPTIONS запроса для пути: {path}")
@@ -138,13 +183,21 @@ app.openapi = custom_openapi
 @app.on_event("startup")
 async def startup_event():
     logger.info("Приложение запущено")
+    if settings.DB_MIGRATE_ON_STARTUP:
+        await apply_migrations()
     db = Database()
     await db.connect()
     logger.info("Соединение с базой данных установлено")
+    if settings.DB_PARTITION_MAINTENANCE:
+        partition_manager.start()
+    if settings.DB_QUERY_CACHE_ENABLED and settings.DB_QUERY_CACHE_LISTEN:
+        query_cache_listener.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Завершение работы приложения")
+    await partition_manager.stop()
+    await query_cache_listener.stop()
     db = Database()
     await db.disconnect()
     logger.info("Соединение с базой данных закрыто")
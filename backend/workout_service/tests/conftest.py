@@ -0,0 +1,166 @@
+import asyncio
+from contextlib import ExitStack
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from unittest.mock import patch
+
+import pytest
+
+from training.infrastructure.database import Database
+from training.infrastructure.pool_stats import PoolStats
+from training.infrastructure.query_stats import QueryStats
+from training.infrastructure.request_scope import RequestScopeMiddleware
+
+
+class FakePool:
+    """
+    Пул соединений asyncpg для тестов Database.
+
+    Соединение выдается и через await pool.acquire() (соединение HTTP-запроса, возвращается
+    через pool.release), и через async with pool.acquire(). Пул считает полученные (acquired)
+    и возвращенные (released) соединения и запоминает время ожидания каждого получения (timeouts).
+
+    Args:
+        connection: Соединение, которое пул выдает при каждом получении
+        factory: Вместо connection - функция factory(pool), создающая соединение при каждом
+            получении (pool.connections - номер создаваемого соединения)
+        name: Имя пула
+        size: Число соединений: пока все выданы, получение ждет не дольше timeout
+            (None - не ограничено, 0 - пул исчерпан, пока тест не вызовет pool.free.release())
+    """
+
+    def __init__(self, connection: Any = None, factory: Optional[Callable[["FakePool"], Any]] = None,
+                 name: str = "default", size: Optional[int] = None):
+        self.connection = connection
+        self.factory = factory
+        self.name = name
+        self.size = size
+        self.free = asyncio.Semaphore(size) if size is not None else None
+        self.acquired = 0
+        self.released = 0
+        self.connections = 0
+        self.timeouts: List[Optional[float]] = []
+
+    def get_size(self):
+        return 1 if self.size is None else self.size
+
+    def get_idle_size(self):
+        if self.free is not None:
+            return self.free._value
+        return max(self.get_size() - self.acquired + self.released, 0)
+
+    def get_min_size(self):
+        return min(1, self.get_size())
+
+    def get_max_size(self):
+        return self.get_size()
+
+    def acquire(self, timeout=None):
+        return FakePoolAcquire(self, timeout)
+
+    async def release(self, connection):
+        self.released += 1
+        if self.free is not None:
+            self.free.release()
+
+    async def _acquire(self, timeout):
+        self.timeouts.append(timeout)
+        if self.free is not None:
+            await asyncio.wait_for(self.free.acquire(), timeout)
+        self.acquired += 1
+        if self.factory is None:
+            return self.connection
+        self.connections += 1
+        return self.factory(self)
+
+
+class FakePoolAcquire:
+    def __init__(self, pool: FakePool, timeout: Optional[float]):
+        self.pool = pool
+        self.timeout = timeout
+        self.connection = None
+
+    def __await__(self):
+        return self.pool._acquire(self.timeout).__await__()
+
+    async def __aenter__(self):
+        self.connection = await self.pool._acquire(self.timeout)
+        return self.connection
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.pool.release(self.connection)
+
+
+@pytest.fixture
+def make_pool() -> Callable[..., FakePool]:
+    """Создает пул FakePool с заданным соединением (параметры - см. FakePool)"""
+    return FakePool
+
+
+@pytest.fixture
+def install_pools():
+    """
+    Подменяет пулы Database до конца теста:
+    install_pools(primary, replicas=[...], named={имя: пул}, shards={имя: пул}).
+    У каждого пула своя статистика, статистика запросов начинается заново
+    """
+    with ExitStack() as stack:
+        def install(primary: FakePool, replicas: Optional[List[FakePool]] = None,
+                    named: Optional[Dict[str, FakePool]] = None,
+                    shards: Optional[Dict[str, FakePool]] = None) -> FakePool:
+            stack.enter_context(patch.object(Database, "_pool", primary))
+            stack.enter_context(patch.object(Database, "_stats", PoolStats()))
+            stack.enter_context(patch.object(Database, "_query_stats", QueryStats()))
+            if replicas is not None:
+                stack.enter_context(patch.object(Database, "_replica_pools", replicas))
+                stack.enter_context(patch.object(Database, "_replica_stats", [PoolStats() for _ in replicas]))
+            if named is not None:
+                stack.enter_context(patch.object(Database, "_named_pools", named))
+                stack.enter_context(patch.object(Database, "_named_stats", {name: PoolStats() for name in named}))
+            if shards is not None:
+                stack.enter_context(patch.object(Database, "_shard_pools", shards))
+                stack.enter_context(patch.object(Database, "_shard_stats", {name: PoolStats() for name in shards}))
+            return primary
+
+        yield install
+
+
+async def _receive():
+    """Клиент не закрывает соединение, пока обрабатывается запрос"""
+    await asyncio.Event().wait()
+
+
+async def _serve_request(app, headers: Iterable[Tuple[bytes, bytes]] = (),
+                         receive: Optional[Callable[[], Awaitable[Dict]]] = None) -> List[Dict]:
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    await RequestScopeMiddleware(app)({"type": "http", "headers": list(headers)}, receive or _receive, send)
+    return sent
+
+
+@pytest.fixture
+def serve_request():
+    """
+    Выполняет ASGI-приложение за RequestScopeMiddleware и возвращает отправленные им сообщения:
+    serve_request(app, headers=(), receive=None). По умолчанию клиент не закрывает соединение
+    """
+    return _serve_request
+
+
+@pytest.fixture
+def run_in_request():
+    """
+    Выполняет handler так, как его выполнил бы обработчик HTTP-запроса за RequestScopeMiddleware,
+    и возвращает заголовки ответа 200: run_in_request(handler, headers=())
+    """
+    async def run(handler: Callable[[], Awaitable[Any]], headers: Iterable[Tuple[bytes, bytes]] = ()) -> Dict:
+        async def app(scope, receive, send):
+            await handler()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+
+        sent = await _serve_request(app, headers)
+        return dict(sent[0]["headers"]) if sent else {}
+
+    return run
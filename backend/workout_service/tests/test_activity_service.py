@@ -0,0 +1,213 @@
+import asyncio
+import pytest
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+from datetime import date, datetime
+
+from training.application.services.activity_service import (
+    ActivityService, EXERCISE_SESSION_UPSERT_QUERY, REFRESH_WORKOUT_SUMMARY_QUERY, STORE_WORKOUT_SUMMARY_QUERY,
+    USER_ACTIVITY_UPSERT_QUERY, WORKOUT_SESSION_LOCK_QUERY, WORKOUT_SESSION_UPSERT_QUERY, WORKOUT_SUMMARY_COLUMNS,
+    WORKOUT_SUMMARY_QUERY
+)
+from config import settings
+from training.infrastructure.database import Transaction
+from training.infrastructure.sharding import current_shard_key
+
+TEST_USER_ID = 12345
+
+
+class FakeTransaction:
+    """Имитация транзакции asyncpg, фиксирующая фиксацию и откат"""
+
+    def __init__(self, events):
+        self.events = events
+
+    async def __aenter__(self):
+        self.events.append("begin")
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.events.append("rollback" if exc_type else "commit")
+        return False
+
+
+# Фикстура для мока соединения с транзакцией
+@pytest.fixture
+def mock_connection():
+    conn = MagicMock()
+    conn.events = []
+    conn.fetchrow = AsyncMock(return_value=None)
+    conn.execute = AsyncMock(side_effect=lambda *args: conn.events.append("refresh"))
+    conn.transaction = MagicMock(side_effect=lambda: FakeTransaction(conn.events))
+    return conn
+
+
+# Фикстура для создания сервиса с моком пула соединений
+@pytest.fixture
+def activity_service(mock_connection):
+    with patch('training.application.services.activity_service.Database') as mock:
+        db_instance = mock.return_value
+
+        async def run_in_transaction(func, **kwargs):
+            mock_connection.events.append(f"shard {current_shard_key()}")
+            async with mock_connection.transaction():
+                return await func(Transaction(mock_connection))
+
+        db_instance.run_in_transaction = run_in_transaction
+        db_instance.is_sharded.return_value = False
+        service = ActivityService()
+        service.db_pool = db_instance
+        yield service
+
+
+@pytest.mark.asyncio
+async def test_save_workout_session_refreshes_summary(activity_service, mock_connection):
+    """Тест обновления сводки по тренировке в транзакции сохранения сессии"""
+    session_uuid = uuid.uuid4()
+    mock_connection.fetchrow.side_effect = [None, {"workout_session_uuid": session_uuid, "inserted": True}]
+
+    result = await activity_service.save_workout_session(
+        TEST_USER_ID, session_uuid, uuid.uuid4(), "start", datetime.now()
+    )
+
+    assert result["success"] is True
+    mock_connection.execute.assert_awaited_once_with(REFRESH_WORKOUT_SUMMARY_QUERY, session_uuid)
+    assert mock_connection.events == [f"shard {TEST_USER_ID}", "begin", "refresh", "commit"]
+
+
+@pytest.mark.asyncio
+async def test_save_workout_session_upserts_under_lock(activity_service, mock_connection):
+    """Тест сохранения сессии тренировки одним запросом после блокировки по ее UUID"""
+    session_uuid, workout_uuid = uuid.uuid4(), uuid.uuid4()
+    started, stopped = datetime(2026, 3, 1, 10, 0), datetime(2026, 3, 1, 10, 45)
+    mock_connection.fetchrow.side_effect = [
+        None, {"workout_session_uuid": session_uuid, "status": "completed", "inserted": False},
+    ]
+
+    result = await activity_service.save_workout_session(
+        TEST_USER_ID, session_uuid, workout_uuid, "completed", started, stopped
+    )
+
+    assert result["message"] == "Сессия тренировки обновлена"
+    assert result["session_data"] == {"workout_session_uuid": session_uuid, "status": "completed"}
+    lock_call, upsert_call = mock_connection.fetchrow.await_args_list
+    assert lock_call.args == (WORKOUT_SESSION_LOCK_QUERY, session_uuid)
+    assert upsert_call.args[:7] == (
+        WORKOUT_SESSION_UPSERT_QUERY, session_uuid, TEST_USER_ID, workout_uuid, started, stopped, "completed"
+    )
+
+
+@pytest.mark.asyncio
+async def test_save_exercise_session_rolls_back_with_summary(activity_service, mock_connection):
+    """Тест отката сессии упражнения при ошибке обновления сводки"""
+    session_uuid = uuid.uuid4()
+    mock_connection.fetchrow.return_value = {"exercise_session_uuid": uuid.uuid4(), "inserted": True}
+    mock_connection.execute.side_effect = Exception("summary failed")
+
+    with pytest.raises(Exception, match="summary failed"):
+        await activity_service.save_exercise_session(
+            TEST_USER_ID, session_uuid, uuid.uuid4(), "start", datetime.now()
+        )
+
+    mock_connection.execute.assert_awaited_once_with(REFRESH_WORKOUT_SUMMARY_QUERY, session_uuid)
+    assert mock_connection.events == [f"shard {TEST_USER_ID}", "begin", "rollback"]
+
+
+@pytest.mark.asyncio
+async def test_save_exercise_session_single_upsert(activity_service, mock_connection):
+    """Тест сохранения сессии упражнения одним запросом: начало задает только время начала, завершение - окончание и статистику"""
+    workout_session_uuid, exercise_uuid, exercise_session_uuid = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    started, ended = datetime(2026, 3, 1, 10, 0), datetime(2026, 3, 1, 10, 5)
+    mock_connection.fetchrow.side_effect = [
+        {"exercise_session_uuid": exercise_session_uuid, "inserted": True},
+        {"exercise_session_uuid": exercise_session_uuid, "inserted": False},
+        {"exercise_session_uuid": exercise_session_uuid, "inserted": False},
+    ]
+
+    created = await activity_service.save_exercise_session(
+        TEST_USER_ID, workout_session_uuid, exercise_uuid, "start", started, ended, duration=60
+    )
+    updated = await activity_service.save_exercise_session(
+        TEST_USER_ID, workout_session_uuid, exercise_uuid, "ended", started, ended, exercise_session_uuid,
+        duration=60, user_duration=55, count=10, user_count=9
+    )
+    unchanged = await activity_service.save_exercise_session(
+        TEST_USER_ID, workout_session_uuid, exercise_uuid, "ended", None, None, exercise_session_uuid
+    )
+
+    assert [created["operation"], updated["operation"], unchanged["operation"]] == ["created", "updated", "updated"]
+    assert created["exercise_session_uuid"] == str(exercise_session_uuid)
+    assert [call.args for call in mock_connection.fetchrow.await_args_list] == [
+        (EXERCISE_SESSION_UPSERT_QUERY, None, TEST_USER_ID, workout_session_uuid, exercise_uuid, "start",
+         started, None, None, None, None, None),
+        (EXERCISE_SESSION_UPSERT_QUERY, exercise_session_uuid, TEST_USER_ID, workout_session_uuid, exercise_uuid,
+         "ended", None, ended, 60, 55, 10, 9),
+        (EXERCISE_SESSION_UPSERT_QUERY, exercise_session_uuid, TEST_USER_ID, workout_session_uuid, exercise_uuid,
+         "ended", None, None, None, None, None, None),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_sharded_save_stores_summary_after_commit(activity_service, mock_connection):
+    """Тест записи сводки на основной сервер после фиксации транзакции на шарде пользователя"""
+    session_uuid = uuid.uuid4()
+    summary = {column: None for column in WORKOUT_SUMMARY_COLUMNS}
+    summary.update(user_id=TEST_USER_ID, last_session_uuid=session_uuid)
+    mock_connection.fetchrow.side_effect = [
+        None, {"workout_session_uuid": session_uuid, "inserted": True}, summary
+    ]
+    activity_service.db_pool.is_sharded.return_value = True
+    activity_service.db_pool.execute = AsyncMock(
+        side_effect=lambda *args: mock_connection.events.append(f"store on shard {current_shard_key()}")
+    )
+
+    await activity_service.save_workout_session(TEST_USER_ID, session_uuid, uuid.uuid4(), "start", datetime.now())
+
+    assert mock_connection.fetchrow.await_args.args == (WORKOUT_SUMMARY_QUERY, session_uuid)
+    mock_connection.execute.assert_not_awaited()
+    activity_service.db_pool.execute.assert_awaited_once_with(
+        STORE_WORKOUT_SUMMARY_QUERY, *[summary[column] for column in WORKOUT_SUMMARY_COLUMNS]
+    )
+    assert mock_connection.events == [f"shard {TEST_USER_ID}", "begin", "commit", "store on shard None"]
+
+
+@pytest.mark.asyncio
+async def test_sharded_summary_store_retried_in_background(activity_service, mock_connection):
+    """Тест фонового повтора записи сводки: ошибка основного сервера после фиксации на шарде не возвращается клиенту"""
+    session_uuid = uuid.uuid4()
+    summary = {column: None for column in WORKOUT_SUMMARY_COLUMNS}
+    summary.update(user_id=TEST_USER_ID, last_session_uuid=session_uuid)
+    mock_connection.fetchrow.side_effect = [
+        None, {"workout_session_uuid": session_uuid, "inserted": True}, summary
+    ]
+    activity_service.db_pool.is_sharded.return_value = True
+    activity_service.db_pool.execute = AsyncMock(side_effect=[Exception("primary down"), Exception("primary down"), None])
+
+    with patch.object(settings, "DB_SUMMARY_STORE_RETRY_BACKOFF", 0):
+        result = await activity_service.save_workout_session(
+            TEST_USER_ID, session_uuid, uuid.uuid4(), "start", datetime.now()
+        )
+        assert result["success"]
+        await asyncio.gather(*activity_service._summary_retries)
+
+    assert activity_service.db_pool.execute.await_count == 3
+    assert not activity_service._summary_retries
+
+
+@pytest.mark.asyncio
+async def test_update_user_activity_single_upsert(activity_service):
+    """Тест записи активности и веса за дату одним запросом"""
+    workout_uuid = uuid.uuid4()
+    record_date = date(2026, 3, 1)
+    activity_service.db_pool.fetchrow = AsyncMock(return_value={
+        "record_date": record_date, "workout_count": 3, "last_workout_uuid": workout_uuid, "weight": 70.5,
+    })
+
+    activity = await activity_service.update_user_activity(
+        TEST_USER_ID, record_date, 1, weight=70.5, increment=True, last_workout_uuid=workout_uuid
+    )
+
+    activity_service.db_pool.fetchrow.assert_awaited_once_with(
+        USER_ACTIVITY_UPSERT_QUERY, TEST_USER_ID, record_date, 1, workout_uuid, True, 70.5
+    )
+    assert (activity.workout_count, activity.weight, activity.last_workout_uuid) == (3, 70.5, workout_uuid)
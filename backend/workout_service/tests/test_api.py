@@ -1,14 +1,18 @@
+import asyncio
 import pytest
 import uuid
 import jwt
 from datetime import datetime, timedelta
 from unittest.mock import patch, AsyncMock, MagicMock
 
-from httpx import AsyncClient
+import asyncpg
+from httpx import ASGITransport, AsyncClient
 import pytest_asyncio
 
+import training
 from config import settings
 from training.domain.schemas import Exercise, MuscleGroupModel
+from training.infrastructure.backpressure import PoolExhaustedError
 from main import app
 
 
@@ -233,4 +237,22 @@ async def test_get_muscle_groups_authorized():
     assert isinstance(result, list)
     assert len(result) == 1
     assert result[0].id == TEST_MUSCLE_GROUP["id"]
-    assert result[0].name == TEST_MUSCLE_GROUP["name"] 
\ No newline at end of file
+    assert result[0].name == TEST_MUSCLE_GROUP["name"] 
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("error, status_code", [
+    (asyncpg.exceptions.QueryCanceledError("canceling statement due to statement timeout"), 504),
+    (asyncio.TimeoutError(), 504),
+    (PoolExhaustedError("interactive", "очередь ожидания переполнена"), 503),
+])
+async def test_database_unavailable_errors_reach_app_handlers(error, status_code):
+    """Тест ответов 504 и 503 на ошибки БД в обработчике маршрута вместо ответа 500"""
+    token = jwt.encode({"user_id": 42, "role": "user"}, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+
+    with patch.object(training.activity_service, "get_user_activity", AsyncMock(side_effect=error)):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver") as client:
+            response = await client.get(
+                f"{settings.WORKOUT_API_PREFIX}/user-activity", headers={"Authorization": f"Bearer {token}"}
+            )
+
+    assert response.status_code == status_code
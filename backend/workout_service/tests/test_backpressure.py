@@ -0,0 +1,90 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from training.infrastructure.backpressure import PoolExhaustedError, acquire_timeout
+from training.infrastructure.database import Database
+from training.infrastructure.request_scope import db_route
+
+
+class FakeConnection:
+    def is_closed(self):
+        return False
+
+    async def fetchval(self, query, *args, timeout=None):
+        return 1
+
+
+@pytest.fixture
+def settings():
+    with patch("training.infrastructure.backpressure.settings") as settings:
+        settings.DB_ACQUIRE_TIMEOUT = 2.0
+        settings.DB_ACQUIRE_TIMEOUT_INTERACTIVE = 0.01
+        settings.DB_ACQUIRE_TIMEOUT_WRITE = 0.5
+        settings.DB_ACQUIRE_TIMEOUT_ADMIN = 5.0
+        settings.DB_ACQUIRE_MAX_WAITING = 2
+        settings.DB_RETRY_AFTER = 3
+        yield settings
+
+
+@pytest.fixture
+def pool(settings, make_pool, install_pools):
+    # Пул исчерпан, пока тест не освободит соединение
+    return install_pools(make_pool(FakeConnection(), size=0))
+
+
+def test_acquire_timeout_by_route_class(settings):
+    """Время ожидания соединения задается классом маршрута и ограничивается остатком бюджета"""
+    assert acquire_timeout("interactive") == 0.01
+    assert acquire_timeout("write") == 0.5
+    assert acquire_timeout("unknown") == 2.0
+    assert acquire_timeout("admin", limit=1.5) == 1.5
+
+
+@pytest.mark.asyncio
+async def test_exhausted_pool_returns_503_even_if_handler_swallows_error(pool, serve_request):
+    """Отказ в соединении завершает запрос ответом 503 с Retry-After, даже если обработчик перехватил ошибку"""
+    db = Database()
+
+    async def app(scope, receive, send):
+        await db_route("interactive")()
+        try:
+            await db.fetchval("SELECT 1")
+        except Exception:
+            pass
+        await send({"type": "http.response.start", "status": 500, "headers": []})
+        await send({"type": "http.response.body", "body": b"error"})
+
+    sent = await serve_request(app)
+
+    assert sent[0]["status"] == 503
+    assert dict(sent[0]["headers"])[b"retry-after"] == b"3"
+    assert len(sent) == 2
+    assert pool.timeouts == [0.01]
+    queue = db.pool_stats()["queue"]
+    assert queue["rejected_by_route_class"] == {"interactive": 1}
+    assert queue["waiting"] == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_without_waiting(pool):
+    """При переполненной очереди отказ возвращается сразу; глубина очереди видна в статистике"""
+    db = Database()
+
+    async def wait_connection():
+        async with db.acquire():
+            pass
+
+    waiters = [asyncio.ensure_future(wait_connection()) for _ in range(2)]
+    await asyncio.sleep(0)
+    assert db.pool_stats()["queue"]["waiting"] == 2
+
+    with pytest.raises(PoolExhaustedError) as error:
+        await db.fetchval("SELECT 1")
+    assert error.value.retry_after == 3
+    assert len(pool.timeouts) == 2
+
+    pool.free.release()
+    await asyncio.gather(*waiters)
+    queue = db.pool_stats()["queue"]
+    assert queue == {"waiting": 0, "waiting_max": 2, "rejected": 1, "rejected_by_route_class": {"default": 1}}
@@ -0,0 +1,126 @@
+import pytest
+import uuid
+from datetime import date, datetime, timezone
+from unittest.mock import AsyncMock, patch
+
+from training.application.services.activity_service import ActivityService, EXERCISE_SESSIONS_QUERY
+from training.infrastructure.archive import (
+    ARCHIVE_ROWS_QUERY,
+    DELETE_ARCHIVED_QUERY,
+    ExerciseArchive,
+    archive_user_month,
+)
+
+TEST_USER_ID = 12345
+MONTH = date(2026, 3, 1)
+
+
+def exercise_session(workout_started_at, **values):
+    row = {
+        "exercise_session_uuid": uuid.uuid4(), "workout_session_uuid": uuid.uuid4(),
+        "workout_started_at": workout_started_at, "exercise_uuid": uuid.uuid4(), "status": "ended",
+        "datetime_start": workout_started_at, "datetime_end": workout_started_at, "duration": 60,
+        "user_duration": 55, "count": 10, "user_count": 9,
+        "created_at": workout_started_at.replace(tzinfo=None), "updated_at": None,
+    }
+    row.update(values)
+    return row
+
+
+class FakeTransaction:
+    def __init__(self, events):
+        self.events = events
+
+    async def __aenter__(self):
+        self.events.append("begin")
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.events.append("rollback" if exc_type else "commit")
+        return False
+
+
+class FakeConnection:
+    """Соединение с сессиями для переноса, записывающее порядок действий"""
+
+    def __init__(self, rows, archive, events):
+        self.rows = rows
+        self.archive = archive
+        self.events = events
+
+    def transaction(self):
+        return FakeTransaction(self.events)
+
+    async def fetch(self, query, *args):
+        assert query == ARCHIVE_ROWS_QUERY
+        return self.rows
+
+    async def execute(self, query, uuids, started):
+        # К моменту удаления строк файл архива уже записан
+        archived = {row["exercise_session_uuid"] for row in self.archive.read_month(TEST_USER_ID, MONTH)}
+        self.events.append(("delete", query, set(uuids) <= archived, len(started)))
+
+
+def test_archive_round_trip_and_merge(tmp_path):
+    """Значения всех столбцов, включая NULL, читаются из архива без изменений; повторная запись дополняет файл"""
+    archive = ExerciseArchive(str(tmp_path))
+    first = exercise_session(datetime(2026, 3, 5, 8, 30, 0, 123456, tzinfo=timezone.utc))
+    second = exercise_session(
+        datetime(2026, 3, 20, 18, 0, tzinfo=timezone.utc), datetime_end=None, user_count=None, status="start"
+    )
+
+    assert archive.write_month(TEST_USER_ID, MONTH, [second]) == 1
+    updated = dict(second, user_count=12)
+    assert archive.write_month(TEST_USER_ID, MONTH, [first, updated]) == 2
+
+    assert archive.read_month(TEST_USER_ID, MONTH) == [
+        dict(first, user_id=TEST_USER_ID), dict(updated, user_id=TEST_USER_ID),
+    ]
+    assert archive.read_range(
+        TEST_USER_ID, datetime(2026, 3, 10, tzinfo=timezone.utc), datetime(2026, 4, 1, tzinfo=timezone.utc)
+    ) == [dict(updated, user_id=TEST_USER_ID)]
+    assert archive.read_month(TEST_USER_ID, date(2026, 4, 1)) == []
+    assert [path.name for path in (tmp_path / str(TEST_USER_ID)).iterdir()] == ["2026_03.zip"]
+
+
+@pytest.mark.asyncio
+async def test_archive_user_month_writes_file_before_delete(tmp_path):
+    """Строки удаляются из таблицы в той же транзакции и только после записи файла"""
+    archive = ExerciseArchive(str(tmp_path))
+    rows = [exercise_session(datetime(2026, 3, day, tzinfo=timezone.utc)) for day in (2, 9)]
+    events = []
+    connection = FakeConnection(rows, archive, events)
+
+    archived = await archive_user_month(connection, archive, TEST_USER_ID, MONTH, datetime.now(timezone.utc))
+
+    assert archived == 2
+    assert events == ["begin", ("delete", DELETE_ARCHIVED_QUERY, True, 2), "commit"]
+
+
+@pytest.mark.asyncio
+async def test_get_exercise_sessions_merges_archive_and_table(tmp_path):
+    """История объединяет архив и таблицу; строка таблицы заменяет архивную копию той же сессии"""
+    archived = exercise_session(datetime(2026, 3, 2, tzinfo=timezone.utc))
+    both = exercise_session(datetime(2026, 3, 4, tzinfo=timezone.utc), user_count=1)
+    live = exercise_session(datetime(2026, 3, 3, tzinfo=timezone.utc))
+    ExerciseArchive(str(tmp_path)).write_month(TEST_USER_ID, MONTH, [archived, both])
+
+    with patch('training.application.services.activity_service.Database') as mock:
+        db_instance = mock.return_value
+        db_instance.is_sharded.return_value = False
+        db_instance.fetch = AsyncMock(return_value=[live, dict(both, user_count=2)])
+        service = ActivityService()
+        service.db_pool = db_instance
+        service.archive = ExerciseArchive(str(tmp_path))
+
+        result = await service.get_exercise_sessions(TEST_USER_ID, date(2026, 3, 1), date(2026, 3, 31))
+
+    assert [(session.exercise_session_uuid, session.archived) for session in result] == [
+        (archived["exercise_session_uuid"], True),
+        (live["exercise_session_uuid"], False),
+        (both["exercise_session_uuid"], False),
+    ]
+    assert result[2].user_count == 2
+    db_instance.fetch.assert_awaited_once_with(
+        EXERCISE_SESSIONS_QUERY, TEST_USER_ID,
+        datetime(2026, 3, 1, tzinfo=timezone.utc), datetime(2026, 4, 1, tzinfo=timezone.utc)
+    )
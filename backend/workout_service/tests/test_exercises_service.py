@@ -24,6 +24,7 @@ def mock_database():
     with patch('training.infrastructure.database.Database') as mock:
         db_instance = mock.return_value
         db_instance.fetch = AsyncMock()
+        db_instance.fetch_cached = AsyncMock()
         db_instance.fetchrow = AsyncMock()
         db_instance.execute = AsyncMock()
         db_instance.fetchval = AsyncMock()
@@ -41,13 +42,13 @@ def exercises_service(mock_database):
 async def test_get_all_exercises(exercises_service):
     """Тест получения всех упражнений"""
     # Настройка мока
-    exercises_service.db.fetch.return_value = [TEST_EXERCISE]
+    exercises_service.db.fetch_cached.return_value = [TEST_EXERCISE]
     
     # Вызов тестируемого метода
     result = await exercises_service.get_all_exercises()
     
     # Проверки
-    assert exercises_service.db.fetch.called
+    assert exercises_service.db.fetch_cached.called
     assert len(result) == 1
     assert str(result[0].exercise_id) == str(TEST_EXERCISE_ID)
     assert result[0].title == TEST_EXERCISE["title"]
@@ -0,0 +1,135 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from training.infrastructure.database import Database
+from training.infrastructure.request_scope import RequestScope
+
+
+class QueryLoad:
+    """Счетчики выполняемых и отмененных запросов всех соединений пула"""
+
+    def __init__(self):
+        self.running = 0
+        self.running_max = 0
+        self.cancelled = 0
+
+
+class FakeConnection:
+    """Соединение, выполняющее запрос SELECT pg_sleep заданное время; запрос FAIL завершается ошибкой"""
+
+    def __init__(self, load, number):
+        self.load = load
+        self.number = number
+        self.in_transaction = False
+
+    def is_closed(self):
+        return False
+
+    def is_in_transaction(self):
+        return self.in_transaction
+
+    async def fetchval(self, query, *args, timeout=None):
+        self.load.running += 1
+        self.load.running_max = max(self.load.running_max, self.load.running)
+        try:
+            if "pg_sleep" in query:
+                await asyncio.sleep(args[0])
+            if "FAIL" in query:
+                raise RuntimeError("ошибка запроса")
+            return self.number
+        except asyncio.CancelledError:
+            self.load.cancelled += 1
+            raise
+        finally:
+            self.load.running -= 1
+
+    async def execute(self, query, *args, timeout=None):
+        return "INSERT 0 1"
+
+
+@pytest.fixture
+def load():
+    return QueryLoad()
+
+
+@pytest.fixture
+def fake_pool(load, make_pool, install_pools):
+    pool = install_pools(make_pool(factory=lambda pool: FakeConnection(load, pool.connections)))
+    with patch("training.infrastructure.database.settings") as settings:
+        settings.DB_GATHER_CONCURRENCY = 2
+        yield pool
+
+
+@pytest.mark.asyncio
+async def test_independent_queries_run_on_separate_connections(fake_pool, load, serve_request):
+    """Ветви gather выполняются параллельно на своих соединениях, не больше DB_GATHER_CONCURRENCY одновременно"""
+    db = Database()
+    results = []
+
+    async def app(scope, receive, send):
+        started = asyncio.get_running_loop().time()
+        results.append(await db.gather(*[db.fetchval("SELECT pg_sleep($1)", 0.05) for _ in range(4)]))
+        results.append(asyncio.get_running_loop().time() - started)
+
+    await serve_request(app)
+
+    numbers, elapsed = results
+    assert sorted(numbers) == [1, 2, 3, 4]
+    assert load.running_max == 2
+    assert 0.1 <= elapsed < 0.2
+    assert fake_pool.released == 4
+    assert Database._stats.acquisitions == 4
+
+
+@pytest.mark.asyncio
+async def test_failed_branch_cancels_others(fake_pool, load, serve_request):
+    """Ошибка одной ветви отменяет остальные, соединения всех ветвей возвращаются в пул"""
+    db = Database()
+
+    async def app(scope, receive, send):
+        with pytest.raises(RuntimeError):
+            await db.gather(db.fetchval("SELECT pg_sleep($1)", 10), db.fetchval("SELECT FAIL"))
+
+    await asyncio.wait_for(serve_request(app), 1)
+
+    assert load.cancelled == 1
+    assert fake_pool.released == fake_pool.connections == 2
+
+
+@pytest.mark.asyncio
+async def test_sequential_inside_transaction(fake_pool, load, serve_request):
+    """Внутри транзакции запросы gather выполняются последовательно на соединении транзакции"""
+    db = Database()
+    results = []
+
+    async def app(scope, receive, send):
+        async with db.acquire() as connection:
+            connection.in_transaction = True
+            results.extend(await db.gather(db.fetchval("SELECT 1"), db.fetchval("SELECT 2")))
+            connection.in_transaction = False
+
+    await serve_request(app)
+
+    assert results == [1, 1]
+    assert fake_pool.connections == 1
+    assert load.running_max == 1
+
+
+@pytest.mark.asyncio
+async def test_branch_state_merged_into_request():
+    """Ветвь наследует бюджет и закрепление за основным сервером, ее запись переносится в область запроса"""
+    scope = RequestScope(budget=5.0)
+    scope.route_class = "interactive"
+    branch = scope.fork()
+
+    assert branch.is_branch
+    assert (branch.deadline, branch.route_class) == (scope.deadline, "interactive")
+    assert not scope.wrote
+
+    branch.wrote = True
+    branch.queries = 3
+    await scope.join(branch)
+
+    assert scope.wrote and scope.pinned_to_primary
+    assert scope.queries == 3
@@ -0,0 +1,87 @@
+import asyncpg
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from training.application.services.activity_service import EXERCISE_SESSION_UPSERT_QUERY
+from training.application.services.training_service import TrainingService
+from training.infrastructure.database import Database
+from training.infrastructure.hot_statements import hot_statements, prepare_hot_statements
+from training.infrastructure.pool_stats import PoolStats
+
+
+class FakeCreatedPool:
+    """Пул, открывающий min_size соединений через хук init, как asyncpg.create_pool"""
+
+    def __init__(self, init, min_size, **kwargs):
+        self.init = init
+        self.connections = [MagicMock(_prepare=AsyncMock()) for _ in range(min_size)]
+
+    async def open(self):
+        for connection in self.connections:
+            await self.init(connection)
+        return self
+
+
+@pytest.mark.asyncio
+async def test_connect_prepares_hot_statements_before_ready():
+    """Частые запросы подготавливаются на каждом соединении пула до того, как сервис станет готов"""
+    db = Database()
+    pools = []
+
+    async def create_pool(**kwargs):
+        assert not db.is_ready()
+        pools.append(FakeCreatedPool(**kwargs))
+        return await pools[-1].open()
+
+    # connect присваивает _pool и _ready экземпляру-одиночке, поэтому подменяются атрибуты экземпляра
+    with patch.object(db, "_pool", None), patch.object(db, "_ready", False), \
+            patch.object(Database, "_stats", PoolStats()), \
+            patch.object(Database, "_connect_named_pools", AsyncMock()), \
+            patch.object(Database, "_connect_replicas", AsyncMock()), \
+            patch.object(Database, "_connect_shards", AsyncMock()), \
+            patch("training.infrastructure.database.asyncpg.create_pool", create_pool), \
+            patch("training.infrastructure.database.settings") as settings, \
+            patch("training.infrastructure.hot_statements._hot_statements", ["SELECT 1", "SELECT 2"]):
+        settings.DB_POOL_MIN_SIZE = 3
+        settings.DB_STATEMENT_CACHE_SIZE = 100
+        settings.DB_WARMUP_STATEMENTS = True
+        settings.DB_STATEMENT_TIMEOUT = None
+        settings.DB_CONNECTION_INIT_SQL = None
+        settings.DB_CONNECTION_SETUP_SQL = None
+        settings.DB_TRANSACTION_POOLER = False
+
+        await db.connect()
+
+        assert db.is_ready()
+        assert Database._stats.statements_prepared == 6
+
+    prepared = pools[0].connections[0]._prepare.call_args_list
+    assert [call.args[0] for call in prepared] == ["SELECT 1", "SELECT 2"]
+    assert all(call.kwargs["use_cache"] for call in prepared)
+
+
+@pytest.mark.asyncio
+async def test_failed_statement_skipped():
+    """Запрос, который не удалось подготовить, не мешает открытию соединения"""
+    connection = MagicMock()
+    connection._prepare = AsyncMock(side_effect=[asyncpg.UndefinedTableError("нет таблицы"), None])
+
+    with patch("training.infrastructure.hot_statements._hot_statements", ["SELECT * FROM missing", "SELECT 1"]):
+        assert await prepare_hot_statements(connection) == 1
+
+
+@pytest.mark.asyncio
+async def test_service_queries_match_registered_statements():
+    """Сервисы выполняют запросы с тем же текстом, что подготовлен при прогреве"""
+    db = MagicMock()
+    db.fetch = AsyncMock(return_value=[])
+    db.fetch_cached = AsyncMock(return_value=[])
+    service = TrainingService()
+    service.db = db
+
+    await service.get_app_workouts(1)
+    await service.get_app_workouts(1, limit=20)
+
+    assert EXERCISE_SESSION_UPSERT_QUERY in hot_statements()
+    for call in db.fetch.call_args_list:
+        assert call.args[0] in hot_statements()
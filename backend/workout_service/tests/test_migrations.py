@@ -0,0 +1,149 @@
+import asyncpg
+import pytest
+from pathlib import Path
+
+from training.infrastructure.migrations import MigrationError, load_migrations, migrate, split_statements
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[3] / "database" / "migrations"
+
+
+class FakeTransaction:
+    def __init__(self, connection):
+        self.connection = connection
+
+    async def __aenter__(self):
+        self.connection.log.append("BEGIN")
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.connection.log.append("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+class FakeConnection:
+    """Соединение, записывающее выполненные запросы; lock_failures - число отказов по lock_timeout для запроса"""
+
+    def __init__(self, lock_failures=None, invalid_indexes=()):
+        self.log = []
+        self.applied = {}
+        self.lock_failures = dict(lock_failures or {})
+        self.invalid_indexes = set(invalid_indexes)
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+    async def execute(self, query, *args):
+        if self.lock_failures.get(query):
+            self.lock_failures[query] -= 1
+            raise asyncpg.exceptions.LockNotAvailableError("canceling statement due to lock timeout")
+        if query.startswith("INSERT INTO schema_migrations"):
+            self.applied[args[0]] = args[2]
+            self.log.append(f"record {args[0]}")
+        elif "CREATE TABLE IF NOT EXISTS schema_migrations" not in query:
+            self.log.append(query.strip())
+
+    async def fetch(self, query, *args):
+        return [{"version": version, "checksum": checksum} for version, checksum in self.applied.items()]
+
+    async def fetchval(self, query, *args):
+        return args[0] in self.invalid_indexes
+
+
+def write_migrations(directory, files):
+    for name, sql in files.items():
+        (directory / name).write_text(sql, encoding="utf-8")
+    return load_migrations(str(directory))
+
+
+def test_split_statements_respects_quotes_and_comments():
+    """Точка с запятой в строках, телах функций и комментариях не разделяет запросы"""
+    sql = """
+        -- комментарий; не запрос
+        INSERT INTO t VALUES ('a;b');
+        CREATE FUNCTION f() RETURNS void AS $body$ BEGIN PERFORM 1; END; $body$ LANGUAGE plpgsql;
+        /* блок; */ SELECT 1
+    """
+
+    assert split_statements(sql) == [
+        "INSERT INTO t VALUES ('a;b')",
+        "CREATE FUNCTION f() RETURNS void AS $body$ BEGIN PERFORM 1; END; $body$ LANGUAGE plpgsql",
+        "SELECT 1",
+    ]
+
+
+def test_load_migrations_rejects_blocking_ddl(tmp_path):
+    """Блокирующие операции над существующими таблицами отклоняются, кроме помеченных unsafe-ok"""
+    with pytest.raises(MigrationError) as error:
+        write_migrations(tmp_path, {
+            "0001_index.sql": "CREATE INDEX idx_a ON user_activities(user_id);",
+            "0002_column.sql": "ALTER TABLE user_activities ADD COLUMN note TEXT NOT NULL;",
+            "0003_concurrently.sql": "CREATE INDEX CONCURRENTLY idx_b ON user_activities(record_date);",
+        })
+    message = str(error.value)
+    assert "0001_index: CREATE INDEX" in message
+    assert "0002_column: ADD COLUMN ... NOT NULL" in message
+    assert "0003_concurrently: CONCURRENTLY" in message
+
+    for path in tmp_path.iterdir():
+        path.unlink()
+    migrations = write_migrations(tmp_path, {
+        "0001_new_table.sql": "CREATE TABLE IF NOT EXISTS t (id INT NOT NULL);\nCREATE INDEX idx_t ON t(id);",
+        "0002_unsafe.sql": "-- migrate:unsafe-ok\nALTER TABLE t ALTER COLUMN id TYPE BIGINT;",
+        "0003_online.sql": "-- migrate:no-transaction\nCREATE INDEX CONCURRENTLY IF NOT EXISTS idx_t2 ON t(id);",
+    })
+    assert [migration.version for migration in migrations] == [1, 2, 3]
+    assert [migration.transactional for migration in migrations] == [True, True, False]
+
+
+def test_repository_migrations_pass_checks():
+    """Миграции репозитория загружаются и проходят проверку"""
+    migrations = load_migrations(str(MIGRATIONS_DIR))
+
+    assert migrations[0].label == "0001_baseline"
+
+
+@pytest.mark.asyncio
+async def test_migrate_applies_pending_once(tmp_path):
+    """Миграции применяются по порядку в транзакциях и записываются; измененная миграция - ошибка"""
+    migrations = write_migrations(tmp_path, {
+        "0002_second.sql": "CREATE TABLE IF NOT EXISTS b (id INT);",
+        "0001_first.sql": "CREATE TABLE IF NOT EXISTS a (id INT);",
+    })
+    connection = FakeConnection()
+
+    applied = await migrate(connection, migrations, lock_timeout=2)
+
+    assert [migration.version for migration in applied] == [1, 2]
+    assert connection.log == [
+        "SELECT pg_advisory_lock($1)", "SET lock_timeout = 2000", "SET statement_timeout = 0",
+        "BEGIN", "CREATE TABLE IF NOT EXISTS a (id INT);", "record 1", "COMMIT",
+        "BEGIN", "CREATE TABLE IF NOT EXISTS b (id INT);", "record 2", "COMMIT",
+        "SELECT pg_advisory_unlock($1)",
+    ]
+
+    assert await migrate(connection, migrations) == []
+
+    connection.applied[1] = "другая контрольная сумма"
+    with pytest.raises(MigrationError, match="0001_first"):
+        await migrate(connection, migrations)
+    assert connection.log[-1] == "SELECT pg_advisory_unlock($1)"
+
+
+@pytest.mark.asyncio
+async def test_no_transaction_migration_retries_lock_timeout(tmp_path):
+    """Запросы вне транзакции повторяются после lock_timeout; недостроенный индекс удаляется перед повтором"""
+    statement = "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_a ON a(id)"
+    migrations = write_migrations(tmp_path, {
+        "0001_index.sql": f"-- migrate:no-transaction\n{statement};\nANALYZE a;",
+    })
+    connection = FakeConnection(lock_failures={statement: 2}, invalid_indexes={"idx_a"})
+
+    await migrate(connection, migrations, retries=2, backoff=0)
+
+    assert "BEGIN" not in connection.log
+    assert connection.log.count("DROP INDEX CONCURRENTLY IF EXISTS idx_a") == 3
+    assert connection.log.index(statement) < connection.log.index("ANALYZE a") < connection.log.index("record 1")
+
+    failing = FakeConnection(lock_failures={statement: 3})
+    with pytest.raises(asyncpg.exceptions.LockNotAvailableError):
+        await migrate(failing, migrations, retries=2, backoff=0)
+    assert failing.applied == {}
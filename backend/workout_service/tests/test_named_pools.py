@@ -0,0 +1,123 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock, patch
+
+from training.api.router import TrainingRouter
+from training.infrastructure.database import Database
+from training.infrastructure.pool_stats import PoolStats
+from training.infrastructure.pools import ANALYTICS_POOL, DEFAULT_POOL, REALTIME_POOL, use_pool
+from training.infrastructure.request_scope import RequestScope, db_route, run_in_scope
+
+
+class FakeConnection:
+    def __init__(self, pool_name):
+        self.pool_name = pool_name
+
+    def is_closed(self):
+        return False
+
+    def is_in_transaction(self):
+        return False
+
+    async def fetchval(self, query, *args, timeout=None):
+        return self.pool_name
+
+    async def execute(self, query, *args, timeout=None):
+        return "UPDATE 1"
+
+
+@pytest.fixture
+def pools(make_pool, install_pools):
+    # Пулы из одного соединения: пока оно занято, получение соединения ждет
+    default = make_pool(FakeConnection("default"), size=1)
+    realtime = make_pool(FakeConnection(REALTIME_POOL), name=REALTIME_POOL, size=1)
+    install_pools(default, named={REALTIME_POOL: realtime})
+    return default, realtime
+
+
+@pytest.mark.asyncio
+async def test_realtime_route_not_starved_by_default_pool(pools, serve_request):
+    """Маршрут с пулом realtime получает соединение, даже когда пул по умолчанию занят отчетом"""
+    default, realtime = pools
+    db = Database()
+    report_started, report_done = asyncio.Event(), asyncio.Event()
+    results = []
+
+    async def long_report():
+        async with db.acquire():
+            report_started.set()
+            await report_done.wait()
+
+    async def save_progress(scope, receive, send):
+        await db_route("write", pool=REALTIME_POOL)()
+        results.append(await db.fetchval("UPDATE user_activity SET workout_count = 1 RETURNING 1"))
+
+    report = asyncio.ensure_future(long_report())
+    await report_started.wait()
+    await asyncio.wait_for(serve_request(save_progress), 1)
+    report_done.set()
+    await report
+
+    assert results == [REALTIME_POOL]
+    stats = db.pool_stats()
+    assert stats["pools"][REALTIME_POOL]["acquisitions"] == 1
+    assert stats["acquisitions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_use_pool_outside_request_and_fallback(pools):
+    """use_pool выбирает именованный пул; отключенный пул заменяется пулом по умолчанию"""
+    db = Database()
+
+    with use_pool(REALTIME_POOL):
+        assert await db.fetchval("SELECT 1") == REALTIME_POOL
+    with use_pool(ANALYTICS_POOL):
+        assert await db.fetchval("SELECT 1") == "default"
+    assert await db.fetchval("SELECT 1") == "default"
+
+
+@pytest.mark.asyncio
+async def test_routes_served_by_named_pools():
+    """Изменения каталога и история упражнений обслуживаются пулом analytics, запись прогресса - пулом realtime"""
+    router = TrainingRouter(*[MagicMock() for _ in range(5)]).router
+    pools = {}
+    for route in router.routes:
+        scope = RequestScope()
+        for dependency in route.dependant.dependencies:
+            await run_in_scope(scope, dependency.call())
+        for method in route.methods:
+            pools[(method, route.path.removeprefix(router.prefix))] = scope.pool_name
+
+    assert {route for route, pool in pools.items() if pool == ANALYTICS_POOL} >= {
+        ("POST", "/muscle-groups"), ("PUT", "/muscle-groups/{muscle_group_id}"),
+        ("DELETE", "/muscle-groups/{muscle_group_id}"), ("POST", "/exercises"),
+        ("PUT", "/exercises/{exercise_id}"), ("DELETE", "/exercises/{exercise_id}"),
+        ("POST", "/exercises/{exercise_id}/upload-gif"), ("DELETE", "/exercises/{exercise_id}/delete-gif"),
+        ("GET", "/user-activity/exercise-sessions"),
+    }
+    assert pools[("POST", "/user-activity/save-progress")] == REALTIME_POOL
+    assert pools[("GET", "/exercises")] == DEFAULT_POOL
+    assert pools[("GET", "/app-workouts")] == DEFAULT_POOL
+
+
+def test_named_pool_options_from_settings():
+    """Размеры и statement_timeout именованного пула задаются отдельно от пула по умолчанию"""
+    with patch("training.infrastructure.database.settings") as settings, \
+            patch("training.infrastructure.pools.settings") as pool_settings:
+        settings.DB_POOL_MAX_SIZE = 10
+        settings.DB_APPLICATION_NAME = None
+        settings.DB_STATEMENT_TIMEOUT = 60.0
+        settings.DB_CONNECTION_SETUP_SQL = None
+        settings.DB_TRANSACTION_POOLER = False
+        pool_settings.DB_POOL_ANALYTICS_MIN_SIZE = 0
+        pool_settings.DB_POOL_ANALYTICS_MAX_SIZE = 2
+        pool_settings.DB_POOL_ANALYTICS_STATEMENT_TIMEOUT = 300.0
+        pool_settings.DB_POOL_REALTIME_MAX_SIZE = 0
+
+        analytics = Database()._pool_options(PoolStats(), ANALYTICS_POOL)
+        default = Database()._pool_options()
+
+    assert (analytics["min_size"], analytics["max_size"]) == (0, 2)
+    assert analytics["server_settings"] == {"statement_timeout": "300000"}
+    assert default["max_size"] == 10
+    assert default["server_settings"] == {"statement_timeout": "60000"}
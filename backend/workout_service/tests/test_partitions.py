@@ -0,0 +1,95 @@
+import pytest
+from datetime import date
+
+from training.infrastructure.partitions import (
+    EXERCISE_SESSIONS_FOREIGN_KEY,
+    add_months,
+    detach_partitions,
+    ensure_partitions,
+    maintain_partitions,
+    partition_month,
+)
+
+TODAY = date(2026, 11, 17)
+
+
+class FakeConnection:
+    """Соединение со списком секций по таблицам, записывающее выполненные запросы"""
+
+    def __init__(self, partitions=None, locked=False):
+        self.partitions = {table: list(names) for table, names in (partitions or {}).items()}
+        self.locked = locked
+        self.log = []
+
+    async def fetch(self, query, table):
+        return [{"name": name} for name in self.partitions.get(table, [])]
+
+    async def fetchval(self, query, *args):
+        return not self.locked
+
+    async def execute(self, query, *args):
+        self.log.append(query)
+
+
+def test_month_helpers():
+    """Сдвиг месяца переходит через границу года, месяц секции определяется по имени"""
+    assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partition_month("user_workout_sessions", "user_workout_sessions_2026_03") == date(2026, 3, 1)
+    assert partition_month("user_workout_sessions", "user_workout_sessions_default") is None
+    assert partition_month("user_workout_sessions", "user_workout_sessions_2026_03_old") is None
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_creates_missing_months():
+    """Создаются только недостающие секции текущего и следующих месяцев"""
+    connection = FakeConnection({
+        "user_exercise_sessions": ["user_exercise_sessions_2026_11", "user_exercise_sessions_default"],
+        "user_workout_sessions": ["user_workout_sessions_2026_11", "user_workout_sessions_2026_12"],
+    })
+
+    created = await ensure_partitions(connection, TODAY, months_ahead=2)
+
+    assert created == [
+        "user_exercise_sessions_2026_12", "user_exercise_sessions_2027_01", "user_workout_sessions_2027_01",
+    ]
+    assert connection.log[-1] == (
+        "CREATE TABLE IF NOT EXISTS user_workout_sessions_2027_01 PARTITION OF user_workout_sessions "
+        "FOR VALUES FROM ('2027-01-01') TO ('2027-02-01')"
+    )
+
+
+@pytest.mark.asyncio
+async def test_detach_partitions_exercises_first():
+    """Устаревшие секции отсоединяются, сначала сессии упражнений, с удалением их внешнего ключа"""
+    connection = FakeConnection({
+        "user_exercise_sessions": [
+            "user_exercise_sessions_2026_09", "user_exercise_sessions_2026_07", "user_exercise_sessions_2026_08",
+            "user_exercise_sessions_default",
+        ],
+        "user_workout_sessions": ["user_workout_sessions_2026_07", "user_workout_sessions_2026_08"],
+    })
+
+    detached = await detach_partitions(connection, TODAY, retention_months=3)
+
+    assert detached == ["user_exercise_sessions_2026_07", "user_workout_sessions_2026_07"]
+    assert connection.log == [
+        "ALTER TABLE user_exercise_sessions DETACH PARTITION user_exercise_sessions_2026_07",
+        f"ALTER TABLE user_exercise_sessions_2026_07 DROP CONSTRAINT IF EXISTS {EXERCISE_SESSIONS_FOREIGN_KEY}",
+        "ALTER TABLE user_workout_sessions DETACH PARTITION user_workout_sessions_2026_07",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_maintain_partitions_once_per_cluster():
+    """Обслуживание выполняется под advisory-блокировкой с lock_timeout; занятая блокировка - пропуск"""
+    busy = FakeConnection(locked=True)
+    assert await maintain_partitions(busy, TODAY, 1, retention_months=3) == {"created": [], "detached": []}
+    assert busy.log == []
+
+    connection = FakeConnection()
+    result = await maintain_partitions(connection, TODAY, 0, lock_timeout=2)
+
+    assert result == {"created": ["user_exercise_sessions_2026_11", "user_workout_sessions_2026_11"], "detached": []}
+    assert connection.log[0] == "SET lock_timeout = 2000"
+    assert connection.log[-1] == "SELECT pg_advisory_unlock($1)"
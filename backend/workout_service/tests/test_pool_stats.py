@@ -0,0 +1,79 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from training.infrastructure.database import Database
+from training.infrastructure.pool_stats import PoolStats
+
+
+def _make_pool(size: int, idle: int) -> MagicMock:
+    pool = MagicMock()
+    pool.get_size.return_value = size
+    pool.get_idle_size.return_value = idle
+    pool.get_min_size.return_value = 2
+    pool.get_max_size.return_value = size
+    return pool
+
+
+def test_pool_stats_snapshot():
+    """Снимок статистики содержит размер пула, занятые соединения и гистограмму ожидания"""
+    stats = PoolStats()
+    stats.record_acquire(0.0005)
+    stats.record_acquire(0.020)
+    stats.record_acquire(10.0)
+
+    snapshot = stats.snapshot(_make_pool(size=5, idle=2))
+
+    assert snapshot["size"] == 5
+    assert snapshot["idle"] == 2
+    assert snapshot["in_use"] == 3
+    assert snapshot["acquisitions"] == 3
+    assert snapshot["acquisitions_per_sec"] > 0
+    assert snapshot["acquire_wait_histogram"]["le_1ms"] == 1
+    assert snapshot["acquire_wait_histogram"]["le_25ms"] == 1
+    assert snapshot["acquire_wait_histogram"]["inf"] == 1
+    assert snapshot["acquire_wait_max_ms"] == 10000.0
+
+
+def test_pool_stats_snapshot_without_pool():
+    """До подключения к БД статистика возвращается с нулевым размером пула"""
+    snapshot = PoolStats().snapshot(None)
+
+    assert snapshot["connected"] is False
+    assert snapshot["size"] == 0
+    assert snapshot["acquire_wait_avg_ms"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_database_acquire_records_wait(make_pool, install_pools):
+    """Получение соединения через Database.acquire учитывается в статистике пула"""
+    connection = MagicMock()
+    connection.fetchval = AsyncMock(return_value=1)
+    install_pools(make_pool(connection))
+    db = Database()
+
+    async with db.acquire():
+        pass
+    await db.fetchval("SELECT 1")
+
+    assert db.pool_stats()["acquisitions"] == 2
+
+
+def test_database_pool_options_from_settings():
+    """Параметры пула берутся из настроек приложения"""
+    with patch("training.infrastructure.database.settings") as settings:
+        settings.DB_POOL_MIN_SIZE = 2
+        settings.DB_POOL_MAX_SIZE = 20
+        settings.DB_COMMAND_TIMEOUT = 5.0
+        settings.DB_APPLICATION_NAME = None
+        settings.DB_STATEMENT_TIMEOUT = None
+        settings.DB_CONNECTION_SETUP_SQL = None
+        settings.DB_TRANSACTION_POOLER = False
+
+        options = Database()._pool_options()
+
+    assert options["min_size"] == 2
+    assert options["max_size"] == 20
+    assert options["command_timeout"] == 5.0
+    assert "init" in options
+    assert "setup" not in options
+    assert "server_settings" not in options
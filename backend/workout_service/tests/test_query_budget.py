@@ -0,0 +1,131 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from training.infrastructure.backpressure import DEFAULT_ROUTE_CLASS, acquire_timeout
+from training.infrastructure.database import Database
+from training.infrastructure.request_scope import QueryBudgetExceeded, db_budget
+
+
+class FakeConnection:
+    """Соединение, запоминающее время ожидания запросов; запрос SELECT pg_sleep не завершается"""
+
+    def __init__(self):
+        self.timeouts = []
+        self.cancelled = 0
+
+    def is_closed(self):
+        return False
+
+    def is_in_transaction(self):
+        return False
+
+    async def fetchval(self, query, *args, timeout=None):
+        self.timeouts.append(timeout)
+        if "pg_sleep" in query:
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+        return 1
+
+
+@pytest.fixture
+def fake_pool(make_pool, install_pools):
+    pool = install_pools(make_pool(FakeConnection()))
+    with patch("training.infrastructure.request_scope.settings") as settings:
+        settings.DB_REQUEST_BUDGET = 30.0
+        settings.DB_CANCEL_ON_DISCONNECT = True
+        yield pool
+
+
+def _client(disconnect: asyncio.Event):
+    """Клиент без тела запроса, закрывающий соединение по событию disconnect"""
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    return receive
+
+
+@pytest.mark.asyncio
+async def test_queries_limited_by_route_budget(fake_pool, serve_request):
+    """Запросы ограничены остатком бюджета маршрута; после его исчерпания запросы не выполняются"""
+    db = Database()
+
+    async def app(scope, receive, send):
+        await db.fetchval("SELECT 1")
+        await db_budget(2.0)()
+        await db.fetchval("SELECT 2")
+        await db_budget(0.01)()
+        await asyncio.sleep(0.02)
+        with pytest.raises(QueryBudgetExceeded):
+            await db.fetchval("SELECT 3")
+        with pytest.raises(asyncio.TimeoutError):
+            await db.fetchval("SELECT 4")
+
+    await serve_request(app, receive=_client(asyncio.Event()))
+
+    first, second = fake_pool.connection.timeouts
+    assert fake_pool.timeouts == [acquire_timeout(DEFAULT_ROUTE_CLASS)]
+    assert 29.0 < first <= 30.0
+    assert 1.0 < second <= 2.0
+    assert fake_pool.released == 1
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_cancels_running_query(fake_pool, serve_request):
+    """Закрытие соединения клиентом отменяет выполняемый запрос и возвращает соединение в пул"""
+    db = Database()
+    disconnect = asyncio.Event()
+
+    async def app(scope, receive, send):
+        disconnect.set()
+        await db.fetchval("SELECT pg_sleep(60)")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    sent = await asyncio.wait_for(serve_request(app, receive=_client(disconnect)), 1)
+
+    assert fake_pool.connection.cancelled == 1
+    assert fake_pool.released == 1
+    assert sent == []
+
+
+@pytest.mark.asyncio
+async def test_disconnect_after_response_does_not_cancel(fake_pool, serve_request):
+    """После отправки ответа http.disconnect не отменяет обработку запроса (фоновые задачи ответа)"""
+    db = Database()
+    disconnect = asyncio.Event()
+    finished = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+        disconnect.set()
+        await asyncio.sleep(0.01)
+        finished.append(await db.fetchval("SELECT 1"))
+
+    await serve_request(app, receive=_client(disconnect))
+
+    assert finished == [1]
+
+
+def test_statement_timeout_server_setting():
+    """Предельное время выполнения запроса передается серверу как statement_timeout в миллисекундах"""
+    with patch("training.infrastructure.database.settings") as settings:
+        settings.DB_APPLICATION_NAME = "trainova_workout_service"
+        settings.DB_STATEMENT_TIMEOUT = 60.0
+        settings.DB_CONNECTION_SETUP_SQL = None
+        settings.DB_TRANSACTION_POOLER = False
+
+        options = Database()._pool_options()
+
+    assert options["server_settings"] == {
+        "application_name": "trainova_workout_service",
+        "statement_timeout": "60000",
+    }
@@ -0,0 +1,191 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from training.infrastructure.database import Database
+from training.infrastructure.query_cache import QUERY_CACHE_CHANNEL, QueryCache, QueryCacheListener, written_tables
+
+
+class FakeConnection:
+    """Соединение, возвращающее строки каталога и считающее запросы на чтение"""
+
+    def __init__(self):
+        self.reads = 0
+        self.depth = 0
+
+    def is_closed(self):
+        return False
+
+    def is_in_transaction(self):
+        return self.depth > 0
+
+    def transaction(self, **options):
+        return FakeTransaction(self)
+
+    async def fetch(self, query, *args, **kwargs):
+        self.reads += 1
+        return [{"id": 1, "title": "Приседания"}]
+
+    async def execute(self, query, *args, **kwargs):
+        return "UPDATE 1"
+
+
+class FakeTransaction:
+    def __init__(self, connection):
+        self.connection = connection
+
+    async def __aenter__(self):
+        self.connection.depth += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.connection.depth -= 1
+        return False
+
+
+@pytest.fixture
+def settings():
+    with patch("training.infrastructure.query_cache.settings") as settings:
+        settings.DB_QUERY_CACHE_ENABLED = True
+        settings.DB_QUERY_CACHE_MAX_BYTES = 1024 * 1024
+        settings.DB_QUERY_CACHE_TTL = 60.0
+        yield settings
+
+
+@pytest.fixture
+def db(settings, make_pool, install_pools):
+    connection = FakeConnection()
+    install_pools(make_pool(connection))
+    with patch.object(Database, "_query_cache", QueryCache()):
+        yield Database(), connection
+
+
+def test_written_tables():
+    """Изменяемые таблицы определяются по тексту запроса, запросы на чтение таблиц не изменяют"""
+    assert written_tables("INSERT INTO exercises (title) VALUES ($1) RETURNING *") == {"exercises"}
+    assert written_tables('UPDATE public."muscle_groups" SET name = $1') == {"muscle_groups"}
+    assert written_tables("DELETE FROM app_workouts WHERE app_workout_uuid = $1") == {"app_workouts"}
+    assert written_tables("SELECT * FROM exercises ORDER BY title") == frozenset()
+    assert written_tables(
+        "INSERT INTO user_workout_summary (user_id) VALUES ($1) ON CONFLICT (user_id) DO UPDATE SET user_id = $1"
+    ) == {"user_workout_summary"}
+    assert written_tables("SELECT * FROM exercises WHERE exercise_id = $1 FOR UPDATE SKIP LOCKED") == frozenset()
+    assert written_tables("SELECT * FROM exercises FOR NO KEY UPDATE OF exercises") == frozenset()
+    assert written_tables(
+        "WITH moved AS (UPDATE exercises SET title = $1 RETURNING *) UPDATE muscle_groups SET name = $2"
+    ) == {"exercises", "muscle_groups"}
+
+
+def test_cache_lru_byte_budget_and_ttl(settings):
+    """Кэш вытесняет давно не использованные записи при превышении объема и удаляет устаревшие"""
+    cache = QueryCache()
+    rows = [{"id": index, "title": "x" * 100} for index in range(5)]
+
+    assert cache.put("a", rows, ("exercises",), cache.generation(("exercises",)))
+    settings.DB_QUERY_CACHE_MAX_BYTES = cache.size * 2  # помещаются две записи
+    assert cache.put("b", rows, ("exercises",), cache.generation(("exercises",)))
+    assert cache.get("a") == rows  # "a" становится последней использованной записью
+    assert cache.put("c", rows, ("exercises",), cache.generation(("exercises",)))
+
+    assert cache.get("b") is None
+    assert cache.get("a") == rows
+    assert cache.evictions == 1
+    assert cache.size <= settings.DB_QUERY_CACHE_MAX_BYTES
+
+    assert cache.put("d", rows, ("muscle_groups",), cache.generation(("muscle_groups",)), ttl=0)
+    assert cache.get("d") is None
+    assert cache.expirations == 1
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_cached_invalidated_by_write(db):
+    """Запись в таблицу сбрасывает закэшированные запросы, которые ее читают"""
+    database, connection = db
+    query = "SELECT * FROM exercises ORDER BY title"
+
+    first = await database.fetch_cached(query, tables=("exercises",))
+    second = await database.fetch_cached(query, tables=("exercises",))
+    assert first is second
+    assert connection.reads == 1
+
+    await database.execute("UPDATE muscle_groups SET name = $1", "Спина")
+    await database.fetch_cached(query, tables=("exercises",))
+    assert connection.reads == 1
+
+    await database.execute("UPDATE exercises SET title = $1", "Выпады")
+    await database.fetch_cached(query, tables=("exercises",))
+    assert connection.reads == 2
+
+    cache = database.query_stats()["cache"]
+    assert cache["hits"] == 2
+    assert cache["misses"] == 2
+    assert cache["invalidations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_transaction_invalidates_after_commit(db):
+    """Изменения в транзакции сбрасывают кэш только после фиксации, включая изменения в точках сохранения"""
+    database, connection = db
+    query = "SELECT * FROM exercises ORDER BY title"
+    cache = Database._query_cache
+
+    await database.fetch_cached(query, tables=("exercises",))
+    async with database.transaction() as tx:
+        async with tx.savepoint():
+            pass
+        async with database.transaction() as nested:
+            await nested.execute("DELETE FROM exercises WHERE exercise_id = $1", 1)
+        assert cache.get(cache.key(query, ())) is not None
+
+    assert cache.get(cache.key(query, ())) is None
+
+    # Результат, прочитанный до записи, не сохраняется в кэше после нее
+    generation = cache.generation(("exercises",))
+    cache.invalidate(("exercises",))
+    assert not cache.put(cache.key(query, ()), [], ("exercises",), generation)
+
+
+class FakeListenConnection:
+    """Соединение для LISTEN: доставляет уведомления подписчику и сообщает о своем закрытии"""
+
+    def __init__(self):
+        self.listeners = {}
+        self.on_close = None
+
+    def add_termination_listener(self, callback):
+        self.on_close = callback
+
+    async def add_listener(self, channel, callback):
+        self.listeners[channel] = callback
+
+    def notify(self, payload):
+        self.listeners[QUERY_CACHE_CHANNEL](self, 4321, QUERY_CACHE_CHANNEL, payload)
+
+
+@pytest.mark.asyncio
+async def test_listener_invalidates_on_notification_from_other_process(settings):
+    """Уведомление о записи в таблицу из другого процесса сбрасывает записи кэша, которые ее читают"""
+    cache = QueryCache()
+    connection = FakeListenConnection()
+    listening = asyncio.ensure_future(QueryCacheListener(cache).listen(connection))
+    await asyncio.sleep(0)
+
+    cache.put("exercises", [], ("exercises",), cache.generation(("exercises",)))
+    cache.put("groups", [], ("muscle_groups",), cache.generation(("muscle_groups",)))
+    in_flight = cache.generation(("exercises",))
+    connection.notify("exercises")
+
+    assert cache.get("exercises") is None
+    assert cache.get("groups") == []
+    assert not cache.put("exercises", [], ("exercises",), in_flight)
+
+    # Пока соединение закрыто, уведомления не доходят: подписка заканчивается и кэш сбрасывается целиком
+    connection.on_close(connection)
+    await asyncio.wait_for(listening, 1)
+    in_flight = cache.generation(("muscle_groups",))
+    cache.invalidate_all()
+    assert cache.get("groups") is None
+    assert not cache.put("groups", [], ("muscle_groups",), in_flight)
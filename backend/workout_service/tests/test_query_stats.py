@@ -0,0 +1,84 @@
+import logging
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from training.infrastructure.database import Database
+from training.infrastructure.query_stats import QueryStats, normalize_query
+
+
+@pytest.fixture
+def db(make_pool, install_pools):
+    connection = MagicMock()
+    connection.fetch = AsyncMock(return_value=[{"id": 1}, {"id": 2}, {"id": 3}])
+    connection.execute = AsyncMock(side_effect=Exception("ошибка"))
+    install_pools(make_pool(connection))
+    with patch("training.infrastructure.query_stats.settings") as settings:
+        settings.DB_QUERY_STATS_ENABLED = True
+        settings.DB_QUERY_STATS_MAX_STATEMENTS = 100
+        settings.DB_SLOW_QUERY_MS = None
+        yield Database(), settings
+
+
+def test_normalize_query_replaces_literals():
+    """Запросы, отличающиеся только подставленными литералами и пробелами, группируются вместе"""
+    first = normalize_query("SELECT *\n  FROM trainings WHERE user_id = 42 AND name = 'Ноги' AND id IN (1, 2, 3)")
+    second = normalize_query("SELECT * FROM trainings WHERE user_id = 7 AND name = 'Спина' AND id IN (5, 6)")
+
+    assert first == second == "SELECT * FROM trainings WHERE user_id = ? AND name = ? AND id IN (?, ...)"
+    assert normalize_query("SELECT $1::int[]") == "SELECT $1::int[]"
+
+
+@pytest.mark.asyncio
+async def test_database_records_statement_stats(db):
+    """Время, число выполнений, строк и ошибок запросов учитываются по нормализованному тексту"""
+    database, _ = db
+
+    await database.fetch("SELECT * FROM exercises WHERE id = 1")
+    await database.fetch("SELECT * FROM exercises WHERE id = 2")
+    with pytest.raises(Exception):
+        await database.execute("DELETE FROM exercises")
+
+    stats = database.query_stats(limit=10, order_by="count")
+
+    assert stats["queries"] == 3
+    assert stats["distinct_statements"] == 2
+    top = stats["statements"][0]
+    assert top["statement"] == "SELECT * FROM exercises WHERE id = ?"
+    assert top["count"] == 2
+    assert top["rows"] == 6
+    assert top["p99_ms"] >= top["p95_ms"] >= 0
+    assert stats["statements"][1]["errors"] == 1
+
+    assert len(database.query_stats(limit=1)["statements"]) == 1
+    with pytest.raises(ValueError):
+        database.query_stats(order_by="unknown")
+
+
+@pytest.mark.asyncio
+async def test_slow_query_logged_with_call_site(db, caplog):
+    """Медленный запрос записывается в журнал вместе с местом вызова вне слоя работы с БД"""
+    database, settings = db
+    settings.DB_SLOW_QUERY_MS = 0
+
+    with caplog.at_level(logging.WARNING, logger="training.infrastructure.query_stats"):
+        await database.fetch("SELECT * FROM muscle_groups")
+
+    assert "test_query_stats.py" in caplog.text
+    assert "SELECT * FROM muscle_groups" in caplog.text
+    stats = database.query_stats()
+    assert stats["slow_queries"] == 1
+    assert "test_slow_query_logged_with_call_site" in stats["statements"][0]["last_slow_call_site"]
+
+
+def test_statement_limit_evicts_cheapest(db):
+    """При превышении лимита вытесняется запрос с наименьшим суммарным временем"""
+    _, settings = db
+    settings.DB_QUERY_STATS_MAX_STATEMENTS = 2
+    stats = QueryStats()
+
+    stats.record("SELECT a FROM t", 0.5)
+    stats.record("SELECT b FROM t", 0.1)
+    stats.record("SELECT c FROM t", 0.2)
+
+    assert set(stats.statements) == {"SELECT a FROM t", "SELECT c FROM t"}
+    assert stats.statements_dropped == 1
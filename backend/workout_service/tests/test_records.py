@@ -0,0 +1,44 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from asyncpg.protocol.protocol import _create_record
+
+from training.domain.schemas import AppWorkout
+from training.infrastructure.database import Database
+from training.infrastructure.records import Row
+
+
+def _make_record(**values):
+    return _create_record({name: index for index, name in enumerate(values)}, tuple(values.values()))
+
+
+def test_row_attribute_and_mapping_access():
+    """Строка доступна по ключу и как атрибут, из нее строится модель ответа без словаря"""
+    record = _make_record(name="Ноги", is_visible=True)
+
+    assert Row.__getattr__(record, "name") == record["name"] == "Ноги"
+    with pytest.raises(AttributeError):
+        Row.__getattr__(record, "missing")
+    assert AppWorkout(**record).name == "Ноги"
+
+
+@pytest.mark.asyncio
+async def test_fetch_records_skips_dict_conversion(make_pool, install_pools):
+    """fetch(records=True) запрашивает строки Row и возвращает их без копирования в словари"""
+    records = [_make_record(id=1), _make_record(id=2)]
+    connection = MagicMock()
+    connection.fetch = AsyncMock(return_value=records)
+    connection.fetchrow = AsyncMock(return_value=records[0])
+    install_pools(make_pool(connection))
+    db = Database()
+
+    rows = await db.fetch("SELECT id FROM t", records=True)
+    row = await db.fetchrow("SELECT id FROM t", records=True)
+    dicts = await db.fetch("SELECT id FROM t")
+
+    assert rows is records
+    assert row is records[0]
+    assert connection.fetch.await_args_list[0].kwargs == {"record_class": Row}
+    assert connection.fetchrow.await_args.kwargs == {"record_class": Row}
+    assert connection.fetch.await_args_list[1].kwargs == {}
+    assert dicts == [{"id": 1}, {"id": 2}]
@@ -0,0 +1,111 @@
+import pytest
+
+from training.infrastructure.database import Database, is_read_only_query
+
+
+class FakeConnection:
+    """Соединение, записывающее выполненные запросы"""
+
+    def __init__(self, name, caught_up=True):
+        self.name = name
+        self.caught_up = caught_up
+        self.queries = []
+
+    def is_closed(self):
+        return False
+
+    def is_in_transaction(self):
+        return False
+
+    async def execute(self, query, *args, timeout=None):
+        self.queries.append(query)
+        return "OK"
+
+    async def fetchval(self, query, *args, timeout=None):
+        if "pg_last_wal_replay_lsn" in query:
+            return self.caught_up
+        if "pg_current_wal_lsn" in query:
+            return "0/3000148"
+        self.queries.append(query)
+        return self.name
+
+
+@pytest.fixture
+def pools(make_pool, install_pools):
+    primary = make_pool(FakeConnection("primary"))
+    replica = make_pool(FakeConnection("replica"))
+    install_pools(primary, replicas=[replica])
+    return primary, replica
+
+
+def test_is_read_only_query():
+    """На реплику направляются только запросы, не изменяющие данные и не блокирующие строки"""
+    assert is_read_only_query("\n  SELECT * FROM exercises WHERE updated_at > $1")
+    assert is_read_only_query("WITH s AS (SELECT 1) SELECT * FROM s")
+    assert not is_read_only_query("INSERT INTO exercises (title) VALUES ($1) RETURNING *")
+    assert not is_read_only_query("UPDATE exercises SET title = $1 RETURNING *")
+    assert not is_read_only_query("WITH d AS (DELETE FROM trainings RETURNING id) SELECT count(*) FROM d")
+    assert not is_read_only_query("SELECT * FROM user_activities WHERE user_id = $1 FOR UPDATE")
+
+
+@pytest.mark.asyncio
+async def test_reads_use_replica_and_writes_use_primary(pools):
+    """Вне HTTP-запроса чтения выполняются на реплике, запись - на основном сервере"""
+    primary, replica = pools
+    db = Database()
+
+    assert await db.fetchval("SELECT 1") == "replica"
+    assert await db.fetchval("DELETE FROM trainings WHERE id = $1 RETURNING id") == "primary"
+    await db.execute("UPDATE trainings SET name = $1")
+
+    assert replica.acquired == 1
+    assert primary.acquired == 2
+    routing = db.pool_stats()["routing"]
+    assert routing["reads_replica"] == 1
+    assert routing["reads_primary"] == 0
+    assert db.pool_stats()["replicas"][0]["acquisitions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_request_reads_own_writes_from_primary(pools, run_in_request):
+    """После записи чтения запроса идут на основной сервер, а ответ содержит позицию WAL"""
+    primary, replica = pools
+    db = Database()
+    results = []
+
+    async def handler():
+        results.append(await db.fetchval("SELECT 1"))
+        await db.execute("UPDATE trainings SET name = $1")
+        results.append(await db.fetchval("SELECT 1"))
+
+    headers = await run_in_request(handler)
+
+    assert results == ["replica", "primary"]
+    assert headers[b"x-db-lsn"] == b"0/3000148"
+    assert primary.acquired == primary.released == 1
+    assert replica.acquired == replica.released == 1
+
+
+@pytest.mark.asyncio
+async def test_request_falls_back_to_primary_when_replica_lags(pools, run_in_request):
+    """Если реплика не воспроизвела позицию WAL из X-DB-Read-After, чтения идут на основной сервер"""
+    primary, replica = pools
+    replica.connection.caught_up = False
+    db = Database()
+    results = []
+
+    async def handler():
+        results.append(await db.fetchval("SELECT 1"))
+        results.append(await db.fetchval("SELECT 1"))
+
+    headers = await run_in_request(handler, headers=[(b"x-db-read-after", b"0/3000148")])
+
+    assert results == ["primary", "primary"]
+    assert b"x-db-lsn" not in headers
+    assert replica.acquired == replica.released == 1
+    assert db.pool_stats()["routing"]["replica_fallbacks"] == 1
+
+    replica.connection.caught_up = True
+    results.clear()
+    await run_in_request(handler, headers=[(b"x-db-read-after", b"0/3000148")])
+    assert results == ["replica", "replica"]
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+
+from training.infrastructure.database import Database
+
+
+class FakeConnection:
+    """Соединение, проверяющее, что на нем не выполняются параллельные запросы"""
+
+    def __init__(self):
+        self.active = 0
+        self.queries = 0
+
+    def is_closed(self):
+        return False
+
+    async def fetchval(self, query, *args, timeout=None):
+        assert self.active == 0, "параллельный запрос на одном соединении"
+        self.active += 1
+        await asyncio.sleep(0)
+        self.active -= 1
+        self.queries += 1
+        return 1
+
+
+@pytest.fixture
+def fake_pool(make_pool, install_pools):
+    return install_pools(make_pool(FakeConnection()))
+
+
+@pytest.mark.asyncio
+async def test_request_reuses_single_connection(fake_pool, run_in_request):
+    """Все запросы к БД в рамках HTTP-запроса выполняются на одном соединении"""
+    db = Database()
+
+    async def handler():
+        for _ in range(4):
+            await db.fetchval("SELECT 1")
+
+    await run_in_request(handler)
+
+    assert fake_pool.acquired == 1
+    assert fake_pool.released == 1
+    requests = db.pool_stats()["requests"]
+    assert requests["count"] == 1
+    assert requests["acquisitions_per_request_avg"] == 1
+    assert requests["queries_per_request_avg"] == 4
+
+
+@pytest.mark.asyncio
+async def test_request_serializes_concurrent_queries(fake_pool, run_in_request):
+    """Параллельные задачи одного HTTP-запроса выполняют запросы на соединении по очереди"""
+    db = Database()
+
+    async def handler():
+        await asyncio.gather(*(db.fetchval("SELECT 1") for _ in range(5)))
+
+    await run_in_request(handler)
+
+    assert fake_pool.acquired == 1
+    assert fake_pool.connection.queries == 5
+
+
+@pytest.mark.asyncio
+async def test_acquire_per_query_outside_request(fake_pool):
+    """Вне HTTP-запроса соединение берется из пула на каждый запрос, как раньше"""
+    db = Database()
+
+    for _ in range(3):
+        await db.fetchval("SELECT 1")
+
+    assert fake_pool.acquired == 3
+    assert fake_pool.released == 3
+    assert db.pool_stats()["requests"]["count"] == 0
@@ -0,0 +1,106 @@
+import pytest
+from collections import Counter
+from unittest.mock import patch
+
+from training.infrastructure.database import Database
+from training.infrastructure.request_scope import PRIMARY, RequestScope, run_in_scope
+from training.infrastructure.sharding import ShardRing, parse_shard_dsns, use_shard
+
+USERS = range(1, 10001)
+
+
+class FakeConnection:
+    def __init__(self, name):
+        self.name = name
+
+    def is_closed(self):
+        return False
+
+    def is_in_transaction(self):
+        return False
+
+    async def fetchval(self, query, *args, timeout=None):
+        return self.name
+
+    async def execute(self, query, *args, timeout=None):
+        return "INSERT 0 1"
+
+
+@pytest.fixture
+def shards(make_pool, install_pools):
+    ring = ShardRing(["a", "b", "c"])
+    install_pools(
+        make_pool(FakeConnection(PRIMARY), name=PRIMARY),
+        shards={name: make_pool(FakeConnection(name), name=name) for name in ring.names}
+    )
+    with patch.object(Database, "_shard_ring", ring):
+        yield ring
+
+
+def test_ring_spreads_users_evenly():
+    """Пользователи распределяются по шардам примерно поровну и всегда на один и тот же шард"""
+    ring = ShardRing(["a", "b", "c"])
+
+    counts = Counter(ring.shard_for(user_id) for user_id in USERS)
+
+    assert set(counts) == {"a", "b", "c"}
+    assert all(count > len(USERS) * 0.25 for count in counts.values())
+    assert ShardRing(["c", "a", "b"]).shard_for(42) == ring.shard_for(42)
+
+
+def test_adding_shard_moves_only_its_share_of_users():
+    """Новый шард забирает около 1/N пользователей, остальные остаются на своих шардах"""
+    ring, extended = ShardRing(["a", "b", "c"]), ShardRing(["a", "b", "c", "d"])
+
+    moves = ring.moves(extended, USERS)
+
+    assert 0.15 < len(moves) / len(USERS) < 0.35
+    assert {target for _, _, target in moves} == {"d"}
+
+
+def test_parse_shard_dsns():
+    """Шарды задаются парами имя=DSN; DSN может содержать знак ="""
+    assert parse_shard_dsns("a=postgresql://h1/db, b=postgresql://h2/db?sslmode=require") == {
+        "a": "postgresql://h1/db", "b": "postgresql://h2/db?sslmode=require"
+    }
+    assert parse_shard_dsns("") == {}
+    with pytest.raises(ValueError):
+        parse_shard_dsns("postgresql://h1/db")
+    with pytest.raises(ValueError):
+        parse_shard_dsns("a=postgresql://h1/db,a=postgresql://h2/db")
+
+
+@pytest.mark.asyncio
+async def test_use_shard_routes_to_user_shard(shards):
+    """Внутри use_shard запросы выполняются на шарде пользователя, вне него - на основном сервере"""
+    db = Database()
+
+    for user_id in (1, 2, 3, 4, 5):
+        with use_shard(user_id):
+            assert await db.fetchval("SELECT 1") == shards.shard_for(user_id)
+            with use_shard(None):
+                assert await db.fetchval("SELECT 1") == PRIMARY
+    assert await db.fetchval("SELECT 1") == PRIMARY
+    assert db.is_sharded()
+
+
+@pytest.mark.asyncio
+async def test_request_keeps_shard_and_primary_connections(shards):
+    """Запрос держит отдельные соединения с шардом и основным сервером; запись на шард не закрепляет чтения"""
+    db = Database()
+    scope = RequestScope()
+
+    async def handler():
+        with use_shard(7):
+            await db.execute("INSERT INTO user_weights VALUES ($1)", 7)
+            assert not scope.wrote
+            await db.fetchval("SELECT 1")
+        await db.execute("INSERT INTO user_workout_summary VALUES ($1)", 7)
+
+    await run_in_scope(scope, handler())
+
+    assert set(scope.connections) == {PRIMARY, f"shard:{shards.shard_for(7)}"}
+    assert scope.acquisitions == 2
+    assert scope.wrote
+    await scope.close()
+    assert Database._shard_pools[shards.shard_for(7)].released == 1
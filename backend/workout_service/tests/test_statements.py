@@ -0,0 +1,70 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from training.application.services.exercises_service import ExercisesService
+from training.domain.schemas import ExerciseUpdate
+from training.infrastructure.statements import UpdateStatements
+
+
+def test_field_order_does_not_change_statement():
+    """Один набор полей дает один текст запроса независимо от порядка добавления полей"""
+    statements = UpdateStatements()
+
+    first, first_params = statements.build("exercises", "exercises", {"title": "A", "description": "B"},
+                                           {"exercise_id": 7}, expressions={"updated_at": "CURRENT_TIMESTAMP"})
+    second, second_params = statements.build("exercises", "exercises", {"description": "B", "title": "A"},
+                                             {"exercise_id": 7}, expressions={"updated_at": "CURRENT_TIMESTAMP"})
+
+    assert first is second
+    assert first == (
+        "UPDATE exercises SET description = $1, title = $2, updated_at = CURRENT_TIMESTAMP "
+        "WHERE exercise_id = $3 RETURNING *"
+    )
+    assert first_params == second_params == ["B", "A", 7]
+
+
+def test_value_overrides_expression_and_where_order():
+    """Значение поля заменяет выражение по умолчанию; условия WHERE идут после полей SET"""
+    statements = UpdateStatements()
+
+    query, params = statements.build("activity", "user_workout_sessions", {"updated_at": "now"},
+                                     {"user_id": 1, "workout_session_uuid": "u"},
+                                     expressions={"updated_at": "NOW()"}, returning="")
+
+    assert query == "UPDATE user_workout_sessions SET updated_at = $1 WHERE user_id = $2 AND workout_session_uuid = $3"
+    assert params == ["now", 1, "u"]
+
+
+def test_distinct_statements_by_service():
+    """Статистика показывает число различных запросов и построений по сервисам"""
+    statements = UpdateStatements()
+    for values in ({"a": 1}, {"a": 2}, {"a": 1, "b": 2}):
+        statements.build("training", "trainings", values, {"id": 1})
+    statements.build("activity", "user_exercise_sessions", {"a": 1}, {"id": 1})
+
+    assert statements.stats() == {
+        "distinct_statements": 3,
+        "services": {
+            "activity": {"distinct_statements": 1, "calls": 1},
+            "training": {"distinct_statements": 2, "calls": 3},
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_update_exercise_reuses_statement():
+    """Обновления упражнения с одним набором полей выполняются одним текстом запроса"""
+    db = AsyncMock()
+    db.fetchrow.return_value = None
+    service = ExercisesService()
+    service.db = db
+    statements = UpdateStatements()
+
+    with patch("training.infrastructure.statements.update_statements", statements), \
+            patch.object(ExercisesService, "get_exercise_by_id", AsyncMock(return_value=object())):
+        await service.update_exercise(1, ExerciseUpdate(title="A", description="B"))
+        await service.update_exercise(2, ExerciseUpdate(description="C", title="D"))
+
+    first, second = [call.args[0] for call in db.fetchrow.call_args_list]
+    assert first == second
+    assert statements.stats()["services"]["exercises"] == {"distinct_statements": 1, "calls": 2}
@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 import uuid
 from unittest.mock import AsyncMock, patch, MagicMock
@@ -5,7 +6,10 @@ from typing import List, Dict, Any
 from datetime import datetime
 
 from training.application.services.training_service import TrainingService
-from training.domain.schemas import Training, TrainingCreate, DifficultyLevel, TrainingExercise
+from training.domain.schemas import (
+    Training, TrainingCreate, DifficultyLevel, TrainingExercise, AppWorkoutCreate, AppWorkoutExerciseCreate
+)
+from training.domain.utils import encode_cursor
 
 # Тестовые данные
 TEST_TRAINING_ID = 1
@@ -30,6 +34,7 @@ def mock_database():
     with patch('training.infrastructure.database.Database') as mock:
         db_instance = mock.return_value
         db_instance.fetch = AsyncMock()
+        db_instance.fetch_cached = AsyncMock(return_value=[])
         db_instance.fetchrow = AsyncMock()
         db_instance.execute = AsyncMock()
         db_instance.fetchval = AsyncMock()
@@ -79,4 +84,147 @@ async def test_get_training_by_id(training_service):
         assert result.name == TEST_TRAINING["name"]
 
 # Тест get_user_trainings требует больше настройки, т.к. в нем происходит обработка строк из БД
-# Его лучше оставить для интеграционного тестирования 
\ No newline at end of file
+# Его лучше оставить для интеграционного тестирования 
+
+def _make_app_workout_row(index: int) -> Dict[str, Any]:
+    return {
+        "app_workout_uuid": str(uuid.uuid4()),
+        "name": f"Тренировка {index}",
+        "description": None,
+        "is_visible": True,
+        "created_at": datetime(2024, 1, 1, 12, 0, 0),
+        "updated_at": datetime(2024, 1, 1, 12, 0, 0),
+        "last_session_uuid": None,
+        "last_session_start": None,
+        "last_session_stop": None,
+        "last_session_status": None,
+        "last_exercise_session_uuid": None,
+        "last_exercise_start": None,
+        "last_exercise_stop": None,
+        "last_exercise_status": None,
+        "total_workout_time": None,
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("catalog_size", [1, 10, 300])
+async def test_get_app_workouts_constant_round_trips(training_service, catalog_size):
+    """Количество запросов к БД не зависит от размера каталога тренировок"""
+    workout_rows = [_make_app_workout_row(i) for i in range(catalog_size)]
+    exercise_rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "app_workout_uuid": row["app_workout_uuid"],
+            "exercise_id": str(uuid.uuid4()),
+            "duration": 30,
+            "count": None,
+            "exercise_name": "Планка",
+        }
+        for row in workout_rows
+        for _ in range(2)
+    ]
+    training_service.db.fetch.side_effect = [workout_rows]
+    training_service.db.fetch_cached.return_value = exercise_rows
+    
+    result = await training_service.get_app_workouts(TEST_USER_ID)
+    
+    assert training_service.db.fetch.call_count == 1
+    assert training_service.db.fetch_cached.call_count == 1
+    assert not training_service.db.fetchrow.called
+    assert len(result) == catalog_size
+    assert all(len(workout.exercises) == 2 for workout in result)
+    assert [exercise.order for exercise in result[0].exercises] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_get_app_workouts_page_keyset_cursor(training_service):
+    """Сортировка и лимит выполняются в SQL, курсор продолжает выборку с последней тренировки"""
+    workout_rows = [_make_app_workout_row(i) for i in range(3)]
+    for index, row in enumerate(workout_rows):
+        row["sort_key"] = f"2024-01-0{3 - index} 12:00:00+00"
+    training_service.db.fetch.side_effect = [workout_rows, workout_rows[:1]]
+    
+    page, next_cursor = await training_service.get_app_workouts_page(TEST_USER_ID, order_by="newest", limit=2)
+    
+    query, *params = training_service.db.fetch.call_args_list[0].args
+    assert "ORDER BY COALESCE(s.last_session_start, '-infinity'::timestamptz) DESC" in query
+    assert params[-1] == 3  # запрашивается одна лишняя строка
+    assert [workout.app_workout_uuid for workout in page] == [row["app_workout_uuid"] for row in workout_rows[:2]]
+    assert next_cursor is not None
+    
+    page, next_cursor = await training_service.get_app_workouts_page(
+        TEST_USER_ID, order_by="newest", limit=2, cursor=next_cursor
+    )
+    
+    query, *params = training_service.db.fetch.call_args_list[1].args
+    assert "aw.app_workout_uuid) < ($3::text::timestamptz, $4::uuid)" in query
+    assert params[2:4] == [workout_rows[1]["sort_key"], uuid.UUID(workout_rows[1]["app_workout_uuid"])]
+    # asyncpg передает параметр типа text только как str, а uuid - как UUID
+    assert [type(param) for param in params[2:4]] == [str, uuid.UUID]
+    assert len(page) == 1
+    assert next_cursor is None
+
+
+@pytest.mark.asyncio
+async def test_get_app_workouts_propagates_budget_timeout(training_service):
+    """Исчерпание бюджета запроса при чтении упражнений доходит до обработчика 504, а не дает тренировки без упражнений"""
+    training_service.db.fetch.side_effect = [[_make_app_workout_row(0)]]
+    training_service.db.fetch_cached.side_effect = asyncio.TimeoutError()
+    
+    with pytest.raises(asyncio.TimeoutError):
+        await training_service.get_app_workouts(TEST_USER_ID)
+
+
+@pytest.mark.asyncio
+async def test_get_app_workouts_page_rejects_invalid_params(training_service):
+    """Неизвестная сортировка, поврежденный курсор и курсор другой сортировки отклоняются"""
+    with pytest.raises(ValueError):
+        await training_service.get_app_workouts_page(TEST_USER_ID, order_by="random")
+    with pytest.raises(ValueError):
+        await training_service.get_app_workouts_page(TEST_USER_ID, cursor="not a cursor")
+    
+    workout_rows = [_make_app_workout_row(i) for i in range(2)]
+    for row in workout_rows:
+        row["sort_key"] = row["name"]
+    training_service.db.fetch.side_effect = [workout_rows]
+    _, cursor = await training_service.get_app_workouts_page(TEST_USER_ID, order_by="name", limit=1)
+    with pytest.raises(ValueError):
+        await training_service.get_app_workouts_page(TEST_USER_ID, order_by="oldest", cursor=cursor)
+    
+    # Поврежденный ключ сортировки отклоняется до запроса к БД
+    training_service.db.fetch.reset_mock()
+    last_uuid = str(uuid.uuid4())
+    for order_by, value in [("newest", "abc"), ("newest", None), ("created", 123), ("name", None)]:
+        with pytest.raises(ValueError, match="Некорректный курсор пагинации"):
+            await training_service.get_app_workouts_page(
+                TEST_USER_ID, order_by=order_by, cursor=encode_cursor({"o": order_by, "v": value, "id": last_uuid})
+            )
+    training_service.db.fetch.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_create_app_workout_bulk_inserts_exercises(training_service):
+    """Упражнения тренировки добавляются одним запросом независимо от их количества"""
+    workout_row = _make_app_workout_row(0)
+    exercises = [AppWorkoutExerciseCreate(exercise_id=uuid.uuid4(), duration=30) for _ in range(30)]
+    tx = MagicMock()
+    tx.fetchrow = AsyncMock(return_value=workout_row)
+    tx.insert_many = AsyncMock(return_value=[
+        {"id": str(uuid.uuid4()), "app_workout_uuid": workout_row["app_workout_uuid"],
+         "exercise_id": str(exercise.exercise_id), "duration": 30}
+        for exercise in exercises
+    ])
+    transaction = MagicMock()
+    transaction.__aenter__ = AsyncMock(return_value=tx)
+    transaction.__aexit__ = AsyncMock(return_value=False)
+    training_service.db.transaction = MagicMock(return_value=transaction)
+    
+    result = await training_service.create_app_workout(
+        AppWorkoutCreate(name="Тренировка", exercises=exercises), TEST_USER_ID
+    )
+    
+    assert tx.fetchrow.await_count == 1
+    assert tx.insert_many.await_count == 1
+    rows = tx.insert_many.await_args.args[3]
+    assert [row[1] for row in rows] == [str(exercise.exercise_id) for exercise in exercises]
+    assert [str(exercise.exercise_id) for exercise in result.exercises] == [row[1] for row in rows]
@@ -0,0 +1,168 @@
+import pytest
+import asyncpg
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from training.infrastructure.database import Database, Transaction
+
+
+class FakeConnection:
+    """Соединение, записывающее открытие, фиксацию и откат транзакций"""
+
+    def __init__(self):
+        self.events = []
+        self.depth = 0
+
+    def is_closed(self):
+        return False
+
+    def is_in_transaction(self):
+        return self.depth > 0
+
+    def transaction(self, **options):
+        return FakeTransaction(self, options)
+
+    async def fetchval(self, query, *args, timeout=None):
+        self.events.append(query)
+        return 1
+
+
+class FakeTransaction:
+    def __init__(self, connection, options):
+        self.connection = connection
+        self.options = options
+
+    async def __aenter__(self):
+        kind = "savepoint" if self.connection.depth else "begin"
+        self.connection.events.append((kind, self.options))
+        self.connection.depth += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.connection.depth -= 1
+        self.connection.events.append("rollback" if exc_type else "commit")
+        return False
+
+
+@pytest.fixture
+def connection(make_pool, install_pools):
+    connection = FakeConnection()
+    install_pools(make_pool(connection))
+    with patch("training.infrastructure.database.settings") as settings:
+        settings.DB_TRANSACTION_MAX_RETRIES = 2
+        settings.DB_TRANSACTION_RETRY_BACKOFF = 0
+        yield connection
+
+
+@pytest.mark.asyncio
+async def test_transaction_commit_and_rollback(connection):
+    """Транзакция фиксируется при успешном выходе и откатывается при ошибке"""
+    db = Database()
+
+    async with db.transaction(isolation="repeatable_read") as tx:
+        assert await tx.fetchval("SELECT 1") == 1
+
+    with pytest.raises(ValueError):
+        async with db.transaction():
+            raise ValueError("ошибка")
+
+    assert connection.events == [
+        ("begin", {"isolation": "repeatable_read", "readonly": False, "deferrable": False}),
+        "SELECT 1",
+        "commit",
+        ("begin", {"isolation": None, "readonly": False, "deferrable": False}),
+        "rollback",
+    ]
+    transactions = db.pool_stats()["transactions"]
+    assert transactions["committed"] == 1
+    assert transactions["rolled_back"] == 1
+
+
+@pytest.mark.asyncio
+async def test_savepoint_rolls_back_only_inner_block(connection):
+    """Ошибка внутри точки сохранения не откатывает всю транзакцию"""
+    db = Database()
+
+    async with db.transaction() as tx:
+        with pytest.raises(ValueError):
+            async with tx.savepoint():
+                raise ValueError("ошибка")
+        await tx.fetchval("SELECT 1")
+
+    assert [event[0] if isinstance(event, tuple) else event for event in connection.events] == [
+        "begin", "savepoint", "rollback", "SELECT 1", "commit"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_run_in_transaction_retries_serialization_failure(connection):
+    """Транзакция повторяется целиком после ошибки сериализации"""
+    db = Database()
+    attempts = []
+
+    async def write(tx):
+        attempts.append(tx)
+        if len(attempts) < 3:
+            raise asyncpg.exceptions.SerializationError("could not serialize access")
+        return "ok"
+
+    assert await db.run_in_transaction(write, isolation="serializable") == "ok"
+    assert len(attempts) == 3
+    assert db.pool_stats()["transactions"]["retries"] == 2
+
+    attempts.clear()
+
+    async def always_fails(tx):
+        attempts.append(tx)
+        raise asyncpg.exceptions.DeadlockDetectedError("deadlock detected")
+
+    with pytest.raises(asyncpg.exceptions.DeadlockDetectedError):
+        await db.run_in_transaction(always_fails)
+    assert len(attempts) == 3
+
+
+@pytest.mark.asyncio
+async def test_nested_transaction_in_request_uses_savepoint(connection, run_in_request):
+    """Вложенная транзакция на соединении запроса становится точкой сохранения и не повторяется"""
+    db = Database()
+    attempts = []
+
+    async def inner(tx):
+        attempts.append(tx)
+        raise asyncpg.exceptions.SerializationError("could not serialize access")
+
+    async def handler():
+        async with db.transaction():
+            with pytest.raises(asyncpg.exceptions.SerializationError):
+                await db.run_in_transaction(inner)
+
+    await run_in_request(handler)
+
+    assert len(attempts) == 1
+    assert [event[0] if isinstance(event, tuple) else event for event in connection.events] == [
+        "begin", "savepoint", "rollback", "commit"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_insert_many_single_statement():
+    """Строки вставляются одним запросом с массивами значений по столбцам в порядке передачи"""
+    connection = MagicMock()
+    connection.fetch = AsyncMock(return_value=[{"id": 1}, {"id": 2}])
+    tx = Transaction(connection)
+
+    rows = await tx.insert_many(
+        "items", ["owner", "value"], ["uuid", "int"], [("a", 1), ("b", 2)],
+        computed={"position": "_ord"}
+    )
+
+    assert rows == [{"id": 1}, {"id": 2}]
+    connection.fetch.assert_awaited_once()
+    query, owners, values = connection.fetch.await_args.args
+    assert "INSERT INTO items (owner, value, position)" in query
+    assert "unnest($1::uuid[], $2::int[]) WITH ORDINALITY AS _rows(owner, value, _ord)" in query
+    assert "ORDER BY _ord" in query
+    assert owners == ["a", "b"]
+    assert values == [1, 2]
+
+    assert await tx.insert_many("items", ["owner"], ["uuid"], []) == []
+    assert connection.fetch.await_count == 1
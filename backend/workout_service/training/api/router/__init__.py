@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, File, UploadFile, Form
 from typing import List, Optional, Dict, Any
 from uuid import UUID, uuid4
 import os
@@ -16,9 +16,13 @@ from training.domain.schemas import (
     Training, TrainingCreate, TrainingUpdate,
     MuscleGroup, MuscleGroupModel, MuscleGroupCreate, MuscleGroupUpdate,
     AppWorkout, AppWorkoutCreate, 
-    UserActivity, WorkoutProgress
+    UserActivity, WorkoutProgress, ExerciseSessionHistory
 )
 from training.domain.utils import verify_token, get_current_user_id, is_admin_or_trainer, is_admin
+from training.infrastructure.backpressure import ADMIN_ROUTE_CLASS, INTERACTIVE_ROUTE_CLASS, WRITE_ROUTE_CLASS
+from training.infrastructure.database import DATABASE_UNAVAILABLE_ERRORS
+from training.infrastructure.pools import ANALYTICS_POOL, REALTIME_POOL
+from training.infrastructure.request_scope import db_route
 from config import settings
 
 # Директория для сохранения GIF-файлов упражнений
@@ -79,6 +83,10 @@ class TrainingRouter:
         """
         Регистрируем все маршруты API
         """
+        # Изменения каталога (группы мышц, упражнения, GIF) выполняют администраторы и тренеры,
+        # а история упражнений читает архив: такие маршруты берут соединения из пула analytics,
+        # чтобы не занимать пул по умолчанию, из которого обслуживаются запросы приложения
+        
         # маршруты для групп мышц
         self.router.add_api_route(
             "/muscle-groups",
@@ -102,6 +110,7 @@ class TrainingRouter:
             "/muscle-groups",
             self.create_muscle_group,
             methods=["POST"],
+            dependencies=[Depends(db_route(ADMIN_ROUTE_CLASS, pool=ANALYTICS_POOL))],
             response_model=MuscleGroupModel,
             summary="Создать новую группу мышц",
             description="Создает новую группу мышц"
@@ -111,6 +120,7 @@ class TrainingRouter:
             "/muscle-groups/{muscle_group_id}",
             self.update_muscle_group,
             methods=["PUT"],
+            dependencies=[Depends(db_route(ADMIN_ROUTE_CLASS, pool=ANALYTICS_POOL))],
             response_model=MuscleGroupModel,
             summary="Обновить группу мышц",
             description="Обновляет существующую группу мышц"
@@ -120,6 +130,7 @@ class TrainingRouter:
             "/muscle-groups/{muscle_group_id}",
             self.delete_muscle_group,
             methods=["DELETE"],
+            dependencies=[Depends(db_route(ADMIN_ROUTE_CLASS, pool=ANALYTICS_POOL))],
             response_model=bool,
             summary="Удалить группу мышц",
             description="Удаляет группу мышц по её ID"
@@ -157,6 +168,7 @@ class TrainingRouter:
             "/exercises",
             self.create_exercise,
             methods=["POST"],
+            dependencies=[Depends(db_route(ADMIN_ROUTE_CLASS, pool=ANALYTICS_POOL))],
             response_model=Exercise,
             summary="Создать новое упражнение",
             description="Создает новое упражнение"
@@ -166,6 +178,7 @@ class TrainingRouter:
             "/exercises/{exercise_id}",
             self.update_exercise,
             methods=["PUT"],
+            dependencies=[Depends(db_route(ADMIN_ROUTE_CLASS, pool=ANALYTICS_POOL))],
             response_model=Exercise,
             summary="Обновить упражнение",
             description="Обновляет существующее упражнение"
@@ -175,6 +188,7 @@ class TrainingRouter:
             "/exercises/{exercise_id}",
             self.delete_exercise,
             methods=["DELETE"],
+            dependencies=[Depends(db_route(ADMIN_ROUTE_CLASS, pool=ANALYTICS_POOL))],
             response_model=bool,
             summary="Удалить упражнение",
             description="Удаляет упражнение по его ID"
@@ -240,6 +254,7 @@ class TrainingRouter:
             "/exercises/{exercise_id}/upload-gif",
             self.upload_exercise_gif,
             methods=["POST"],
+            dependencies=[Depends(db_route(ADMIN_ROUTE_CLASS, pool=ANALYTICS_POOL))],
             response_model=Exercise,
             summary="Загрузить GIF для упражнения",
             description="Загружает GIF-анимацию для упражнения и привязывает ее к нему"
@@ -249,6 +264,7 @@ class TrainingRouter:
             "/exercises/{exercise_id}/delete-gif",
             self.delete_exercise_gif,
             methods=["DELETE"],
+            dependencies=[Depends(db_route(ADMIN_ROUTE_CLASS, pool=ANALYTICS_POOL))],
             response_model=Exercise,
             summary="Удалить GIF упражнения",
             description="Удаляет GIF-анимацию упражнения"
@@ -267,15 +283,17 @@ class TrainingRouter:
             "/app-workouts",
             self.get_app_workouts,
             methods=["GET"],
+            dependencies=[Depends(db_route(INTERACTIVE_ROUTE_CLASS))],
             response_model=List[AppWorkout],
             summary="Получить список тренировок пользователя",
-            description="Возвращает список всех тренировок текущего пользователя с возможностью сортировки и ограничения количества"
+            description="Возвращает список тренировок текущего пользователя с сортировкой (newest, oldest, name, created) и постраничной выборкой по курсору из заголовка X-Next-Cursor"
         )
         
         self.router.add_api_route(
             "/app-workouts/{workout_uuid}",
             self.get_app_workout,
             methods=["GET"],
+            dependencies=[Depends(db_route(INTERACTIVE_ROUTE_CLASS))],
             response_model=AppWorkout,
             summary="Получить тренировку пользователя по ID",
             description="Возвращает тренировку пользователя по её UUID"
@@ -313,6 +331,7 @@ class TrainingRouter:
             "/user-activity/save-progress",
             self.save_workout_progress,
             methods=["POST"],
+            dependencies=[Depends(db_route(WRITE_ROUTE_CLASS, pool=REALTIME_POOL))],
             response_model=dict,
             summary="Сохранить прогресс тренировки и обновить активность пользователя"
         )
@@ -322,19 +341,52 @@ class TrainingRouter:
             "/user-activity",
             self.get_user_activity,
             methods=["GET"],
+            dependencies=[Depends(db_route(INTERACTIVE_ROUTE_CLASS))],
             response_model=List[UserActivity],
             summary="Получить активность пользователя",
             description="Возвращает данные об активности пользователя за указанный период"
         )
         
+        self.router.add_api_route(
+            "/user-activity/exercise-sessions",
+            self.get_exercise_sessions,
+            methods=["GET"],
+            dependencies=[Depends(db_route(INTERACTIVE_ROUTE_CLASS, pool=ANALYTICS_POOL))],
+            response_model=List[ExerciseSessionHistory],
+            summary="Получить историю упражнений пользователя",
+            description="Возвращает сессии упражнений из тренировок, начатых за указанный период, включая перенесенные в архив"
+        )
+        
         self.router.add_api_route(
             "/user-activity",
             self.update_user_activity,
             methods=["POST"],
+            dependencies=[Depends(db_route(WRITE_ROUTE_CLASS, pool=REALTIME_POOL))],
             response_model=UserActivity,
             summary="Обновить активность пользователя",
             description="Обновляет данные об активности пользователя за указанную дату"
         )
+        
+        # маршруты для администрирования
+        self.router.add_api_route(
+            "/admin/db/pool-stats",
+            self.get_db_pool_stats,
+            methods=["GET"],
+            dependencies=[Depends(db_route(ADMIN_ROUTE_CLASS, pool=ANALYTICS_POOL))],
+            response_model=Dict[str, Any],
+            summary="Получить статистику пула соединений с БД",
+            description="Возвращает размер пула, число свободных и занятых соединений, гистограмму ожидания соединения и частоту получения соединений"
+        )
+        
+        self.router.add_api_route(
+            "/admin/db/query-stats",
+            self.get_db_query_stats,
+            methods=["GET"],
+            dependencies=[Depends(db_route(ADMIN_ROUTE_CLASS, pool=ANALYTICS_POOL))],
+            response_model=Dict[str, Any],
+            summary="Получить статистику запросов к БД",
+            description="Возвращает запросы с наибольшим суммарным, средним, p95 или p99 временем выполнения, числом выполнений, строк или ошибок"
+        )
     
     
     # методы для упражнений
@@ -657,6 +709,8 @@ class TrainingRouter:
             print(f"Упражнение успешно обновлено")
             return updated_exercise
             
+        except DATABASE_UNAVAILABLE_ERRORS:
+            raise
         except Exception as e:
             # Если не удалось обновить упражнение, удаляем созданный файл
             print(f"Ошибка при обновлении упражнения: {str(e)}")
@@ -711,6 +765,8 @@ class TrainingRouter:
             
             return updated_exercise
             
+        except DATABASE_UNAVAILABLE_ERRORS:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -733,16 +789,22 @@ class TrainingRouter:
     # Методы для обработки маршрутов app_workouts
     # \/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/
     
-    async def get_app_workouts(self, request: Request, 
+    async def get_app_workouts(self, request: Request, response: Response,
                        order_by: Optional[str] = None, 
-                       limit: Optional[int] = None) -> List[AppWorkout]:
+                       limit: Optional[int] = None,
+                       cursor: Optional[str] = None) -> List[AppWorkout]:
         """
         Получить список тренировок пользователя
         
+        Сортировка и ограничение выполняются в БД. Если после страницы есть еще тренировки,
+        курсор следующей страницы возвращается в заголовке X-Next-Cursor.
+        
         Args:
             request: HTTP запрос
-            order_by: Опциональный параметр сортировки ("newest" или "oldest")
+            response: HTTP ответ (для заголовка X-Next-Cursor)
+            order_by: Опциональный параметр сортировки ("newest", "oldest", "name" или "created")
             limit: Опциональный параметр ограничения количества результатов
+            cursor: Курсор следующей страницы из заголовка X-Next-Cursor предыдущего ответа
         
         Returns:
             Список тренировок пользователя
@@ -752,34 +814,31 @@ class TrainingRouter:
         
         try:
             user_id_int = int(user_id)
-            workouts = await self.training_service.get_app_workouts(user_id_int, is_user_admin)
-            
-            # Если указан параметр сортировки, применяем его
-            if order_by:
-                # Создаем утилитарную функцию для извлечения даты для сортировки
-                def get_sort_datetime(workout):
-                    # Для корректного сравнения дат используем строковое представление,
-                    # если last_session_start не задан, используем минимальную строку
-                    return str(workout.last_session_start) if workout.last_session_start else ""
-                
-                if order_by == "newest":
-                    # Сортируем по убыванию даты последней сессии (сначала новые)
-                    workouts.sort(key=get_sort_datetime, reverse=True)
-                elif order_by == "oldest":
-                    # Сортируем по возрастанию даты последней сессии (сначала старые)
-                    workouts.sort(key=get_sort_datetime)
-            
-            # Если указан лимит, ограничиваем количество результатов
-            if limit and isinstance(limit, int) and limit > 0:
-                workouts = workouts[:limit]
-            
-            return workouts
         except ValueError as e:
             logger.error(f"Ошибка преобразования user_id в int: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Некорректный формат user_id: {str(e)}"
             )
+        
+        # Неположительный лимит, как и раньше, означает отсутствие ограничения
+        if limit is not None and limit <= 0:
+            limit = None
+        
+        try:
+            workouts, next_cursor = await self.training_service.get_app_workouts_page(
+                user_id_int, is_user_admin, order_by, limit, cursor
+            )
+        except ValueError as e:
+            logger.error(f"Некорректные параметры списка тренировок: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return workouts
     
     async def get_app_workout(self, workout_uuid: UUID, request: Request) -> AppWorkout:
         """Получить тренировку пользователя по ID"""
@@ -899,6 +958,8 @@ class TrainingRouter:
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Некорректный формат user_id: {str(e)}"
                 )
+        except DATABASE_UNAVAILABLE_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Ошибка при получении данных активности: {str(e)}")
             raise HTTPException(
@@ -906,6 +967,39 @@ class TrainingRouter:
                 detail=f"Ошибка при получении данных активности: {str(e)}"
             )
     
+    async def get_exercise_sessions(self, request: Request, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[ExerciseSessionHistory]:
+        """
+        Получаем историю упражнений пользователя за указанный период.
+        Если даты не указаны, возвращаем историю за последние 30 дней.
+        """
+        try:
+            user_id = await get_current_user_id(request)
+            
+            if not start_date:
+                start_date = date.today() - timedelta(days=29)
+            if not end_date:
+                end_date = date.today()
+            
+            try:
+                user_id_int = int(user_id)
+            except ValueError as e:
+                logger.error(f"Ошибка преобразования user_id в int: {str(e)}")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Некорректный формат user_id: {str(e)}"
+                )
+            return await self.activity_service.get_exercise_sessions(user_id_int, start_date, end_date)
+        except HTTPException:
+            raise
+        except DATABASE_UNAVAILABLE_ERRORS:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка при получении истории упражнений: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Ошибка при получении истории упражнений: {str(e)}"
+            )
+    
     async def update_user_activity(self, activity_data: UserActivity, request: Request) -> UserActivity:
         """
         Обновляем данные об активности пользователя за указанную дату.
@@ -934,6 +1028,8 @@ class TrainingRouter:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Некорректный формат user_id: {str(e)}"
             )
+        except DATABASE_UNAVAILABLE_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Ошибка при обновлении активности: {str(e)}")
             if isinstance(e, HTTPException):
@@ -1155,6 +1251,8 @@ class TrainingRouter:
                                 last_workout_uuid=workout_uuid
                             )
                             print(f"Увеличен счетчик тренировок для пользователя {current_user_id} за {today}")
+                        except DATABASE_UNAVAILABLE_ERRORS:
+                            raise
                         except Exception as e:
                             print(f"Ошибка при обновлении активности: {str(e)}")
                 else:
@@ -1184,6 +1282,8 @@ class TrainingRouter:
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                 detail=f"Некорректный формат user_id: {str(e)}"
             )
+        except DATABASE_UNAVAILABLE_ERRORS:
+            raise
         except Exception as e:
             # Другие ошибки
             print(f"Ошибка при сохранении прогресса тренировки: {str(e)}")
@@ -1191,3 +1291,41 @@ class TrainingRouter:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Ошибка при сохранении прогресса тренировки: {str(e)}"
             )
+    
+    # методы для администрирования
+    async def get_db_pool_stats(self, request: Request) -> Dict[str, Any]:
+        """Получает статистику пула соединений с БД"""
+        if not is_admin(request):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Только администраторы могут просматривать статистику пула соединений"
+            )
+        return self.admin_service.get_db_pool_stats()
+    
+    async def get_db_query_stats(self, request: Request, limit: int = 20,
+                                 order_by: str = "total") -> Dict[str, Any]:
+        """
+        Получает статистику запросов к БД
+        
+        Args:
+            request: HTTP запрос
+            limit: Число запросов в ответе
+            order_by: Показатель сортировки ("total", "mean", "p95", "p99", "count", "rows" или "errors")
+        """
+        if not is_admin(request):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Только администраторы могут просматривать статистику запросов"
+            )
+        if limit <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Параметр limit должен быть положительным"
+            )
+        try:
+            return self.admin_service.get_db_query_stats(limit, order_by)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
@@ -1,13 +1,238 @@
+import asyncio
 import logging
-from typing import List, Optional, Dict, Any
-from datetime import datetime, date, timedelta
+from typing import List, Optional, Dict, Any, Set, Tuple
+from datetime import datetime, date, time, timedelta, timezone
 from uuid import UUID
-from training.domain.schemas import UserActivity
-from training.infrastructure.database import Database
+from config import settings
+from training.domain.schemas import ExerciseSessionHistory, UserActivity
+from training.infrastructure.archive import ExerciseArchive
+from training.infrastructure.database import Database, Transaction
+from training.infrastructure.hot_statements import hot_statement
+from training.infrastructure.request_scope import run_in_scope
+from training.infrastructure.sharding import use_shard, user_sharded
 from training.domain.db_constants import *
 
 logger = logging.getLogger(__name__)
 
+# Столбцы сводки user_workout_summary в порядке значений запросов сводки
+WORKOUT_SUMMARY_COLUMNS = (
+    "user_id", "workout_uuid",
+    "last_session_uuid", "last_session_start", "last_session_stop", "last_session_status",
+    "last_exercise_session_uuid", "last_exercise_start", "last_exercise_stop", "last_exercise_status",
+    "total_workout_time", "updated_at",
+)
+
+# Строка сводки по сессии тренировки $1: последняя сессия пользователя по той же тренировке,
+# последнее упражнение в ней и суммарное время упражнений. Упражнения сессии выбираются
+# и по ключу секции (времени начала тренировки), поэтому просматривается одна секция
+_WORKOUT_SUMMARY_TARGET = """
+    WITH target AS (
+        SELECT user_id, workout_uuid
+        FROM user_workout_sessions
+        WHERE workout_session_uuid = $1
+        ORDER BY datetime_start
+        LIMIT 1
+    )
+"""
+
+_WORKOUT_SUMMARY_ROW = """
+    SELECT
+        ls.user_id, ls.workout_uuid,
+        ls.workout_session_uuid AS last_session_uuid, ls.datetime_start AS last_session_start,
+        ls.datetime_stop AS last_session_stop, ls.status AS last_session_status,
+        le.exercise_session_uuid AS last_exercise_session_uuid, le.datetime_start AS last_exercise_start,
+        le.datetime_end AS last_exercise_stop, le.status AS last_exercise_status,
+        tt.total_workout_time, NOW() AS updated_at
+    FROM target t
+    CROSS JOIN LATERAL (
+        SELECT user_id, workout_uuid, workout_session_uuid, datetime_start, datetime_stop, status
+        FROM user_workout_sessions
+        WHERE user_id = t.user_id AND workout_uuid = t.workout_uuid
+        ORDER BY datetime_start DESC
+        LIMIT 1
+    ) ls
+    LEFT JOIN LATERAL (
+        SELECT exercise_session_uuid, datetime_start, datetime_end, status
+        FROM user_exercise_sessions
+        WHERE workout_session_uuid = ls.workout_session_uuid AND workout_started_at = ls.datetime_start
+        ORDER BY datetime_start DESC
+        LIMIT 1
+    ) le ON true
+    LEFT JOIN LATERAL (
+        SELECT
+            CASE WHEN COUNT(*) > 0 THEN
+                FLOOR(COALESCE(SUM(EXTRACT(EPOCH FROM (datetime_end - datetime_start))), 0))::int
+            END AS total_workout_time
+        FROM user_exercise_sessions
+        WHERE workout_session_uuid = ls.workout_session_uuid AND workout_started_at = ls.datetime_start
+            AND datetime_end IS NOT NULL
+    ) tt ON true
+"""
+
+_WORKOUT_SUMMARY_ON_CONFLICT = """
+    ON CONFLICT (user_id, workout_uuid) DO UPDATE SET
+        last_session_uuid = EXCLUDED.last_session_uuid,
+        last_session_start = EXCLUDED.last_session_start,
+        last_session_stop = EXCLUDED.last_session_stop,
+        last_session_status = EXCLUDED.last_session_status,
+        last_exercise_session_uuid = EXCLUDED.last_exercise_session_uuid,
+        last_exercise_start = EXCLUDED.last_exercise_start,
+        last_exercise_stop = EXCLUDED.last_exercise_stop,
+        last_exercise_status = EXCLUDED.last_exercise_status,
+        total_workout_time = EXCLUDED.total_workout_time,
+        updated_at = EXCLUDED.updated_at
+"""
+
+# Пересчет сводки user_workout_summary по сессии тренировки одним запросом
+REFRESH_WORKOUT_SUMMARY_QUERY = hot_statement(
+    f"{_WORKOUT_SUMMARY_TARGET}    INSERT INTO user_workout_summary ({', '.join(WORKOUT_SUMMARY_COLUMNS)})"
+    f"{_WORKOUT_SUMMARY_ROW}{_WORKOUT_SUMMARY_ON_CONFLICT}"
+)
+
+# При шардировании сессии хранятся на шарде пользователя, а сводка - на основном сервере
+# рядом с каталогом тренировок: строка сводки вычисляется на шарде и записывается отдельно.
+# Строка, вычисленная раньше, не перезаписывает более новую. Строки сравниваются по данным самой
+# сессии (начало и UUID сессии, ее окончание, начало и окончание последнего упражнения),
+# а не по updated_at: часы шардов и основного сервера не согласованы
+WORKOUT_SUMMARY_QUERY = hot_statement(_WORKOUT_SUMMARY_TARGET + _WORKOUT_SUMMARY_ROW)
+
+
+def _workout_summary_progress(row: str) -> str:
+    return (
+        f"({row}.last_session_start, {row}.last_session_uuid, "
+        f"COALESCE({row}.last_session_stop, '-infinity'), "
+        f"COALESCE({row}.last_exercise_start, '-infinity'), "
+        f"COALESCE({row}.last_exercise_stop, '-infinity'))"
+    )
+
+
+STORE_WORKOUT_SUMMARY_QUERY = hot_statement(f"""
+    INSERT INTO user_workout_summary ({', '.join(WORKOUT_SUMMARY_COLUMNS)})
+    VALUES ({', '.join(f'${index}' for index in range(1, len(WORKOUT_SUMMARY_COLUMNS) + 1))})
+    {_WORKOUT_SUMMARY_ON_CONFLICT.strip()}
+    WHERE {_workout_summary_progress('user_workout_summary')} <= {_workout_summary_progress('EXCLUDED')}
+""")
+
+# Ключ секции сессии упражнения - время начала ее сессии тренировки (параметр - номер параметра
+# с UUID сессии тренировки); по нему сессия упражнения ищется в одной секции
+def _workout_started_at(param: int) -> str:
+    return (
+        f"(SELECT datetime_start FROM user_workout_sessions WHERE workout_session_uuid = ${param} "
+        f"ORDER BY datetime_start LIMIT 1)"
+    )
+
+
+# Первичный ключ сессии тренировки включает ключ секции (datetime_start), поэтому UUID сессии
+# уникален только за счет записи: сохранения одной сессии выполняются по очереди под блокировкой
+# транзакции по UUID, а существующая сессия обновляется по своему времени начала
+WORKOUT_SESSION_LOCK_QUERY = "SELECT pg_advisory_xact_lock(hashtextextended($1::text, 0))"
+
+# Создание или обновление сессии тренировки одним запросом: новая сессия создается со статусом
+# $6 (по умолчанию 'in_process'), у существующей заменяются заданные статус и время окончания
+WORKOUT_SESSION_UPSERT_QUERY = hot_statement(f"""
+    INSERT INTO user_workout_sessions AS s (
+        workout_session_uuid, user_id, workout_uuid, datetime_start, datetime_stop, status, created_at, updated_at
+    )
+    SELECT $1, $2, $3, COALESCE({_workout_started_at(1)}, $4::timestamptz), $5::timestamptz,
+           COALESCE($6::varchar, 'in_process'), $7::timestamp, $7::timestamp
+    ON CONFLICT (workout_session_uuid, datetime_start) DO UPDATE SET
+        status = COALESCE($6::varchar, s.status),
+        datetime_stop = COALESCE(EXCLUDED.datetime_stop, s.datetime_stop),
+        updated_at = EXCLUDED.updated_at
+    RETURNING *, xmax = 0 AS inserted
+""")
+
+
+# Сохранение прогресса упражнения (два раза на каждое упражнение тренировки) одним запросом.
+# Сессия упражнения - переданная с фронтенда ($1) или, если UUID не передан, последняя сессия
+# упражнения в тренировке; после завершенной сессии новое начало упражнения создает новую сессию.
+# UUID новой сессии без UUID с фронтенда вычисляется из тренировки, упражнения и предыдущей сессии,
+# поэтому одновременные события одной сессии сходятся на первичном ключе, а не создают дубликаты.
+# При конфликте заданные поля заменяют сохраненные, незаданные (NULL) оставляют их без изменений;
+# updated_at обновляется всегда, даже если других изменений нет
+EXERCISE_SESSION_UPSERT_QUERY = hot_statement(f"""
+    WITH latest AS (
+        SELECT exercise_session_uuid, status
+        FROM user_exercise_sessions
+        WHERE $1::uuid IS NULL AND user_id = $2 AND workout_session_uuid = $3 AND exercise_uuid = $4
+            AND workout_started_at = {_workout_started_at(3)}
+        ORDER BY created_at DESC
+        LIMIT 1
+    )
+    INSERT INTO user_exercise_sessions AS s (
+        exercise_session_uuid, user_id, workout_session_uuid, workout_started_at, exercise_uuid, status,
+        datetime_start, datetime_end, duration, user_duration, count, user_count, created_at, updated_at
+    )
+    SELECT
+        COALESCE($1::uuid, CASE
+            WHEN latest.exercise_session_uuid IS NULL OR ($5::varchar = 'start' AND latest.status = 'ended')
+                THEN md5($3::uuid::text || $4::uuid::text || COALESCE(latest.exercise_session_uuid::text, ''))::uuid
+            ELSE latest.exercise_session_uuid
+        END),
+        $2, $3, {_workout_started_at(3)}, $4, $5::varchar, $6::timestamptz, $7::timestamptz,
+        $8::int, $9::int, $10::int, $11::int, NOW(), NOW()
+    FROM (SELECT 1) AS one
+    LEFT JOIN latest ON TRUE
+    ON CONFLICT (exercise_session_uuid, workout_started_at) DO UPDATE SET
+        status = EXCLUDED.status,
+        datetime_start = COALESCE(EXCLUDED.datetime_start, s.datetime_start),
+        datetime_end = COALESCE(EXCLUDED.datetime_end, s.datetime_end),
+        duration = COALESCE(EXCLUDED.duration, s.duration),
+        user_duration = COALESCE(EXCLUDED.user_duration, s.user_duration),
+        count = COALESCE(EXCLUDED.count, s.count),
+        user_count = COALESCE(EXCLUDED.user_count, s.user_count),
+        updated_at = NOW()
+    RETURNING exercise_session_uuid, xmax = 0 AS inserted
+""")
+
+# Активность и вес пользователя за период (календарь активности)
+USER_ACTIVITIES_QUERY = hot_statement("""
+    SELECT * FROM user_activities
+    WHERE user_id = $1 AND record_date BETWEEN $2 AND $3
+    ORDER BY record_date
+""")
+
+USER_WEIGHTS_QUERY = hot_statement("""
+    SELECT * FROM user_weights
+    WHERE user_id = $1 AND record_date BETWEEN $2 AND $3
+    ORDER BY record_date
+""")
+
+# Активность и вес пользователя за дату одним запросом: при каждом завершении тренировки
+# счетчик увеличивается ($5 = true), поэтому одновременные завершения в один день сходятся
+# на первичном ключе user_activities, а не вставляют строку параллельно. Вес (если задан, $6)
+# записывается в том же запросе
+USER_ACTIVITY_UPSERT_QUERY = hot_statement("""
+    WITH stored_activity AS (
+        INSERT INTO user_activities AS a (user_id, record_date, workout_count, last_workout_uuid)
+        VALUES ($1, $2, $3, $4)
+        ON CONFLICT (user_id, record_date) DO UPDATE SET
+            workout_count = CASE
+                WHEN $5::boolean THEN COALESCE(a.workout_count, 0) + EXCLUDED.workout_count
+                ELSE EXCLUDED.workout_count
+            END,
+            last_workout_uuid = COALESCE(EXCLUDED.last_workout_uuid, a.last_workout_uuid)
+        RETURNING record_date, workout_count, last_workout_uuid
+    ),
+    stored_weight AS (
+        INSERT INTO user_weights (user_id, record_date, weight)
+        SELECT $1, $2, $6::numeric
+        WHERE $6::numeric IS NOT NULL
+        ON CONFLICT (user_id, record_date) DO UPDATE SET weight = EXCLUDED.weight
+        RETURNING weight
+    )
+    SELECT record_date, workout_count, last_workout_uuid, (SELECT weight FROM stored_weight) AS weight
+    FROM stored_activity
+""")
+
+# Сессии упражнений пользователя, оставшиеся в таблице (старые переносятся в архив)
+EXERCISE_SESSIONS_QUERY = """
+    SELECT exercise_session_uuid, workout_session_uuid, workout_started_at, exercise_uuid, status,
+           datetime_start, datetime_end, duration, user_duration, count, user_count
+    FROM user_exercise_sessions
+    WHERE user_id = $1 AND workout_started_at >= $2 AND workout_started_at < $3
+"""
+
 class ActivityService:
     """
     Сервис для работы с данными активности пользователей
@@ -15,7 +240,11 @@ class ActivityService:
     
     def __init__(self):
         self.db_pool = Database()
+        self.archive = ExerciseArchive(settings.EXERCISE_ARCHIVE_DIR)
+        # Фоновые повторы записи сводки на основной сервер (см. _store_workout_summary)
+        self._summary_retries: Set[asyncio.Task] = set()
     
+    @user_sharded
     async def get_user_activity(self, user_id: int, start_date: date, end_date: date) -> List[UserActivity]:
         """
         Получает данные активности пользователя за указанный период
@@ -29,22 +258,10 @@ class ActivityService:
             Список данных активности
         """
         try:
-            # Запрос для получения активности (тренировок)
-            activities_query = """
-                SELECT * FROM user_activities
-                WHERE user_id = $1 AND record_date BETWEEN $2 AND $3
-                ORDER BY record_date
-            """
-            
-            # Запрос для получения веса
-            weights_query = """
-                SELECT * FROM user_weights
-                WHERE user_id = $1 AND record_date BETWEEN $2 AND $3
-                ORDER BY record_date
-            """
-            
-            activity_rows = await self.db_pool.fetch(activities_query, user_id, start_date, end_date)
-            weight_rows = await self.db_pool.fetch(weights_query, user_id, start_date, end_date)
+            activity_rows, weight_rows = await self.db_pool.gather(
+                self.db_pool.fetch(USER_ACTIVITIES_QUERY, user_id, start_date, end_date),
+                self.db_pool.fetch(USER_WEIGHTS_QUERY, user_id, start_date, end_date)
+            )
             
             # Создаём список дат в запрошенном интервале
             all_dates = [(start_date + timedelta(days=i)) for i in range((end_date - start_date).days + 1)]
@@ -81,9 +298,48 @@ class ActivityService:
             logger.error(f"Ошибка при получении данных активности пользователя: {str(e)}")
             raise
     
+    @user_sharded
+    async def get_exercise_sessions(self, user_id: int, start_date: date, end_date: date) -> List[ExerciseSessionHistory]:
+        """
+        Получает сессии упражнений пользователя из тренировок, начатых за указанный период (даты в UTC).
+        Старые сессии читаются из архива; если сессия есть и в таблице, и в архиве
+        (перенос прервался до удаления строк), используется строка таблицы.
+        
+        Args:
+            user_id: ID пользователя
+            start_date: Начальная дата периода
+            end_date: Конечная дата периода
+            
+        Returns:
+            Список сессий упражнений по времени начала тренировки
+        """
+        try:
+            start = datetime.combine(start_date, time.min, tzinfo=timezone.utc)
+            end = datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=timezone.utc)
+            archived_rows, live_rows = await asyncio.gather(
+                asyncio.to_thread(self.archive.read_range, user_id, start, end),
+                self.db_pool.fetch(EXERCISE_SESSIONS_QUERY, user_id, start, end)
+            )
+            
+            sessions = {row['exercise_session_uuid']: ExerciseSessionHistory(**row, archived=True) for row in archived_rows}
+            sessions.update(
+                (row['exercise_session_uuid'], ExerciseSessionHistory(**dict(row))) for row in live_rows
+            )
+            
+            return sorted(
+                sessions.values(),
+                key=lambda session: (session.workout_started_at, session.datetime_start or session.workout_started_at)
+            )
+            
+        except Exception as e:
+            logger.error(f"Ошибка при получении истории упражнений пользователя: {str(e)}")
+            raise
+    
+    @user_sharded
     async def update_user_activity(self, user_id: int, record_date: date, workout_count: int, weight: Optional[float] = None, increment: bool = False, last_workout_uuid: Optional[UUID] = None) -> UserActivity:
         """
         Обновляет или создаёт запись активности пользователя за конкретную дату
+        (и вес, если он указан) одним запросом USER_ACTIVITY_UPSERT_QUERY
         
         Args:
             user_id: ID пользователя
@@ -97,118 +353,16 @@ class ActivityService:
             Обновленная запись активности
         """
         try:
-            check_activity_query = """
-                SELECT * FROM user_activities
-                WHERE user_id = $1 AND record_date = $2
-            """
-            existing_activity = await self.db_pool.fetchrow(check_activity_query, user_id, record_date)
-            
-            # Обновляем или вставляем данные активности
-            activity_result = None
-            if existing_activity:
-                # Обновляем существующую запись
-                if increment:
-                    # Если есть UUID последней тренировки, обновляем его
-                    if last_workout_uuid:
-                        update_activity_query = """
-                            UPDATE user_activities
-                            SET workout_count = workout_count + $3, last_workout_uuid = $4
-                            WHERE user_id = $1 AND record_date = $2
-                            RETURNING *
-                        """
-                        activity_result = await self.db_pool.fetchrow(update_activity_query, user_id, record_date, workout_count, last_workout_uuid)
-                    else:
-                        update_activity_query = """
-                            UPDATE user_activities
-                            SET workout_count = workout_count + $3
-                            WHERE user_id = $1 AND record_date = $2
-                            RETURNING *
-                        """
-                        activity_result = await self.db_pool.fetchrow(update_activity_query, user_id, record_date, workout_count)
-                else:
-                    # Если есть UUID последней тренировки, обновляем его
-                    if last_workout_uuid:
-                        update_activity_query = """
-                            UPDATE user_activities
-                            SET workout_count = $3, last_workout_uuid = $4
-                            WHERE user_id = $1 AND record_date = $2
-                            RETURNING *
-                        """
-                        activity_result = await self.db_pool.fetchrow(update_activity_query, user_id, record_date, workout_count, last_workout_uuid)
-                    else:
-                        update_activity_query = """
-                            UPDATE user_activities
-                            SET workout_count = $3
-                            WHERE user_id = $1 AND record_date = $2
-                            RETURNING *
-                        """
-                        activity_result = await self.db_pool.fetchrow(update_activity_query, user_id, record_date, workout_count)
-            else:
-                # Создаем новую запись
-                if last_workout_uuid:
-                    insert_activity_query = """
-                        INSERT INTO user_activities (user_id, record_date, workout_count, last_workout_uuid)
-                        VALUES ($1, $2, $3, $4)
-                        RETURNING *
-                    """
-                    activity_result = await self.db_pool.fetchrow(insert_activity_query, user_id, record_date, workout_count, last_workout_uuid)
-                else:
-                    insert_activity_query = """
-                        INSERT INTO user_activities (user_id, record_date, workout_count)
-                        VALUES ($1, $2, $3)
-                        RETURNING *
-                    """
-                    activity_result = await self.db_pool.fetchrow(insert_activity_query, user_id, record_date, workout_count)
-            
-            # Если указан вес, обновляем его
-            weight_result = None
-            if weight is not None:
-                # Проверяем, существует ли запись веса
-                check_weight_query = """
-                    SELECT * FROM user_weights
-                    WHERE user_id = $1 AND record_date = $2
-                """
-                existing_weight = await self.db_pool.fetchrow(check_weight_query, user_id, record_date)
-                
-                if existing_weight:
-                    # Обновляем существующую запись
-                    update_weight_query = """
-                        UPDATE user_weights
-                        SET weight = $3
-                        WHERE user_id = $1 AND record_date = $2
-                        RETURNING *
-                    """
-                    weight_result = await self.db_pool.fetchrow(update_weight_query, user_id, record_date, weight)
-                else:
-                    insert_weight_query = """
-                        INSERT INTO user_weights (user_id, record_date, weight)
-                        VALUES ($1, $2, $3)
-                        RETURNING *
-                    """
-                    weight_result = await self.db_pool.fetchrow(insert_weight_query, user_id, record_date, weight)
-            
-            # Получаем текущий вес после обновления
-            current_weight = None
-            if weight_result:
-                current_weight = float(weight_result['weight'])
-            elif weight is not None:
-                current_weight = weight
+            row = await self.db_pool.fetchrow(
+                USER_ACTIVITY_UPSERT_QUERY, user_id, record_date, workout_count, last_workout_uuid, increment, weight
+            )
             
-            if activity_result:
-                return UserActivity(
-                    record_date=activity_result['record_date'],
-                    workout_count=activity_result['workout_count'],
-                    weight=current_weight,
-                    last_workout_uuid=activity_result.get('last_workout_uuid')
-                )
-            else:
-                # На случай, если возникла ошибка и запись не была создана/ обновлена
-                return UserActivity(
-                    record_date=record_date,
-                    workout_count=workout_count,
-                    weight=current_weight,
-                    last_workout_uuid=last_workout_uuid
-                )
+            return UserActivity(
+                record_date=row['record_date'],
+                workout_count=row['workout_count'],
+                weight=float(row['weight']) if row['weight'] is not None else None,
+                last_workout_uuid=row['last_workout_uuid']
+            )
                 
         except Exception as e:
             logger.error(f"Ошибка при обновлении активности пользователя: {str(e)}")
@@ -262,6 +416,7 @@ class ActivityService:
             logger.error(f"Ошибка при сохранении прогресса тренировки: {str(e)}")
             raise
     
+    @user_sharded
     async def save_workout_session(self, user_id: int, workout_session_uuid: UUID, workout_uuid: Optional[UUID] = None, 
                                 status: str = 'in_process', datetime_start: Optional[datetime] = None,
                                 datetime_stop: Optional[datetime] = None) -> Dict[str, Any]:
@@ -280,104 +435,73 @@ class ActivityService:
             Словарь с информацией о результате операции
         """
         try:
-            # Проверяем существует ли запись с таким workout_session_uuid
-            check_query = """
-                SELECT * FROM user_workout_sessions
-                WHERE workout_session_uuid = $1
-            """
-            existing_session = await self.db_pool.fetchrow(check_query, workout_session_uuid)
-            
-            if existing_session:
-                # Обновляем существующую запись
-                update_parts = []
-                params = []
-                
-                # Начинаем с добавления UUID для WHERE условия
-                params.append(workout_session_uuid)
-                
-                # Формируем части запроса и массив параметров
-                if status:
-                    update_parts.append(f"status = ${len(params) + 1}")
-                    params.append(status)
-                
-                if datetime_stop:
-                    update_parts.append(f"datetime_stop = ${len(params) + 1}")
-                    params.append(datetime_stop)
-                
-                # Добавляем обновление поля updated_at
-                update_parts.append(f"updated_at = ${len(params) + 1}")
-                params.append(datetime.now())
-                
-                # Проверяем, есть ли что обновлять
-                if update_parts:
-                    update_query = f"""
-                        UPDATE user_workout_sessions
-                        SET {', '.join(update_parts)}
-                        WHERE workout_session_uuid = $1
-                        RETURNING *
-                    """
-                    result = await self.db_pool.fetchrow(update_query, *params)
-                    logger.info(f"Обновлена сессия тренировки {workout_session_uuid}")
-                    
-                    # Конвертируем результат в словарь
-                    session_data = {}
-                    if result:
-                        for key in result.keys():
-                            session_data[key] = result[key]
-                    
-                    return {
-                        "success": True,
-                        "message": "Сессия тренировки обновлена",
-                        "session_data": session_data
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "message": "Нет данных для обновления"
-                    }
-            else:
-                # Создаем новую запись
-                insert_query = """
-                    INSERT INTO user_workout_sessions (
-                        workout_session_uuid, user_id, workout_uuid, 
-                        datetime_start, datetime_stop, status, created_at, updated_at
-                    )
-                    VALUES ($1, $2, $3, $4, $5, $6, $7, $7)
-                    RETURNING *
-                """
-                
-                # Используем текущее время для created_at и updated_at
-                current_time = datetime.now()
-                
-                result = await self.db_pool.fetchrow(
-                    insert_query, 
-                    workout_session_uuid, 
-                    user_id, 
-                    workout_uuid, 
-                    datetime_start, 
-                    datetime_stop, 
-                    status,
-                    current_time
+            # Сессия и сводка по тренировке обновляются в одной транзакции,
+            # которая повторяется при взаимной блокировке с параллельным сохранением
+            async def write(tx: Transaction) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+                result = await self._write_workout_session(
+                    tx, user_id, workout_session_uuid, workout_uuid,
+                    status, datetime_start, datetime_stop
                 )
-                
-                logger.info(f"Создана новая сессия тренировки {workout_session_uuid}")
-                
-                # Конвертируем результат в словарь
-                session_data = {}
-                if result:
-                    for key in result.keys():
-                        session_data[key] = result[key]
-                
-                return {
-                    "success": True,
-                    "message": "Новая сессия тренировки создана",
-                    "session_data": session_data
-                }
+                return result, await self._refresh_workout_summary(tx, workout_session_uuid)
+            
+            result, summary = await self.db_pool.run_in_transaction(write)
+            await self._store_workout_summary(summary)
+            return result
         
         except Exception as e:
             logger.error(f"Ошибка при сохранении сессии тренировки: {str(e)}")
             raise
     
+    async def _write_workout_session(self, tx: Transaction, user_id: int, workout_session_uuid: UUID,
+                                     workout_uuid: Optional[UUID], status: str,
+                                     datetime_start: Optional[datetime],
+                                     datetime_stop: Optional[datetime]) -> Dict[str, Any]:
+        """
+        Создает или обновляет запись в таблице user_workout_sessions в переданной транзакции
+        
+        Args:
+            tx: Открытая транзакция
+            user_id: ID пользователя
+            workout_session_uuid: UUID сессии тренировки
+            workout_uuid: UUID тренировки
+            status: Статус тренировки
+            datetime_start: Время начала тренировки
+            datetime_stop: Время окончания тренировки
+            
+        Returns:
+            Словарь с информацией о результате операции
+        """
+        # Сохранения одной сессии выполняются по очереди: после блокировки запрос записи видит
+        # сессию, созданную параллельным сохранением, и обновляет ее, а не создает вторую строку
+        # с тем же UUID и другим временем начала
+        await tx.fetchrow(WORKOUT_SESSION_LOCK_QUERY, workout_session_uuid)
+        result = await tx.fetchrow(
+            WORKOUT_SESSION_UPSERT_QUERY,
+            workout_session_uuid,
+            user_id,
+            workout_uuid,
+            datetime_start,
+            datetime_stop,
+            status or None,
+            datetime.now()
+        )
+        
+        # Конвертируем результат в словарь
+        session_data = dict(result)
+        if session_data.pop("inserted"):
+            logger.info(f"Создана новая сессия тренировки {workout_session_uuid}")
+            message = "Новая сессия тренировки создана"
+        else:
+            logger.info(f"Обновлена сессия тренировки {workout_session_uuid}")
+            message = "Сессия тренировки обновлена"
+        
+        return {
+            "success": True,
+            "message": message,
+            "session_data": session_data
+        }
+    
+    @user_sharded
     async def save_exercise_session(
         self,
         user_id: int,
@@ -412,312 +536,170 @@ class ActivityService:
             Словарь с результатом операции
         """
         try:
-            logger.info(
-                f"Сохранение/обновление сессии упражнения: user_id={user_id}, "
-                f"workout_session_uuid={workout_session_uuid}, exercise_uuid={exercise_uuid}, "
-                f"status={status}, datetime_start={datetime_start}, datetime_end={datetime_end}, "
-                f"exercise_session_uuid={exercise_session_uuid}, duration={duration}, "
-                f"user_duration={user_duration}, count={count}, user_count={user_count}"
-            )
-            
-            # Если передан exercise_session_uuid, проверяем его существование
-            if exercise_session_uuid:
-                # Ищем сессию упражнения по переданному UUID
-                check_by_uuid_query = """
-                    SELECT exercise_session_uuid, status, datetime_start, datetime_end 
-                    FROM user_exercise_sessions 
-                    WHERE exercise_session_uuid = $1
-                    LIMIT 1
-                """
-                
-                logger.debug(f"Проверка существования сессии упражнения по UUID: {check_by_uuid_query}")
-                
-                existing_session = await self.db_pool.fetchrow(check_by_uuid_query, exercise_session_uuid)
-                
-                # Если сессия найдена по UUID, обновляем её
-                if existing_session:
-                    logger.info(f"Найдена существующая сессия упражнения по UUID: {existing_session}")
-                    
-                    # Обновляем существующую запись
-                    update_fields = []
-                    update_params = []
-                    param_index = 1
-                    
-                    # Формируем список полей для обновления
-                    if status != existing_session['status']:
-                        update_fields.append(f"status = ${param_index}")
-                        update_params.append(status)
-                        param_index += 1
-                    
-                    if status == 'start' and datetime_start:
-                        update_fields.append(f"datetime_start = ${param_index}")
-                        update_params.append(datetime_start)
-                        param_index += 1
-                    
-                    if status == 'ended' and datetime_end:
-                        update_fields.append(f"datetime_end = ${param_index}")
-                        update_params.append(datetime_end)
-                        param_index += 1
-                    
-                    # Добавляем поля статистики при завершении упражнения
-                    if status == 'ended':
-                        if duration is not None:
-                            update_fields.append(f"duration = ${param_index}")
-                            update_params.append(duration)
-                            param_index += 1
-                        
-                        if user_duration is not None:
-                            update_fields.append(f"user_duration = ${param_index}")
-                            update_params.append(user_duration)
-                            param_index += 1
-                        
-                        if count is not None:
-                            update_fields.append(f"count = ${param_index}")
-                            update_params.append(count)
-                            param_index += 1
-                        
-                        if user_count is not None:
-                            update_fields.append(f"user_count = ${param_index}")
-                            update_params.append(user_count)
-                            param_index += 1
-                    
-                    update_fields.append(f"updated_at = NOW()")
-                    
-                    if update_fields:
-                        update_query = f"""
-                            UPDATE user_exercise_sessions 
-                            SET {', '.join(update_fields)} 
-                            WHERE exercise_session_uuid = ${param_index}
-                            RETURNING exercise_session_uuid
-                        """
-                        
-                        update_params.append(exercise_session_uuid)
-                        
-                        logger.debug(f"Обновление сессии упражнения по UUID: {update_query}")
-                        updated_session = await self.db_pool.fetchrow(update_query, *update_params)
-                        
-                        result = {
-                            "operation": "updated",
-                            "session_id": exercise_session_uuid,
-                            "status": status,
-                            "message": "Обновлена существующая сессия упражнения"
-                        }
-                    else:
-                        result = {
-                            "operation": "no_change",
-                            "session_id": exercise_session_uuid,
-                            "status": existing_session['status'],
-                            "message": "Нет изменений для сессии упражнения"
-                        }
-                    
-                    # Добавляем дополнительную информацию в результат
-                    result.update({
-                        "user_id": user_id,
-                        "workout_session_uuid": str(workout_session_uuid),
-                        "exercise_uuid": str(exercise_uuid),
-                        "exercise_session_uuid": str(exercise_session_uuid),
-                        "datetime_start": datetime_start.isoformat() if datetime_start else None,
-                        "datetime_end": datetime_end.isoformat() if datetime_end else None,
-                        "duration": duration,
-                        "user_duration": user_duration,
-                        "count": count,
-                        "user_count": user_count
-                    })
-                    
-                    logger.info(f"Успешно обновлена сессия упражнения по UUID: {result}")
-                    return result
-            
-            # Если UUID не передан или сессия не найдена по UUID,
-            # проверяем, существует ли уже сессия по другим параметрам
-            check_query = """
-                SELECT exercise_session_uuid, status, datetime_start, datetime_end 
-                FROM user_exercise_sessions 
-                WHERE user_id = $1 AND workout_session_uuid = $2 AND exercise_uuid = $3
-                ORDER BY created_at DESC
-                LIMIT 1
-            """
-            
-            logger.debug(f"Проверка существования сессии упражнения: {check_query}")
-            
-            existing_session = await self.db_pool.fetchrow(check_query, user_id, workout_session_uuid, exercise_uuid)
-            
-            result = {}
-            
-            # Если сессия существует и не передан UUID с фронтенда
-            if existing_session and not exercise_session_uuid:
-                # Сессия существует, обновляем её
-                logger.info(f"Найдена существующая сессия упражнения: {existing_session}")
-                
-                session_id = existing_session['exercise_session_uuid']
-                existing_status = existing_session['status']
-                
-                # Для случаев, когда приходит:
-                # 1. 'start' после 'start' - обновляем время начала
-                # 2. 'ended' после 'start' - обновляем статус и добавляем время окончания
-                # 3. 'start' после 'ended' - создаем новую запись (это будет новая сессия упражнения)
-                # 4. 'ended' после 'ended' - обновляем время окончания
-                
-                if status == 'start' and existing_status == 'ended':
-                    # Создаем новую запись с переданным UUID или генерируем новый
-                    insert_query = """
-                        INSERT INTO user_exercise_sessions 
-                        (exercise_session_uuid, user_id, workout_session_uuid, exercise_uuid, status, datetime_start, datetime_end, created_at, updated_at)
-                        VALUES ($1, $2, $3, $4, $5, $6, $7, NOW(), NOW())
-                        RETURNING exercise_session_uuid
-                    """
-                    
-                    # Если не передан UUID, используем сгенерированный системой
-                    session_uuid_to_use = exercise_session_uuid if exercise_session_uuid else None
-                    
-                    logger.debug(f"Создание новой сессии упражнения: {insert_query}")
-                    new_session = await self.db_pool.fetchrow(
-                        insert_query, 
-                        session_uuid_to_use,
-                        user_id, 
-                        workout_session_uuid, 
-                        exercise_uuid,
-                        status,
-                        datetime_start,
-                        None
-                    )
-                    
-                    result = {
-                        "operation": "created",
-                        "session_id": new_session['exercise_session_uuid'] if new_session else None,
-                        "status": status,
-                        "message": "Создана новая сессия упражнения"
-                    }
-                else:
-                    # Обновляем существующую запись
-                    update_fields = []
-                    update_params = []
-                    param_index = 1
-                    
-                    # Формируем список полей для обновления
-                    if status != existing_status:
-                        update_fields.append(f"status = ${param_index}")
-                        update_params.append(status)
-                        param_index += 1
-                    
-                    if status == 'start' and datetime_start:
-                        update_fields.append(f"datetime_start = ${param_index}")
-                        update_params.append(datetime_start)
-                        param_index += 1
-                    
-                    if status == 'ended' and datetime_end:
-                        update_fields.append(f"datetime_end = ${param_index}")
-                        update_params.append(datetime_end)
-                        param_index += 1
-                    
-                    # Добавляем поля статистики при завершении упражнения
-                    if status == 'ended':
-                        if duration is not None:
-                            update_fields.append(f"duration = ${param_index}")
-                            update_params.append(duration)
-                            param_index += 1
-                        
-                        if user_duration is not None:
-                            update_fields.append(f"user_duration = ${param_index}")
-                            update_params.append(user_duration)
-                            param_index += 1
-                        
-                        if count is not None:
-                            update_fields.append(f"count = ${param_index}")
-                            update_params.append(count)
-                            param_index += 1
-                        
-                        if user_count is not None:
-                            update_fields.append(f"user_count = ${param_index}")
-                            update_params.append(user_count)
-                            param_index += 1
-                    
-                    update_fields.append(f"updated_at = NOW()")
-                    
-                    if update_fields:
-                        update_query = f"""
-                            UPDATE user_exercise_sessions 
-                            SET {', '.join(update_fields)} 
-                            WHERE exercise_session_uuid = ${param_index}
-                            RETURNING exercise_session_uuid
-                        """
-                        
-                        update_params.append(session_id)
-                        
-                        logger.debug(f"Обновление сессии упражнения: {update_query}")
-                        updated_session = await self.db_pool.fetchrow(update_query, *update_params)
-                        
-                        result = {
-                            "operation": "updated",
-                            "session_id": session_id,
-                            "status": status,
-                            "message": "Обновлена существующая сессия упражнения"
-                        }
-                    else:
-                        result = {
-                            "operation": "no_change",
-                            "session_id": session_id,
-                            "status": existing_status,
-                            "message": "Нет изменений для сессии упражнения"
-                        }
-            else:
-                # Сессия не существует или нужно создать новую с указанным UUID, создаем новую запись
-                insert_query = """
-                    INSERT INTO user_exercise_sessions 
-                    (exercise_session_uuid, user_id, workout_session_uuid, exercise_uuid, status, datetime_start, datetime_end, 
-                    duration, user_duration, count, user_count, created_at, updated_at)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, NOW(), NOW())
-                    RETURNING exercise_session_uuid
-                """
-                
-                # Если не передан UUID, используем сгенерированный системой
-                session_uuid_to_use = exercise_session_uuid if exercise_session_uuid else None
-                
-                # Устанавливаем значения в зависимости от статуса
-                start_time = datetime_start if status == 'start' else None
-                end_time = datetime_end if status == 'ended' else None
-                
-                # Добавляем значения для статистики только при завершении
-                dur = duration if status == 'ended' else None
-                user_dur = user_duration if status == 'ended' else None
-                cnt = count if status == 'ended' else None
-                user_cnt = user_count if status == 'ended' else None
-                
-                logger.debug(f"Создание новой сессии упражнения: {insert_query}")
-                new_session = await self.db_pool.fetchrow(
-                    insert_query, 
-                    session_uuid_to_use,
-                    user_id, 
-                    workout_session_uuid, 
-                    exercise_uuid,
-                    status,
-                    start_time,
-                    end_time,
-                    dur,
-                    user_dur,
-                    cnt,
-                    user_cnt
+            # Сессия упражнения и сводка по тренировке обновляются в одной транзакции,
+            # которая повторяется при взаимной блокировке с параллельным сохранением
+            async def write(tx: Transaction) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+                result = await self._write_exercise_session(
+                    tx, user_id, workout_session_uuid, exercise_uuid, status,
+                    datetime_start, datetime_end, exercise_session_uuid,
+                    duration, user_duration, count, user_count
                 )
-                
-                result = {
-                    "operation": "created",
-                    "session_id": new_session['exercise_session_uuid'] if new_session else None,
-                    "status": status,
-                    "message": "Создана новая сессия упражнения"
-                }
-            
-            # Добавляем дополнительную информацию в результат
-            result.update({
-                "user_id": user_id,
-                "workout_session_uuid": str(workout_session_uuid),
-                "exercise_uuid": str(exercise_uuid),
-                "exercise_session_uuid": str(result["session_id"]) if result.get("session_id") else None,
-                "datetime_start": datetime_start.isoformat() if datetime_start else None,
-                "datetime_end": datetime_end.isoformat() if datetime_end else None
-            })
+                return result, await self._refresh_workout_summary(tx, workout_session_uuid)
             
-            logger.info(f"Успешно сохранена/обновлена сессия упражнения: {result}")
+            result, summary = await self.db_pool.run_in_transaction(write)
+            await self._store_workout_summary(summary)
             return result
         
         except Exception as e:
             logger.error(f"Ошибка при сохранении сессии упражнения: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+    
+    async def _write_exercise_session(
+        self,
+        tx: Transaction,
+        user_id: int,
+        workout_session_uuid: UUID,
+        exercise_uuid: UUID,
+        status: str,
+        datetime_start: Optional[datetime],
+        datetime_end: Optional[datetime],
+        exercise_session_uuid: Optional[UUID],
+        duration: Optional[int],
+        user_duration: Optional[int],
+        count: Optional[int],
+        user_count: Optional[int]
+    ) -> Dict[str, Any]:
+        """
+        Создает или обновляет запись в таблице user_exercise_sessions в переданной транзакции
+        одним запросом (EXERCISE_SESSION_UPSERT_QUERY).
+        Параметры совпадают с save_exercise_session, tx - открытая транзакция.
+        
+        Returns:
+            Словарь с результатом операции
+        """
+        logger.info(
+            f"Сохранение/обновление сессии упражнения: user_id={user_id}, "
+            f"workout_session_uuid={workout_session_uuid}, exercise_uuid={exercise_uuid}, "
+            f"status={status}, datetime_start={datetime_start}, datetime_end={datetime_end}, "
+            f"exercise_session_uuid={exercise_session_uuid}, duration={duration}, "
+            f"user_duration={user_duration}, count={count}, user_count={user_count}"
+        )
+        
+        # Начало упражнения задает только время начала, завершение - время окончания и статистику
+        ended = status == 'ended'
+        row = await tx.fetchrow(
+            EXERCISE_SESSION_UPSERT_QUERY,
+            exercise_session_uuid,
+            user_id,
+            workout_session_uuid,
+            exercise_uuid,
+            status,
+            datetime_start if status == 'start' else None,
+            datetime_end if ended else None,
+            duration if ended else None,
+            user_duration if ended else None,
+            count if ended else None,
+            user_count if ended else None
+        )
+        
+        if row['inserted']:
+            result = {
+                "operation": "created",
+                "session_id": row['exercise_session_uuid'],
+                "status": status,
+                "message": "Создана новая сессия упражнения"
+            }
+        else:
+            result = {
+                "operation": "updated",
+                "session_id": row['exercise_session_uuid'],
+                "status": status,
+                "message": "Обновлена существующая сессия упражнения"
+            }
+        
+        # Добавляем дополнительную информацию в результат
+        result.update({
+            "user_id": user_id,
+            "workout_session_uuid": str(workout_session_uuid),
+            "exercise_uuid": str(exercise_uuid),
+            "exercise_session_uuid": str(result["session_id"]) if result.get("session_id") else None,
+            "datetime_start": datetime_start.isoformat() if datetime_start else None,
+            "datetime_end": datetime_end.isoformat() if datetime_end else None,
+            "duration": duration,
+            "user_duration": user_duration,
+            "count": count,
+            "user_count": user_count
+        })
+        
+        logger.info(f"Успешно сохранена/обновлена сессия упражнения: {result}")
+        return result
+    
+    async def _refresh_workout_summary(self, tx: Transaction,
+                                       workout_session_uuid: UUID) -> Optional[Dict[str, Any]]:
+        """
+        Пересчитывает строку user_workout_summary для тренировки, к которой относится сессия.
+        
+        Пересчет затрагивает только последнюю сессию пользователя по этой тренировке и её упражнения,
+        поэтому его стоимость не зависит от количества накопленных сессий.
+        
+        При шардировании сессии и сводка хранятся на разных серверах, поэтому строка сводки
+        только вычисляется в транзакции на шарде и записывается после ее фиксации
+        (см. _store_workout_summary).
+        
+        Args:
+            tx: Транзакция, в которой была изменена сессия
+            workout_session_uuid: UUID измененной сессии тренировки
+            
+        Returns:
+            Строка сводки для записи на основном сервере или None, если сводка уже обновлена
+        """
+        if not self.db_pool.is_sharded():
+            await tx.execute(REFRESH_WORKOUT_SUMMARY_QUERY, workout_session_uuid)
+            return None
+        return await tx.fetchrow(WORKOUT_SUMMARY_QUERY, workout_session_uuid)
+    
+    async def _store_workout_summary(self, summary: Optional[Dict[str, Any]]) -> None:
+        """
+        Записывает строку сводки, вычисленную на шарде, в user_workout_summary на основном сервере.
+        
+        Транзакция на шарде к этому моменту уже зафиксирована, поэтому ошибка записи сводки
+        не возвращается клиенту: запись повторяется в фоновой задаче (_retry_store_workout_summary).
+        
+        Args:
+            summary: Строка сводки (None - записывать нечего)
+        """
+        if summary is None:
+            return
+        values = [summary[column] for column in WORKOUT_SUMMARY_COLUMNS]
+        try:
+            with use_shard(None):
+                await self.db_pool.execute(STORE_WORKOUT_SUMMARY_QUERY, *values)
+        except Exception as e:
+            logger.warning(f"Сводка тренировки не записана, запись будет повторена: {str(e)}")
+            # Фоновая задача не наследует соединения и бюджет HTTP-запроса
+            task = asyncio.create_task(run_in_scope(None, self._retry_store_workout_summary(values)))
+            self._summary_retries.add(task)
+            task.add_done_callback(self._summary_retries.discard)
+    
+    async def _retry_store_workout_summary(self, values: List[Any]) -> None:
+        """
+        Повторяет запись строки сводки с растущей паузой (DB_SUMMARY_STORE_RETRIES,
+        DB_SUMMARY_STORE_RETRY_BACKOFF). Повтор устаревшей строки безопасен: она не перезаписывает
+        более новую (см. STORE_WORKOUT_SUMMARY_QUERY).
+        
+        Args:
+            values: Значения столбцов WORKOUT_SUMMARY_COLUMNS
+        """
+        retries = settings.DB_SUMMARY_STORE_RETRIES
+        for attempt in range(1, retries + 1):
+            await asyncio.sleep(settings.DB_SUMMARY_STORE_RETRY_BACKOFF * (2 ** (attempt - 1)))
+            try:
+                with use_shard(None):
+                    await self.db_pool.execute(STORE_WORKOUT_SUMMARY_QUERY, *values)
+                return
+            except Exception as e:
+                logger.warning(f"Повтор записи сводки тренировки ({attempt}/{retries}) не удался: {str(e)}")
+        logger.error(
+            f"Сводка тренировки user_id={values[0]}, workout_uuid={values[1]} не записана; "
+            f"она будет пересчитана при следующем сохранении сессии этой тренировки"
+        )
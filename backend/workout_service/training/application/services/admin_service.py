@@ -126,33 +126,32 @@ class AdminService:
         """
         try:
             # Начинаем транзакцию
-            async with self.db._pool.acquire() as conn:
-                async with conn.transaction():
-                    # Удаляем связи упражнений
-                    await conn.execute(
-                        f"DELETE FROM {TRAINING_EXERCISES_TABLE} WHERE {TRAINING_EXERCISE_TRAINING_ID} = $1",
-                        training_id
-                    )
-                    
-                    # Удаляем записи о тренировках пользователей
-                    await conn.execute(
-                        f"DELETE FROM {USER_TRAININGS_TABLE} WHERE {USER_TRAINING_TRAINING_ID} = $1",
-                        training_id
-                    )
-                    
-                    # Удаляем записи о прогрессе пользователей
-                    await conn.execute(
-                        f"DELETE FROM {USER_PROGRESS_TABLE} WHERE {USER_PROGRESS_TRAINING_ID} = $1",
-                        training_id
-                    )
-                    
-                    # Удаляем тренировку
-                    result = await conn.fetchval(
-                        f"DELETE FROM {TRAININGS_TABLE} WHERE {TRAINING_ID} = $1 RETURNING {TRAINING_ID}",
-                        training_id
-                    )
-                    
-                    return result is not None
+            async with self.db.transaction() as tx:
+                # Удаляем связи упражнений
+                await tx.execute(
+                    f"DELETE FROM {TRAINING_EXERCISES_TABLE} WHERE {TRAINING_EXERCISE_TRAINING_ID} = $1",
+                    training_id
+                )
+                
+                # Удаляем записи о тренировках пользователей
+                await tx.execute(
+                    f"DELETE FROM {USER_TRAININGS_TABLE} WHERE {USER_TRAINING_TRAINING_ID} = $1",
+                    training_id
+                )
+                
+                # Удаляем записи о прогрессе пользователей
+                await tx.execute(
+                    f"DELETE FROM {USER_PROGRESS_TABLE} WHERE {USER_PROGRESS_TRAINING_ID} = $1",
+                    training_id
+                )
+                
+                # Удаляем тренировку
+                result = await tx.fetchval(
+                    f"DELETE FROM {TRAININGS_TABLE} WHERE {TRAINING_ID} = $1 RETURNING {TRAINING_ID}",
+                    training_id
+                )
+                
+                return result is not None
         except Exception as e:
             logger.error(f"Ошибка при удалении тренировки {training_id}: {str(e)}")
             raise
@@ -168,24 +167,45 @@ class AdminService:
             True, если упражнение успешно удалено, иначе False
         """
         try:
-            async with self.db._pool.acquire() as conn:
-                async with conn.transaction():
-                    await conn.execute(
-                        f"DELETE FROM {TRAINING_EXERCISES_TABLE} WHERE {TRAINING_EXERCISE_EXERCISE_ID} = $1",
-                        exercise_id
-                    )
-                    
-                    await conn.execute(
-                        f"DELETE FROM {USER_PROGRESS_TABLE} WHERE {USER_PROGRESS_EXERCISE_ID} = $1",
-                        exercise_id
-                    )
-                    
-                    result = await conn.fetchval(
-                        f"DELETE FROM {EXERCISES_TABLE} WHERE exercise_id = $1 RETURNING exercise_id",
-                        exercise_id
-                    )
-                    
-                    return result is not None
+            async with self.db.transaction() as tx:
+                await tx.execute(
+                    f"DELETE FROM {TRAINING_EXERCISES_TABLE} WHERE {TRAINING_EXERCISE_EXERCISE_ID} = $1",
+                    exercise_id
+                )
+                
+                await tx.execute(
+                    f"DELETE FROM {USER_PROGRESS_TABLE} WHERE {USER_PROGRESS_EXERCISE_ID} = $1",
+                    exercise_id
+                )
+                
+                result = await tx.fetchval(
+                    f"DELETE FROM {EXERCISES_TABLE} WHERE exercise_id = $1 RETURNING exercise_id",
+                    exercise_id
+                )
+                
+                return result is not None
         except Exception as e:
             logger.error(f"Ошибка при удалении упражнения {exercise_id}: {str(e)}")
             raise
+    
+    def get_db_pool_stats(self) -> Dict[str, Any]:
+        """
+        Получает статистику пула соединений с базой данных
+        
+        Returns:
+            Словарь со статистикой пула соединений
+        """
+        return self.db.pool_stats()
+
+    def get_db_query_stats(self, limit: int = 20, order_by: str = "total") -> Dict[str, Any]:
+        """
+        Получает статистику запросов к базе данных
+        
+        Args:
+            limit: Число запросов в ответе
+            order_by: Показатель сортировки
+            
+        Returns:
+            Словарь с общими счетчиками и запросами с наибольшими значениями показателя
+        """
+        return self.db.query_stats(limit, order_by)
@@ -3,6 +3,7 @@ from typing import List, Optional, Dict, Any
 from uuid import UUID
 from training.domain.schemas import Exercise, ExerciseCreate, ExerciseUpdate
 from training.infrastructure.database import Database
+from training.infrastructure.statements import build_update
 from training.domain.db_constants import *
 
 logger = logging.getLogger(__name__)
@@ -28,7 +29,7 @@ class ExercisesService:
                 ORDER BY title
             """
             
-            rows = await self.db.fetch(query)
+            rows = await self.db.fetch_cached(query, tables=(EXERCISES_TABLE,))
             result = []
             for row in rows:
                 exercise = self._map_to_model(row)
@@ -155,44 +156,24 @@ class ExercisesService:
             if not current_exercise:
                 return None
             
-            update_fields = []
-            params = []
-            param_index = 1
+            update_values = {}
             
             if exercise_data.title is not None:
-                update_fields.append(f"title = ${param_index}")
-                params.append(exercise_data.title)
-                param_index += 1
+                update_values["title"] = exercise_data.title
                 
             if exercise_data.description is not None:
-                update_fields.append(f"description = ${param_index}")
-                params.append(exercise_data.description)
-                param_index += 1
+                update_values["description"] = exercise_data.description
                 
             if exercise_data.muscle_group_id is not None:
-                update_fields.append(f"muscle_group_id = ${param_index}")
-                params.append(exercise_data.muscle_group_id)
-                param_index += 1
+                update_values["muscle_group_id"] = exercise_data.muscle_group_id
                 
             if hasattr(exercise_data, 'gif_uuid'):
-                update_fields.append(f"gif_uuid = ${param_index}")
-                params.append(exercise_data.gif_uuid)
-                param_index += 1
+                update_values["gif_uuid"] = exercise_data.gif_uuid
             
-            update_fields.append(f"updated_at = CURRENT_TIMESTAMP")
-            
-            # Если нет полей для обновления, возвращаем текущее упражнение
-            if not update_fields:
-                return current_exercise
-            
-            query = f"""
-                UPDATE {EXERCISES_TABLE}
-                SET {', '.join(update_fields)}
-                WHERE exercise_id = ${param_index}
-                RETURNING *
-            """
-            
-            params.append(exercise_id)
+            query, params = build_update(
+                "exercises", EXERCISES_TABLE, update_values, {"exercise_id": exercise_id},
+                expressions={"updated_at": "CURRENT_TIMESTAMP"}
+            )
             row = await self.db.fetchrow(query, *params)
             return self._map_to_model(row)
         except Exception as e:
@@ -2,6 +2,7 @@ import logging
 from typing import List, Optional, Dict, Any
 from training.domain.schemas import MuscleGroupModel, MuscleGroupCreate, MuscleGroupUpdate
 from training.infrastructure.database import Database
+from training.infrastructure.statements import build_update
 from training.domain.db_constants import *
 
 logger = logging.getLogger(__name__)
@@ -27,7 +28,7 @@ class MuscleGroupsService:
                 ORDER BY {MUSCLE_GROUP_NAME}
             """
             
-            rows = await self.db.fetch(query)
+            rows = await self.db.fetch_cached(query, tables=(MUSCLE_GROUPS_TABLE,))
             return [self._map_to_model(row) for row in rows]
         except Exception as e:
             logger.error(f"Ошибка при получении списка групп мышц: {str(e)}")
@@ -106,31 +107,20 @@ class MuscleGroupsService:
             if not current_muscle_group:
                 return None
             
-            update_fields = []
-            params = []
-            param_index = 1
+            update_values = {}
             
             if muscle_group_data.name is not None:
-                update_fields.append(f"{MUSCLE_GROUP_NAME} = ${param_index}")
-                params.append(muscle_group_data.name)
-                param_index += 1
+                update_values[MUSCLE_GROUP_NAME] = muscle_group_data.name
             
             if muscle_group_data.description is not None:
-                update_fields.append(f"{MUSCLE_GROUP_DESCRIPTION} = ${param_index}")
-                params.append(muscle_group_data.description)
-                param_index += 1
+                update_values[MUSCLE_GROUP_DESCRIPTION] = muscle_group_data.description
             
-            if not update_fields:
+            if not update_values:
                 return current_muscle_group
                         
-            query = f"""
-                UPDATE {MUSCLE_GROUPS_TABLE}
-                SET {", ".join(update_fields)}
-                WHERE {MUSCLE_GROUP_ID} = ${param_index}
-                RETURNING *
-            """
-            
-            params.append(muscle_group_id)
+            query, params = build_update(
+                "muscle_groups", MUSCLE_GROUPS_TABLE, update_values, {MUSCLE_GROUP_ID: muscle_group_id}
+            )
             
             row = await self.db.fetchrow(query, *params)
             return self._map_to_model(row)
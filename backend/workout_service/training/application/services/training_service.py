@@ -1,19 +1,43 @@
 import logging
-from typing import List, Optional, Dict, Any, Union
+from typing import List, Optional, Dict, Any, Union, Tuple
 from uuid import UUID
 from training.domain.schemas import (
     Training, TrainingCreate, TrainingUpdate,
     UserTraining, UserTrainingCreate, UserTrainingUpdate,
     TrainingExercise, TrainingExerciseCreate,
-    AppWorkout, AppWorkoutCreate, AppWorkoutExercise,
+    AppWorkout, AppWorkoutCreate, AppWorkoutExercise, AppWorkoutExerciseCreate,
     TrainingStatus
 )
-from training.infrastructure.database import Database
+from training.infrastructure.database import DATABASE_UNAVAILABLE_ERRORS, Database, Transaction
+from training.infrastructure.hot_statements import hot_statement
+from training.infrastructure.statements import build_update
 from training.domain.db_constants import *
+from training.domain.utils import encode_cursor, decode_cursor
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Сортировки списка тренировок: выражение ключа сортировки, его тип для курсора и направление.
+# Тренировки без сессий получают ключ -infinity и оказываются в конце "newest" и в начале "oldest"
+APP_WORKOUTS_ORDERINGS = {
+    "newest": ("COALESCE(s.last_session_start, '-infinity'::timestamptz)", "timestamptz", "DESC"),
+    "oldest": ("COALESCE(s.last_session_start, '-infinity'::timestamptz)", "timestamptz", "ASC"),
+    "name": ("aw.name", "text", "ASC"),
+    "created": ("COALESCE(aw.created_at, '-infinity'::timestamp)", "timestamp", "DESC"),
+}
+APP_WORKOUTS_DEFAULT_ORDER = "created"
+
+# Упражнения тренировок страницы списка, загружаемые одним запросом
+APP_WORKOUTS_EXERCISES_QUERY = hot_statement("""
+    SELECT awe.*, e.title as exercise_name, e.description as exercise_description, e.gif_uuid, 
+           mg.name as muscle_group_name, mg.id as muscle_group_id
+    FROM app_workout_exercises awe
+    JOIN exercises e ON awe.exercise_id = e.exercise_id
+    LEFT JOIN muscle_groups mg ON e.muscle_group_id = mg.id
+    WHERE awe.app_workout_uuid = ANY($1::uuid[])
+    ORDER BY awe.app_workout_uuid, awe.created_at
+""")
+
 class TrainingService:
     """
     Сервис для работы с тренировками
@@ -108,70 +132,38 @@ class TrainingService:
             Созданная тренировка
         """
         try:
-            # Убедимся, что подключение к БД установлено
-            if not self.db._pool:
-                await self.db.connect()
-                
-            async with self.db._pool.acquire() as conn:
-                async with conn.transaction():
-                    query = f"""
-                        INSERT INTO {TRAININGS_TABLE} (
-                            {TRAINING_NAME}, 
-                            {TRAINING_DESCRIPTION}, 
-                            {TRAINING_DIFFICULTY}, 
-                            {TRAINING_DURATION}, 
-                            {TRAINING_CREATED_BY}, 
-                            {TRAINING_IS_PUBLIC}
-                        )
-                        VALUES ($1, $2, $3, $4, $5, $6)
-                        RETURNING *
-                    """
-                    
-                    training_row = await conn.fetchrow(
-                        query, 
-                        training_data.name, 
-                        training_data.description, 
-                        training_data.difficulty.value, 
-                        training_data.duration, 
-                        user_id, 
-                        training_data.is_public
+            async with self.db.transaction() as tx:
+                query = f"""
+                    INSERT INTO {TRAININGS_TABLE} (
+                        {TRAINING_NAME}, 
+                        {TRAINING_DESCRIPTION}, 
+                        {TRAINING_DIFFICULTY}, 
+                        {TRAINING_DURATION}, 
+                        {TRAINING_CREATED_BY}, 
+                        {TRAINING_IS_PUBLIC}
                     )
-                    
-                    training_id = training_row[TRAINING_ID]
-                    
-                    exercises = []
-                    for exercise_data in training_data.exercises:
-                        exercise_query = f"""
-                            INSERT INTO {TRAINING_EXERCISES_TABLE} (
-                                {TRAINING_EXERCISE_TRAINING_ID}, 
-                                {TRAINING_EXERCISE_EXERCISE_ID}, 
-                                {TRAINING_EXERCISE_SETS}, 
-                                {TRAINING_EXERCISE_REPS}, 
-                                {TRAINING_EXERCISE_WEIGHT}, 
-                                {TRAINING_EXERCISE_REST_TIME}, 
-                                {TRAINING_EXERCISE_ORDER}
-                            )
-                            VALUES ($1, $2, $3, $4, $5, $6, $7)
-                            RETURNING *
-                        """
-                        
-                        exercise_row = await conn.fetchrow(
-                            exercise_query,
-                            training_id,
-                            exercise_data.exercise_id,
-                            exercise_data.sets,
-                            exercise_data.reps,
-                            exercise_data.weight,
-                            exercise_data.rest_time,
-                            exercise_data.exercise_order
-                        )
-                        
-                        exercises.append(TrainingExercise(**exercise_row))
-                    
-                    training = Training(**training_row)
-                    training.exercises = exercises
-                    
-                    return training
+                    VALUES ($1, $2, $3, $4, $5, $6)
+                    RETURNING *
+                """
+                
+                training_row = await tx.fetchrow(
+                    query, 
+                    training_data.name, 
+                    training_data.description, 
+                    training_data.difficulty.value, 
+                    training_data.duration, 
+                    user_id, 
+                    training_data.is_public
+                )
+                
+                training_id = training_row[TRAINING_ID]
+                
+                exercises = await self._insert_training_exercises(tx, training_id, training_data.exercises)
+                
+                training = Training(**training_row)
+                training.exercises = exercises
+                
+                return training
         except Exception as e:
             logger.error(f"Ошибка при создании тренировки: {str(e)}")
             raise
@@ -193,103 +185,46 @@ class TrainingService:
             if not current_training or current_training.created_by != user_id:
                 return None
             
-            # Убедимся, что подключение к БД установлено
-            if not self.db._pool:
-                await self.db.connect()
+            async with self.db.transaction() as tx:
+                update_values = {}
                 
-            async with self.db._pool.acquire() as conn:
-                async with conn.transaction():
-                    update_fields = []
-                    params = []
-                    param_index = 1
+                if training_data.name is not None:
+                    update_values[TRAINING_NAME] = training_data.name
                     
-                    if training_data.name is not None:
-                        update_fields.append(f"{TRAINING_NAME} = ${param_index}")
-                        params.append(training_data.name)
-                        param_index += 1
-                        
-                    if training_data.description is not None:
-                        update_fields.append(f"{TRAINING_DESCRIPTION} = ${param_index}")
-                        params.append(training_data.description)
-                        param_index += 1
-                        
-                    if training_data.difficulty is not None:
-                        update_fields.append(f"{TRAINING_DIFFICULTY} = ${param_index}")
-                        params.append(training_data.difficulty.value)
-                        param_index += 1
-                        
-                    if training_data.duration is not None:
-                        update_fields.append(f"{TRAINING_DURATION} = ${param_index}")
-                        params.append(training_data.duration)
-                        param_index += 1
-                        
-                    if training_data.is_public is not None:
-                        update_fields.append(f"{TRAINING_IS_PUBLIC} = ${param_index}")
-                        params.append(training_data.is_public)
-                        param_index += 1
+                if training_data.description is not None:
+                    update_values[TRAINING_DESCRIPTION] = training_data.description
                     
-                    update_fields.append(f"{TRAINING_UPDATED_AT} = CURRENT_TIMESTAMP")
+                if training_data.difficulty is not None:
+                    update_values[TRAINING_DIFFICULTY] = training_data.difficulty.value
                     
-                    if not update_fields and not training_data.exercises:
-                        return current_training
+                if training_data.duration is not None:
+                    update_values[TRAINING_DURATION] = training_data.duration
                     
-                    if update_fields:
-                        query = f"""
-                            UPDATE {TRAININGS_TABLE}
-                            SET {', '.join(update_fields)}
-                            WHERE {TRAINING_ID} = ${param_index}
-                            RETURNING *
-                        """
-                        
-                        params.append(training_id)
-                        training_row = await conn.fetchrow(query, *params)
-                    else:
-                        query = f"SELECT * FROM {TRAININGS_TABLE} WHERE {TRAINING_ID} = $1"
-                        training_row = await conn.fetchrow(query, training_id)
+                if training_data.is_public is not None:
+                    update_values[TRAINING_IS_PUBLIC] = training_data.is_public
+                
+                query, params = build_update(
+                    "training", TRAININGS_TABLE, update_values, {TRAINING_ID: training_id},
+                    expressions={TRAINING_UPDATED_AT: "CURRENT_TIMESTAMP"}
+                )
+                training_row = await tx.fetchrow(query, *params)
+                
+                if training_data.exercises:
+                    delete_query = f"""
+                        DELETE FROM {TRAINING_EXERCISES_TABLE}
+                        WHERE {TRAINING_EXERCISE_TRAINING_ID} = $1
+                    """
+                    await tx.execute(delete_query, training_id)
                     
-                    if training_data.exercises:
-                        delete_query = f"""
-                            DELETE FROM {TRAINING_EXERCISES_TABLE}
-                            WHERE {TRAINING_EXERCISE_TRAINING_ID} = $1
-                        """
-                        await conn.execute(delete_query, training_id)
-                        
-                        exercises = []
-                        for exercise_data in training_data.exercises:
-                            exercise_query = f"""
-                                INSERT INTO {TRAINING_EXERCISES_TABLE} (
-                                    {TRAINING_EXERCISE_TRAINING_ID}, 
-                                    {TRAINING_EXERCISE_EXERCISE_ID}, 
-                                    {TRAINING_EXERCISE_SETS}, 
-                                    {TRAINING_EXERCISE_REPS}, 
-                                    {TRAINING_EXERCISE_WEIGHT}, 
-                                    {TRAINING_EXERCISE_REST_TIME}, 
-                                    {TRAINING_EXERCISE_ORDER}
-                                )
-                                VALUES ($1, $2, $3, $4, $5, $6, $7)
-                                RETURNING *
-                            """
-                            
-                            exercise_row = await conn.fetchrow(
-                                exercise_query,
-                                training_id,
-                                exercise_data.exercise_id,
-                                exercise_data.sets,
-                                exercise_data.reps,
-                                exercise_data.weight,
-                                exercise_data.rest_time,
-                                exercise_data.exercise_order
-                            )
-                            
-                            exercises.append(TrainingExercise(**exercise_row))
-                        
-                        training = Training(**training_row)
-                        training.exercises = exercises
-                    else:
-                        training = Training(**training_row)
-                        training.exercises = await self._get_training_exercises(training_id)
+                    exercises = await self._insert_training_exercises(tx, training_id, training_data.exercises)
                     
-                    return training
+                    training = Training(**training_row)
+                    training.exercises = exercises
+                else:
+                    training = Training(**training_row)
+                    training.exercises = await self._get_training_exercises(training_id)
+                
+                return training
         except Exception as e:
             logger.error(f"Ошибка при обновлении тренировки {training_id}: {str(e)}")
             raise
@@ -310,37 +245,72 @@ class TrainingService:
             if not current_training or current_training.created_by != user_id:
                 return False
             
-            # Убедимся, что подключение к БД установлено
-            if not self.db._pool:
-                await self.db.connect()
+            async with self.db.transaction() as tx:
+                await tx.execute(
+                    f"DELETE FROM {TRAINING_EXERCISES_TABLE} WHERE {TRAINING_EXERCISE_TRAINING_ID} = $1",
+                    training_id
+                )
                 
-            async with self.db._pool.acquire() as conn:
-                async with conn.transaction():
-                    await conn.execute(
-                        f"DELETE FROM {TRAINING_EXERCISES_TABLE} WHERE {TRAINING_EXERCISE_TRAINING_ID} = $1",
-                        training_id
-                    )
-                    
-                    await conn.execute(
-                        f"DELETE FROM {USER_TRAININGS_TABLE} WHERE {USER_TRAINING_TRAINING_ID} = $1",
-                        training_id
-                    )
-                    
-                    await conn.execute(
-                        f"DELETE FROM {USER_PROGRESS_TABLE} WHERE {USER_PROGRESS_TRAINING_ID} = $1",
-                        training_id
-                    )
-                    
-                    result = await conn.fetchval(
-                        f"DELETE FROM {TRAININGS_TABLE} WHERE {TRAINING_ID} = $1 RETURNING {TRAINING_ID}",
-                        training_id
-                    )
-                    
-                    return result is not None
+                await tx.execute(
+                    f"DELETE FROM {USER_TRAININGS_TABLE} WHERE {USER_TRAINING_TRAINING_ID} = $1",
+                    training_id
+                )
+                
+                await tx.execute(
+                    f"DELETE FROM {USER_PROGRESS_TABLE} WHERE {USER_PROGRESS_TRAINING_ID} = $1",
+                    training_id
+                )
+                
+                result = await tx.fetchval(
+                    f"DELETE FROM {TRAININGS_TABLE} WHERE {TRAINING_ID} = $1 RETURNING {TRAINING_ID}",
+                    training_id
+                )
+                
+                return result is not None
         except Exception as e:
             logger.error(f"Ошибка при удалении тренировки {training_id}: {str(e)}")
             raise
     
+    async def _insert_training_exercises(self, tx: Transaction, training_id: int,
+                                         exercises_data: List[TrainingExerciseCreate]) -> List[TrainingExercise]:
+        """
+        Добавляет упражнения тренировки одним запросом
+        
+        Args:
+            tx: Открытая транзакция
+            training_id: ID тренировки
+            exercises_data: Упражнения тренировки
+            
+        Returns:
+            Добавленные упражнения в порядке передачи
+        """
+        rows = await tx.insert_many(
+            TRAINING_EXERCISES_TABLE,
+            [
+                TRAINING_EXERCISE_TRAINING_ID,
+                TRAINING_EXERCISE_EXERCISE_ID,
+                TRAINING_EXERCISE_SETS,
+                TRAINING_EXERCISE_REPS,
+                TRAINING_EXERCISE_WEIGHT,
+                TRAINING_EXERCISE_REST_TIME,
+                TRAINING_EXERCISE_ORDER
+            ],
+            ["int", "int", "int", "int", "float8", "int", "int"],
+            [
+                (
+                    training_id,
+                    exercise_data.exercise_id,
+                    exercise_data.sets,
+                    exercise_data.reps,
+                    exercise_data.weight,
+                    exercise_data.rest_time,
+                    exercise_data.exercise_order
+                )
+                for exercise_data in exercises_data
+            ]
+        )
+        return [TrainingExercise(**row) for row in rows]
+    
     async def _get_training_exercises(self, training_id: Optional[int]) -> List[TrainingExercise]:
         """
         Получает список упражнений для тренировки
@@ -361,7 +331,7 @@ class TrainingService:
                 ORDER BY {TRAINING_EXERCISE_ORDER}
             """
             
-            rows = await self.db.fetch(query, training_id)
+            rows = await self.db.fetch(query, training_id, records=True)
             return [TrainingExercise(**row) for row in rows]
         except Exception as e:
             logger.error(f"Ошибка при получении упражнений для тренировки {training_id}: {str(e)}")
@@ -508,41 +478,27 @@ class TrainingService:
             if not existing:
                 return None
             
-            update_fields = []
-            params = []
-            param_index = 1
+            update_values = {}
             
             if data.status is not None:
-                update_fields.append(f"{USER_TRAINING_STATUS} = ${param_index}")
-                params.append(data.status.value)
-                param_index += 1
+                update_values[USER_TRAINING_STATUS] = data.status.value
                 
                 if data.status == "in_progress" and existing[USER_TRAINING_STARTED_AT] is None:
-                    update_fields.append(f"{USER_TRAINING_STARTED_AT} = ${param_index}")
-                    params.append(datetime.now())
-                    param_index += 1
+                    update_values[USER_TRAINING_STARTED_AT] = datetime.now()
                 
                 if data.status == "completed" and existing[USER_TRAINING_COMPLETED_AT] is None:
-                    update_fields.append(f"{USER_TRAINING_COMPLETED_AT} = ${param_index}")
-                    params.append(datetime.now())
-                    param_index += 1
+                    update_values[USER_TRAINING_COMPLETED_AT] = datetime.now()
             
             if data.is_favorite is not None:
-                update_fields.append(f"{USER_TRAINING_FAVORITE} = ${param_index}")
-                params.append(data.is_favorite)
-                param_index += 1
+                update_values[USER_TRAINING_FAVORITE] = data.is_favorite
                 
             if data.started_at is not None:
-                update_fields.append(f"{USER_TRAINING_STARTED_AT} = ${param_index}")
-                params.append(data.started_at)
-                param_index += 1
+                update_values[USER_TRAINING_STARTED_AT] = data.started_at
                 
             if data.completed_at is not None:
-                update_fields.append(f"{USER_TRAINING_COMPLETED_AT} = ${param_index}")
-                params.append(data.completed_at)
-                param_index += 1
+                update_values[USER_TRAINING_COMPLETED_AT] = data.completed_at
             
-            if not update_fields:
+            if not update_values:
                 training = await self.get_training_by_id(training_id, user_id)
                 existing_dict = dict(existing) if existing else {}
                 user_training = UserTraining(
@@ -557,14 +513,10 @@ class TrainingService:
                 user_training.training = training
                 return user_training
             
-            update_query = f"""
-                UPDATE {USER_TRAININGS_TABLE}
-                SET {', '.join(update_fields)}
-                WHERE {USER_TRAINING_USER_ID} = ${param_index} AND {USER_TRAINING_TRAINING_ID} = ${param_index + 1}
-                RETURNING *
-            """
-            
-            params.extend([user_id, training_id])
+            update_query, params = build_update(
+                "training", USER_TRAININGS_TABLE, update_values,
+                {USER_TRAINING_USER_ID: user_id, USER_TRAINING_TRAINING_ID: training_id}
+            )
             row = await self.db.fetchrow(update_query, *params)
             
             # Получаем данные тренировки
@@ -612,129 +564,175 @@ class TrainingService:
             raise
 
     
-    async def get_app_workouts(self, user_id: int, is_admin: bool = False) -> List[AppWorkout]:
+    @staticmethod
+    def _app_workouts_query(where_clause: str, extra_columns: Optional[str] = None) -> str:
         """
-        Получает список всех пользовательских тренировок с информацией о последней сессии пользователя,
+        Формирует запрос на получение тренировок вместе с информацией о последней сессии пользователя,
+        последнем упражнении и суммарном времени тренировки.
+        
+        Информация о сессиях берется из проекции user_workout_summary, которую ActivityService
+        обновляет при сохранении прогресса, поэтому стоимость чтения не зависит от количества
+        накопленных сессий пользователя.
+        
+        Args:
+            where_clause: Условие фильтрации тренировок (алиас таблицы тренировок - aw, $1 - ID пользователя)
+            extra_columns: Дополнительные выражения для списка SELECT (опционально)
+            
+        Returns:
+            Текст SQL-запроса
+        """
+        return f"""
+            SELECT
+                aw.*,
+                s.last_session_uuid,
+                s.last_session_start,
+                s.last_session_stop,
+                s.last_session_status,
+                s.last_exercise_session_uuid,
+                s.last_exercise_start,
+                s.last_exercise_stop,
+                s.last_exercise_status,
+                s.total_workout_time{f", {extra_columns}" if extra_columns else ""}
+            FROM app_workouts aw
+            LEFT JOIN user_workout_summary s
+                ON s.user_id = $1 AND s.workout_uuid = aw.app_workout_uuid
+            WHERE {where_clause}
+        """
+    
+    @staticmethod
+    def _app_workouts_page_query(order_by: str, after_cursor: bool, limited: bool) -> str:
+        """
+        Формирует запрос страницы списка тренировок. Текст запроса зависит только от сортировки
+        и наличия курсора и размера страницы, поэтому первые страницы списка можно подготовить заранее.
+        
+        Args:
+            order_by: Сортировка (ключ APP_WORKOUTS_ORDERINGS)
+            after_cursor: Страница читается после курсора ($3 - ключ сортировки, $4 - UUID тренировки)
+            limited: Размер страницы ограничен (последний параметр - размер страницы плюс одна строка)
+            
+        Returns:
+            Текст SQL-запроса ($1 - ID пользователя, $2 - флаг администратора)
+        """
+        sort_expr, sort_type, direction = APP_WORKOUTS_ORDERINGS[order_by]
+        
+        # Фильтрация по is_visible для не-админов
+        conditions = ["(aw.is_visible = true OR $2 = true)"]
+        params_count = 2
+        if after_cursor:
+            comparison = "<" if direction == "DESC" else ">"
+            # Ключ сортировки в курсоре - текст (sort_key), в том числе '-infinity', который нельзя
+            # передать как datetime: параметр передается строкой и приводится к типу ключа в запросе
+            conditions.append(
+                f"({sort_expr}, aw.app_workout_uuid) {comparison} "
+                f"(${params_count + 1}::text::{sort_type}, ${params_count + 2}::uuid)"
+            )
+            params_count += 2
+        
+        query = TrainingService._app_workouts_query(
+            " AND ".join(conditions),
+            extra_columns=f"{sort_expr}::text AS sort_key"
+        ) + f"""
+                ORDER BY {sort_expr} {direction}, aw.app_workout_uuid {direction}
+            """
+        if limited:
+            # Лишняя строка показывает, что за страницей есть продолжение
+            query += f"LIMIT ${params_count + 1}"
+        return query
+    
+    async def get_app_workouts(self, user_id: int, is_admin: bool = False,
+                               order_by: Optional[str] = None, limit: Optional[int] = None,
+                               cursor: Optional[str] = None) -> List[AppWorkout]:
+        """
+        Получает список пользовательских тренировок с информацией о последней сессии пользователя,
         последнем упражнении и суммарном времени тренировки
         
         Args:
             user_id: ID пользователя
             is_admin: Флаг, указывающий, что пользователь является администратором
+            order_by: Сортировка ("newest", "oldest", "name" или "created", по умолчанию "created")
+            limit: Максимальное количество тренировок (None - без ограничения)
+            cursor: Курсор продолжения выборки, полученный вместе с предыдущей страницей
             
         Returns:
             Список пользовательских тренировок с расширенной информацией
         """
-        try:
-            # Запрос на получение тренировок с фильтрацией по is_visible для не-админов
-            query = """
-                SELECT * FROM app_workouts
-                WHERE (is_visible = true OR $1 = true)
-                ORDER BY created_at DESC
-            """
-            rows = await self.db.fetch(query, is_admin)
+        workouts, _ = await self.get_app_workouts_page(user_id, is_admin, order_by, limit, cursor)
+        return workouts
+    
+    async def get_app_workouts_page(self, user_id: int, is_admin: bool = False,
+                                    order_by: Optional[str] = None, limit: Optional[int] = None,
+                                    cursor: Optional[str] = None) -> Tuple[List[AppWorkout], Optional[str]]:
+        """
+        Получает страницу пользовательских тренировок, отсортированную на стороне БД
+        
+        Используется keyset-пагинация: курсор хранит значение ключа сортировки и UUID последней
+        тренировки страницы, поэтому следующая страница читается с места остановки без OFFSET.
+        Упражнения загружаются одним запросом только для тренировок страницы.
+        
+        Args:
+            user_id: ID пользователя
+            is_admin: Флаг, указывающий, что пользователь является администратором
+            order_by: Сортировка ("newest", "oldest", "name" или "created", по умолчанию "created")
+            limit: Размер страницы (None - все тренировки после курсора)
+            cursor: Курсор продолжения выборки
             
-            workouts = []
-            for row in rows:
-                workout = AppWorkout(**row)
-                workout.exercises = await self._get_app_workout_exercises(workout.app_workout_uuid)
-                
-                # Получаем информацию о последней сессии для этой тренировки для этого пользователя
-                last_session_query = """
-                    SELECT 
-                        workout_session_uuid,
-                        datetime_start,
-                        datetime_stop,
-                        status
-                    FROM user_workout_sessions
-                    WHERE user_id = $1 AND workout_uuid = $2
-                    ORDER BY datetime_start DESC
-                    LIMIT 1
-                """
-                
+        Returns:
+            Кортеж из списка тренировок и курсора следующей страницы (None, если страница последняя)
+            
+        Raises:
+            ValueError: если передана неизвестная сортировка или некорректный курсор
+        """
+        order_by = order_by or APP_WORKOUTS_DEFAULT_ORDER
+        if order_by not in APP_WORKOUTS_ORDERINGS:
+            raise ValueError(
+                f"Неизвестная сортировка {order_by}, допустимые значения: {', '.join(APP_WORKOUTS_ORDERINGS)}"
+            )
+        params: List[Any] = [user_id, is_admin]
+        
+        if cursor:
+            position = decode_cursor(cursor)
+            if position.get("o") != order_by or "v" not in position or "id" not in position:
+                raise ValueError("Курсор не соответствует выбранной сортировке")
+            sort_value = position["v"]
+            if not isinstance(sort_value, str):
+                raise ValueError("Некорректный курсор пагинации")
+            # Ключ сортировки по времени проверяется до запроса: иначе ошибку приведения типа вернет БД
+            if APP_WORKOUTS_ORDERINGS[order_by][1] != "text" and sort_value != "-infinity":
                 try:
-                    last_session = await self.db.fetchrow(last_session_query, user_id, str(workout.app_workout_uuid))
-                    
-                    # Добавляем информацию о последней сессии к объекту тренировки
-                    if last_session:
-                        session_dict = dict(last_session)
-                        workout_session_uuid = session_dict.get('workout_session_uuid')
-                        workout.last_session_uuid = workout_session_uuid
-                        workout.last_session_start = session_dict.get('datetime_start')
-                        workout.last_session_stop = session_dict.get('datetime_stop')
-                        workout.last_session_status = session_dict.get('status')
-                        
-                        # Если нашли сессию тренировки, ищем информацию о последнем упражнении
-                        if workout_session_uuid:
-                            # Запрос на получение последнего упражнения в тренировке
-                            last_exercise_query = """
-                                SELECT 
-                                    exercise_session_uuid,
-                                    datetime_start,
-                                    datetime_end,
-                                    status
-                                FROM user_exercise_sessions
-                                WHERE workout_session_uuid = $1
-                                ORDER BY datetime_start DESC
-                                LIMIT 1
-                            """
-                            
-                            last_exercise = await self.db.fetchrow(last_exercise_query, str(workout_session_uuid))
-                            if last_exercise:
-                                exercise_dict = dict(last_exercise)
-                                workout.last_exercise_session_uuid = exercise_dict.get('exercise_session_uuid')
-                                workout.last_exercise_start = exercise_dict.get('datetime_start')
-                                workout.last_exercise_stop = exercise_dict.get('datetime_end')
-                                workout.last_exercise_status = exercise_dict.get('status')
-                            
-                            # Подсчитываем суммарное время всех упражнений в тренировке
-                            total_time_query = """
-                                SELECT 
-                                    datetime_start,
-                                    datetime_end
-                                FROM user_exercise_sessions
-                                WHERE workout_session_uuid = $1 AND datetime_end IS NOT NULL
-                            """
-                            
-                            exercise_times = await self.db.fetch(total_time_query, str(workout_session_uuid))
-                            total_seconds = 0
-                            
-                            if exercise_times:
-                                for exercise_time in exercise_times:
-                                    time_dict = dict(exercise_time)
-                                    start_time = time_dict.get('datetime_start')
-                                    end_time = time_dict.get('datetime_end')
-                                    
-                                    # Вычисляем разницу только если оба значения не None
-                                    if start_time and end_time:
-                                        time_diff = end_time - start_time
-                                        total_seconds += time_diff.total_seconds()
-                                
-                                workout.total_workout_time = int(total_seconds)
-                    else:
-                        workout.last_session_uuid = None
-                        workout.last_session_start = None
-                        workout.last_session_stop = None
-                        workout.last_session_status = None
-                        workout.last_exercise_session_uuid = None
-                        workout.last_exercise_start = None
-                        workout.last_exercise_stop = None
-                        workout.last_exercise_status = None
-                        workout.total_workout_time = None
-                except Exception as e:
-                    logger.error(f"Ошибка при получении информации о последней сессии: {str(e)}")
-                    workout.last_session_uuid = None
-                    workout.last_session_start = None
-                    workout.last_session_stop = None
-                    workout.last_session_status = None
-                    workout.last_exercise_session_uuid = None
-                    workout.last_exercise_start = None
-                    workout.last_exercise_stop = None
-                    workout.last_exercise_status = None
-                    workout.total_workout_time = None
-                
-                workouts.append(workout)
+                    datetime.fromisoformat(sort_value)
+                except ValueError:
+                    raise ValueError("Некорректный курсор пагинации")
+            try:
+                last_uuid = UUID(str(position["id"]))
+            except ValueError:
+                raise ValueError("Некорректный курсор пагинации")
+            params.extend([sort_value, last_uuid])
+        
+        try:
+            query = self._app_workouts_page_query(order_by, bool(cursor), bool(limit))
+            if limit:
+                params.append(limit + 1)
+            
+            rows = await self.db.fetch(query, *params, records=True)
+            
+            next_cursor = None
+            if limit and len(rows) > limit:
+                rows = rows[:limit]
+                last_row = rows[-1]
+                next_cursor = encode_cursor({
+                    "o": order_by,
+                    "v": last_row["sort_key"],
+                    "id": str(last_row["app_workout_uuid"]),
+                })
+            
+            workouts = [AppWorkout(**row) for row in rows]
+            exercises_by_workout = await self._get_app_workouts_exercises(
+                [workout.app_workout_uuid for workout in workouts]
+            )
+            for workout in workouts:
+                workout.exercises = exercises_by_workout.get(str(workout.app_workout_uuid), [])
             
-            return workouts
+            return workouts, next_cursor
         except Exception as e:
             logger.error(f"Ошибка при получении списка пользовательских тренировок: {str(e)}")
             raise
@@ -753,111 +751,20 @@ class TrainingService:
             Объект тренировки или None, если тренировка не найдена
         """
         try:
-            query = """
-                SELECT * FROM app_workouts
-                WHERE app_workout_uuid = $1 AND (is_visible = true OR $2 = true)
-            """
-            row = await self.db.fetchrow(query, str(workout_uuid), is_admin)
+            query = self._app_workouts_query(
+                "aw.app_workout_uuid = $2 AND (aw.is_visible = true OR $3 = true)"
+            )
+            # Упражнения не зависят от строки тренировки и читаются параллельно с ней
+            row, exercises = await self.db.gather(
+                self.db.fetchrow(query, user_id, str(workout_uuid), is_admin),
+                self._get_app_workout_exercises(workout_uuid)
+            )
             
             if not row:
                 return None
                 
             workout = AppWorkout(**row)
-            workout.exercises = await self._get_app_workout_exercises(workout.app_workout_uuid)
-            
-            # Получаем информацию о последней сессии для этой тренировки для этого пользователя
-            last_session_query = """
-                SELECT 
-                    workout_session_uuid,
-                    datetime_start,
-                    datetime_stop,
-                    status
-                FROM user_workout_sessions
-                WHERE user_id = $1 AND workout_uuid = $2
-                ORDER BY datetime_start DESC
-                LIMIT 1
-            """
-            
-            try:
-                last_session = await self.db.fetchrow(last_session_query, user_id, str(workout.app_workout_uuid))
-                
-                # Добавляем информацию о последней сессии к объекту тренировки
-                if last_session:
-                    session_dict = dict(last_session)
-                    workout_session_uuid = session_dict.get('workout_session_uuid')
-                    workout.last_session_uuid = workout_session_uuid
-                    workout.last_session_start = session_dict.get('datetime_start')
-                    workout.last_session_stop = session_dict.get('datetime_stop')
-                    workout.last_session_status = session_dict.get('status')
-                    
-                    # Если нашли сессию тренировки, ищем информацию о последнем упражнении
-                    if workout_session_uuid:
-                        # Запрос на получение последнего упражнения в тренировке
-                        last_exercise_query = """
-                            SELECT 
-                                exercise_session_uuid,
-                                datetime_start,
-                                datetime_end,
-                                status
-                            FROM user_exercise_sessions
-                            WHERE workout_session_uuid = $1
-                            ORDER BY datetime_start DESC
-                            LIMIT 1
-                        """
-                        
-                        last_exercise = await self.db.fetchrow(last_exercise_query, str(workout_session_uuid))
-                        if last_exercise:
-                            exercise_dict = dict(last_exercise)
-                            workout.last_exercise_session_uuid = exercise_dict.get('exercise_session_uuid')
-                            workout.last_exercise_start = exercise_dict.get('datetime_start')
-                            workout.last_exercise_stop = exercise_dict.get('datetime_end')
-                            workout.last_exercise_status = exercise_dict.get('status')
-                        
-                        # Подсчитываем суммарное время всех упражнений в тренировке
-                        total_time_query = """
-                            SELECT 
-                                datetime_start,
-                                datetime_end
-                            FROM user_exercise_sessions
-                            WHERE workout_session_uuid = $1 AND datetime_end IS NOT NULL
-                        """
-                        
-                        exercise_times = await self.db.fetch(total_time_query, str(workout_session_uuid))
-                        total_seconds = 0
-                        
-                        if exercise_times:
-                            for exercise_time in exercise_times:
-                                time_dict = dict(exercise_time)
-                                start_time = time_dict.get('datetime_start')
-                                end_time = time_dict.get('datetime_end')
-                                
-                                # Вычисляем разницу только если оба значения не None
-                                if start_time and end_time:
-                                    time_diff = end_time - start_time
-                                    total_seconds += time_diff.total_seconds()
-                            
-                            workout.total_workout_time = int(total_seconds)
-                else:
-                    workout.last_session_uuid = None
-                    workout.last_session_start = None
-                    workout.last_session_stop = None
-                    workout.last_session_status = None
-                    workout.last_exercise_session_uuid = None
-                    workout.last_exercise_start = None
-                    workout.last_exercise_stop = None
-                    workout.last_exercise_status = None
-                    workout.total_workout_time = None
-            except Exception as e:
-                logger.error(f"Ошибка при получении информации о последней сессии: {str(e)}")
-                workout.last_session_uuid = None
-                workout.last_session_start = None
-                workout.last_session_stop = None
-                workout.last_session_status = None
-                workout.last_exercise_session_uuid = None
-                workout.last_exercise_start = None
-                workout.last_exercise_stop = None
-                workout.last_exercise_status = None
-                workout.total_workout_time = None
+            workout.exercises = exercises
             
             return workout
         except Exception as e:
@@ -876,58 +783,32 @@ class TrainingService:
             Созданная тренировка
         """
         try:
-            # Убедимся, что подключение к БД установлено
-            if not self.db._pool:
-                await self.db.connect()
-                
-            async with self.db._pool.acquire() as conn:
-                async with conn.transaction():
-                    query = """
-                        INSERT INTO app_workouts (
-                            name, 
-                            description,
-                            is_visible
-                        )
-                        VALUES ($1, $2, $3)
-                        RETURNING *
-                    """
-                    
-                    workout_row = await conn.fetchrow(
-                        query, 
-                        data.name, 
-                        data.description,
-                        data.is_visible
+            async with self.db.transaction() as tx:
+                query = """
+                    INSERT INTO app_workouts (
+                        name, 
+                        description,
+                        is_visible
                     )
-                    
-                    workout_uuid = workout_row['app_workout_uuid']
-                    
-                    exercises = []
-                    for exercise_data in data.exercises:
-                        exercise_query = """
-                            INSERT INTO app_workout_exercises (
-                                app_workout_uuid, 
-                                exercise_id, 
-                                duration, 
-                                count
-                            )
-                            VALUES ($1, $2, $3, $4)
-                            RETURNING *
-                        """
-                        
-                        exercise_row = await conn.fetchrow(
-                            exercise_query,
-                            str(workout_uuid),
-                            str(exercise_data.exercise_id),
-                            exercise_data.duration,
-                            exercise_data.count
-                        )
-                        
-                        exercises.append(AppWorkoutExercise(**exercise_row))
-                    
-                    workout = AppWorkout(**workout_row)
-                    workout.exercises = exercises
-                    
-                    return workout
+                    VALUES ($1, $2, $3)
+                    RETURNING *
+                """
+                
+                workout_row = await tx.fetchrow(
+                    query, 
+                    data.name, 
+                    data.description,
+                    data.is_visible
+                )
+                
+                workout_uuid = workout_row['app_workout_uuid']
+                
+                exercises = await self._insert_app_workout_exercises(tx, workout_uuid, data.exercises)
+                
+                workout = AppWorkout(**workout_row)
+                workout.exercises = exercises
+                
+                return workout
         except Exception as e:
             logger.error(f"Ошибка при создании пользовательской тренировки: {str(e)}")
             raise
@@ -950,64 +831,38 @@ class TrainingService:
             if not current_workout:
                 return None
             
-            # Убедимся, что подключение к БД установлено
-            if not self.db._pool:
-                await self.db.connect()
-            
-            async with self.db._pool.acquire() as conn:
-                async with conn.transaction():
-                    update_query = """
-                        UPDATE app_workouts
-                        SET name = $1, description = $2, is_visible = $3, updated_at = CURRENT_TIMESTAMP
-                        WHERE app_workout_uuid = $4
-                        RETURNING *
-                    """
-                    
-                    updated_row = await conn.fetchrow(
-                        update_query,
-                        data.name,
-                        data.description,
-                        data.is_visible,
-                        str(workout_uuid)
-                    )
-                    
-                    if not updated_row:
-                        return None
-                    
-                    delete_exercises_query = """
-                        DELETE FROM app_workout_exercises
-                        WHERE app_workout_uuid = $1
-                    """
-                    await conn.execute(delete_exercises_query, str(workout_uuid))
-                    
-                    # Добавляем новые упражнения
-                    exercises = []
-                    for exercise_data in data.exercises:
-                        exercise_query = """
-                            INSERT INTO app_workout_exercises (
-                                app_workout_uuid, 
-                                exercise_id, 
-                                duration, 
-                                count
-                            )
-                            VALUES ($1, $2, $3, $4)
-                            RETURNING *
-                        """
-                        
-                        exercise_row = await conn.fetchrow(
-                            exercise_query,
-                            str(workout_uuid),
-                            str(exercise_data.exercise_id),
-                            exercise_data.duration,
-                            exercise_data.count
-                        )
-                        
-                        exercises.append(AppWorkoutExercise(**exercise_row))
-                    
-                    workout = AppWorkout(**updated_row)
-                    workout.exercises = exercises
-                    
-                    return workout
+            async with self.db.transaction() as tx:
+                update_query = """
+                    UPDATE app_workouts
+                    SET name = $1, description = $2, is_visible = $3, updated_at = CURRENT_TIMESTAMP
+                    WHERE app_workout_uuid = $4
+                    RETURNING *
+                """
+                
+                updated_row = await tx.fetchrow(
+                    update_query,
+                    data.name,
+                    data.description,
+                    data.is_visible,
+                    str(workout_uuid)
+                )
+                
+                if not updated_row:
+                    return None
+                
+                delete_exercises_query = """
+                    DELETE FROM app_workout_exercises
+                    WHERE app_workout_uuid = $1
+                """
+                await tx.execute(delete_exercises_query, str(workout_uuid))
+                
+                # Добавляем новые упражнения
+                exercises = await self._insert_app_workout_exercises(tx, workout_uuid, data.exercises)
+                
+                workout = AppWorkout(**updated_row)
+                workout.exercises = exercises
+                
+                return workout
         except Exception as e:
             logger.error(f"Ошибка при обновлении пользовательской тренировки {workout_uuid}: {str(e)}")
             raise
@@ -1040,6 +895,38 @@ class TrainingService:
             logger.error(f"Ошибка при удалении пользовательской тренировки {workout_uuid}: {str(e)}")
             raise
     
+    async def _insert_app_workout_exercises(self, tx: Transaction, workout_uuid: Union[str, UUID],
+                                            exercises_data: List[AppWorkoutExerciseCreate]) -> List[AppWorkoutExercise]:
+        """
+        Добавляет упражнения пользовательской тренировки одним запросом
+        
+        Порядок упражнений задается временем создания, поэтому каждому следующему упражнению
+        created_at сдвигается на микросекунду: все строки вставляются в одной транзакции
+        с одинаковым CURRENT_TIMESTAMP.
+        
+        Args:
+            tx: Открытая транзакция
+            workout_uuid: UUID тренировки
+            exercises_data: Упражнения тренировки
+            
+        Returns:
+            Добавленные упражнения в порядке передачи
+        """
+        rows = await tx.insert_many(
+            "app_workout_exercises",
+            ["app_workout_uuid", "exercise_id", "duration", "count"],
+            ["uuid", "uuid", "int", "int"],
+            [
+                (str(workout_uuid), str(exercise_data.exercise_id), exercise_data.duration, exercise_data.count)
+                for exercise_data in exercises_data
+            ],
+            computed={
+                "created_at": "CURRENT_TIMESTAMP + _ord * interval '1 microsecond'",
+                "updated_at": "CURRENT_TIMESTAMP",
+            }
+        )
+        return [AppWorkoutExercise(**row) for row in rows]
+    
     async def _get_app_workout_exercises(self, workout_uuid: Optional[Union[str, UUID]]) -> List[AppWorkoutExercise]:
         """
         Получает упражнения для пользовательской тренировки
@@ -1050,32 +937,49 @@ class TrainingService:
         Returns:
             Список упражнений для тренировки с добавленным порядковым номером (order)
         """
-        try:
-            if workout_uuid is None:
-                return []
-                
-            workout_uuid_str = str(workout_uuid)
+        if workout_uuid is None:
+            return []
+        
+        exercises_by_workout = await self._get_app_workouts_exercises([workout_uuid])
+        return exercises_by_workout.get(str(workout_uuid), [])
+    
+    async def _get_app_workouts_exercises(
+        self, workout_uuids: List[Union[str, UUID]]
+    ) -> Dict[str, List[AppWorkoutExercise]]:
+        """
+        Получает упражнения сразу для нескольких пользовательских тренировок одним запросом
+        
+        Args:
+            workout_uuids: Список UUID тренировок
             
-            query = """
-                SELECT awe.*, e.title as exercise_name, e.description as exercise_description, e.gif_uuid, 
-                       mg.name as muscle_group_name, mg.id as muscle_group_id
-                FROM app_workout_exercises awe
-                JOIN exercises e ON awe.exercise_id = e.exercise_id
-                LEFT JOIN muscle_groups mg ON e.muscle_group_id = mg.id
-                WHERE awe.app_workout_uuid = $1
-                ORDER BY awe.created_at
-            """
+        Returns:
+            Словарь UUID тренировки (строка) -> список упражнений с порядковым номером (order)
+        """
+        try:
+            if not workout_uuids:
+                return {}
             
-            rows = await self.db.fetch(query, workout_uuid_str)
+            rows = await self.db.fetch_cached(
+                APP_WORKOUTS_EXERCISES_QUERY, [str(workout_uuid) for workout_uuid in workout_uuids],
+                tables=("app_workout_exercises", EXERCISES_TABLE, MUSCLE_GROUPS_TABLE)
+            )
             
-            exercises = []
-            # Добавляем порядковый номер к каждому упражнению
-            for index, row in enumerate(rows):
+            exercises_by_workout: Dict[str, List[AppWorkoutExercise]] = {}
+            # Добавляем порядковый номер к каждому упражнению в пределах тренировки
+            for row in rows:
+                exercises = exercises_by_workout.setdefault(str(row['app_workout_uuid']), [])
                 exercise = AppWorkoutExercise(**row)
-                exercise.order = index + 1
+                exercise.order = len(exercises) + 1
                 exercises.append(exercise)
             
-            return exercises
+            return exercises_by_workout
+        except DATABASE_UNAVAILABLE_ERRORS:
+            raise
         except Exception as e:
-            logger.error(f"Ошибка при получении упражнений для тренировки {workout_uuid}: {str(e)}")
-            return []
+            logger.error(f"Ошибка при получении упражнений для тренировок {workout_uuids}: {str(e)}")
+            return {}
+
+
+# Первая страница списка тренировок с сортировкой по умолчанию - самый частый запрос сервиса
+hot_statement(TrainingService._app_workouts_page_query(APP_WORKOUTS_DEFAULT_ORDER, after_cursor=False, limited=True))
+hot_statement(TrainingService._app_workouts_page_query(APP_WORKOUTS_DEFAULT_ORDER, after_cursor=False, limited=False))
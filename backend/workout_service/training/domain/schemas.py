@@ -288,6 +288,24 @@ class UserActivity(BaseModel):
         from_attributes = True
 
 
+class ExerciseSessionHistory(BaseModel):
+    exercise_session_uuid: UUID
+    workout_session_uuid: UUID
+    workout_started_at: datetime
+    exercise_uuid: UUID
+    status: str
+    datetime_start: Optional[datetime] = None
+    datetime_end: Optional[datetime] = None
+    duration: Optional[int] = None
+    user_duration: Optional[int] = None
+    count: Optional[int] = None
+    user_count: Optional[int] = None
+    archived: bool = False  # сессия прочитана из архива (training/infrastructure/archive.py)
+
+    class Config:
+        from_attributes = True
+
+
 class UserActivityRequest(BaseModel):
     start_date: date
     end_date: date
@@ -1,4 +1,6 @@
 import jwt
+import json
+import base64
 import logging
 from fastapi import Request, HTTPException, status
 from training.domain.schemas import TokenPayload
@@ -127,3 +129,41 @@ def is_admin_or_trainer(request: Request) -> bool:
     logger.info(f"ОТЛАДКА - Результат проверки: is_admin={is_admin_result}, is_trainer={is_trainer_result}")
     
     return is_admin_result or is_trainer_result
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    """
+    Кодирует позицию постраничной выборки в непрозрачный курсор
+    
+    Args:
+        payload: Данные позиции (сортировка, значение ключа сортировки, UUID последней записи)
+        
+    Returns:
+        Курсор в виде строки base64url без выравнивания
+    """
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Декодирует курсор, полученный от encode_cursor
+    
+    Args:
+        cursor: Курсор из параметра запроса
+        
+    Returns:
+        Данные позиции постраничной выборки
+        
+    Raises:
+        ValueError: если курсор поврежден или имеет неверный формат
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw.decode("utf-8"))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Некорректный курсор пагинации: {str(e)}")
+    
+    if not isinstance(payload, dict):
+        raise ValueError("Некорректный курсор пагинации")
+    return payload
@@ -0,0 +1,281 @@
+"""
+Архив старых сессий упражнений в сжатых файлах по столбцам.
+
+Завершенные сессии упражнений, тренировка которых началась раньше, чем EXERCISE_ARCHIVE_AFTER_DAYS
+дней назад, переносятся из user_exercise_sessions в файлы EXERCISE_ARCHIVE_DIR/<user_id>/<ГГГГ_ММ>.zip:
+по файлу на пользователя и месяц начала тренировки. Файл - zip-архив (deflate) с отдельным элементом
+для каждого столбца: UUID - по 16 байт, время и целые числа - int64 (время - микросекунды от начала
+эпохи, NULL - наименьшее значение int64), строки - через перевод строки; meta.json содержит версию
+формата, столбцы и число строк. Значения одного столбца сжимаются лучше строк таблицы, а история
+пользователя за месяц читается одним файлом.
+
+Файл записывается до удаления строк из таблицы, в транзакции, которая держит эти строки:
+если перенос прервется после записи файла, строки останутся и в таблице, и в архиве, а при чтении
+(ActivityService.get_exercise_sessions) строка таблицы заменяет архивную.
+
+Каталог архива должен быть общим для всех экземпляров сервиса. Архивировать нужно раньше,
+чем секции сессий отсоединяются (DB_PARTITION_RETENTION_MONTHS).
+
+Запуск из каталога backend/workout_service (например, раз в сутки по расписанию):
+    python -m training.infrastructure.archive [--older-than-days N] [--dry-run]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import zipfile
+from array import array
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+import asyncpg
+
+from config import settings
+from training.infrastructure.migrations import schema_databases
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMAT_VERSION = 1
+
+# Столбцы архива и их типы; user_id задается каталогом файла
+ARCHIVE_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("exercise_session_uuid", "uuid"),
+    ("workout_session_uuid", "uuid"),
+    ("workout_started_at", "timestamptz"),
+    ("exercise_uuid", "uuid"),
+    ("status", "text"),
+    ("datetime_start", "timestamptz"),
+    ("datetime_end", "timestamptz"),
+    ("duration", "int"),
+    ("user_duration", "int"),
+    ("count", "int"),
+    ("user_count", "int"),
+    ("created_at", "timestamp"),
+    ("updated_at", "timestamp"),
+)
+ARCHIVE_COLUMN_NAMES = tuple(name for name, _ in ARCHIVE_COLUMNS)
+
+_NULL = -2 ** 63
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_TZ = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Пользователи и месяцы, у которых есть сессии для переноса
+ARCHIVE_CANDIDATES_QUERY = """
+    SELECT user_id, date_trunc('month', workout_started_at)::date AS month, COUNT(*) AS sessions
+    FROM user_exercise_sessions
+    WHERE status = 'ended' AND datetime_end IS NOT NULL AND workout_started_at < $1
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+"""
+
+ARCHIVE_ROWS_QUERY = f"""
+    SELECT {', '.join(ARCHIVE_COLUMN_NAMES)}
+    FROM user_exercise_sessions
+    WHERE user_id = $1
+        AND workout_started_at >= $2::date AND workout_started_at < ($2::date + INTERVAL '1 month')
+        AND workout_started_at < $3
+        AND status = 'ended' AND datetime_end IS NOT NULL
+    FOR UPDATE
+"""
+
+DELETE_ARCHIVED_QUERY = """
+    DELETE FROM user_exercise_sessions e
+    USING unnest($1::uuid[], $2::timestamptz[]) AS archived(exercise_session_uuid, workout_started_at)
+    WHERE e.exercise_session_uuid = archived.exercise_session_uuid
+        AND e.workout_started_at = archived.workout_started_at
+"""
+
+
+def _int64(values: List[int]) -> bytes:
+    column = array("q", values)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column.tobytes()
+
+
+def _from_int64(data: bytes) -> List[int]:
+    column = array("q")
+    column.frombytes(data)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column.tolist()
+
+
+def encode_column(kind: str, values: List[Any]) -> bytes:
+    """
+    Кодирует значения столбца архива
+    """
+    if kind == "uuid":
+        return b"".join(value.bytes if value is not None else bytes(16) for value in values)
+    if kind == "text":
+        return "\n".join(value or "" for value in values).encode("utf-8")
+    if kind == "int":
+        return _int64([_NULL if value is None else value for value in values])
+    epoch = _EPOCH_TZ if kind == "timestamptz" else _EPOCH
+    return _int64([_NULL if value is None else (value - epoch) // _MICROSECOND for value in values])
+
+
+def decode_column(kind: str, data: bytes, rows: int) -> List[Any]:
+    """
+    Декодирует значения столбца архива
+    """
+    if kind == "uuid":
+        values = [data[index * 16:(index + 1) * 16] for index in range(rows)]
+        return [UUID(bytes=value) if any(value) else None for value in values]
+    if kind == "text":
+        return data.decode("utf-8").split("\n") if rows else []
+    if kind == "int":
+        return [None if value == _NULL else value for value in _from_int64(data)]
+    epoch = _EPOCH_TZ if kind == "timestamptz" else _EPOCH
+    return [None if value == _NULL else epoch + value * _MICROSECOND for value in _from_int64(data)]
+
+
+class ExerciseArchive:
+    """
+    Файлы архива сессий упражнений по пользователям и месяцам
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def path(self, user_id: int, month: date) -> Path:
+        return self.root / str(user_id) / f"{month:%Y_%m}.zip"
+
+    def read_month(self, user_id: int, month: date) -> List[Dict[str, Any]]:
+        """
+        Читает сессии пользователя за месяц (пустой список, если файла нет)
+        """
+        path = self.path(user_id, month)
+        if not path.exists():
+            return []
+        with zipfile.ZipFile(path) as archive:
+            meta = json.loads(archive.read("meta.json"))
+            columns = {
+                name: decode_column(kind, archive.read(name), meta["rows"])
+                for name, kind in meta["columns"]
+            }
+        return [
+            {"user_id": user_id, **{name: values[index] for name, values in columns.items()}}
+            for index in range(meta["rows"])
+        ]
+
+    def write_month(self, user_id: int, month: date, rows: List[Dict[str, Any]]) -> int:
+        """
+        Добавляет сессии в файл пользователя за месяц. Строки с уже архивированным
+        exercise_session_uuid заменяются. Файл заменяется целиком после записи на диск,
+        поэтому при сбое остается прежний файл.
+
+        Returns:
+            Число строк в файле
+        """
+        merged = {row["exercise_session_uuid"]: row for row in self.read_month(user_id, month)}
+        merged.update((row["exercise_session_uuid"], row) for row in rows)
+        ordered = sorted(merged.values(), key=lambda row: (row["workout_started_at"], row["exercise_session_uuid"]))
+
+        path = self.path(user_id, month)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                with zipfile.ZipFile(file, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+                    archive.writestr("meta.json", json.dumps({
+                        "version": ARCHIVE_FORMAT_VERSION, "rows": len(ordered), "columns": ARCHIVE_COLUMNS,
+                    }))
+                    for name, kind in ARCHIVE_COLUMNS:
+                        archive.writestr(name, encode_column(kind, [row[name] for row in ordered]))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        return len(ordered)
+
+    def read_range(self, user_id: int, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """
+        Читает сессии пользователя, тренировка которых началась в интервале [start, end)
+        """
+        # Месяц файла определен в часовом поясе сервера БД, поэтому читаются и соседние месяцы
+        month = date(start.year, start.month, 1) - timedelta(days=1)
+        month = month.replace(day=1)
+        rows = []
+        while month <= end.date():
+            rows.extend(
+                row for row in self.read_month(user_id, month)
+                if start <= row["workout_started_at"] < end
+            )
+            month = (month + timedelta(days=32)).replace(day=1)
+        return rows
+
+
+async def archive_user_month(connection: asyncpg.Connection, archive: ExerciseArchive, user_id: int,
+                             month: date, cutoff: datetime) -> int:
+    """
+    Переносит завершенные сессии пользователя за месяц в архив
+
+    Args:
+        connection: Соединение с сервером, на котором хранятся сессии пользователя
+        archive: Архив
+        user_id: ID пользователя
+        month: Месяц начала тренировок
+        cutoff: Переносятся сессии тренировок, начатых раньше этого времени
+
+    Returns:
+        Число перенесенных сессий
+    """
+    async with connection.transaction():
+        rows = [dict(row) for row in await connection.fetch(ARCHIVE_ROWS_QUERY, user_id, month, cutoff)]
+        if not rows:
+            return 0
+        await asyncio.to_thread(archive.write_month, user_id, month, rows)
+        await connection.execute(
+            DELETE_ARCHIVED_QUERY,
+            [row["exercise_session_uuid"] for row in rows],
+            [row["workout_started_at"] for row in rows],
+        )
+    return len(rows)
+
+
+async def archive_sessions(older_than_days: Optional[int] = None, dry_run: bool = False) -> int:
+    """
+    Переносит старые сессии упражнений в архив на основном сервере и на шардах
+
+    Args:
+        older_than_days: Возраст тренировки в днях (по умолчанию EXERCISE_ARCHIVE_AFTER_DAYS)
+        dry_run: Только вывести число сессий для переноса
+
+    Returns:
+        Число перенесенных сессий
+    """
+    days = settings.EXERCISE_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    archive = ExerciseArchive(settings.EXERCISE_ARCHIVE_DIR)
+    archived = 0
+    for label, options in schema_databases():
+        connection = await asyncpg.connect(**options)
+        try:
+            candidates = await connection.fetch(ARCHIVE_CANDIDATES_QUERY, cutoff)
+            logger.info(f"Сессий для переноса ({label}): {sum(row['sessions'] for row in candidates)}")
+            if dry_run:
+                continue
+            for row in candidates:
+                archived += await archive_user_month(connection, archive, row["user_id"], row["month"], cutoff)
+        finally:
+            await connection.close()
+    logger.info(f"Перенесено сессий упражнений в архив: {archived}")
+    return archived
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--older-than-days", type=int, default=None, help="Возраст тренировки в днях")
+    parser.add_argument("--dry-run", action="store_true", help="Только вывести число сессий для переноса")
+    args = parser.parse_args()
+    asyncio.run(archive_sessions(args.older_than_days, args.dry_run))
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable, List, Optional, TypeVar
+
+from training.infrastructure.pool_stats import PoolStats
+from config import settings
+
+T = TypeVar("T")
+
+# Классы маршрутов, для которых задается допустимое время ожидания соединения
+DEFAULT_ROUTE_CLASS = "default"
+INTERACTIVE_ROUTE_CLASS = "interactive"
+WRITE_ROUTE_CLASS = "write"
+ADMIN_ROUTE_CLASS = "admin"
+
+
+class PoolExhaustedError(Exception):
+    """
+    Соединение не получено из пула за допустимое для класса маршрута время
+    или очередь ожидания соединения переполнена. Отвечается 503 с Retry-After.
+    """
+
+    def __init__(self, route_class: str, reason: str):
+        super().__init__(f"Пул соединений с БД перегружен ({reason}), класс маршрута: {route_class}")
+        self.route_class = route_class
+        self.retry_after = settings.DB_RETRY_AFTER
+
+
+def acquire_timeout(route_class: str, limit: Optional[float] = None) -> float:
+    """
+    Возвращает допустимое время ожидания соединения для класса маршрута
+
+    Args:
+        route_class: Класс маршрута
+        limit: Дополнительное ограничение (например, остаток бюджета запроса)
+
+    Returns:
+        Время ожидания в секундах
+    """
+    timeouts = {
+        INTERACTIVE_ROUTE_CLASS: settings.DB_ACQUIRE_TIMEOUT_INTERACTIVE,
+        WRITE_ROUTE_CLASS: settings.DB_ACQUIRE_TIMEOUT_WRITE,
+        ADMIN_ROUTE_CLASS: settings.DB_ACQUIRE_TIMEOUT_ADMIN,
+    }
+    timeout = timeouts.get(route_class, settings.DB_ACQUIRE_TIMEOUT)
+    return min(timeout, limit) if limit is not None else timeout
+
+
+async def wait_for_connection(acquire: Callable[[], Awaitable[T]], stats: PoolStats,
+                              route_class: str, timeout: float) -> T:
+    """
+    Ожидает соединение из пула с учетом очереди ожидания в статистике пула.
+
+    Если в очереди уже DB_ACQUIRE_MAX_WAITING запросов, отказ возвращается сразу,
+    не дожидаясь истечения времени ожидания.
+
+    Args:
+        acquire: Функция, начинающая получение соединения (вызывается с уже заданным timeout)
+        stats: Статистика пула
+        route_class: Класс маршрута
+        timeout: Время ожидания, переданное пулу (см. acquire_timeout)
+
+    Returns:
+        Полученное соединение
+
+    Raises:
+        PoolExhaustedError: Если очередь переполнена или время ожидания истекло
+    """
+    max_waiting = settings.DB_ACQUIRE_MAX_WAITING
+    if max_waiting is not None and stats.waiting >= max_waiting:
+        stats.record_rejected(route_class)
+        raise PoolExhaustedError(route_class, f"в очереди {stats.waiting} запросов")
+
+    stats.queue_enter()
+    started = time.perf_counter()
+    try:
+        connection = await acquire()
+    except asyncio.TimeoutError:
+        stats.record_rejected(route_class)
+        raise PoolExhaustedError(route_class, f"соединение не получено за {timeout:g} с") from None
+    finally:
+        stats.queue_exit()
+    stats.record_acquire(time.perf_counter() - started)
+    return connection
+
+
+def overloaded_messages(error: PoolExhaustedError) -> List[dict]:
+    """
+    Формирует ASGI-сообщения ответа 503 с заголовком Retry-After
+
+    Args:
+        error: Отказ в соединении
+
+    Returns:
+        Сообщения http.response.start и http.response.body
+    """
+    body = json.dumps({"detail": "Сервис перегружен, повторите запрос позже"}, ensure_ascii=False).encode()
+    return [
+        {
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(error.retry_after).encode()),
+            ],
+        },
+        {"type": "http.response.body", "body": body},
+    ]
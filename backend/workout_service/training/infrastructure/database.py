@@ -1,19 +1,290 @@
+import asyncio
 import logging
-from typing import Dict, List, Any, Optional
+import random
+import re
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from functools import lru_cache, partial
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Any, Optional, Set, Tuple, TypeVar, Union
 import asyncpg
 from asyncpg.pool import Pool
 from training.domain.db_constants import *
+from training.infrastructure.backpressure import (
+    DEFAULT_ROUTE_CLASS, PoolExhaustedError, acquire_timeout, wait_for_connection
+)
+from training.infrastructure.hot_statements import hot_statements, prepare_hot_statements
+from training.infrastructure.pool_stats import PoolStats
+from training.infrastructure.pools import DEFAULT_POOL, NAMED_POOLS, current_pool_name, named_pool_config
+from training.infrastructure.query_cache import QueryCache, written_tables
+from training.infrastructure.query_stats import QueryStats, QueryTimer
+from training.infrastructure.sharding import ShardRing, current_shard_key, parse_shard_dsns
+from training.infrastructure.statements import update_statements
+from training.infrastructure.records import Row
+from training.infrastructure.request_scope import (
+    PRIMARY, REPLICA, RequestScope, get_request_scope, query_timeout, run_in_scope
+)
 from config import settings
 
 # Настройка логгера
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Ошибки, после которых транзакцию можно безопасно повторить целиком
+RETRYABLE_TRANSACTION_ERRORS = (
+    asyncpg.exceptions.SerializationError,
+    asyncpg.exceptions.DeadlockDetectedError,
+)
+
+# Ошибки обращения к БД, на которые main.py отвечает 504 (исчерпан бюджет времени запроса
+# или запрос отменен по statement_timeout) и 503 (пул соединений перегружен): маршруты
+# и сервисы пропускают их дальше, а не заменяют ответом 500 или пустым результатом
+DATABASE_UNAVAILABLE_ERRORS = (asyncio.TimeoutError, asyncpg.exceptions.QueryCanceledError, PoolExhaustedError)
+
+_READ_QUERY_START = re.compile(r"^\s*(SELECT|WITH|VALUES|TABLE|SHOW)\b", re.IGNORECASE)
+_WRITE_KEYWORDS = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|SHARE|nextval|setval|pg_advisory_\w+)\b", re.IGNORECASE
+)
+
+
+@lru_cache(maxsize=1024)
+def is_read_only_query(query: str) -> bool:
+    """
+    Проверяет, что запрос только читает данные и может быть выполнен на реплике.
+    
+    Проверка консервативная: запросы с INSERT/UPDATE/DELETE (в том числе RETURNING
+    и CTE с изменением данных), блокировками строк FOR UPDATE/SHARE и последовательностями
+    считаются записью и выполняются на основном сервере.
+    
+    Args:
+        query: SQL-запрос
+        
+    Returns:
+        True, если запрос можно выполнить на реплике
+    """
+    return bool(_READ_QUERY_START.match(query)) and not _WRITE_KEYWORDS.search(query)
+
+
+def build_insert_many_query(table: str, columns: List[str], column_types: List[str],
+                            computed: Optional[Dict[str, str]] = None, returning: Optional[str] = "*") -> str:
+    """
+    Формирует многострочный INSERT ... SELECT FROM unnest(...), вставляющий все строки одним запросом.
+    
+    Значения каждого столбца передаются одним массивом ($1 - первый столбец, $2 - второй и т.д.).
+    Строки вставляются в порядке передачи; номер строки (с 1) доступен в выражениях computed как _ord.
+    
+    Args:
+        table: Имя таблицы
+        columns: Столбцы, значения которых передаются массивами
+        column_types: Типы PostgreSQL этих столбцов (например, "uuid", "int")
+        computed: Дополнительные столбцы, значения которых вычисляются SQL-выражениями
+        returning: Выражение RETURNING (None - без RETURNING)
+        
+    Returns:
+        Текст SQL-запроса
+    """
+    if len(columns) != len(column_types):
+        raise ValueError("Количество столбцов и типов должно совпадать")
+    computed = computed or {}
+    arrays = ", ".join(f"${index}::{column_type}[]" for index, column_type in enumerate(column_types, start=1))
+    query = f"""
+        INSERT INTO {table} ({", ".join([*columns, *computed])})
+        SELECT {", ".join([*columns, *computed.values()])}
+        FROM unnest({arrays}) WITH ORDINALITY AS _rows({", ".join(columns)}, _ord)
+        ORDER BY _ord
+    """
+    if returning:
+        query += f"RETURNING {returning}"
+    return query
+
+
+def _columns_to_arrays(rows: List[Any], width: int) -> List[List[Any]]:
+    arrays: List[List[Any]] = [[] for _ in range(width)]
+    for row in rows:
+        if len(row) != width:
+            raise ValueError("Количество значений в строке не совпадает с количеством столбцов")
+        for index, value in enumerate(row):
+            arrays[index].append(value)
+    return arrays
+
+
+def _with_budget(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Ограничивает время выполнения запроса остатком бюджета HTTP-запроса (см. RequestScope).
+    По истечении времени asyncpg отменяет запрос на сервере и возбуждает asyncio.TimeoutError.
+    """
+    timeout = query_timeout()
+    if timeout is not None:
+        kwargs["timeout"] = min(kwargs.get("timeout") or timeout, timeout)
+    return kwargs
+
+
+class Transaction:
+    """
+    Открытая транзакция на соединении из пула.
+    
+    Методы execute/fetch/fetchrow/fetchval повторяют методы Database, но выполняются
+    на соединении транзакции. Время выполнения запросов учитывается в статистике запросов,
+    а измененные таблицы - в written_tables (кэш запросов по ним сбрасывается после фиксации).
+    """
+
+    def __init__(self, connection: asyncpg.Connection, query_stats: Optional[QueryStats] = None,
+                 written_tables: Optional[Set[str]] = None):
+        self.connection = connection
+        self.query_stats = query_stats
+        self.written_tables = written_tables
+
+    def _measure(self, query: str) -> QueryTimer:
+        on_success = None
+        if self.written_tables is not None:
+            on_success = partial(self.written_tables.update, written_tables(query))
+        return QueryTimer(self.query_stats, query, on_success)
+
+    async def execute(self, query: str, *args, **kwargs) -> str:
+        """
+        Выполняет SQL-запрос, который не возвращает результатов.
+        """
+        with self._measure(query):
+            return await self.connection.execute(query, *args, **_with_budget(kwargs))
+
+    async def executemany(self, query: str, args: List[Any], **kwargs) -> None:
+        """
+        Выполняет SQL-запрос для каждого набора аргументов.
+        """
+        with self._measure(query):
+            await self.connection.executemany(query, args, **_with_budget(kwargs))
+
+    async def fetch(self, query: str, *args, records: bool = False,
+                    **kwargs) -> List[Union[Dict[str, Any], Row]]:
+        """
+        Выполняет SQL-запрос и возвращает список результатов (records=True - строки Row без копирования в словари).
+        """
+        with self._measure(query) as timer:
+            if records:
+                kwargs["record_class"] = Row
+            rows = await self.connection.fetch(query, *args, **_with_budget(kwargs))
+            timer.rows = len(rows)
+        return rows if records else [dict(row) for row in rows]
+
+    async def fetchrow(self, query: str, *args, records: bool = False,
+                       **kwargs) -> Optional[Union[Dict[str, Any], Row]]:
+        """
+        Выполняет SQL-запрос и возвращает первую строку результата (records=True - строку Row).
+        """
+        with self._measure(query) as timer:
+            if records:
+                kwargs["record_class"] = Row
+            row = await self.connection.fetchrow(query, *args, **_with_budget(kwargs))
+            timer.rows = 1 if row else 0
+        if records:
+            return row
+        return dict(row) if row else None
+
+    async def fetchval(self, query: str, *args, **kwargs) -> Any:
+        """
+        Выполняет SQL-запрос и возвращает одно значение.
+        """
+        with self._measure(query) as timer:
+            value = await self.connection.fetchval(query, *args, **_with_budget(kwargs))
+            timer.rows = 1
+        return value
+
+    async def insert_many(self, table: str, columns: List[str], column_types: List[str],
+                          rows: List[Any], computed: Optional[Dict[str, str]] = None,
+                          returning: Optional[str] = "*") -> List[Dict[str, Any]]:
+        """
+        Вставляет строки одним запросом INSERT ... SELECT FROM unnest(...) (см. build_insert_many_query).
+        
+        Args:
+            table: Имя таблицы
+            columns: Столбцы, значения которых передаются
+            column_types: Типы PostgreSQL этих столбцов
+            rows: Значения строк в порядке столбцов
+            computed: Дополнительные столбцы, вычисляемые SQL-выражениями (номер строки - _ord)
+            returning: Выражение RETURNING (None - без RETURNING)
+            
+        Returns:
+            Вставленные строки в порядке передачи (пустой список без RETURNING)
+        """
+        if not rows:
+            return []
+        query = build_insert_many_query(table, columns, column_types, computed, returning)
+        arrays = _columns_to_arrays(rows, len(columns))
+        if not returning:
+            await self.execute(query, *arrays)
+            return []
+        return await self.fetch(query, *arrays)
+
+    async def copy_records(self, table: str, columns: List[str], rows: List[Any]) -> str:
+        """
+        Загружает строки в таблицу через COPY. Самый быстрый способ вставки большого
+        количества строк, но без RETURNING и без вычисляемых выражений.
+        
+        Args:
+            table: Имя таблицы
+            columns: Столбцы, значения которых передаются
+            rows: Значения строк в порядке столбцов
+            
+        Returns:
+            Статус выполнения COPY
+        """
+        with self._measure(f"COPY {table} ({', '.join(columns)})") as timer:
+            timer.rows = len(rows)
+            return await self.connection.copy_records_to_table(table, records=rows, columns=columns,
+                                                               **_with_budget({}))
+
+    @asynccontextmanager
+    async def savepoint(self) -> AsyncIterator["Transaction"]:
+        """
+        Открывает точку сохранения: при ошибке внутри блока откатываются только его изменения,
+        а транзакция остается открытой.
+        
+        Returns:
+            Асинхронный контекстный менеджер, возвращающий эту же транзакцию
+        """
+        async with self.connection.transaction():
+            yield self
+
+
+class PoolerConnection(asyncpg.Connection):
+    """
+    Соединение через пулер транзакций (PgBouncer с pool_mode=transaction).
+    
+    Серверное соединение закрепляется за клиентом только на время транзакции, поэтому
+    состояние сеанса на нем не сохраняется: при возврате в пул не выполняется сброс сеанса
+    (RESET ALL и т.п. ушли бы на случайное серверное соединение), а statement_timeout
+    задается для каждой транзакции через SET LOCAL.
+    """
+    
+    # statement_timeout пула в секундах, задается хуком init
+    statement_timeout: Optional[float] = None
+    
+    def _get_reset_query(self) -> str:
+        return ""
+
+
 class Database:
     """
     Класс для асинхронной работы с базой данных PostgreSQL
     """
     _instance = None
     _pool: Optional[Pool] = None
+    _stats: PoolStats = PoolStats()
+    # Именованные пулы основного сервера (realtime, analytics) помимо пула по умолчанию
+    _named_pools: Dict[str, Pool] = {}
+    _named_stats: Dict[str, PoolStats] = {}
+    _query_stats: QueryStats = QueryStats()
+    _query_cache: QueryCache = QueryCache()
+    # Таблицы, измененные в открытых транзакциях (по id соединения)
+    _transaction_tables: Dict[int, Set[str]] = {}
+    _replica_pools: List[Pool] = []
+    _replica_stats: List[PoolStats] = []
+    _replica_index = 0
+    # Шарды данных пользователей (см. sharding.py): пулы по именам шардов и кольцо хеширования
+    _shard_pools: Dict[str, Pool] = {}
+    _shard_stats: Dict[str, PoolStats] = {}
+    _shard_ring: Optional[ShardRing] = None
+    _ready = False
 
     def __new__(cls):
         if cls._instance is None:
@@ -23,8 +294,12 @@ class Database:
     async def connect(self) -> None:
         """
         Создает пул соединений с базой данных.
+        
+        Частые запросы (см. hot_statement) подготавливаются на каждом соединении пула
+        при его открытии; после создания всех пулов сервис считается готовым (is_ready).
         """
         if self._pool is None:
+            started = time.perf_counter()
             try:
                 logger.info("Подключение к базе данных...")
                 self._pool = await asyncpg.create_pool(
@@ -32,17 +307,665 @@ class Database:
                     password=settings.DB_PASSWORD,
                     host=settings.DB_HOST,
                     port=settings.DB_PORT,
-                    database=settings.DB_NAME
+                    database=settings.DB_NAME,
+                    **self._pool_options()
                 )
                 logger.info("Подключение к базе данных успешно установлено.")
             except Exception as e:
                 logger.error(f"Ошибка при подключении к базе данных: {str(e)}")
                 raise
+            if settings.DB_TRANSACTION_POOLER and (settings.DB_CONNECTION_INIT_SQL or settings.DB_CONNECTION_SETUP_SQL):
+                logger.warning(
+                    "DB_CONNECTION_INIT_SQL и DB_CONNECTION_SETUP_SQL не применяются за пулером транзакций"
+                )
+            await self._connect_named_pools()
+            await self._connect_replicas()
+            await self._connect_shards()
+            self._ready = True
+            logger.info(
+                f"База данных готова за {time.perf_counter() - started:.3f} с, "
+                f"подготовлено частых запросов: {self._stats.statements_prepared} "
+                f"на {self._stats.connections_opened} соединениях"
+            )
+
+    def is_ready(self) -> bool:
+        """
+        Проверяет, созданы ли пулы соединений и подготовлены ли частые запросы
+        """
+        return self._ready and self._pool is not None
+
+    async def _connect_named_pools(self) -> None:
+        """
+        Создает именованные пулы соединений с основным сервером (см. named_pool_config).
+        Если пул отключен или не создан, его запросы выполняются в пуле по умолчанию.
+        """
+        pools, stats = {}, {}
+        for name in NAMED_POOLS:
+            if named_pool_config(name) is None:
+                continue
+            pool_stats = PoolStats()
+            try:
+                pools[name] = await asyncpg.create_pool(
+                    user=settings.DB_USER,
+                    password=settings.DB_PASSWORD,
+                    host=settings.DB_HOST,
+                    port=settings.DB_PORT,
+                    database=settings.DB_NAME,
+                    **self._pool_options(pool_stats, name)
+                )
+                stats[name] = pool_stats
+                logger.info(f"Пул соединений {name} создан.")
+            except Exception as e:
+                logger.error(f"Ошибка при создании пула соединений {name}: {str(e)}")
+        self._named_pools = pools
+        self._named_stats = stats
+
+    async def _connect_replicas(self) -> None:
+        """
+        Создает пулы соединений с репликами из DB_REPLICA_DSNS.
+        Недоступная реплика пропускается: чтения выполняются на остальных репликах или на основном сервере.
+        """
+        pools, stats = [], []
+        for index, dsn in enumerate(self._replica_dsns(), start=1):
+            replica_stats = PoolStats()
+            try:
+                pools.append(await asyncpg.create_pool(dsn=dsn, **self._pool_options(replica_stats)))
+                stats.append(replica_stats)
+                logger.info(f"Подключение к реплике {index} успешно установлено.")
+            except Exception as e:
+                logger.error(f"Ошибка при подключении к реплике {index}: {str(e)}")
+        self._replica_pools = pools
+        self._replica_stats = stats
+
+    async def _connect_shards(self) -> None:
+        """
+        Создает пулы соединений с шардами данных пользователей из DB_SHARD_DSNS.
+        В отличие от реплики, недоступный шард не пропускается: данные его пользователей
+        больше нигде не хранятся, поэтому сервис не запускается.
+        """
+        shards = parse_shard_dsns(settings.DB_SHARD_DSNS)
+        pools, stats = {}, {}
+        for name, dsn in shards.items():
+            shard_stats = PoolStats()
+            try:
+                pools[name] = await asyncpg.create_pool(dsn=dsn, **self._pool_options(shard_stats))
+            except Exception as e:
+                logger.error(f"Ошибка при подключении к шарду {name}: {str(e)}")
+                for pool in pools.values():
+                    await pool.close()
+                raise
+            stats[name] = shard_stats
+            logger.info(f"Подключение к шарду {name} успешно установлено.")
+        self._shard_pools = pools
+        self._shard_stats = stats
+        self._shard_ring = ShardRing(shards, settings.DB_SHARD_VNODES) if shards else None
+
+    @property
+    def query_cache(self) -> QueryCache:
+        """
+        Кэш результатов запросов процесса (см. fetch_cached)
+        """
+        return self._query_cache
+
+    def is_sharded(self) -> bool:
+        """
+        Проверяет, хранятся ли данные пользователей на шардах
+        """
+        return self._shard_ring is not None
+
+    def _replica_dsns(self) -> List[str]:
+        """
+        Возвращает список DSN реплик из настроек приложения
+        """
+        return [dsn.strip() for dsn in (settings.DB_REPLICA_DSNS or "").split(",") if dsn.strip()]
+
+    def _pool_options(self, stats: Optional[PoolStats] = None, name: str = DEFAULT_POOL) -> Dict[str, Any]:
+        """
+        Формирует параметры пула соединений из настроек приложения.
+        
+        Args:
+            stats: Статистика пула (None - статистика основного сервера)
+            name: Имя пула: размеры и statement_timeout именованных пулов задаются отдельно
+            
+        Returns:
+            Именованные аргументы для asyncpg.create_pool
+        """
+        min_size, max_size, statement_timeout = (
+            named_pool_config(name) or (settings.DB_POOL_MIN_SIZE, settings.DB_POOL_MAX_SIZE,
+                                        settings.DB_STATEMENT_TIMEOUT)
+        )
+        options = {
+            "min_size": min_size,
+            "max_size": max_size,
+            "max_queries": settings.DB_POOL_MAX_QUERIES,
+            "max_inactive_connection_lifetime": settings.DB_POOL_MAX_INACTIVE_CONNECTION_LIFETIME,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "command_timeout": settings.DB_COMMAND_TIMEOUT,
+            "init": partial(self._init_connection, stats=stats) if stats else self._init_connection,
+        }
+        if settings.DB_TRANSACTION_POOLER:
+            # Именованные подготовленные запросы живут на серверном соединении, которое пулер
+            # отдает другим клиентам после транзакции; без кэша asyncpg использует безымянные
+            # запросы. statement_timeout задается в транзакциях, а не в параметрах сеанса
+            options["statement_cache_size"] = 0
+            options["connection_class"] = PoolerConnection
+            options["init"] = partial(self._init_connection, stats=stats, statement_timeout=statement_timeout)
+            statement_timeout = None
+        server_settings = {}
+        if settings.DB_APPLICATION_NAME:
+            server_settings["application_name"] = settings.DB_APPLICATION_NAME
+        if statement_timeout:
+            # Предел на сервере для запросов вне бюджета HTTP-запроса и на случай, когда
+            # отмена от клиента не дошла до сервера
+            server_settings["statement_timeout"] = str(int(statement_timeout * 1000))
+        if server_settings:
+            options["server_settings"] = server_settings
+        if settings.DB_CONNECTION_SETUP_SQL and not settings.DB_TRANSACTION_POOLER:
+            options["setup"] = self._setup_connection
+        return options
+
+    async def _init_connection(self, connection: asyncpg.Connection, stats: Optional[PoolStats] = None,
+                               statement_timeout: Optional[float] = None) -> None:
+        """
+        Хук пула, вызываемый один раз для каждого нового физического соединения.
+        
+        За пулером транзакций настройки сеанса и подготовленные запросы не сохраняются,
+        поэтому DB_CONNECTION_INIT_SQL и прогрев запросов пропускаются.
+        
+        Args:
+            connection: Новое соединение
+            stats: Статистика пула (None - статистика основного сервера)
+            statement_timeout: statement_timeout транзакций за пулером транзакций в секундах
+        """
+        stats = stats or self._stats
+        stats.record_connection_opened()
+        if settings.DB_TRANSACTION_POOLER:
+            connection.statement_timeout = statement_timeout
+            return
+        if settings.DB_CONNECTION_INIT_SQL:
+            await connection.execute(settings.DB_CONNECTION_INIT_SQL)
+        if settings.DB_WARMUP_STATEMENTS and settings.DB_STATEMENT_CACHE_SIZE and hot_statements():
+            started = time.perf_counter()
+            prepared = await prepare_hot_statements(connection)
+            stats.record_warmup(time.perf_counter() - started, prepared)
+
+    async def _setup_connection(self, connection: asyncpg.Connection) -> None:
+        """
+        Хук пула, вызываемый при каждой выдаче соединения из пула.
+        Подключается только если задан DB_CONNECTION_SETUP_SQL, так как добавляет запрос на каждую выдачу.
+        
+        Args:
+            connection: Выдаваемое соединение
+        """
+        await connection.execute(settings.DB_CONNECTION_SETUP_SQL)
+
+    @asynccontextmanager
+    async def acquire(self, readonly: bool = False, primary: bool = False) -> AsyncIterator[asyncpg.Connection]:
+        """
+        Получает соединение из пула с учетом времени ожидания в статистике пула.
+        Ожидание ограничено временем для класса маршрута (см. acquire_timeout), после
+        которого возбуждается PoolExhaustedError.
+        
+        Чтения (readonly=True) при наличии реплик выполняются на реплике, запись -
+        на основном сервере. Внутри HTTP-запроса (см. RequestScopeMiddleware) возвращаются
+        соединения запроса: они берутся из пулов при первом обращении и переиспользуются
+        всеми последующими запросами к БД до конца HTTP-запроса. После записи чтения
+        запроса выполняются на основном сервере.
+        
+        Запросы к основному серверу выполняются в пуле, выбранном через use_pool или
+        маршрутом (db_route(..., pool=...)); по умолчанию - в пуле по умолчанию.
+        
+        Внутри use_shard(user_id) при заданных шардах все обращения (и чтение, и запись)
+        выполняются на шарде пользователя; у шардов нет реплик.
+        
+        Args:
+            readonly: Соединение нужно только для чтения
+            primary: Читать с основного сервера, даже если есть реплики
+            
+        Returns:
+            Асинхронный контекстный менеджер, возвращающий соединение
+        """
+        if not self._pool:
+            await self.connect()
+        
+        scope = get_request_scope()
+        shard = self._user_shard()
+        use_replica = (shard is None and readonly and not primary and bool(self._replica_pools)
+                       and not (scope and scope.pinned_to_primary))
+        pool_name = current_pool_name() or (scope.pool_name if scope else DEFAULT_POOL)
+        if scope is None:
+            if shard is not None:
+                pool, stats = shard[1:]
+            else:
+                pool, stats = self._next_replica() if use_replica else self._named_pool(pool_name)
+            if readonly:
+                self._stats.record_read(use_replica)
+            timeout = acquire_timeout(DEFAULT_ROUTE_CLASS)
+            async with AsyncExitStack() as stack:
+                connection = await wait_for_connection(
+                    partial(stack.enter_async_context, pool.acquire(timeout=timeout)),
+                    stats, DEFAULT_ROUTE_CLASS, timeout
+                )
+                yield connection
+            return
+        
+        await scope.enter()
+        try:
+            if shard is not None:
+                # Запись на шард не закрепляет чтения запроса за основным сервером
+                name, pool, stats = shard
+                connection = await self._scope_connection(scope, f"shard:{name}", pool, stats)
+            else:
+                connection = await self._scope_replica_connection(scope) if use_replica else None
+                if readonly:
+                    self._stats.record_read(connection is not None)
+                if connection is None:
+                    connection = await self._scope_connection(scope, PRIMARY, *self._named_pool(pool_name))
+                    if not readonly:
+                        scope.wrote = True
+                        scope.track_writes = bool(self._replica_pools)
+            yield connection
+        finally:
+            scope.exit()
+
+    def _named_pool(self, name: str) -> Tuple[Pool, PoolStats]:
+        """
+        Возвращает пул основного сервера по имени (пул по умолчанию, если именованный пул не создан)
+        
+        Returns:
+            Пул соединений и его статистика
+        """
+        pool = self._named_pools.get(name)
+        if pool is None:
+            return self._pool, self._stats
+        return pool, self._named_stats[name]
+
+    def _user_shard(self) -> Optional[Tuple[str, Pool, PoolStats]]:
+        """
+        Возвращает шард пользователя, выбранного через use_shard
+        
+        Returns:
+            Имя шарда, его пул и статистика или None, если обращение выполняется на основном сервере
+        """
+        user_id = current_shard_key()
+        if user_id is None or self._shard_ring is None:
+            return None
+        name = self._shard_ring.shard_for(user_id)
+        return name, self._shard_pools[name], self._shard_stats[name]
+
+    def _next_replica(self) -> Tuple[Pool, PoolStats]:
+        """
+        Выбирает реплику по кругу
+        
+        Returns:
+            Пул соединений реплики и его статистика
+        """
+        index = self._replica_index % len(self._replica_pools)
+        self._replica_index = index + 1
+        return self._replica_pools[index], self._replica_stats[index]
+
+    async def _scope_connection(self, scope: RequestScope, role: str, pool: Pool,
+                                stats: PoolStats) -> asyncpg.Connection:
+        """
+        Возвращает соединение запроса указанной роли, при необходимости беря его из пула.
+        """
+        connection = scope.connections.get(role)
+        if connection is not None and connection.is_closed():
+            await scope.release(role)
+            connection = None
+        if connection is None:
+            timeout = acquire_timeout(scope.route_class, scope.remaining())
+            try:
+                connection = await wait_for_connection(
+                    partial(pool.acquire, timeout=timeout), stats, scope.route_class, timeout
+                )
+            except PoolExhaustedError as e:
+                scope.pool_rejection = e
+                raise
+            scope.stats = self._stats
+            scope.attach(role, pool, connection)
+        return connection
+
+    async def _scope_replica_connection(self, scope: RequestScope) -> Optional[asyncpg.Connection]:
+        """
+        Возвращает соединение запроса с репликой.
+        
+        Если клиент передал позицию WAL своей последней записи (заголовок X-DB-Read-After),
+        реплика используется, только если она уже воспроизвела эту позицию. Иначе все чтения
+        запроса выполняются на основном сервере.
+        
+        Returns:
+            Соединение с репликой или None, если читать нужно с основного сервера
+        """
+        existing = scope.connections.get(REPLICA)
+        if existing is not None and not existing.is_closed():
+            return existing
+        
+        pool, stats = self._next_replica()
+        connection = await self._scope_connection(scope, REPLICA, pool, stats)
+        if scope.read_after_lsn:
+            try:
+                caught_up = await connection.fetchval(
+                    "SELECT pg_last_wal_replay_lsn() >= $1::pg_lsn", scope.read_after_lsn,
+                    timeout=scope.remaining()
+                )
+            except Exception as e:
+                logger.error(f"Ошибка при проверке отставания реплики: {str(e)}")
+                caught_up = False
+            if not caught_up:
+                await scope.release(REPLICA)
+                scope.replica_lagging = True
+                self._stats.record_replica_fallback()
+                return None
+        return connection
+
+    async def executemany(self, query: str, args: List[Any], **kwargs) -> None:
+        """
+        Выполняет SQL-запрос для каждого набора аргументов за один обмен с сервером.
+        
+        Args:
+            query: SQL-запрос
+            args: Список наборов аргументов
+        """
+        async with self.acquire() as connection:
+            try:
+                with self._measure(connection, query):
+                    await connection.executemany(query, args, **_with_budget(kwargs))
+            except Exception as e:
+                logger.error(f"Ошибка при выполнении запроса {query}: {str(e)}")
+                raise
+
+    async def insert_many(self, table: str, columns: List[str], column_types: List[str],
+                          rows: List[Any], computed: Optional[Dict[str, str]] = None,
+                          returning: Optional[str] = "*") -> List[Dict[str, Any]]:
+        """
+        Вставляет строки одним запросом (см. Transaction.insert_many).
+        
+        Returns:
+            Вставленные строки в порядке передачи
+        """
+        async with self.transaction() as tx:
+            return await tx.insert_many(table, columns, column_types, rows, computed, returning)
+
+    async def copy_records(self, table: str, columns: List[str], rows: List[Any]) -> str:
+        """
+        Загружает строки в таблицу через COPY (см. Transaction.copy_records).
+        
+        Returns:
+            Статус выполнения COPY
+        """
+        async with self.acquire() as connection:
+            tables: Set[str] = set()
+            status = await Transaction(connection, self._query_stats, tables).copy_records(table, columns, rows)
+            self._record_written_tables(connection, tables)
+            return status
+
+    @asynccontextmanager
+    async def transaction(self, isolation: Optional[str] = None, readonly: bool = False,
+                          deferrable: bool = False) -> AsyncIterator[Transaction]:
+        """
+        Открывает транзакцию: изменения фиксируются при выходе из блока и откатываются при ошибке.
+        
+        Если транзакция открывается внутри другой транзакции на том же соединении
+        (например, на соединении HTTP-запроса), вместо нее создается точка сохранения.
+        
+        Args:
+            isolation: Уровень изоляции ("read_committed", "repeatable_read" или "serializable"),
+                None - уровень по умолчанию
+            readonly: Транзакция только для чтения
+            deferrable: Отложенная транзакция (только для serializable readonly)
+            
+        Returns:
+            Асинхронный контекстный менеджер, возвращающий объект транзакции
+        """
+        # Serializable-транзакции не поддерживаются на репликах (hot standby)
+        on_replica = readonly and isolation != "serializable"
+        async with self.acquire(readonly=on_replica) as connection:
+            nested = connection.is_in_transaction()
+            # Измененные таблицы собираются до фиксации внешней транзакции: сбросить кэш раньше
+            # нельзя, иначе в него может попасть результат, прочитанный до фиксации
+            pending = self._transaction_tables.get(id(connection)) if nested else None
+            tables = pending if pending is not None else set()
+            if not nested:
+                self._transaction_tables[id(connection)] = tables
+            started = time.perf_counter()
+            committed = False
+            try:
+                if nested:
+                    async with connection.transaction():
+                        yield Transaction(connection, self._query_stats, tables)
+                else:
+                    async with connection.transaction(isolation=isolation, readonly=readonly,
+                                                      deferrable=deferrable):
+                        await self._set_transaction_timeout(connection)
+                        yield Transaction(connection, self._query_stats, tables)
+                committed = True
+                if tables is not pending:
+                    self._query_cache.invalidate(tables)
+            finally:
+                if not nested:
+                    self._transaction_tables.pop(id(connection), None)
+                    self._stats.record_transaction(time.perf_counter() - started, committed)
+
+    async def _set_transaction_timeout(self, connection: asyncpg.Connection) -> None:
+        """
+        За пулером транзакций задает statement_timeout пула для открытой транзакции
+        """
+        if not settings.DB_TRANSACTION_POOLER:
+            return
+        statement_timeout = getattr(connection, "statement_timeout", None)
+        if statement_timeout:
+            await connection.execute(f"SET LOCAL statement_timeout = {int(statement_timeout * 1000)}")
+
+    async def run_in_transaction(self, func: Callable[[Transaction], Awaitable[T]],
+                                 isolation: Optional[str] = None, readonly: bool = False,
+                                 retries: Optional[int] = None) -> T:
+        """
+        Выполняет функцию в транзакции и повторяет ее целиком при ошибке сериализации
+        или взаимной блокировке.
+        
+        Повтор возможен только для внешней транзакции: если соединение уже находится
+        в транзакции, ошибка передается вызывающему коду.
+        
+        Args:
+            func: Асинхронная функция, принимающая объект транзакции
+            isolation: Уровень изоляции транзакции
+            readonly: Транзакция только для чтения
+            retries: Число повторов (по умолчанию DB_TRANSACTION_MAX_RETRIES)
+            
+        Returns:
+            Результат функции
+        """
+        if retries is None:
+            retries = settings.DB_TRANSACTION_MAX_RETRIES
+        
+        attempt = 0
+        while True:
+            scope = get_request_scope()
+            nested = bool(scope and scope.in_transaction())
+            try:
+                async with self.transaction(isolation=isolation, readonly=readonly) as tx:
+                    return await func(tx)
+            except RETRYABLE_TRANSACTION_ERRORS as e:
+                if nested or attempt >= retries:
+                    raise
+                attempt += 1
+                self._stats.record_transaction_retry()
+                delay = settings.DB_TRANSACTION_RETRY_BACKOFF * (2 ** (attempt - 1))
+                logger.warning(f"Повтор транзакции ({attempt}/{retries}) после ошибки: {str(e)}")
+                await asyncio.sleep(delay * (1 + random.random()))
+
+    async def gather(self, *aws: Awaitable[Any]) -> List[Any]:
+        """
+        Выполняет независимые обращения к БД параллельно, каждое на своем соединении из пула.
+        
+        Внутри HTTP-запроса ветви наследуют бюджет, класс маршрута, пул и закрепление
+        чтений за основным сервером, а число одновременно выполняемых ветвей запроса
+        ограничено DB_GATHER_CONCURRENCY. Каждая ветвь занимает отдельное соединение,
+        поэтому gather стоит использовать для чтений, а не для записи.
+        
+        Внутри транзакции (запросы вне ее не видят ее изменений) и внутри ветви
+        обращения выполняются последовательно на соединении запроса.
+        
+        При ошибке в одной из ветвей остальные отменяются, ошибка передается вызывающему коду.
+        
+        Args:
+            aws: Корутины, обращающиеся к БД (например, self.db.fetch(...))
+            
+        Returns:
+            Результаты в порядке передачи
+        """
+        scope = get_request_scope()
+        if scope is not None and (scope.is_branch or scope.in_transaction()):
+            return [await aw for aw in aws]
+        
+        if scope is None:
+            semaphore = asyncio.Semaphore(settings.DB_GATHER_CONCURRENCY)
+        else:
+            if scope.gather_semaphore is None:
+                scope.gather_semaphore = asyncio.Semaphore(settings.DB_GATHER_CONCURRENCY)
+            semaphore = scope.gather_semaphore
+        branches: List[RequestScope] = []
+        
+        async def run_branch(aw: Awaitable[Any]) -> Any:
+            async with semaphore:
+                if scope is None:
+                    return await aw
+                branch = scope.fork()
+                branches.append(branch)
+                return await run_in_scope(branch, aw)
+        
+        tasks = [asyncio.ensure_future(run_branch(aw)) for aw in aws]
+        try:
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for aw in aws:
+                # Корутины отмененных до запуска ветвей закрываются без предупреждения о неожиданном await
+                if asyncio.iscoroutine(aw):
+                    aw.close()
+            raise
+        finally:
+            for branch in branches:
+                await scope.join(branch)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Возвращает текущее состояние пула соединений и накопленную статистику.
+        
+        Returns:
+            Словарь со статистикой пула (размер, свободные и занятые соединения,
+            гистограмма ожидания соединения, частота получения соединений), статистика
+            именованных пулов, реплик и шардов
+        """
+        snapshot = self._stats.snapshot(self._pool)
+        snapshot["pools"] = {
+            name: self._named_stats[name].snapshot(pool) for name, pool in self._named_pools.items()
+        }
+        snapshot["replicas"] = [
+            stats.snapshot(pool) for pool, stats in zip(self._replica_pools, self._replica_stats)
+        ]
+        snapshot["shards"] = {
+            name: self._shard_stats[name].snapshot(pool) for name, pool in self._shard_pools.items()
+        }
+        return snapshot
+
+    def query_stats(self, limit: int = 20, order_by: str = "total") -> Dict[str, Any]:
+        """
+        Возвращает статистику запросов, сгруппированную по нормализованному тексту запроса.
+        
+        Args:
+            limit: Число запросов в ответе
+            order_by: Показатель сортировки ("total", "mean", "p95", "p99", "count", "rows", "errors")
+            
+        Returns:
+            Словарь с общими счетчиками, запросами с наибольшими значениями показателя,
+            статистикой кэша запросов и числом различных запросов UPDATE по сервисам
+        """
+        stats = self._query_stats.top(limit, order_by)
+        stats["cache"] = self._query_cache.stats()
+        stats["update_statements"] = update_statements.stats()
+        return stats
+
+    def _measure(self, connection: asyncpg.Connection, query: str) -> QueryTimer:
+        """
+        Создает замер запроса; после успешной записи сбрасывается кэш запросов по измененным таблицам.
+        """
+        return QueryTimer(self._query_stats, query,
+                          partial(self._record_written_tables, connection, written_tables(query)))
+
+    def _record_written_tables(self, connection: asyncpg.Connection, tables: Iterable[str]) -> None:
+        """
+        Сбрасывает кэш запросов по измененным таблицам. Внутри транзакции таблицы
+        запоминаются и кэш сбрасывается после ее фиксации.
+        """
+        if not tables:
+            return
+        pending = self._transaction_tables.get(id(connection)) if connection.is_in_transaction() else None
+        if pending is not None:
+            pending.update(tables)
+        else:
+            self._query_cache.invalidate(tables)
+
+    async def fetch_cached(self, query: str, *args, tables: Iterable[str],
+                           ttl: Optional[float] = None) -> List[Row]:
+        """
+        Выполняет запрос на чтение с кэшированием результата (см. QueryCache).
+        
+        Запись кэша сбрасывается при любой записи в таблицы tables через Database или Transaction,
+        поэтому в tables нужно перечислить все таблицы, которые читает запрос. Результат
+        возвращается строками Row: они неизменяемы и могут безопасно разделяться между запросами.
+        
+        Args:
+            query: SQL-запрос
+            args: Позиционные аргументы для запроса
+            tables: Таблицы, которые читает запрос
+            ttl: Время жизни записи в секундах (None - DB_QUERY_CACHE_TTL)
+            
+        Returns:
+            Список строк результата
+        """
+        tables = tuple(tables)
+        cache = self._query_cache
+        scope = get_request_scope()
+        if not cache.enabled or (scope is not None and scope.in_transaction()):
+            return await self.fetch(query, *args, records=True)
+        
+        key = cache.key(query, args)
+        rows = cache.get(key)
+        if rows is not None:
+            return rows
+        
+        generation = cache.generation(tables)
+        # Кэш заполняется с основного сервера: реплика может еще не воспроизвести запись,
+        # после которой запись кэша была сброшена
+        async with self.acquire(readonly=True, primary=True) as connection:
+            try:
+                with self._measure(connection, query) as timer:
+                    rows = await connection.fetch(query, *args, record_class=Row, **_with_budget({}))
+                    timer.rows = len(rows)
+            except Exception as e:
+                logger.error(f"Ошибка при выполнении запроса {query}: {str(e)}")
+                raise
+        cache.put(key, rows, tables, generation, ttl)
+        return rows
 
     async def disconnect(self) -> None:
         """
         Закрывает пул соединений с базой данных.
         """
+        self._ready = False
+        for pool in [*self._named_pools.values(), *self._replica_pools, *self._shard_pools.values()]:
+            await pool.close()
+        self._named_pools = {}
+        self._named_stats = {}
+        self._replica_pools = []
+        self._replica_stats = []
+        self._shard_pools = {}
+        self._shard_stats = {}
+        self._shard_ring = None
         if self._pool:
             await self._pool.close()
             self._pool = None
@@ -59,55 +982,63 @@ class Database:
         Returns:
             Статус выполнения запроса
         """
-        if not self._pool:
-            await self.connect()
-        
-        async with self._pool.acquire() as connection:
+        async with self.acquire() as connection:
             try:
-                return await connection.execute(query, *args, **kwargs)
+                with self._measure(connection, query):
+                    return await connection.execute(query, *args, **_with_budget(kwargs))
             except Exception as e:
                 logger.error(f"Ошибка при выполнении запроса {query}: {str(e)}")
                 raise
 
-    async def fetch(self, query: str, *args, **kwargs) -> List[Dict[str, Any]]:
+    async def fetch(self, query: str, *args, records: bool = False,
+                    **kwargs) -> List[Union[Dict[str, Any], Row]]:
         """
         Выполняет SQL-запрос и возвращает список результатов.
         
         Args:
             query: SQL-запрос
             args: Позиционные аргументы для запроса
+            records: Вернуть строки Row вместо словарей. Строки не копируются в словари,
+                что вдвое сокращает число объектов на строку для списков, из которых сразу
+                строятся модели ответа (Model(**row)). Строки Row неизменяемы.
             
         Returns:
             Список результатов запроса
         """
-        if not self._pool:
-            await self.connect()
-        
-        async with self._pool.acquire() as connection:
+        async with self.acquire(readonly=is_read_only_query(query)) as connection:
             try:
-                rows = await connection.fetch(query, *args, **kwargs)
-                return [dict(row) for row in rows]
+                with self._measure(connection, query) as timer:
+                    if records:
+                        kwargs["record_class"] = Row
+                    rows = await connection.fetch(query, *args, **_with_budget(kwargs))
+                    timer.rows = len(rows)
+                return rows if records else [dict(row) for row in rows]
             except Exception as e:
                 logger.error(f"Ошибка при выполнении запроса {query}: {str(e)}")
                 raise
 
-    async def fetchrow(self, query: str, *args, **kwargs) -> Optional[Dict[str, Any]]:
+    async def fetchrow(self, query: str, *args, records: bool = False,
+                       **kwargs) -> Optional[Union[Dict[str, Any], Row]]:
         """
         Выполняет SQL-запрос и возвращает первую строку результата.
         
         Args:
             query: SQL-запрос
             args: Позиционные аргументы для запроса
+            records: Вернуть строку Row вместо словаря (см. fetch)
             
         Returns:
             Первая строка результата или None, если результат пустой
         """
-        if not self._pool:
-            await self.connect()
-        
-        async with self._pool.acquire() as connection:
+        async with self.acquire(readonly=is_read_only_query(query)) as connection:
             try:
-                row = await connection.fetchrow(query, *args, **kwargs)
+                with self._measure(connection, query) as timer:
+                    if records:
+                        kwargs["record_class"] = Row
+                    row = await connection.fetchrow(query, *args, **_with_budget(kwargs))
+                    timer.rows = 1 if row else 0
+                if records:
+                    return row
                 return dict(row) if row else None
             except Exception as e:
                 logger.error(f"Ошибка при выполнении запроса {query}: {str(e)}")
@@ -124,12 +1055,11 @@ class Database:
         Returns:
             Одно значение или None, если результат пустой
         """
-        if not self._pool:
-            await self.connect()
-        
-        async with self._pool.acquire() as connection:
+        async with self.acquire(readonly=is_read_only_query(query)) as connection:
             try:
-                return await connection.fetchval(query, *args, **kwargs)
+                with self._measure(connection, query) as timer:
+                    timer.rows = 1
+                    return await connection.fetchval(query, *args, **_with_budget(kwargs))
             except Exception as e:
                 logger.error(f"Ошибка при выполнении запроса {query}: {str(e)}")
                 raise
@@ -0,0 +1,59 @@
+import logging
+from typing import List, Tuple
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+# Самые частые запросы сервиса, которые подготавливаются на каждом новом соединении пула
+_hot_statements: List[str] = []
+
+
+def hot_statement(query: str) -> str:
+    """
+    Регистрирует запрос для подготовки на каждом новом соединении пула.
+
+    Подготовленный запрос попадает в кэш подготовленных запросов соединения asyncpg,
+    поэтому первый запрос с тем же текстом после запуска или переподключения пула
+    не тратит время на разбор и описание запроса сервером.
+
+    Args:
+        query: Текст запроса (должен совпадать с текстом, который выполняет сервис)
+
+    Returns:
+        Тот же текст запроса
+    """
+    if query not in _hot_statements:
+        _hot_statements.append(query)
+    return query
+
+
+def hot_statements() -> Tuple[str, ...]:
+    """
+    Возвращает зарегистрированные запросы
+    """
+    return tuple(_hot_statements)
+
+
+async def prepare_hot_statements(connection: asyncpg.Connection) -> int:
+    """
+    Подготавливает зарегистрированные запросы на соединении.
+    Запрос, который не удалось подготовить (например, таблица еще не создана),
+    пропускается: он будет подготовлен при первом выполнении.
+
+    Args:
+        connection: Новое соединение
+
+    Returns:
+        Число подготовленных запросов
+    """
+    prepared = 0
+    for query in _hot_statements:
+        try:
+            # Connection.prepare не помещает запрос в кэш соединения, которым пользуются
+            # fetch/execute, поэтому запрос подготавливается с use_cache=True
+            await connection._prepare(query, use_cache=True)
+            prepared += 1
+        except asyncpg.PostgresError as e:
+            logger.warning(f"Не удалось подготовить запрос при прогреве соединения: {str(e)}")
+    return prepared
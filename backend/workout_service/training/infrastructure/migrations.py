@@ -0,0 +1,453 @@
+"""
+Версионные миграции схемы базы данных.
+
+Миграции - файлы NNNN_описание.sql в каталоге DB_MIGRATIONS_DIR (database/migrations),
+применяются по возрастанию номера и записываются в таблицу schema_migrations вместе
+с контрольной суммой файла. Это единственный исполнитель миграций: схемой основного сервера
+и шардов владеет сервис тренировок (в docker-compose - одноразовый сервис migrate). Миграции
+применяются под advisory-блокировкой, поэтому при одновременном запуске нескольких экземпляров
+каждая миграция выполняется один раз.
+
+Директивы в начале файла:
+    -- migrate:no-transaction  запросы выполняются по одному вне транзакции (нужно для
+                               CREATE INDEX CONCURRENTLY); такая миграция должна быть
+                               идемпотентной (IF NOT EXISTS), так как после сбоя
+                               она выполняется заново целиком
+    -- migrate:unsafe-ok       отключает проверку блокирующих операций (см. check_statement)
+
+DDL-запросы выполняются с lock_timeout DB_MIGRATION_LOCK_TIMEOUT: запрос, который не получил
+блокировку таблицы за это время, отменяется, а не задерживает все запросы к таблице
+в очереди за своей блокировкой, и повторяется до DB_MIGRATION_LOCK_RETRIES раз.
+
+Запуск из каталога backend/workout_service:
+    python -m training.infrastructure.migrations status
+    python -m training.infrastructure.migrations up [--target N]
+    python -m training.infrastructure.migrations check
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from config import settings
+from training.infrastructure.sharding import parse_shard_dsns
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory-блокировки, под которой применяются миграции
+MIGRATIONS_LOCK_KEY = 720_301
+
+NO_TRANSACTION = "no-transaction"
+UNSAFE_OK = "unsafe-ok"
+
+CREATE_MIGRATIONS_TABLE_QUERY = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        name TEXT NOT NULL,
+        checksum TEXT NOT NULL,
+        applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+        duration_ms INT NOT NULL
+    )
+"""
+
+_MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+_DIRECTIVE = re.compile(r"^--\s*migrate:([\w-]+)\s*$", re.MULTILINE)
+_DOLLAR_TAG = re.compile(r"\$[A-Za-z_]*\$")
+
+_CREATE_TABLE = re.compile(r"^CREATE\s+(?:UNLOGGED\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w.]+)", re.I)
+_CREATE_INDEX = re.compile(
+    r"^CREATE\s+(?:UNIQUE\s+)?INDEX\s+(CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?([\w.]+)?\s*ON\s+(?:ONLY\s+)?([\w.]+)",
+    re.I
+)
+_DROP_INDEX = re.compile(r"^DROP\s+INDEX\s+(CONCURRENTLY\s+)?", re.I)
+_ALTER_TABLE = re.compile(r"^ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?([\w.]+)\s+(.*)$", re.I | re.S)
+_CONCURRENTLY = re.compile(r"\bCONCURRENTLY\b", re.I)
+
+_ADD_COLUMN = r"^ADD\s+(?:COLUMN\s+)?(?!(?:CONSTRAINT|CHECK|FOREIGN|PRIMARY|UNIQUE|EXCLUDE)\b)"
+
+# Действия ALTER TABLE, которые блокируют таблицу на время перезаписи или полного просмотра
+_UNSAFE_ALTER_ACTIONS = (
+    (re.compile(_ADD_COLUMN + r"(?=.*\bNOT\s+NULL\b)(?!.*\bDEFAULT\b)", re.I | re.S),
+     "ADD COLUMN ... NOT NULL без DEFAULT: добавьте столбец без NOT NULL, заполните его и ограничьте через CHECK ... NOT VALID"),
+    (re.compile(_ADD_COLUMN + r".*\bDEFAULT\s+(?:gen_random_uuid|uuid_generate_v4|random|clock_timestamp|nextval)\s*\(",
+                re.I | re.S),
+     "ADD COLUMN с изменчивым DEFAULT перезаписывает таблицу: добавьте столбец без DEFAULT и заполните его пакетами"),
+    (re.compile(r"^ALTER\s+(?:COLUMN\s+)?\w+\s+(?:SET\s+DATA\s+)?TYPE\b", re.I),
+     "ALTER COLUMN ... TYPE перезаписывает таблицу: добавьте новый столбец и перенесите данные"),
+    (re.compile(r"^ALTER\s+(?:COLUMN\s+)?\w+\s+SET\s+NOT\s+NULL\b", re.I),
+     "SET NOT NULL просматривает таблицу под блокировкой: сначала добавьте и проверьте CHECK (... IS NOT NULL) NOT VALID"),
+    (re.compile(r"^ADD\s+(?:CONSTRAINT\s+\w+\s+)?(?:FOREIGN\s+KEY|CHECK)\b(?!.*\bNOT\s+VALID\b)", re.I | re.S),
+     "ограничение без NOT VALID проверяется под блокировкой: добавьте NOT VALID и выполните VALIDATE CONSTRAINT отдельно"),
+    (re.compile(r"^ADD\s+(?:CONSTRAINT\s+\w+\s+)?(?:PRIMARY\s+KEY|UNIQUE)\s*\(", re.I),
+     "PRIMARY KEY/UNIQUE строит индекс под блокировкой: создайте индекс CONCURRENTLY и добавьте ограничение USING INDEX"),
+)
+
+
+class MigrationError(Exception):
+    """
+    Ошибка в файлах миграций или расхождение с уже примененными миграциями
+    """
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Разбивает текст миграции на отдельные запросы по точке с запятой.
+    Учитываются строки в кавычках, тела функций в долларовых кавычках и комментарии
+    (комментарии в запросы не попадают).
+
+    Args:
+        sql: Текст миграции
+
+    Returns:
+        Список запросов без завершающей точки с запятой
+    """
+    statements: List[str] = []
+    current: List[str] = []
+    quote: Optional[str] = None
+    index, length = 0, len(sql)
+    while index < length:
+        char = sql[index]
+        if quote is not None:
+            if sql.startswith(quote, index):
+                current.append(quote)
+                index += len(quote)
+                quote = None
+            else:
+                current.append(char)
+                index += 1
+            continue
+        if sql.startswith("--", index):
+            end = sql.find("\n", index)
+            index = length if end == -1 else end
+            continue
+        if sql.startswith("/*", index):
+            end = sql.find("*/", index + 2)
+            index = length if end == -1 else end + 2
+            continue
+        if char == ";":
+            statement = "".join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+            index += 1
+            continue
+        if char in "'\"":
+            quote = char
+        elif char == "$":
+            tag = _DOLLAR_TAG.match(sql, index)
+            if tag:
+                quote = tag.group(0)
+                current.append(quote)
+                index = tag.end()
+                continue
+        current.append(char)
+        index += 1
+    statement = "".join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+def _split_actions(actions: str) -> List[str]:
+    """
+    Разбивает список действий ALTER TABLE по запятым вне скобок
+    """
+    parts, depth, start = [], 0, 0
+    for index, char in enumerate(actions):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(actions[start:index].strip())
+            start = index + 1
+    parts.append(actions[start:].strip())
+    return [part for part in parts if part]
+
+
+def check_statement(statement: str, new_tables: Tuple[str, ...] = ()) -> List[str]:
+    """
+    Проверяет, что запрос не блокирует запись в существующую таблицу на время,
+    зависящее от ее размера (построение индекса, перезапись или полный просмотр таблицы).
+    Таблицы, созданные в той же миграции, пусты, и для них проверка не выполняется.
+
+    Args:
+        statement: Запрос без комментариев
+        new_tables: Таблицы, созданные в той же миграции
+
+    Returns:
+        Описания найденных проблем
+    """
+    problems = []
+    index = _CREATE_INDEX.match(statement)
+    if index and not index.group(1) and index.group(3) not in new_tables:
+        problems.append("CREATE INDEX блокирует запись в таблицу: используйте CREATE INDEX CONCURRENTLY")
+    drop_index = _DROP_INDEX.match(statement)
+    if drop_index and not drop_index.group(1):
+        problems.append("DROP INDEX блокирует таблицу: используйте DROP INDEX CONCURRENTLY")
+    alter = _ALTER_TABLE.match(statement)
+    if alter and alter.group(1) not in new_tables:
+        for action in _split_actions(alter.group(2)):
+            problems.extend(message for pattern, message in _UNSAFE_ALTER_ACTIONS if pattern.search(action))
+    return problems
+
+
+class Migration:
+    """
+    Файл миграции NNNN_описание.sql
+    """
+
+    def __init__(self, version: int, name: str, sql: str):
+        self.version = version
+        self.name = name
+        self.sql = sql
+        self.checksum = hashlib.sha256(sql.encode()).hexdigest()
+        directives = set(_DIRECTIVE.findall(sql))
+        self.transactional = NO_TRANSACTION not in directives
+        self.unsafe_ok = UNSAFE_OK in directives
+        self.statements = split_statements(sql)
+
+    @property
+    def label(self) -> str:
+        return f"{self.version:04d}_{self.name}"
+
+    def problems(self) -> List[str]:
+        """
+        Возвращает ошибки миграции и блокирующие операции (если миграция не помечена unsafe-ok)
+        """
+        problems = []
+        if self.transactional and any(_CONCURRENTLY.search(statement) for statement in self.statements):
+            problems.append("CONCURRENTLY не выполняется в транзакции: добавьте -- migrate:no-transaction")
+        if not self.unsafe_ok:
+            new_tables = tuple(
+                match.group(1) for match in map(_CREATE_TABLE.match, self.statements) if match
+            )
+            for statement in self.statements:
+                problems.extend(check_statement(statement, new_tables))
+        return problems
+
+
+def load_migrations(directory: str) -> List[Migration]:
+    """
+    Загружает и проверяет файлы миграций
+
+    Args:
+        directory: Каталог миграций
+
+    Returns:
+        Миграции по возрастанию номера
+
+    Raises:
+        MigrationError: Номер миграции повторяется или миграция содержит блокирующие операции
+    """
+    migrations: Dict[int, Migration] = {}
+    for filename in sorted(os.listdir(directory)):
+        match = _MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(f"Номер миграции {version} повторяется: {migrations[version].label}, {filename}")
+        with open(os.path.join(directory, filename), encoding="utf-8") as file:
+            migrations[version] = Migration(version, match.group(2), file.read())
+    problems = [
+        f"{migration.label}: {problem}" for migration in migrations.values() for problem in migration.problems()
+    ]
+    if problems:
+        raise MigrationError("Миграции не прошли проверку:\n" + "\n".join(problems))
+    return [migrations[version] for version in sorted(migrations)]
+
+
+async def _retry_on_lock_timeout(func: Callable[[], Awaitable[Any]], label: str, retries: int,
+                                 backoff: float) -> Any:
+    """
+    Выполняет func и повторяет его, если запрос не получил блокировку за lock_timeout
+    """
+    attempt = 0
+    while True:
+        try:
+            return await func()
+        except asyncpg.exceptions.LockNotAvailableError:
+            if attempt >= retries:
+                raise
+            attempt += 1
+            logger.warning(f"Миграция {label} не получила блокировку за lock_timeout, повтор {attempt}/{retries}")
+            await asyncio.sleep(backoff * 2 ** (attempt - 1))
+
+
+async def _drop_invalid_index(connection: asyncpg.Connection, statement: str) -> None:
+    """
+    Удаляет недостроенный индекс, оставшийся после прерванного CREATE INDEX CONCURRENTLY:
+    иначе IF NOT EXISTS пропустит его, и индекс так и останется неиспользуемым
+    """
+    index = _CREATE_INDEX.match(statement)
+    if not (index and index.group(1) and index.group(2)):
+        return
+    invalid = await connection.fetchval(
+        "SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass($1)", index.group(2)
+    )
+    if invalid:
+        logger.warning(f"Удаление недостроенного индекса {index.group(2)}")
+        await connection.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index.group(2)}")
+
+
+async def _apply(connection: asyncpg.Connection, migration: Migration, retries: int, backoff: float) -> None:
+    started = time.perf_counter()
+
+    async def record() -> None:
+        await connection.execute(
+            "INSERT INTO schema_migrations (version, name, checksum, duration_ms) VALUES ($1, $2, $3, $4)",
+            migration.version, migration.name, migration.checksum,
+            int((time.perf_counter() - started) * 1000)
+        )
+
+    if migration.transactional:
+        async def apply_in_transaction() -> None:
+            async with connection.transaction():
+                await connection.execute(migration.sql)
+                await record()
+
+        await _retry_on_lock_timeout(apply_in_transaction, migration.label, retries, backoff)
+        return
+
+    for statement in migration.statements:
+        async def apply_statement(statement: str = statement) -> None:
+            await _drop_invalid_index(connection, statement)
+            await connection.execute(statement)
+
+        await _retry_on_lock_timeout(apply_statement, migration.label, retries, backoff)
+    await record()
+
+
+async def migrate(connection: asyncpg.Connection, migrations: List[Migration], target: Optional[int] = None,
+                  lock_timeout: float = 5.0, retries: int = 5, backoff: float = 1.0) -> List[Migration]:
+    """
+    Применяет миграции, которые еще не записаны в schema_migrations
+
+    Args:
+        connection: Прямое соединение с сервером (не через пулер транзакций: advisory-блокировка
+            и настройки сеанса должны сохраняться между запросами)
+        migrations: Миграции (см. load_migrations)
+        target: Последний применяемый номер (None - все миграции)
+        lock_timeout: Время ожидания блокировки DDL-запросом в секундах
+        retries: Число повторов миграции после истечения lock_timeout
+        backoff: Задержка перед первым повтором в секундах (удваивается)
+
+    Returns:
+        Примененные миграции
+
+    Raises:
+        MigrationError: Примененная миграция была изменена
+    """
+    await connection.execute(CREATE_MIGRATIONS_TABLE_QUERY)
+    await connection.execute("SELECT pg_advisory_lock($1)", MIGRATIONS_LOCK_KEY)
+    try:
+        rows = await connection.fetch("SELECT version, checksum FROM schema_migrations")
+        applied = {row["version"]: row["checksum"] for row in rows}
+        changed = [
+            migration.label for migration in migrations
+            if migration.version in applied and applied[migration.version] != migration.checksum
+        ]
+        if changed:
+            raise MigrationError(f"Примененные миграции были изменены: {', '.join(changed)}")
+        pending = [
+            migration for migration in migrations
+            if migration.version not in applied and (target is None or migration.version <= target)
+        ]
+        await connection.execute(f"SET lock_timeout = {int(lock_timeout * 1000)}")
+        # Построение индекса на большой таблице не должно прерываться statement_timeout сервиса
+        await connection.execute("SET statement_timeout = 0")
+        for migration in pending:
+            logger.info(f"Применение миграции {migration.label}")
+            await _apply(connection, migration, retries, backoff)
+        return pending
+    finally:
+        await connection.execute("SELECT pg_advisory_unlock($1)", MIGRATIONS_LOCK_KEY)
+
+
+async def migration_status(connection: asyncpg.Connection, migrations: List[Migration]) -> List[Dict[str, Any]]:
+    """
+    Возвращает миграции с временем применения (None - миграция не применена)
+    """
+    await connection.execute(CREATE_MIGRATIONS_TABLE_QUERY)
+    rows = await connection.fetch("SELECT version, applied_at FROM schema_migrations")
+    applied = {row["version"]: row["applied_at"] for row in rows}
+    return [
+        {"version": migration.version, "name": migration.label, "applied_at": applied.get(migration.version)}
+        for migration in migrations
+    ]
+
+
+def schema_databases() -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Возвращает параметры подключения к основному серверу и к шардам данных пользователей
+    """
+    if settings.DB_MIGRATION_DSN:
+        primary: Dict[str, Any] = {"dsn": settings.DB_MIGRATION_DSN}
+    else:
+        primary = {
+            "user": settings.DB_USER,
+            "password": settings.DB_PASSWORD,
+            "host": settings.DB_HOST,
+            "port": settings.DB_PORT,
+            "database": settings.DB_NAME,
+        }
+    databases = [("primary", primary)]
+    databases.extend((f"shard {name}", {"dsn": dsn}) for name, dsn in parse_shard_dsns(settings.DB_SHARD_DSNS).items())
+    return databases
+
+
+async def apply_migrations(target: Optional[int] = None) -> int:
+    """
+    Применяет миграции из DB_MIGRATIONS_DIR на основном сервере и на шардах
+
+    Args:
+        target: Последний применяемый номер (None - все миграции)
+
+    Returns:
+        Число примененных миграций
+    """
+    migrations = load_migrations(settings.DB_MIGRATIONS_DIR)
+    applied = 0
+    for label, options in schema_databases():
+        connection = await asyncpg.connect(**options)
+        try:
+            result = await migrate(connection, migrations, target, settings.DB_MIGRATION_LOCK_TIMEOUT,
+                                   settings.DB_MIGRATION_LOCK_RETRIES)
+            applied += len(result)
+            logger.info(f"Миграции ({label}): применено {len(result)}")
+        finally:
+            await connection.close()
+    return applied
+
+
+async def _print_status() -> None:
+    migrations = load_migrations(settings.DB_MIGRATIONS_DIR)
+    for label, options in schema_databases():
+        connection = await asyncpg.connect(**options)
+        try:
+            print(label)
+            for row in await migration_status(connection, migrations):
+                print(f"  {row['name']:<40} {row['applied_at'] or 'не применена'}")
+        finally:
+            await connection.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["status", "up", "check"])
+    parser.add_argument("--target", type=int, default=None, help="Последний применяемый номер миграции")
+    args = parser.parse_args()
+    if args.command == "check":
+        print(f"Миграций: {len(load_migrations(settings.DB_MIGRATIONS_DIR))}, проверка пройдена")
+    elif args.command == "status":
+        asyncio.run(_print_status())
+    else:
+        asyncio.run(apply_migrations(args.target))
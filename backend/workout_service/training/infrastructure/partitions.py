@@ -0,0 +1,212 @@
+"""
+Обслуживание помесячных секций таблиц сессий.
+
+user_workout_sessions секционирована по datetime_start, user_exercise_sessions - по workout_started_at
+(времени начала сессии тренировки), секции называются <таблица>_ГГГГ_ММ (см. миграцию
+0003_partitioned_sessions). PartitionManager периодически на основном сервере и на шардах:
+    - создает секции на DB_PARTITION_MONTHS_AHEAD месяцев вперед, чтобы новые сессии не попадали
+      в секцию по умолчанию;
+    - отсоединяет секции месяцев старше DB_PARTITION_RETENTION_MONTHS: отсоединенная секция остается
+      отдельной таблицей с теми же данными, но запросы сервиса ее больше не просматривают.
+
+Секции одного месяца обеих таблиц отсоединяются вместе, сначала сессии упражнений:
+они ссылаются на сессии тренировок внешним ключом.
+"""
+import asyncio
+import logging
+import re
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+
+from config import settings
+from training.infrastructure.migrations import schema_databases
+
+logger = logging.getLogger(__name__)
+
+PARTITIONS_LOCK_KEY = 720_302
+
+# Секционированные таблицы в порядке отсоединения секций
+PARTITIONED_TABLES = ("user_exercise_sessions", "user_workout_sessions")
+
+# Внешний ключ сессий упражнений на сессии тренировок: у отсоединенной секции он удаляется,
+# иначе секцию сессий тренировок того же месяца нельзя будет отсоединить
+EXERCISE_SESSIONS_FOREIGN_KEY = "user_exercise_sessions_workout_session_fkey"
+
+PARTITIONS_QUERY = """
+    SELECT child.relname AS name
+    FROM pg_inherits
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE pg_inherits.inhparent = to_regclass($1)
+"""
+
+
+def add_months(month: date, months: int) -> date:
+    """
+    Возвращает первое число месяца, отстоящего от month на months месяцев
+    """
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    """
+    Возвращает имя секции таблицы за месяц
+    """
+    return f"{table}_{month:%Y_%m}"
+
+
+def partition_month(table: str, name: str) -> Optional[date]:
+    """
+    Возвращает месяц помесячной секции по ее имени (None - не помесячная секция, например по умолчанию)
+    """
+    match = re.fullmatch(rf"{re.escape(table)}_(\d{{4}})_(\d{{2}})", name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+async def _partitions(connection: asyncpg.Connection, table: str) -> Dict[str, date]:
+    rows = await connection.fetch(PARTITIONS_QUERY, table)
+    months = {row["name"]: partition_month(table, row["name"]) for row in rows}
+    return {name: month for name, month in months.items() if month is not None}
+
+
+async def ensure_partitions(connection: asyncpg.Connection, today: date, months_ahead: int) -> List[str]:
+    """
+    Создает недостающие секции от текущего месяца на months_ahead месяцев вперед
+
+    Args:
+        connection: Соединение с сервером
+        today: Текущая дата
+        months_ahead: Число месяцев после текущего
+
+    Returns:
+        Имена созданных секций
+    """
+    current = today.replace(day=1)
+    created = []
+    for table in PARTITIONED_TABLES:
+        existing = await _partitions(connection, table)
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            name = partition_name(table, month)
+            if name in existing:
+                continue
+            await connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            )
+            created.append(name)
+    return created
+
+
+async def detach_partitions(connection: asyncpg.Connection, today: date, retention_months: int) -> List[str]:
+    """
+    Отсоединяет секции месяцев, закончившихся раньше, чем retention_months месяцев назад
+
+    Args:
+        connection: Соединение с сервером
+        today: Текущая дата
+        retention_months: Число хранимых месяцев до текущего
+
+    Returns:
+        Имена отсоединенных секций
+    """
+    cutoff = add_months(today.replace(day=1), -retention_months)
+    detached = []
+    for table in PARTITIONED_TABLES:
+        partitions = await _partitions(connection, table)
+        for name, month in sorted(partitions.items(), key=lambda item: item[1]):
+            if month >= cutoff:
+                continue
+            await connection.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+            if table == "user_exercise_sessions":
+                await connection.execute(f"ALTER TABLE {name} DROP CONSTRAINT IF EXISTS {EXERCISE_SESSIONS_FOREIGN_KEY}")
+            detached.append(name)
+    return detached
+
+
+async def maintain_partitions(connection: asyncpg.Connection, today: date, months_ahead: int,
+                              retention_months: Optional[int] = None,
+                              lock_timeout: float = 5.0) -> Dict[str, List[str]]:
+    """
+    Создает будущие секции и отсоединяет устаревшие. Если обслуживание уже выполняет
+    другой экземпляр сервиса, ничего не делает.
+
+    Args:
+        connection: Прямое соединение с сервером (advisory-блокировка и настройки сеанса)
+        today: Текущая дата
+        months_ahead: Число месяцев, для которых секции создаются заранее
+        retention_months: Число хранимых месяцев (None - секции не отсоединяются)
+        lock_timeout: Время ожидания блокировки таблицы в секундах: создание и отсоединение секции
+            блокируют таблицу, и запрос не должен ставить запросы сервиса в очередь за собой
+
+    Returns:
+        Имена созданных и отсоединенных секций
+    """
+    result: Dict[str, List[str]] = {"created": [], "detached": []}
+    if not await connection.fetchval("SELECT pg_try_advisory_lock($1)", PARTITIONS_LOCK_KEY):
+        return result
+    try:
+        await connection.execute(f"SET lock_timeout = {int(lock_timeout * 1000)}")
+        result["created"] = await ensure_partitions(connection, today, months_ahead)
+        if retention_months is not None:
+            result["detached"] = await detach_partitions(connection, today, retention_months)
+        return result
+    finally:
+        await connection.execute("SELECT pg_advisory_unlock($1)", PARTITIONS_LOCK_KEY)
+
+
+class PartitionManager:
+    """
+    Фоновая задача сервиса, обслуживающая секции таблиц сессий раз в DB_PARTITION_CHECK_INTERVAL секунд
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self, today: Optional[date] = None) -> Dict[str, Dict[str, List[str]]]:
+        """
+        Обслуживает секции на основном сервере и на шардах. Ошибка на одном сервере
+        (например, истек lock_timeout) не мешает остальным: секции будут обслужены при следующей проверке.
+
+        Returns:
+            Созданные и отсоединенные секции по серверам
+        """
+        today = today or date.today()
+        results: Dict[str, Dict[str, Any]] = {}
+        for label, options in schema_databases():
+            try:
+                connection = await asyncpg.connect(**options)
+                try:
+                    results[label] = await maintain_partitions(
+                        connection, today, settings.DB_PARTITION_MONTHS_AHEAD,
+                        settings.DB_PARTITION_RETENTION_MONTHS, settings.DB_MIGRATION_LOCK_TIMEOUT
+                    )
+                finally:
+                    await connection.close()
+            except Exception as e:
+                logger.error(f"Ошибка при обслуживании секций ({label}): {str(e)}")
+                continue
+            if results[label]["created"] or results[label]["detached"]:
+                logger.info(f"Секции ({label}): {results[label]}")
+        return results
+
+    async def _run(self) -> None:
+        while True:
+            await self.run_once()
+            await asyncio.sleep(settings.DB_PARTITION_CHECK_INTERVAL)
@@ -0,0 +1,236 @@
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from asyncpg.pool import Pool
+
+# Верхние границы корзин гистограммы ожидания соединения, в миллисекундах
+ACQUIRE_WAIT_BUCKETS_MS: Tuple[float, ...] = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Окно, по которому считается частота получения соединений, в секундах
+ACQUISITIONS_RATE_WINDOW = 60.0
+
+
+class PoolStats:
+    """
+    Накопительная статистика пула соединений: число выданных соединений,
+    время ожидания соединения, очередь ожидания и отказы в соединении
+    и число открытых физических соединений
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Сбрасывает накопленную статистику
+        """
+        self.started_at = time.monotonic()
+        self.acquisitions = 0
+        self.connections_opened = 0
+        self.statements_prepared = 0
+        self.warmup_total = 0.0
+        self.warmup_max = 0.0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(ACQUIRE_WAIT_BUCKETS_MS) + 1)
+        self._recent: Deque[float] = deque()
+        self.waiting = 0
+        self.waiting_max = 0
+        self.rejected: Dict[str, int] = {}
+        self.requests = 0
+        self.request_acquisitions = 0
+        self.request_queries = 0
+        self.request_queries_max = 0
+        self.transactions_committed = 0
+        self.transactions_rolled_back = 0
+        self.transaction_retries = 0
+        self.transaction_time_total = 0.0
+        self.transaction_time_max = 0.0
+        self.reads_primary = 0
+        self.reads_replica = 0
+        self.replica_fallbacks = 0
+
+    def record_acquire(self, wait: float) -> None:
+        """
+        Учитывает получение соединения из пула
+
+        Args:
+            wait: Время ожидания соединения в секундах
+        """
+        now = time.monotonic()
+        self.acquisitions += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+
+        wait_ms = wait * 1000
+        for index, bound in enumerate(ACQUIRE_WAIT_BUCKETS_MS):
+            if wait_ms <= bound:
+                self.wait_buckets[index] += 1
+                break
+        else:
+            self.wait_buckets[-1] += 1
+
+        self._recent.append(now)
+        self._trim(now)
+
+    def record_request(self, acquisitions: int, queries: int) -> None:
+        """
+        Учитывает HTTP-запрос, выполненный на соединении запроса
+
+        Args:
+            acquisitions: Сколько раз соединение бралось из пула за запрос
+            queries: Сколько обращений к БД было сделано за запрос
+                (столько же получений соединения было бы без соединения запроса)
+        """
+        self.requests += 1
+        self.request_acquisitions += acquisitions
+        self.request_queries += queries
+        self.request_queries_max = max(self.request_queries_max, queries)
+
+    def record_transaction(self, duration: float, committed: bool) -> None:
+        """
+        Учитывает завершенную транзакцию
+
+        Args:
+            duration: Длительность транзакции в секундах
+            committed: True, если транзакция зафиксирована, False - если откачена
+        """
+        if committed:
+            self.transactions_committed += 1
+        else:
+            self.transactions_rolled_back += 1
+        self.transaction_time_total += duration
+        self.transaction_time_max = max(self.transaction_time_max, duration)
+
+    def record_transaction_retry(self) -> None:
+        """
+        Учитывает повтор транзакции после ошибки сериализации или взаимной блокировки
+        """
+        self.transaction_retries += 1
+
+    def record_read(self, replica: bool) -> None:
+        """
+        Учитывает чтение и сервер, на который оно направлено
+
+        Args:
+            replica: True, если чтение выполнено на реплике
+        """
+        if replica:
+            self.reads_replica += 1
+        else:
+            self.reads_primary += 1
+
+    def record_replica_fallback(self) -> None:
+        """
+        Учитывает чтение, перенаправленное на основной сервер из-за отставания реплики
+        """
+        self.replica_fallbacks += 1
+
+    def record_connection_opened(self) -> None:
+        """
+        Учитывает открытие нового физического соединения
+        """
+        self.connections_opened += 1
+
+    def record_warmup(self, duration: float, prepared: int) -> None:
+        """
+        Учитывает подготовку частых запросов на новом соединении
+
+        Args:
+            duration: Длительность подготовки в секундах
+            prepared: Число подготовленных запросов
+        """
+        self.statements_prepared += prepared
+        self.warmup_total += duration
+        self.warmup_max = max(self.warmup_max, duration)
+
+    def queue_enter(self) -> None:
+        """
+        Учитывает запрос, вставший в очередь ожидания соединения
+        """
+        self.waiting += 1
+        self.waiting_max = max(self.waiting_max, self.waiting)
+
+    def queue_exit(self) -> None:
+        """
+        Учитывает запрос, покинувший очередь ожидания (получил соединение или отказ)
+        """
+        self.waiting -= 1
+
+    def record_rejected(self, route_class: str) -> None:
+        """
+        Учитывает отказ в соединении: время ожидания истекло или очередь переполнена
+
+        Args:
+            route_class: Класс маршрута, для которого не удалось получить соединение
+        """
+        self.rejected[route_class] = self.rejected.get(route_class, 0) + 1
+
+    def _trim(self, now: float) -> None:
+        while self._recent and now - self._recent[0] > ACQUISITIONS_RATE_WINDOW:
+            self._recent.popleft()
+
+    def snapshot(self, pool: Optional[Pool]) -> Dict[str, Any]:
+        """
+        Формирует снимок состояния пула и накопленной статистики
+
+        Args:
+            pool: Пул соединений asyncpg (None, если пул еще не создан)
+
+        Returns:
+            Словарь со статистикой пула
+        """
+        now = time.monotonic()
+        self._trim(now)
+        window = min(ACQUISITIONS_RATE_WINDOW, now - self.started_at) or 1.0
+
+        histogram = {f"le_{bound:g}ms": count for bound, count in zip(ACQUIRE_WAIT_BUCKETS_MS, self.wait_buckets)}
+        histogram["inf"] = self.wait_buckets[-1]
+
+        transactions = self.transactions_committed + self.transactions_rolled_back
+        size = pool.get_size() if pool else 0
+        idle = pool.get_idle_size() if pool else 0
+        return {
+            "connected": pool is not None,
+            "min_size": pool.get_min_size() if pool else None,
+            "max_size": pool.get_max_size() if pool else None,
+            "size": size,
+            "idle": idle,
+            "in_use": size - idle,
+            "connections_opened": self.connections_opened,
+            "warmup": {
+                "statements_prepared": self.statements_prepared,
+                "duration_avg_ms": round(self.warmup_total / self.connections_opened * 1000, 3) if self.connections_opened else 0.0,
+                "duration_max_ms": round(self.warmup_max * 1000, 3),
+            },
+            "acquisitions": self.acquisitions,
+            "acquisitions_per_sec": round(len(self._recent) / window, 3),
+            "acquire_wait_avg_ms": round(self.wait_total / self.acquisitions * 1000, 3) if self.acquisitions else 0.0,
+            "acquire_wait_max_ms": round(self.wait_max * 1000, 3),
+            "acquire_wait_histogram": histogram,
+            "queue": {
+                "waiting": self.waiting,
+                "waiting_max": self.waiting_max,
+                "rejected": sum(self.rejected.values()),
+                "rejected_by_route_class": dict(self.rejected),
+            },
+            "requests": {
+                "count": self.requests,
+                "acquisitions_per_request_avg": round(self.request_acquisitions / self.requests, 3) if self.requests else 0.0,
+                "queries_per_request_avg": round(self.request_queries / self.requests, 3) if self.requests else 0.0,
+                "queries_per_request_max": self.request_queries_max,
+            },
+            "transactions": {
+                "committed": self.transactions_committed,
+                "rolled_back": self.transactions_rolled_back,
+                "retries": self.transaction_retries,
+                "duration_avg_ms": round(self.transaction_time_total / transactions * 1000, 3) if transactions else 0.0,
+                "duration_max_ms": round(self.transaction_time_max * 1000, 3),
+            },
+            "routing": {
+                "reads_primary": self.reads_primary,
+                "reads_replica": self.reads_replica,
+                "replica_fallbacks": self.replica_fallbacks,
+            },
+        }
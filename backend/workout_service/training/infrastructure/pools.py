@@ -0,0 +1,64 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, Tuple
+
+from config import settings
+
+# Именованные пулы соединений с основным сервером: realtime - короткие записи
+# прогресса тренировки, analytics - изменения каталога, история упражнений и фоновые задачи
+DEFAULT_POOL = "default"
+REALTIME_POOL = "realtime"
+ANALYTICS_POOL = "analytics"
+NAMED_POOLS = (REALTIME_POOL, ANALYTICS_POOL)
+
+
+def named_pool_config(name: str) -> Optional[Tuple[int, int, Optional[float]]]:
+    """
+    Возвращает параметры именованного пула из настроек приложения
+
+    Args:
+        name: Имя пула (REALTIME_POOL или ANALYTICS_POOL)
+
+    Returns:
+        Минимальный и максимальный размер пула и statement_timeout в секундах
+        или None, если пул отключен (размер 0) и запросы идут в пул по умолчанию
+    """
+    configs = {
+        REALTIME_POOL: (settings.DB_POOL_REALTIME_MIN_SIZE, settings.DB_POOL_REALTIME_MAX_SIZE,
+                        settings.DB_POOL_REALTIME_STATEMENT_TIMEOUT),
+        ANALYTICS_POOL: (settings.DB_POOL_ANALYTICS_MIN_SIZE, settings.DB_POOL_ANALYTICS_MAX_SIZE,
+                         settings.DB_POOL_ANALYTICS_STATEMENT_TIMEOUT),
+    }
+    config = configs.get(name)
+    if config is None or config[1] <= 0:
+        return None
+    return config
+
+
+_current_pool: ContextVar[Optional[str]] = ContextVar("db_pool_name", default=None)
+
+
+def current_pool_name() -> Optional[str]:
+    """
+    Возвращает пул, выбранный через use_pool, или None
+    """
+    return _current_pool.get()
+
+
+@contextmanager
+def use_pool(name: str) -> Iterator[None]:
+    """
+    Выполняет обращения к БД внутри блока на соединениях именованного пула.
+
+    Внутри HTTP-запроса соединение запроса общее для всех обращений, поэтому пул
+    действует, только если соединение еще не взято; маршруты выбирают пул через
+    db_route(..., pool=...).
+
+    Args:
+        name: Имя пула
+    """
+    token = _current_pool.set(name)
+    try:
+        yield
+    finally:
+        _current_pool.reset(token)
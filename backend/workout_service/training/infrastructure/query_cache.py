@@ -0,0 +1,299 @@
+import asyncio
+import logging
+import re
+import sys
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Set, Tuple
+
+import asyncpg
+
+from config import settings
+from training.infrastructure.migrations import schema_databases
+
+logger = logging.getLogger(__name__)
+
+# Канал уведомлений PostgreSQL об изменении таблиц кэшируемых запросов (см. миграцию
+# 0006_query_cache_notify): полезная нагрузка - имя измененной таблицы
+QUERY_CACHE_CHANNEL = "query_cache_invalidate"
+
+# UPDATE изменяет таблицу, только если начинает запрос или запрос в WITH: в ON CONFLICT ... DO UPDATE SET
+# и SELECT ... FOR UPDATE за ним следует не имя таблицы
+_WRITTEN_TABLE = re.compile(
+    r"(?:\b(?:INSERT\s+INTO|DELETE\s+FROM|TRUNCATE(?:\s+TABLE)?|MERGE\s+INTO|COPY)|(?:^|[;()])\s*UPDATE)"
+    r"\s+(?:ONLY\s+)?([\w.\"]+)",
+    re.IGNORECASE
+)
+
+
+@lru_cache(maxsize=1024)
+def written_tables(query: str) -> FrozenSet[str]:
+    """
+    Возвращает таблицы, которые изменяет SQL-запрос (INSERT/UPDATE/DELETE/TRUNCATE/COPY)
+
+    Args:
+        query: SQL-запрос
+
+    Returns:
+        Имена таблиц без схемы в нижнем регистре (пустое множество для запросов на чтение)
+    """
+    return frozenset(
+        match.rsplit(".", 1)[-1].strip('"').lower() for match in _WRITTEN_TABLE.findall(query)
+    )
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+def _estimate_size(rows: List[Any]) -> int:
+    """
+    Приблизительный объем памяти результата запроса в байтах
+    """
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+    return size
+
+
+class CacheEntry:
+    __slots__ = ("rows", "tables", "size", "expires_at")
+
+    def __init__(self, rows: List[Any], tables: Tuple[str, ...], size: int, expires_at: float):
+        self.rows = rows
+        self.tables = tables
+        self.size = size
+        self.expires_at = expires_at
+
+
+class QueryCache:
+    """
+    Кэш результатов запросов на чтение: LRU с ограничением объема (DB_QUERY_CACHE_MAX_BYTES)
+    и временем жизни записей (DB_QUERY_CACHE_TTL).
+
+    Каждая запись помечена таблицами, которые читает запрос. Запись в любую из этих
+    таблиц удаляет запись из кэша. Чтобы результат, прочитанный до записи, не попал
+    в кэш после нее, для каждой таблицы хранится номер поколения, который
+    увеличивается при каждой записи.
+
+    Кэш свой у каждого процесса сервиса. Запись через Database сбрасывает кэш процесса,
+    который ее выполнил; кэш остальных процессов сбрасывает QueryCacheListener по уведомлениям
+    триггеров таблиц. Без него (DB_QUERY_CACHE_LISTEN=false) другие процессы видят изменение
+    только после истечения DB_QUERY_CACHE_TTL.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Очищает кэш и сбрасывает счетчики
+        """
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        self._generations: Dict[str, int] = {}
+        # Увеличивается при сбросе всего кэша (invalidate_all)
+        self._epoch = 0
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.DB_QUERY_CACHE_ENABLED
+
+    def key(self, query: str, args: Tuple[Any, ...]) -> Hashable:
+        """
+        Ключ записи кэша: текст запроса и значения параметров
+        """
+        return query, _freeze(args)
+
+    def get(self, key: Hashable) -> Optional[List[Any]]:
+        """
+        Возвращает результат из кэша
+
+        Args:
+            key: Ключ записи
+
+        Returns:
+            Строки результата или None, если записи нет или ее время жизни истекло
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.rows
+
+    def generation(self, tables: Iterable[str]) -> Tuple[int, ...]:
+        """
+        Возвращает поколения таблиц; снимок берется до выполнения запроса и передается в put
+        """
+        return (self._epoch, *(self._generations.get(table, 0) for table in tables))
+
+    def put(self, key: Hashable, rows: List[Any], tables: Tuple[str, ...], generation: Tuple[int, ...],
+            ttl: Optional[float] = None) -> bool:
+        """
+        Сохраняет результат запроса в кэше
+
+        Args:
+            key: Ключ записи
+            rows: Строки результата
+            tables: Таблицы, которые читает запрос
+            generation: Поколения таблиц до выполнения запроса
+            ttl: Время жизни записи в секундах (None - DB_QUERY_CACHE_TTL)
+
+        Returns:
+            True, если результат сохранен; False, если таблицы изменились во время
+            выполнения запроса или результат больше всего кэша
+        """
+        if generation != self.generation(tables):
+            return False
+        size = _estimate_size(rows)
+        max_bytes = settings.DB_QUERY_CACHE_MAX_BYTES
+        if size > max_bytes:
+            return False
+
+        self._remove(key)
+        ttl = settings.DB_QUERY_CACHE_TTL if ttl is None else ttl
+        self._entries[key] = CacheEntry(rows, tables, size, time.monotonic() + ttl)
+        self.size += size
+        for table in tables:
+            self._tags.setdefault(table, set()).add(key)
+
+        while self.size > max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+        return True
+
+    def invalidate(self, tables: Iterable[str]) -> None:
+        """
+        Удаляет записи, которые читают указанные таблицы
+
+        Args:
+            tables: Измененные таблицы
+        """
+        for table in tables:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            for key in list(self._tags.pop(table, ())):
+                if key in self._entries:
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def invalidate_all(self) -> None:
+        """
+        Удаляет все записи; результаты запросов, начатых до вызова, в кэш не сохраняются
+        """
+        self._epoch += 1
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._tags.clear()
+        self.size = 0
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= entry.size
+        for table in entry.tables:
+            keys = self._tags.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[table]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает состояние кэша и счетчики попаданий, промахов, вытеснений и инвалидаций
+        """
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "size_bytes": self.size,
+            "max_bytes": settings.DB_QUERY_CACHE_MAX_BYTES,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class QueryCacheListener:
+    """
+    Фоновая задача процесса, сбрасывающая его кэш запросов по уведомлениям об изменении таблиц.
+
+    Триггеры таблиц кэшируемых запросов отправляют NOTIFY в канал QUERY_CACHE_CHANNEL при фиксации
+    любой записи в них, в каком бы процессе (или сервисе) она ни выполнялась. Задача держит
+    отдельное соединение с основным сервером (в обход PgBouncer, если задан DB_MIGRATION_DSN:
+    LISTEN требует сеанса) и сбрасывает записи кэша, читающие измененную таблицу. Пока соединения
+    нет, уведомления теряются, поэтому после каждого (пере)подключения кэш сбрасывается целиком.
+    """
+
+    def __init__(self, cache: QueryCache):
+        self.cache = cache
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def _on_notification(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        self.cache.invalidate(table for table in payload.split(",") if table)
+
+    async def listen(self, connection: asyncpg.Connection) -> None:
+        """
+        Подписывается на уведомления и ждет закрытия соединения
+
+        Args:
+            connection: Соединение с основным сервером
+        """
+        closed = asyncio.Event()
+        connection.add_termination_listener(lambda _: closed.set())
+        await connection.add_listener(QUERY_CACHE_CHANNEL, self._on_notification)
+        # Изменения, сделанные до подписки, могли не дойти до процесса
+        self.cache.invalidate_all()
+        await closed.wait()
+
+    async def _run(self) -> None:
+        _, options = schema_databases()[0]
+        while True:
+            try:
+                connection = await asyncpg.connect(**options)
+                try:
+                    await self.listen(connection)
+                finally:
+                    await connection.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка соединения для уведомлений кэша запросов: {str(e)}")
+            logger.warning("Соединение для уведомлений кэша запросов потеряно, кэш сброшен")
+            self.cache.invalidate_all()
+            await asyncio.sleep(settings.DB_QUERY_CACHE_LISTEN_RETRY)
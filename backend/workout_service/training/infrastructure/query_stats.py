@@ -0,0 +1,245 @@
+import logging
+import math
+import os
+import re
+import sys
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Число последних замеров каждого запроса, по которым считаются перцентили
+QUERY_SAMPLES = 1000
+
+# Поля, по которым можно сортировать статистику запросов
+QUERY_STATS_ORDERINGS = ("total", "mean", "p95", "p99", "count", "rows", "errors")
+
+_INFRASTRUCTURE_DIR = os.path.dirname(os.path.abspath(__file__))
+_CONTEXTLIB_FILE = os.path.abspath(sys.modules["contextlib"].__file__)
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?\b")
+_VALUES_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+@lru_cache(maxsize=2048)
+def normalize_query(query: str) -> str:
+    """
+    Приводит SQL-запрос к нормализованному виду для группировки статистики:
+    схлопывает пробелы и заменяет строковые и числовые литералы (в том числе
+    подставленные в запрос через f-строку) на "?"
+
+    Args:
+        query: SQL-запрос
+
+    Returns:
+        Нормализованный запрос
+    """
+    normalized = _STRING_LITERAL.sub("?", query)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _VALUES_LIST.sub("(?, ...)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def _call_site() -> str:
+    """
+    Возвращает место вызова запроса: первый кадр стека вне слоя работы с БД
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if os.path.dirname(filename) != _INFRASTRUCTURE_DIR and filename != _CONTEXTLIB_FILE:
+            return f"{os.path.relpath(filename)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return "unknown"
+
+
+def _percentile(samples: List[float], percent: float) -> float:
+    """
+    Перцентиль по методу ближайшего ранга (samples должны быть отсортированы)
+    """
+    if not samples:
+        return 0.0
+    index = max(0, math.ceil(percent / 100 * len(samples)) - 1)
+    return samples[index]
+
+
+class StatementStats:
+    """
+    Накопительная статистика одного нормализованного запроса
+    """
+
+    def __init__(self, statement: str):
+        self.statement = statement
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.time_total = 0.0
+        self.time_max = 0.0
+        self.samples: Deque[float] = deque(maxlen=QUERY_SAMPLES)
+        self.last_call_site: Optional[str] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Формирует снимок статистики запроса (перцентили - по последним QUERY_SAMPLES замерам)
+        """
+        samples = sorted(self.samples)
+        return {
+            "statement": self.statement,
+            "count": self.count,
+            "errors": self.errors,
+            "rows": self.rows,
+            "rows_avg": round(self.rows / self.count, 3) if self.count else 0.0,
+            "total_ms": round(self.time_total * 1000, 3),
+            "mean_ms": round(self.time_total / self.count * 1000, 3) if self.count else 0.0,
+            "p95_ms": round(_percentile(samples, 95) * 1000, 3),
+            "p99_ms": round(_percentile(samples, 99) * 1000, 3),
+            "max_ms": round(self.time_max * 1000, 3),
+            "last_slow_call_site": self.last_call_site,
+        }
+
+
+class QueryTimer:
+    """
+    Замер одного запроса: используется как контекстный менеджер вокруг обращения к соединению.
+    Число возвращенных строк записывается в атрибут rows. Функция on_success вызывается
+    после успешного выполнения запроса.
+    """
+
+    def __init__(self, stats: Optional["QueryStats"], query: str,
+                 on_success: Optional[Callable[[], None]] = None):
+        self.stats = stats
+        self.query = query
+        self.on_success = on_success
+        self.rows = 0
+        self.started = 0.0
+
+    def __enter__(self) -> "QueryTimer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if self.stats is not None:
+            self.stats.record(self.query, time.perf_counter() - self.started, self.rows, failed=exc_type is not None)
+        if exc_type is None and self.on_success is not None:
+            self.on_success()
+        return False
+
+
+class QueryStats:
+    """
+    Статистика выполнения запросов, сгруппированная по нормализованному тексту запроса:
+    число выполнений, ошибок и возвращенных строк, суммарное, среднее, p95/p99 и
+    максимальное время. Запросы дольше DB_SLOW_QUERY_MS записываются в журнал
+    вместе с местом вызова.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Сбрасывает накопленную статистику
+        """
+        self.started_at = time.monotonic()
+        self.statements: Dict[str, StatementStats] = {}
+        self.queries = 0
+        self.slow_queries = 0
+        self.statements_dropped = 0
+
+    def measure(self, query: str) -> QueryTimer:
+        """
+        Создает замер запроса
+
+        Args:
+            query: SQL-запрос
+
+        Returns:
+            Контекстный менеджер, учитывающий время выполнения запроса
+        """
+        return QueryTimer(self, query)
+
+    def record(self, query: str, duration: float, rows: int = 0, failed: bool = False) -> None:
+        """
+        Учитывает выполненный запрос
+
+        Args:
+            query: SQL-запрос
+            duration: Время выполнения в секундах
+            rows: Число возвращенных строк
+            failed: Запрос завершился ошибкой
+        """
+        if not settings.DB_QUERY_STATS_ENABLED:
+            return
+
+        statement = normalize_query(query)
+        stats = self.statements.get(statement)
+        if stats is None:
+            stats = self._add_statement(statement)
+
+        self.queries += 1
+        stats.count += 1
+        stats.rows += rows
+        stats.time_total += duration
+        stats.time_max = max(stats.time_max, duration)
+        stats.samples.append(duration)
+        if failed:
+            stats.errors += 1
+
+        threshold = settings.DB_SLOW_QUERY_MS
+        if threshold is not None and duration * 1000 >= threshold:
+            self.slow_queries += 1
+            stats.last_call_site = _call_site()
+            logger.warning(
+                f"Медленный запрос ({duration * 1000:.1f} мс, строк: {rows}) из {stats.last_call_site}: {statement}"
+            )
+
+    def _add_statement(self, statement: str) -> StatementStats:
+        """
+        Добавляет запрос в статистику. При превышении DB_QUERY_STATS_MAX_STATEMENTS
+        вытесняется запрос с наименьшим суммарным временем.
+        """
+        if len(self.statements) >= settings.DB_QUERY_STATS_MAX_STATEMENTS:
+            evicted = min(self.statements.values(), key=lambda item: item.time_total)
+            del self.statements[evicted.statement]
+            self.statements_dropped += 1
+        stats = StatementStats(statement)
+        self.statements[statement] = stats
+        return stats
+
+    def top(self, limit: int = 20, order_by: str = "total") -> Dict[str, Any]:
+        """
+        Возвращает запросы с наибольшими значениями выбранного показателя
+
+        Args:
+            limit: Число запросов
+            order_by: Показатель сортировки (см. QUERY_STATS_ORDERINGS)
+
+        Returns:
+            Словарь с общими счетчиками и списком запросов
+        """
+        if order_by not in QUERY_STATS_ORDERINGS:
+            raise ValueError(f"Неизвестная сортировка: {order_by}")
+
+        key = order_by if order_by in ("count", "rows", "errors") else f"{order_by}_ms"
+        statements = sorted(
+            (stats.snapshot() for stats in self.statements.values()),
+            key=lambda item: item[key],
+            reverse=True
+        )
+        total_time = sum(stats.time_total for stats in self.statements.values())
+        return {
+            "uptime_sec": round(time.monotonic() - self.started_at, 3),
+            "queries": self.queries,
+            "slow_queries": self.slow_queries,
+            "slow_query_threshold_ms": settings.DB_SLOW_QUERY_MS,
+            "distinct_statements": len(self.statements),
+            "statements_dropped": self.statements_dropped,
+            "total_ms": round(total_time * 1000, 3),
+            "statements": statements[:limit],
+        }
@@ -0,0 +1,22 @@
+from typing import Any
+
+import asyncpg
+
+
+class Row(asyncpg.Record):
+    """
+    Строка результата запроса без копирования в словарь.
+
+    Поддерживает доступ по ключу (row["name"], row.get("name"), Model(**row)) и как
+    к атрибуту (row.name, Model.model_validate(row) для моделей с from_attributes).
+    Строка неизменяема. Столбцы, имена которых совпадают с методами Record
+    (keys, values, items, get), доступны только по ключу.
+    """
+
+    __slots__ = ()
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
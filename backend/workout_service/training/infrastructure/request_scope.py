@@ -0,0 +1,449 @@
+import asyncio
+import logging
+import re
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import asyncpg
+from asyncpg.pool import Pool
+
+from training.infrastructure.backpressure import (
+    ADMIN_ROUTE_CLASS, DEFAULT_ROUTE_CLASS, INTERACTIVE_ROUTE_CLASS, PoolExhaustedError, overloaded_messages
+)
+from training.infrastructure.pool_stats import PoolStats
+from training.infrastructure.pools import DEFAULT_POOL
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Роли соединений запроса: основной сервер (запись) и реплика (чтение)
+PRIMARY = "primary"
+REPLICA = "replica"
+
+# Заголовок ответа с позицией WAL основного сервера после записи в запросе
+# и заголовок запроса, которым клиент возвращает ее, чтобы читать свои записи
+LSN_HEADER = "x-db-lsn"
+READ_AFTER_HEADER = "x-db-read-after"
+
+_LSN_PATTERN = re.compile(r"^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$")
+
+
+def parse_lsn(value: Optional[str]) -> Optional[str]:
+    """
+    Проверяет позицию WAL, переданную клиентом
+
+    Args:
+        value: Значение заголовка (например, "0/3000148")
+
+    Returns:
+        Позиция WAL или None, если значение отсутствует или некорректно
+    """
+    if value and _LSN_PATTERN.match(value.strip()):
+        return value.strip()
+    return None
+
+
+class QueryBudgetExceeded(asyncio.TimeoutError):
+    """
+    Бюджет времени HTTP-запроса на обращения к БД исчерпан
+    """
+
+
+class RequestScope:
+    """
+    Соединения с БД, общие для всех запросов к БД в рамках одного HTTP-запроса.
+
+    Соединение с основным сервером и соединение с репликой берутся из пулов лениво,
+    при первом обращении, и возвращаются в пулы при завершении HTTP-запроса. Запросы
+    к соединениям выполняются по очереди: asyncpg не допускает параллельных операций
+    на одном соединении.
+
+    После первой записи запрос закрепляется за основным сервером, чтобы последующие
+    чтения в нем видели записанные данные.
+
+    Если задан бюджет времени, ожидание соединения и каждый запрос к БД ограничиваются
+    оставшимся временем: по истечении asyncpg отменяет запрос на сервере.
+
+    Класс маршрута (route_class) задает допустимое время ожидания соединения из пула.
+    Если соединение не получено, отказ запоминается в pool_rejection и запрос
+    завершается ответом 503, даже если обработчик перехватил ошибку.
+    """
+
+    def __init__(self, read_after_lsn: Optional[str] = None, budget: Optional[float] = None):
+        self.stats: Optional[PoolStats] = None
+        self.pools: Dict[str, Pool] = {}
+        self.connections: Dict[str, asyncpg.Connection] = {}
+        self.acquisitions = 0
+        self.queries = 0
+        # Позиция WAL, которую должна воспроизвести реплика, чтобы с нее можно было читать
+        self.read_after_lsn = read_after_lsn
+        # Запрос выполнял запись на основном сервере
+        self.wrote = False
+        # Реплика еще не воспроизвела read_after_lsn, чтения идут на основной сервер
+        self.replica_lagging = False
+        # Вернуть клиенту позицию WAL после записи (включается при наличии реплик)
+        self.track_writes = False
+        # Момент (time.monotonic), после которого обращения к БД запроса не выполняются
+        self.deadline: Optional[float] = None
+        self.set_budget(budget)
+        self.route_class = DEFAULT_ROUTE_CLASS
+        # Пул, из которого берется соединение запроса с основным сервером
+        self.pool_name = DEFAULT_POOL
+        # Отказ в соединении из пула за время запроса
+        self.pool_rejection: Optional[PoolExhaustedError] = None
+        # Ограничение числа параллельных ветвей запроса (Database.gather)
+        self.gather_semaphore: Optional[asyncio.Semaphore] = None
+        # Область параллельной ветви: вложенные ветви выполняются последовательно
+        self.is_branch = False
+        self._lock = asyncio.Lock()
+        self._owner: Optional[asyncio.Task] = None
+        self._depth = 0
+
+    @property
+    def connection(self) -> Optional[asyncpg.Connection]:
+        """
+        Соединение запроса с основным сервером
+        """
+        return self.connections.get(PRIMARY)
+
+    @property
+    def pinned_to_primary(self) -> bool:
+        """
+        Чтения запроса должны выполняться на основном сервере
+        """
+        return self.wrote or self.replica_lagging
+
+    def set_budget(self, seconds: Optional[float]) -> None:
+        """
+        Задает бюджет времени запроса на обращения к БД, отсчитываемый от текущего момента
+
+        Args:
+            seconds: Бюджет в секундах (None - без ограничения)
+        """
+        self.deadline = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> Optional[float]:
+        """
+        Возвращает оставшееся время бюджета запроса
+
+        Returns:
+            Оставшееся время в секундах или None, если бюджет не задан
+
+        Raises:
+            QueryBudgetExceeded: Если бюджет исчерпан
+        """
+        if self.deadline is None:
+            return None
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise QueryBudgetExceeded("Исчерпан бюджет времени запроса к базе данных")
+        return remaining
+
+    def fork(self) -> "RequestScope":
+        """
+        Создает область для параллельной ветви запроса (см. Database.gather): ветвь берет
+        свои соединения из пулов, но наследует бюджет, класс маршрута, пул и закрепление
+        чтений за основным сервером
+        """
+        child = RequestScope(read_after_lsn=self.read_after_lsn)
+        child.deadline = self.deadline
+        child.route_class = self.route_class
+        child.pool_name = self.pool_name
+        child.wrote = self.wrote
+        child.replica_lagging = self.replica_lagging
+        child.is_branch = True
+        return child
+
+    async def join(self, child: "RequestScope") -> None:
+        """
+        Возвращает соединения ветви в пулы и переносит ее состояние в область запроса
+        """
+        await child.release()
+        self.acquisitions += child.acquisitions
+        self.queries += child.queries
+        self.stats = self.stats or child.stats
+        self.wrote = self.wrote or child.wrote
+        self.track_writes = self.track_writes or child.track_writes
+        self.replica_lagging = self.replica_lagging or child.replica_lagging
+        self.pool_rejection = self.pool_rejection or child.pool_rejection
+
+    def in_transaction(self) -> bool:
+        """
+        Проверяет, открыта ли транзакция на одном из соединений запроса
+        """
+        return any(connection.is_in_transaction() for connection in self.connections.values())
+
+    async def enter(self) -> None:
+        """
+        Захватывает соединения запроса для текущей задачи (повторный вход из той же задачи разрешен)
+        """
+        task = asyncio.current_task()
+        if self._owner is not task:
+            await self._lock.acquire()
+            self._owner = task
+        self._depth += 1
+        self.queries += 1
+
+    def exit(self) -> None:
+        """
+        Освобождает соединения запроса для других задач
+        """
+        self._depth -= 1
+        if self._depth == 0:
+            self._owner = None
+            self._lock.release()
+
+    def attach(self, role: str, pool: Pool, connection: asyncpg.Connection) -> None:
+        """
+        Запоминает соединение, взятое из пула для запроса
+
+        Args:
+            role: Роль соединения (PRIMARY, REPLICA или "shard:<имя шарда>")
+            pool: Пул, из которого взято соединение
+            connection: Соединение
+        """
+        self.pools[role] = pool
+        self.connections[role] = connection
+        self.acquisitions += 1
+
+    async def release(self, role: Optional[str] = None) -> None:
+        """
+        Возвращает соединение в пул
+
+        Args:
+            role: Роль соединения (None - вернуть все соединения запроса)
+        """
+        roles = [role] if role else list(self.connections)
+        for current_role in roles:
+            connection = self.connections.pop(current_role, None)
+            pool = self.pools.pop(current_role, None)
+            if connection is None or pool is None:
+                continue
+            try:
+                await pool.release(connection)
+            except Exception as e:
+                logger.error(f"Ошибка при возврате соединения запроса в пул: {str(e)}")
+
+    async def current_lsn(self) -> Optional[str]:
+        """
+        Возвращает позицию WAL основного сервера, если запрос выполнял запись
+
+        Returns:
+            Позиция WAL или None, если запрос ничего не записывал
+        """
+        if not (self.track_writes and self.wrote and self.connection is not None):
+            return None
+        await self.enter()
+        try:
+            return await self.connection.fetchval("SELECT pg_current_wal_lsn()::text")
+        except Exception as e:
+            logger.error(f"Ошибка при получении позиции WAL: {str(e)}")
+            return None
+        finally:
+            self.queries -= 1
+            self.exit()
+
+    async def close(self) -> None:
+        """
+        Завершает область: возвращает соединения в пулы и учитывает число получений
+        соединения и обращений к БД за запрос в статистике пула
+        """
+        if self.stats is not None and self.queries:
+            self.stats.record_request(self.acquisitions, self.queries)
+        await self.release()
+
+
+_current_scope: ContextVar[Optional[RequestScope]] = ContextVar("db_request_scope", default=None)
+
+
+def get_request_scope() -> Optional[RequestScope]:
+    """
+    Возвращает соединения текущего HTTP-запроса или None вне запроса
+    """
+    return _current_scope.get()
+
+
+async def run_in_scope(scope: Optional[RequestScope], awaitable: Awaitable[T]) -> T:
+    """
+    Выполняет awaitable в области соединений scope (вызывается в отдельной задаче)
+    """
+    token = _current_scope.set(scope)
+    try:
+        return await awaitable
+    finally:
+        _current_scope.reset(token)
+
+
+def query_timeout() -> Optional[float]:
+    """
+    Возвращает время ожидания для запроса к БД: остаток бюджета текущего HTTP-запроса
+
+    Returns:
+        Время в секундах или None вне HTTP-запроса и для запросов без бюджета
+
+    Raises:
+        QueryBudgetExceeded: Если бюджет исчерпан
+    """
+    scope = _current_scope.get()
+    return scope.remaining() if scope is not None else None
+
+
+def db_budget(seconds: Optional[float]) -> Callable[[], Awaitable[None]]:
+    """
+    Зависимость FastAPI, задающая бюджет времени маршрута на обращения к БД
+    вместо бюджета по умолчанию (DB_REQUEST_BUDGET).
+
+    Пример: dependencies=[Depends(db_budget(settings.DB_BUDGET_INTERACTIVE))]
+
+    Args:
+        seconds: Бюджет в секундах (None - без ограничения)
+
+    Returns:
+        Асинхронная функция-зависимость
+    """
+    async def set_db_budget() -> None:
+        scope = _current_scope.get()
+        if scope is not None:
+            scope.set_budget(seconds)
+
+    return set_db_budget
+
+
+def db_route(route_class: str, pool: Optional[str] = None) -> Callable[[], Awaitable[None]]:
+    """
+    Зависимость FastAPI, задающая класс маршрута: допустимое время ожидания соединения
+    из пула (см. acquire_timeout) и бюджет времени на обращения к БД для классов
+    interactive (DB_BUDGET_INTERACTIVE) и admin (DB_BUDGET_ADMIN), а также пул соединений.
+
+    Пример: dependencies=[Depends(db_route(WRITE_ROUTE_CLASS, pool=REALTIME_POOL))]
+
+    Args:
+        route_class: Класс маршрута
+        pool: Именованный пул для запросов маршрута к основному серверу (None - пул по умолчанию)
+
+    Returns:
+        Асинхронная функция-зависимость
+    """
+    budgets = {
+        INTERACTIVE_ROUTE_CLASS: settings.DB_BUDGET_INTERACTIVE,
+        ADMIN_ROUTE_CLASS: settings.DB_BUDGET_ADMIN,
+    }
+
+    async def set_db_route() -> None:
+        scope = _current_scope.get()
+        if scope is None:
+            return
+        scope.route_class = route_class
+        if pool is not None:
+            scope.pool_name = pool
+        if route_class in budgets:
+            scope.set_budget(budgets[route_class])
+
+    return set_db_route
+
+
+class RequestScopeMiddleware:
+    """
+    ASGI middleware, открывающее область соединений с БД на время HTTP-запроса.
+
+    Должно подключаться последним (внешним), чтобы область была видна всем остальным
+    middleware и обработчикам запроса.
+
+    Если запрос выполнял запись, в ответ добавляется заголовок X-DB-LSN с позицией WAL
+    основного сервера. Клиент передает ее в заголовке X-DB-Read-After следующих запросов:
+    такие запросы читают с реплики, только если она уже воспроизвела эту позицию.
+
+    Обращения к БД запроса ограничены бюджетом DB_REQUEST_BUDGET (маршруты задают свой
+    через db_budget). Если клиент закрыл соединение до отправки ответа, обработка запроса
+    отменяется вместе с выполняемым запросом к БД, а соединения возвращаются в пул
+    (DB_CANCEL_ON_DISCONNECT).
+
+    Если запросу не хватило соединения из пула, вместо ответа обработчика отправляется
+    503 с заголовком Retry-After.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        read_after = None
+        for name, value in scope.get("headers", []):
+            if name == READ_AFTER_HEADER.encode():
+                read_after = parse_lsn(value.decode("latin-1"))
+
+        request_scope = RequestScope(read_after_lsn=read_after, budget=settings.DB_REQUEST_BUDGET)
+        response_started = False
+        response_complete = False
+        overloaded = False
+
+        async def send_with_lsn(message):
+            nonlocal response_started, response_complete, overloaded
+            if message["type"] == "http.response.start":
+                response_started = True
+                if request_scope.pool_rejection is not None:
+                    overloaded = True
+                    for overloaded_message in overloaded_messages(request_scope.pool_rejection):
+                        await send(overloaded_message)
+                    return
+                lsn = await request_scope.current_lsn()
+                if lsn:
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (LSN_HEADER.encode(), lsn.encode())]}
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            if not overloaded:
+                await send(message)
+
+        token = _current_scope.set(request_scope)
+        try:
+            if settings.DB_CANCEL_ON_DISCONNECT:
+                await self._run_cancellable(scope, receive, send_with_lsn, lambda: response_complete)
+            else:
+                await self.app(scope, receive, send_with_lsn)
+        except PoolExhaustedError as e:
+            if response_started:
+                raise
+            for message in overloaded_messages(e):
+                await send(message)
+        finally:
+            _current_scope.reset(token)
+            await request_scope.close()
+
+    async def _run_cancellable(self, scope, receive, send, response_complete: Callable[[], bool]) -> None:
+        """
+        Выполняет приложение и отменяет его, если клиент закрыл соединение до завершения ответа.
+
+        Сообщения клиента читает отдельная задача: она передает их приложению через очередь
+        и замечает http.disconnect, даже пока обработчик ждет ответа БД.
+        """
+        messages: asyncio.Queue = asyncio.Queue()
+        app_task = asyncio.ensure_future(self.app(scope, messages.get, send))
+        disconnected = False
+
+        async def watch_disconnect():
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    if not response_complete():
+                        disconnected = True
+                        app_task.cancel()
+                    return
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            await app_task
+        except asyncio.CancelledError:
+            if not disconnected:
+                raise
+            logger.info(f"Клиент закрыл соединение, обработка запроса {scope.get('path')} отменена")
+        finally:
+            watcher.cancel()
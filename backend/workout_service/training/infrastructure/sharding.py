@@ -0,0 +1,125 @@
+import hashlib
+import inspect
+from bisect import bisect
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Таблицы с данными пользователей, которые хранятся на шарде пользователя. Порядок важен
+# для переноса данных: сессии упражнений ссылаются на сессии тренировок
+SHARDED_TABLES = ("user_workout_sessions", "user_exercise_sessions", "user_activities", "user_weights")
+
+
+def parse_shard_dsns(value: Optional[str]) -> Dict[str, str]:
+    """
+    Разбирает список шардов вида "имя=DSN,имя=DSN"
+
+    Args:
+        value: Строка из настройки DB_SHARD_DSNS
+
+    Returns:
+        DSN шардов по именам в порядке перечисления
+    """
+    shards: Dict[str, str] = {}
+    for item in (value or "").split(","):
+        if not item.strip():
+            continue
+        name, separator, dsn = item.partition("=")
+        name, dsn = name.strip(), dsn.strip()
+        if not separator or not name or not dsn:
+            raise ValueError(f"Шард должен быть задан в виде имя=DSN: {item.strip()}")
+        if name in shards:
+            raise ValueError(f"Шард {name} указан несколько раз")
+        shards[name] = dsn
+    return shards
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class ShardRing:
+    """
+    Кольцо согласованного хеширования пользователей по шардам.
+
+    Каждый шард занимает на кольце vnodes точек, пользователь относится к первому шарду
+    по часовой стрелке от хеша своего id. Шард определяется только именами шардов, поэтому
+    смена DSN шарда не перемещает пользователей, а добавление шарда к N существующим
+    перемещает на него примерно 1/(N+1) пользователей.
+    """
+
+    def __init__(self, names: Iterable[str], vnodes: int = 64):
+        self.names = tuple(names)
+        if not self.names:
+            raise ValueError("Не задано ни одного шарда")
+        points = sorted((_hash(f"{name}#{index}"), name) for name in self.names for index in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._shards = [name for _, name in points]
+
+    def shard_for(self, user_id: int) -> str:
+        """
+        Возвращает имя шарда пользователя
+        """
+        index = bisect(self._hashes, _hash(str(user_id))) % len(self._hashes)
+        return self._shards[index]
+
+    def moves(self, other: "ShardRing", user_ids: Iterable[int]) -> List[Tuple[int, str, str]]:
+        """
+        Возвращает пользователей, шард которых отличается на другом кольце
+
+        Returns:
+            Список (user_id, шард на этом кольце, шард на другом кольце)
+        """
+        result = []
+        for user_id in user_ids:
+            source, target = self.shard_for(user_id), other.shard_for(user_id)
+            if source != target:
+                result.append((user_id, source, target))
+        return result
+
+
+# Пользователь, на шарде которого выполняются обращения к таблицам SHARDED_TABLES
+_current_shard_key: ContextVar[Optional[int]] = ContextVar("db_shard_key", default=None)
+
+
+def current_shard_key() -> Optional[int]:
+    """
+    Возвращает пользователя, выбранного через use_shard, или None
+    """
+    return _current_shard_key.get()
+
+
+@contextmanager
+def use_shard(user_id: Optional[int]) -> Iterator[None]:
+    """
+    Выполняет обращения к БД внутри блока на шарде пользователя. Без шардов
+    (DB_SHARD_DSNS не задан) обращения выполняются на основном сервере.
+
+    Внутри блока можно обращаться только к таблицам SHARDED_TABLES; каталог тренировок
+    и упражнений и сводка user_workout_summary хранятся на основном сервере, для обращения
+    к ним внутри блока используется use_shard(None).
+
+    Args:
+        user_id: ID пользователя (None - основной сервер)
+    """
+    token = _current_shard_key.set(user_id)
+    try:
+        yield
+    finally:
+        _current_shard_key.reset(token)
+
+
+def user_sharded(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Выполняет метод сервиса на шарде пользователя из аргумента user_id (см. use_shard)
+    """
+    signature = inspect.signature(func)
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        user_id = signature.bind(*args, **kwargs).arguments["user_id"]
+        with use_shard(int(user_id)):
+            return await func(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,89 @@
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
+
+
+class UpdateStatements:
+    """
+    Построитель запросов UPDATE ... SET по набору изменяемых полей.
+
+    Поля упорядочиваются по имени, а текст запроса запоминается для каждого набора полей,
+    поэтому одному набору полей соответствует один текст запроса независимо от порядка,
+    в котором сервис их добавил. Это позволяет asyncpg повторно использовать подготовленные
+    запросы из кэша соединения, а не готовить новый запрос для каждого варианта текста.
+    """
+
+    def __init__(self):
+        self._statements: Dict[Tuple[Any, ...], str] = {}
+        self._services: Dict[str, Set[Tuple[Any, ...]]] = {}
+        self._calls: Dict[str, int] = {}
+
+    def reset(self) -> None:
+        self._statements.clear()
+        self._services.clear()
+        self._calls.clear()
+
+    def build(self, service: str, table: str, values: Mapping[str, Any], where: Mapping[str, Any],
+              expressions: Optional[Mapping[str, str]] = None,
+              returning: str = "*") -> Tuple[str, List[Any]]:
+        """
+        Возвращает текст запроса UPDATE и его параметры
+
+        Args:
+            service: Имя сервиса, которое учитывается в статистике запросов
+            table: Таблица
+            values: Новые значения полей (передаются параметрами запроса)
+            where: Значения полей условия WHERE (сравнение на равенство)
+            expressions: SQL-выражения для полей, например {"updated_at": "CURRENT_TIMESTAMP"}
+            returning: Список RETURNING или пустая строка
+
+        Returns:
+            Текст запроса и список параметров в порядке $1, $2, ...
+        """
+        columns = tuple(sorted(values))
+        expressions = expressions or {}
+        fixed = tuple(sorted((column, expressions[column]) for column in expressions if column not in values))
+        where_columns = tuple(where)
+        key = (table, columns, fixed, where_columns, returning)
+
+        query = self._statements.get(key)
+        if query is None:
+            assignments = sorted(
+                [(column, f"${index}") for index, column in enumerate(columns, start=1)] + list(fixed)
+            )
+            conditions = [
+                f"{column} = ${index}" for index, column in enumerate(where_columns, start=len(columns) + 1)
+            ]
+            query = (
+                f"UPDATE {table} SET {', '.join(f'{column} = {value}' for column, value in assignments)} "
+                f"WHERE {' AND '.join(conditions)}"
+            )
+            if returning:
+                query += f" RETURNING {returning}"
+            self._statements[key] = query
+
+        self._services.setdefault(service, set()).add(key)
+        self._calls[service] = self._calls.get(service, 0) + 1
+        return query, [values[column] for column in columns] + [where[column] for column in where_columns]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Число различных текстов запросов UPDATE и число построений по сервисам
+        """
+        return {
+            "distinct_statements": len(self._statements),
+            "services": {
+                service: {"distinct_statements": len(keys), "calls": self._calls[service]}
+                for service, keys in sorted(self._services.items())
+            },
+        }
+
+
+update_statements = UpdateStatements()
+
+
+def build_update(service: str, table: str, values: Mapping[str, Any], where: Mapping[str, Any],
+                 expressions: Optional[Mapping[str, str]] = None,
+                 returning: str = "*") -> Tuple[str, List[Any]]:
+    """
+    Строит запрос UPDATE через общий построитель update_statements (см. UpdateStatements.build)
+    """
+    return update_statements.build(service, table, values, where, expressions, returning)
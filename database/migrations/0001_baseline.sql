@@ -0,0 +1,228 @@
+-- Базовая схема: таблицы, индексы и сводка user_workout_summary в том виде, в каком их
+-- создавал database/init-db.sql. На базе, созданной init-db.sql, все объекты уже существуют
+-- и миграция только удаляет вспомогательные функции init-db.sql.
+
+DROP FUNCTION IF EXISTS add_column_if_not_exists(text, text, text, text);
+DROP FUNCTION IF EXISTS check_extra_columns(text, text[]);
+
+-- Таблица пользователей
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    email VARCHAR(255) UNIQUE NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    first_name VARCHAR(100),
+    last_name VARCHAR(100),
+    role_id INT DEFAULT 2,
+    is_verified BOOLEAN DEFAULT FALSE,
+    avatar_url VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Таблица кодов верификации
+CREATE TABLE IF NOT EXISTS verification_codes (
+    id SERIAL PRIMARY KEY,
+    user_id INT REFERENCES users(id) ON DELETE CASCADE,
+    verification_code VARCHAR(10) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Таблица кодов сброса пароля
+CREATE TABLE IF NOT EXISTS reset_codes (
+    id SERIAL PRIMARY KEY,
+    user_id INT REFERENCES users(id) ON DELETE CASCADE,
+    reset_code VARCHAR(10) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Таблица кодов смены email
+CREATE TABLE IF NOT EXISTS email_change_codes (
+    id SERIAL PRIMARY KEY,
+    user_id INT REFERENCES users(id) ON DELETE CASCADE,
+    new_email VARCHAR(255) NOT NULL,
+    code VARCHAR(10) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Таблица версий паролей пользователей
+CREATE TABLE IF NOT EXISTS password_versions (
+    user_id INT REFERENCES users(id) ON DELETE CASCADE PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Таблица отозванных токенов (черный список)
+CREATE TABLE IF NOT EXISTS blacklisted_tokens (
+    id SERIAL PRIMARY KEY,
+    token TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    CONSTRAINT unique_token UNIQUE (token)
+);
+
+-- Таблица групп мышц
+CREATE TABLE IF NOT EXISTS muscle_groups (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(100) UNIQUE NOT NULL,
+    description TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Таблица упражнений
+CREATE TABLE IF NOT EXISTS exercises (
+    exercise_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    muscle_group_id INT NOT NULL REFERENCES muscle_groups(id) ON DELETE RESTRICT,
+    title VARCHAR(50) NOT NULL,
+    description VARCHAR(255),
+    gif_uuid UUID,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Таблица тренировок
+CREATE TABLE IF NOT EXISTS app_workouts (
+    app_workout_uuid UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    name VARCHAR(25) NOT NULL,
+    description VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    is_visible BOOLEAN DEFAULT FALSE
+);
+
+-- Таблица упражнений в тренировке
+CREATE TABLE IF NOT EXISTS app_workout_exercises (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    app_workout_uuid UUID NOT NULL REFERENCES app_workouts(app_workout_uuid) ON DELETE CASCADE,
+    exercise_id UUID NOT NULL REFERENCES exercises(exercise_id) ON DELETE RESTRICT,
+    duration INT,
+    count INT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Таблица активности пользователей
+CREATE TABLE IF NOT EXISTS user_activities (
+    user_id INT NOT NULL,
+    record_date DATE NOT NULL,
+    workout_count INT DEFAULT 0,
+    last_workout_uuid UUID,
+    PRIMARY KEY (user_id, record_date)
+);
+
+-- Таблица весов пользователей
+CREATE TABLE IF NOT EXISTS user_weights (
+    user_id INT NOT NULL,
+    record_date DATE NOT NULL,
+    weight DECIMAL(5,2) NOT NULL,
+    PRIMARY KEY (user_id, record_date)
+);
+
+-- Таблица сессий тренировок пользователей
+CREATE TABLE IF NOT EXISTS user_workout_sessions (
+    workout_session_uuid UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id INT NOT NULL,
+    workout_uuid UUID NOT NULL,
+    datetime_start TIMESTAMP WITH TIME ZONE NOT NULL,
+    datetime_stop TIMESTAMP WITH TIME ZONE,
+    status VARCHAR(20) NOT NULL DEFAULT 'in_process',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Таблица упражнений в рамках сессии тренировки
+CREATE TABLE IF NOT EXISTS user_exercise_sessions (
+    exercise_session_uuid UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    workout_session_uuid UUID NOT NULL REFERENCES user_workout_sessions(workout_session_uuid) ON DELETE CASCADE,
+    user_id INT NOT NULL,
+    exercise_uuid UUID NOT NULL,
+    datetime_start TIMESTAMP WITH TIME ZONE,
+    datetime_end TIMESTAMP WITH TIME ZONE,
+    status VARCHAR(20) NOT NULL DEFAULT 'in_process',
+    duration INTEGER,
+    user_duration INTEGER,
+    count INTEGER,
+    user_count INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Комментарии к полям статистики упражнений для документации схемы
+COMMENT ON COLUMN user_exercise_sessions.duration IS 'Заданная длительность упражнения в секундах';
+COMMENT ON COLUMN user_exercise_sessions.user_duration IS 'Фактически выполненная длительность упражнения в секундах';
+COMMENT ON COLUMN user_exercise_sessions.count IS 'Заданное количество повторений';
+COMMENT ON COLUMN user_exercise_sessions.user_count IS 'Фактически выполненное количество повторений';
+
+-- Сводка по последней сессии пользователя для каждой тренировки (проекция, обновляется при сохранении прогресса)
+CREATE TABLE IF NOT EXISTS user_workout_summary (
+    user_id INT NOT NULL,
+    workout_uuid UUID NOT NULL,
+    last_session_uuid UUID,
+    last_session_start TIMESTAMP WITH TIME ZONE,
+    last_session_stop TIMESTAMP WITH TIME ZONE,
+    last_session_status VARCHAR(20),
+    last_exercise_session_uuid UUID,
+    last_exercise_start TIMESTAMP WITH TIME ZONE,
+    last_exercise_stop TIMESTAMP WITH TIME ZONE,
+    last_exercise_status VARCHAR(20),
+    total_workout_time INT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, workout_uuid)
+);
+
+-- Заполнение сводки по уже накопленным сессиям (существующие строки не перезаписываются)
+INSERT INTO user_workout_summary (
+    user_id, workout_uuid,
+    last_session_uuid, last_session_start, last_session_stop, last_session_status,
+    last_exercise_session_uuid, last_exercise_start, last_exercise_stop, last_exercise_status,
+    total_workout_time
+)
+SELECT
+    ls.user_id, ls.workout_uuid,
+    ls.workout_session_uuid, ls.datetime_start, ls.datetime_stop, ls.status,
+    le.exercise_session_uuid, le.datetime_start, le.datetime_end, le.status,
+    tt.total_workout_time
+FROM (
+    SELECT DISTINCT ON (user_id, workout_uuid) *
+    FROM user_workout_sessions
+    ORDER BY user_id, workout_uuid, datetime_start DESC
+) ls
+LEFT JOIN LATERAL (
+    SELECT exercise_session_uuid, datetime_start, datetime_end, status
+    FROM user_exercise_sessions
+    WHERE workout_session_uuid = ls.workout_session_uuid
+    ORDER BY datetime_start DESC
+    LIMIT 1
+) le ON true
+LEFT JOIN LATERAL (
+    SELECT
+        CASE WHEN COUNT(*) > 0 THEN
+            FLOOR(COALESCE(SUM(EXTRACT(EPOCH FROM (datetime_end - datetime_start))), 0))::int
+        END AS total_workout_time
+    FROM user_exercise_sessions
+    WHERE workout_session_uuid = ls.workout_session_uuid AND datetime_end IS NOT NULL
+) tt ON true
+ON CONFLICT (user_id, workout_uuid) DO NOTHING;
+
+-- Создание индексов
+CREATE INDEX IF NOT EXISTS idx_usersemail_ ON users(email);
+CREATE INDEX IF NOT EXISTS idx_verification_codes_user_id ON verification_codes(user_id);
+CREATE INDEX IF NOT EXISTS idx_reset_codes_user_id ON reset_codes(user_id);
+CREATE INDEX IF NOT EXISTS idx_email_change_codes_user_id ON email_change_codes(user_id);
+CREATE INDEX IF NOT EXISTS idx_exercises_muscle_group_id ON exercises(muscle_group_id);
+CREATE INDEX IF NOT EXISTS idx_app_workout_exercises_app_workout_uuid ON app_workout_exercises(app_workout_uuid);
+CREATE INDEX IF NOT EXISTS idx_app_workout_exercises_exercise_id ON app_workout_exercises(exercise_id);
+CREATE INDEX IF NOT EXISTS idx_blacklisted_tokens_expires_at ON blacklisted_tokens(expires_at);
+CREATE INDEX IF NOT EXISTS idx_user_activities_user_id ON user_activities(user_id);
+CREATE INDEX IF NOT EXISTS idx_user_activities_record_date ON user_activities(record_date);
+CREATE INDEX IF NOT EXISTS idx_user_weights_user_id ON user_weights(user_id);
+CREATE INDEX IF NOT EXISTS idx_user_weights_record_date ON user_weights(record_date);
+CREATE INDEX IF NOT EXISTS idx_user_workout_sessions_user_id ON user_workout_sessions(user_id);
+CREATE INDEX IF NOT EXISTS idx_user_workout_sessions_workout_uuid ON user_workout_sessions(workout_uuid);
+CREATE INDEX IF NOT EXISTS idx_user_workout_sessions_status ON user_workout_sessions(status);
+CREATE INDEX IF NOT EXISTS idx_user_exercise_sessions_workout_session_uuid ON user_exercise_sessions(workout_session_uuid);
+CREATE INDEX IF NOT EXISTS idx_user_exercise_sessions_user_id ON user_exercise_sessions(user_id);
+CREATE INDEX IF NOT EXISTS idx_user_exercise_sessions_exercise_uuid ON user_exercise_sessions(exercise_uuid);
+CREATE INDEX IF NOT EXISTS idx_user_exercise_sessions_status ON user_exercise_sessions(status);
+CREATE INDEX IF NOT EXISTS idx_app_workouts_created_at_uuid ON app_workouts((COALESCE(created_at, '-infinity'::timestamp)) DESC, app_workout_uuid DESC);
+CREATE INDEX IF NOT EXISTS idx_app_workouts_name_uuid ON app_workouts(name, app_workout_uuid);
+CREATE INDEX IF NOT EXISTS idx_user_workout_summary_last_session_start ON user_workout_summary(user_id, last_session_start DESC);
@@ -0,0 +1,27 @@
+-- migrate:no-transaction
+-- Составные покрывающие индексы для поиска сессий. Запросы сервиса тренировок выбирают
+-- последнюю сессию тренировки пользователя (user_id, workout_uuid ORDER BY datetime_start DESC),
+-- последнее упражнение сессии и сумму времени упражнений (workout_session_uuid ORDER BY
+-- datetime_start DESC) и сессию упражнения при сохранении прогресса (user_id, workout_session_uuid,
+-- exercise_uuid ORDER BY created_at DESC). Столбцы INCLUDE позволяют читать ответ только из индекса.
+-- Одностолбцовые индексы, которые стали префиксами новых, удаляются: они только замедляют запись.
+-- Проверка планов запросов - backend/workout_service/tests/test_query_plans.py.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_workout_sessions_user_workout_start
+    ON user_workout_sessions (user_id, workout_uuid, datetime_start DESC)
+    INCLUDE (workout_session_uuid, datetime_stop, status);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_exercise_sessions_session_start
+    ON user_exercise_sessions (workout_session_uuid, datetime_start DESC)
+    INCLUDE (exercise_session_uuid, datetime_end, status);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_exercise_sessions_lookup
+    ON user_exercise_sessions (user_id, workout_session_uuid, exercise_uuid, created_at DESC)
+    INCLUDE (exercise_session_uuid, status, datetime_start, datetime_end);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_user_workout_sessions_user_id;
+DROP INDEX CONCURRENTLY IF EXISTS idx_user_exercise_sessions_workout_session_uuid;
+DROP INDEX CONCURRENTLY IF EXISTS idx_user_exercise_sessions_user_id;
+
+ANALYZE user_workout_sessions;
+ANALYZE user_exercise_sessions;
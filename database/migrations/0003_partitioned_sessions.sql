@@ -0,0 +1,168 @@
+-- Помесячное секционирование таблиц сессий (см. backend/workout_service/training/infrastructure/partitions.py),
+-- шаг 1 из 3: секционированные копии таблиц и синхронизация записи в них.
+--
+-- user_workout_sessions секционируется по datetime_start, user_exercise_sessions - по новому столбцу
+-- workout_started_at, равному datetime_start сессии тренировки: упражнения лежат в секции того же месяца,
+-- что и их тренировка, поэтому внешний ключ (workout_session_uuid, workout_started_at) сохраняется,
+-- а секции одного месяца обеих таблиц отсоединяются вместе. Ключ секционирования входит в первичные ключи.
+--
+-- Таблицы переносятся без остановки записи:
+--   0003 - создает пустые таблицы *_partitioned и триггеры, повторяющие в них каждую запись в старые таблицы;
+--   0004 - переносит существующие строки пакетами, каждый пакет в своей транзакции;
+--   0005 - под короткой блокировкой удаляет старые таблицы и переименовывает новые.
+
+CREATE TABLE user_workout_sessions_partitioned (
+    workout_session_uuid UUID NOT NULL DEFAULT gen_random_uuid(),
+    user_id INT NOT NULL,
+    workout_uuid UUID NOT NULL,
+    datetime_start TIMESTAMP WITH TIME ZONE NOT NULL,
+    datetime_stop TIMESTAMP WITH TIME ZONE,
+    status VARCHAR(20) NOT NULL DEFAULT 'in_process',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT user_workout_sessions_partitioned_pkey PRIMARY KEY (workout_session_uuid, datetime_start)
+) PARTITION BY RANGE (datetime_start);
+
+CREATE TABLE user_exercise_sessions_partitioned (
+    exercise_session_uuid UUID NOT NULL DEFAULT gen_random_uuid(),
+    workout_session_uuid UUID NOT NULL,
+    workout_started_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    user_id INT NOT NULL,
+    exercise_uuid UUID NOT NULL,
+    datetime_start TIMESTAMP WITH TIME ZONE,
+    datetime_end TIMESTAMP WITH TIME ZONE,
+    status VARCHAR(20) NOT NULL DEFAULT 'in_process',
+    duration INTEGER,
+    user_duration INTEGER,
+    count INTEGER,
+    user_count INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT user_exercise_sessions_partitioned_pkey PRIMARY KEY (exercise_session_uuid, workout_started_at),
+    CONSTRAINT user_exercise_sessions_workout_session_fkey FOREIGN KEY (workout_session_uuid, workout_started_at)
+        REFERENCES user_workout_sessions_partitioned (workout_session_uuid, datetime_start) ON DELETE CASCADE
+) PARTITION BY RANGE (workout_started_at);
+
+-- Секция по умолчанию принимает строки, для месяца которых секция еще не создана
+CREATE TABLE user_workout_sessions_default PARTITION OF user_workout_sessions_partitioned DEFAULT;
+CREATE TABLE user_exercise_sessions_default PARTITION OF user_exercise_sessions_partitioned DEFAULT;
+
+-- Секции от месяца самой ранней сессии до трех месяцев вперед; дальше их создает PartitionManager
+DO $$
+DECLARE
+    partition_month DATE;
+BEGIN
+    FOR partition_month IN
+        SELECT generate_series(
+            date_trunc('month', LEAST(COALESCE(earliest, NOW()), NOW())),
+            date_trunc('month', NOW()) + INTERVAL '3 months',
+            INTERVAL '1 month'
+        )::date
+        FROM (SELECT MIN(datetime_start) AS earliest FROM user_workout_sessions) sessions
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF user_workout_sessions_partitioned FOR VALUES FROM (%L) TO (%L)',
+            'user_workout_sessions_' || to_char(partition_month, 'YYYY_MM'),
+            partition_month, (partition_month + INTERVAL '1 month')::date
+        );
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF user_exercise_sessions_partitioned FOR VALUES FROM (%L) TO (%L)',
+            'user_exercise_sessions_' || to_char(partition_month, 'YYYY_MM'),
+            partition_month, (partition_month + INTERVAL '1 month')::date
+        );
+    END LOOP;
+END $$;
+
+-- Индексы создаются на пустых таблицах под временными именами (постоянные имена заняты индексами старых таблиц)
+CREATE INDEX user_workout_sessions_partitioned_user_workout_start
+    ON user_workout_sessions_partitioned (user_id, workout_uuid, datetime_start DESC)
+    INCLUDE (workout_session_uuid, datetime_stop, status);
+CREATE INDEX user_workout_sessions_partitioned_workout_uuid ON user_workout_sessions_partitioned (workout_uuid);
+CREATE INDEX user_workout_sessions_partitioned_status ON user_workout_sessions_partitioned (status);
+CREATE INDEX user_exercise_sessions_partitioned_session_start
+    ON user_exercise_sessions_partitioned (workout_session_uuid, datetime_start DESC)
+    INCLUDE (exercise_session_uuid, datetime_end, status);
+CREATE INDEX user_exercise_sessions_partitioned_lookup
+    ON user_exercise_sessions_partitioned (user_id, workout_session_uuid, exercise_uuid, created_at DESC)
+    INCLUDE (exercise_session_uuid, status, datetime_start, datetime_end);
+CREATE INDEX user_exercise_sessions_partitioned_exercise_uuid ON user_exercise_sessions_partitioned (exercise_uuid);
+CREATE INDEX user_exercise_sessions_partitioned_status ON user_exercise_sessions_partitioned (status);
+
+-- Запись в старые таблицы повторяется в новых. Строка, которую перенос (0004) уже скопировал,
+-- заменяется новой версией; строка, которую он еще не скопировал, вставляется сразу.
+-- Сервис не изменяет datetime_start сессии тренировки, поэтому ключ строки в новой таблице постоянен
+CREATE FUNCTION sync_user_workout_sessions_partitioned() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM user_workout_sessions_partitioned WHERE workout_session_uuid = OLD.workout_session_uuid;
+        RETURN OLD;
+    END IF;
+    INSERT INTO user_workout_sessions_partitioned (
+        workout_session_uuid, user_id, workout_uuid, datetime_start, datetime_stop, status, created_at, updated_at
+    )
+    VALUES (
+        NEW.workout_session_uuid, NEW.user_id, NEW.workout_uuid, NEW.datetime_start, NEW.datetime_stop,
+        NEW.status, NEW.created_at, NEW.updated_at
+    )
+    ON CONFLICT (workout_session_uuid, datetime_start) DO UPDATE SET
+        user_id = EXCLUDED.user_id,
+        workout_uuid = EXCLUDED.workout_uuid,
+        datetime_stop = EXCLUDED.datetime_stop,
+        status = EXCLUDED.status,
+        created_at = EXCLUDED.created_at,
+        updated_at = EXCLUDED.updated_at;
+    RETURN NEW;
+END $$;
+
+-- Сессия упражнения ссылается на сессию тренировки, которую перенос мог еще не скопировать:
+-- она копируется вместе с ней
+CREATE FUNCTION sync_user_exercise_sessions_partitioned() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    started_at TIMESTAMP WITH TIME ZONE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM user_exercise_sessions_partitioned WHERE exercise_session_uuid = OLD.exercise_session_uuid;
+        RETURN OLD;
+    END IF;
+    SELECT datetime_start INTO started_at
+    FROM user_workout_sessions
+    WHERE workout_session_uuid = NEW.workout_session_uuid;
+    INSERT INTO user_workout_sessions_partitioned (
+        workout_session_uuid, user_id, workout_uuid, datetime_start, datetime_stop, status, created_at, updated_at
+    )
+    SELECT workout_session_uuid, user_id, workout_uuid, datetime_start, datetime_stop, status, created_at, updated_at
+    FROM user_workout_sessions
+    WHERE workout_session_uuid = NEW.workout_session_uuid
+    ON CONFLICT (workout_session_uuid, datetime_start) DO NOTHING;
+    INSERT INTO user_exercise_sessions_partitioned (
+        exercise_session_uuid, workout_session_uuid, workout_started_at, user_id, exercise_uuid,
+        datetime_start, datetime_end, status, duration, user_duration, count, user_count, created_at, updated_at
+    )
+    VALUES (
+        NEW.exercise_session_uuid, NEW.workout_session_uuid, started_at, NEW.user_id, NEW.exercise_uuid,
+        NEW.datetime_start, NEW.datetime_end, NEW.status, NEW.duration, NEW.user_duration, NEW.count,
+        NEW.user_count, NEW.created_at, NEW.updated_at
+    )
+    ON CONFLICT (exercise_session_uuid, workout_started_at) DO UPDATE SET
+        user_id = EXCLUDED.user_id,
+        exercise_uuid = EXCLUDED.exercise_uuid,
+        datetime_start = EXCLUDED.datetime_start,
+        datetime_end = EXCLUDED.datetime_end,
+        status = EXCLUDED.status,
+        duration = EXCLUDED.duration,
+        user_duration = EXCLUDED.user_duration,
+        count = EXCLUDED.count,
+        user_count = EXCLUDED.user_count,
+        created_at = EXCLUDED.created_at,
+        updated_at = EXCLUDED.updated_at;
+    RETURN NEW;
+END $$;
+
+-- Триггеры создаются последними: CREATE TRIGGER блокирует запись в таблицу до конца транзакции,
+-- поэтому после них в транзакции не должно остаться долгих запросов
+CREATE TRIGGER user_workout_sessions_sync_partitioned
+    AFTER INSERT OR UPDATE OR DELETE ON user_workout_sessions
+    FOR EACH ROW EXECUTE FUNCTION sync_user_workout_sessions_partitioned();
+CREATE TRIGGER user_exercise_sessions_sync_partitioned
+    AFTER INSERT OR UPDATE OR DELETE ON user_exercise_sessions
+    FOR EACH ROW EXECUTE FUNCTION sync_user_exercise_sessions_partitioned();
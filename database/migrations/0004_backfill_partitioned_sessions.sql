@@ -0,0 +1,117 @@
+-- migrate:no-transaction
+-- Помесячное секционирование таблиц сессий, шаг 2 из 3: перенос существующих строк в таблицы *_partitioned.
+--
+-- Строки копируются пакетами по 5000 в порядке первичного ключа старой таблицы, каждый пакет
+-- фиксируется отдельно: блокировки строк держатся только на время пакета, запись в старые таблицы
+-- продолжается, а ее изменения повторяют триггеры из 0003. Строки, которые триггер уже записал,
+-- не перезаписываются (ON CONFLICT DO NOTHING), поэтому после сбоя миграция безопасно выполняется заново.
+
+DO $$
+DECLARE
+    last_uuid UUID := '00000000-0000-0000-0000-000000000000';
+    batch_end UUID;
+BEGIN
+    LOOP
+        SELECT MAX(workout_session_uuid) INTO batch_end
+        FROM (
+            SELECT workout_session_uuid FROM user_workout_sessions
+            WHERE workout_session_uuid > last_uuid
+            ORDER BY workout_session_uuid
+            LIMIT 5000
+        ) batch;
+        EXIT WHEN batch_end IS NULL;
+        INSERT INTO user_workout_sessions_partitioned (
+            workout_session_uuid, user_id, workout_uuid, datetime_start, datetime_stop, status, created_at, updated_at
+        )
+        SELECT workout_session_uuid, user_id, workout_uuid, datetime_start, datetime_stop, status, created_at, updated_at
+        FROM user_workout_sessions
+        WHERE workout_session_uuid > last_uuid AND workout_session_uuid <= batch_end
+        ON CONFLICT (workout_session_uuid, datetime_start) DO NOTHING;
+        last_uuid := batch_end;
+        COMMIT;
+    END LOOP;
+END $$;
+
+DO $$
+DECLARE
+    last_uuid UUID := '00000000-0000-0000-0000-000000000000';
+    batch_end UUID;
+BEGIN
+    LOOP
+        SELECT MAX(exercise_session_uuid) INTO batch_end
+        FROM (
+            SELECT exercise_session_uuid FROM user_exercise_sessions
+            WHERE exercise_session_uuid > last_uuid
+            ORDER BY exercise_session_uuid
+            LIMIT 5000
+        ) batch;
+        EXIT WHEN batch_end IS NULL;
+        INSERT INTO user_exercise_sessions_partitioned (
+            exercise_session_uuid, workout_session_uuid, workout_started_at, user_id, exercise_uuid,
+            datetime_start, datetime_end, status, duration, user_duration, count, user_count, created_at, updated_at
+        )
+        SELECT e.exercise_session_uuid, e.workout_session_uuid, w.datetime_start, e.user_id, e.exercise_uuid,
+               e.datetime_start, e.datetime_end, e.status, e.duration, e.user_duration, e.count, e.user_count,
+               e.created_at, e.updated_at
+        FROM user_exercise_sessions e
+        JOIN user_workout_sessions_partitioned w ON w.workout_session_uuid = e.workout_session_uuid
+        WHERE e.exercise_session_uuid > last_uuid AND e.exercise_session_uuid <= batch_end
+        ON CONFLICT (exercise_session_uuid, workout_started_at) DO NOTHING;
+        last_uuid := batch_end;
+        COMMIT;
+    END LOOP;
+END $$;
+
+-- Пакет, прочитанный до удаления строки из старой таблицы, мог скопировать ее уже после того,
+-- как триггер удалил ее копию: такие строки удаляются (сессии упражнений - каскадом)
+DO $$
+DECLARE
+    last_uuid UUID := '00000000-0000-0000-0000-000000000000';
+    batch_end UUID;
+BEGIN
+    LOOP
+        SELECT MAX(workout_session_uuid) INTO batch_end
+        FROM (
+            SELECT workout_session_uuid FROM user_workout_sessions_partitioned
+            WHERE workout_session_uuid > last_uuid
+            ORDER BY workout_session_uuid
+            LIMIT 5000
+        ) batch;
+        EXIT WHEN batch_end IS NULL;
+        DELETE FROM user_workout_sessions_partitioned p
+        WHERE p.workout_session_uuid > last_uuid AND p.workout_session_uuid <= batch_end
+            AND NOT EXISTS (
+                SELECT 1 FROM user_workout_sessions w WHERE w.workout_session_uuid = p.workout_session_uuid
+            );
+        last_uuid := batch_end;
+        COMMIT;
+    END LOOP;
+END $$;
+
+DO $$
+DECLARE
+    last_uuid UUID := '00000000-0000-0000-0000-000000000000';
+    batch_end UUID;
+BEGIN
+    LOOP
+        SELECT MAX(exercise_session_uuid) INTO batch_end
+        FROM (
+            SELECT exercise_session_uuid FROM user_exercise_sessions_partitioned
+            WHERE exercise_session_uuid > last_uuid
+            ORDER BY exercise_session_uuid
+            LIMIT 5000
+        ) batch;
+        EXIT WHEN batch_end IS NULL;
+        DELETE FROM user_exercise_sessions_partitioned p
+        WHERE p.exercise_session_uuid > last_uuid AND p.exercise_session_uuid <= batch_end
+            AND NOT EXISTS (
+                SELECT 1 FROM user_exercise_sessions e WHERE e.exercise_session_uuid = p.exercise_session_uuid
+            );
+        last_uuid := batch_end;
+        COMMIT;
+    END LOOP;
+END $$;
+
+-- Статистика собирается до замены таблиц, чтобы планы запросов были верными сразу после нее
+ANALYZE user_workout_sessions_partitioned;
+ANALYZE user_exercise_sessions_partitioned;
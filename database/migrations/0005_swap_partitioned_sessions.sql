@@ -0,0 +1,34 @@
+-- Помесячное секционирование таблиц сессий, шаг 3 из 3: замена старых таблиц секционированными.
+--
+-- Таблицы *_partitioned уже содержат все строки (0004), а триггеры из 0003 повторяли в них каждую
+-- запись, поэтому под блокировкой ничего не копируется: удаляются триггеры и старые таблицы,
+-- новые таблицы, их ограничения и индексы получают постоянные имена. Блокировка ждет не дольше
+-- lock_timeout (DB_MIGRATION_LOCK_TIMEOUT), после чего миграция повторяется.
+
+LOCK TABLE user_workout_sessions, user_exercise_sessions IN ACCESS EXCLUSIVE MODE;
+
+DROP TRIGGER user_exercise_sessions_sync_partitioned ON user_exercise_sessions;
+DROP TRIGGER user_workout_sessions_sync_partitioned ON user_workout_sessions;
+DROP FUNCTION sync_user_exercise_sessions_partitioned();
+DROP FUNCTION sync_user_workout_sessions_partitioned();
+
+DROP TABLE user_exercise_sessions;
+DROP TABLE user_workout_sessions;
+
+ALTER TABLE user_workout_sessions_partitioned RENAME TO user_workout_sessions;
+ALTER TABLE user_exercise_sessions_partitioned RENAME TO user_exercise_sessions;
+ALTER TABLE user_workout_sessions RENAME CONSTRAINT user_workout_sessions_partitioned_pkey TO user_workout_sessions_pkey;
+ALTER TABLE user_exercise_sessions RENAME CONSTRAINT user_exercise_sessions_partitioned_pkey TO user_exercise_sessions_pkey;
+ALTER INDEX user_workout_sessions_partitioned_user_workout_start RENAME TO idx_user_workout_sessions_user_workout_start;
+ALTER INDEX user_workout_sessions_partitioned_workout_uuid RENAME TO idx_user_workout_sessions_workout_uuid;
+ALTER INDEX user_workout_sessions_partitioned_status RENAME TO idx_user_workout_sessions_status;
+ALTER INDEX user_exercise_sessions_partitioned_session_start RENAME TO idx_user_exercise_sessions_session_start;
+ALTER INDEX user_exercise_sessions_partitioned_lookup RENAME TO idx_user_exercise_sessions_lookup;
+ALTER INDEX user_exercise_sessions_partitioned_exercise_uuid RENAME TO idx_user_exercise_sessions_exercise_uuid;
+ALTER INDEX user_exercise_sessions_partitioned_status RENAME TO idx_user_exercise_sessions_status;
+
+COMMENT ON COLUMN user_exercise_sessions.workout_started_at IS 'Время начала сессии тренировки (ключ секционирования)';
+COMMENT ON COLUMN user_exercise_sessions.duration IS 'Заданная длительность упражнения в секундах';
+COMMENT ON COLUMN user_exercise_sessions.user_duration IS 'Фактически выполненная длительность упражнения в секундах';
+COMMENT ON COLUMN user_exercise_sessions.count IS 'Заданное количество повторений';
+COMMENT ON COLUMN user_exercise_sessions.user_count IS 'Фактически выполненное количество повторений';
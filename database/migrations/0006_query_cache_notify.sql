@@ -0,0 +1,21 @@
+-- Уведомления об изменении таблиц, результаты чтения которых кэшируют процессы сервиса тренировок
+-- (Database.fetch_cached). Кэш свой у каждого процесса: запись сбрасывает кэш процесса, который
+-- ее выполнил, а остальные процессы сбрасывают свой по уведомлению в канале query_cache_invalidate
+-- (см. QueryCacheListener в backend/workout_service/training/infrastructure/query_cache.py).
+-- NOTIFY доставляется при фиксации транзакции, одинаковые уведомления одной транзакции объединяются.
+
+CREATE FUNCTION notify_query_cache() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('query_cache_invalidate', TG_TABLE_NAME);
+    RETURN NULL;
+END $$;
+
+CREATE TRIGGER muscle_groups_notify_query_cache
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON muscle_groups
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_query_cache();
+CREATE TRIGGER exercises_notify_query_cache
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON exercises
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_query_cache();
+CREATE TRIGGER app_workout_exercises_notify_query_cache
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON app_workout_exercises
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_query_cache();
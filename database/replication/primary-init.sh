@@ -0,0 +1,5 @@
+#!/bin/bash
+# Разрешает потоковую репликацию с основного сервера (выполняется при инициализации кластера)
+set -e
+
+echo "host replication ${POSTGRES_USER} all md5" >> "$PGDATA/pg_hba.conf"
@@ -0,0 +1,14 @@
+#!/bin/bash
+# Запуск реплики: при первом запуске копирует кластер с основного сервера через pg_basebackup
+# и включает потоковую репликацию (standby.signal и primary_conninfo создаются флагом -R)
+set -e
+
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    until pg_basebackup -h "${PRIMARY_HOST:-postgres}" -p 5432 -U "$DB_USER" -D "$PGDATA" -X stream -R; do
+        echo "Основной сервер недоступен, повтор через 2 секунды..."
+        sleep 2
+    done
+    chmod 700 "$PGDATA"
+fi
+
+exec postgres -c listen_addresses='*' -c hot_standby=on
@@ -17,6 +17,24 @@ const getAccessToken = (): string | null => {
   return null;
 };
 
+// Позиция WAL последней записи в сервис тренировок: передается обратно в заголовке
+// X-DB-Read-After, чтобы чтения с реплики БД видели собственные изменения пользователя
+const DB_LSN_STORAGE_KEY = 'db_read_after_lsn';
+
+const getReadAfterLsn = (): string | null => {
+  if (typeof window !== 'undefined') {
+    return sessionStorage.getItem(DB_LSN_STORAGE_KEY);
+  }
+  return null;
+};
+
+const saveReadAfterLsn = (response: Response): void => {
+  const lsn = response.headers.get('X-DB-LSN');
+  if (lsn && typeof window !== 'undefined') {
+    sessionStorage.setItem(DB_LSN_STORAGE_KEY, lsn);
+  }
+};
+
 // Общая функция для выполнения запросов с авторизацией
 export async function fetchWithAuth<T>(
   url: string, 
@@ -35,11 +53,18 @@ export async function fetchWithAuth<T>(
     headers.set('Authorization', `Bearer ${token}`);
   }
   
+  const readAfterLsn = WORKOUT_API_PREFIX && url.includes(WORKOUT_API_PREFIX) ? getReadAfterLsn() : null;
+  if (readAfterLsn) {
+    headers.set('X-DB-Read-After', readAfterLsn);
+  }
+  
   const response = await fetch(url, {
     ...options,
     headers,
   });
   
+  saveReadAfterLsn(response);
+  
   if (!response.ok) {
     const error = await response.json().catch(() => ({ detail: 'Неизвестная ошибка' }));
     throw new Error(error.detail || `Ошибка ${response.status}`);